@@ -1,15 +1,39 @@
+import html
+import re
+import time
+
 from aiogram import Router, F
 from aiogram.types import CallbackQuery, Message
+from aiogram.exceptions import TelegramBadRequest
 from aiogram.filters import Command
-from typing import Optional
-
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.state import State, StatesGroup
+from typing import Callable, Optional
+
+from app.config.settings import settings
+from app.core.exceptions.message import (
+    ExportAlreadyRunning,
+    InvalidMessageData,
+    PurgeAlreadyRunning,
+)
+from app.core.models.user import User
+from app.core.schemas.user import UserIdentity
+from app.core.services.cabinet_service import SEARCH_QUERY_MAX_LENGTH, SEARCH_QUERY_MIN_LENGTH
 from app.core.services.container import Container
+from app.core.services.history_export import ExportFormat
+from app.bot.input_files import StreamInputFile
 from app.bot.keyboards import CabinetKeyboards
 
 
 router = Router()
 
 
+class HistorySearch(StatesGroup):
+    """Search flow: the query is kept in FSM data, the cursor in callback data"""
+
+    waiting_for_query = State()
+
+
 class CabinetMessages:
     """Cabinet interface messages"""
     
@@ -85,6 +109,42 @@ class CabinetMessages:
             f"Showing {start}-{end} of {total_count} messages\n\n"
         )
     
+    @staticmethod
+    def search_prompt() -> str:
+        return (
+            f"🔍 <b>Search History</b>\n\n"
+            f"Send me a word or phrase to find in your messages "
+            f"({SEARCH_QUERY_MIN_LENGTH}-{SEARCH_QUERY_MAX_LENGTH} characters)."
+        )
+    
+    @staticmethod
+    def search_results_header(query: str, page: int) -> str:
+        return (
+            f"🔍 <b>Search:</b> <i>{html.escape(query)}</i>\n"
+            f"Best matches, page {page}\n\n"
+        )
+    
+    @staticmethod
+    def search_no_results(query: str) -> str:
+        return (
+            f"🔍 <b>Search:</b> <i>{html.escape(query)}</i>\n\n"
+            f"Nothing found. Try another word or a shorter phrase."
+        )
+    
+    @staticmethod
+    def format_search_item(msg: dict, index: int, query: str) -> str:
+        # Подсвечиваем вхождения слов запроса в экранированном тексте
+        content = html.escape(msg["content"])
+        words = [html.escape(word) for word in re.findall(r"\w+", query)]
+        if words:
+            pattern = re.compile("|".join(map(re.escape, words)), re.IGNORECASE)
+            content = pattern.sub(lambda match: f"<b>{match.group(0)}</b>", content)
+        return (
+            f"<b>{index}.</b> {msg['role']}\n"
+            f"⏰ {msg['timestamp']}\n"
+            f"💬 <i>{content}</i>\n"
+        )
+    
     @staticmethod
     def format_message_item(msg: dict, index: int) -> str:
         return (
@@ -129,9 +189,11 @@ class CabinetMessages:
     def export_confirmation() -> str:
         return (
             f"📤 <b>Export Message History</b>\n\n"
-            f"This will generate a text file with your complete message history.\n\n"
-            f"⚠️ <i>Large histories may take a moment to process.</i>\n\n"
-            f"Continue with export?"
+            f"This will generate a file with your complete message history.\n\n"
+            f"📄 <b>TXT</b> — readable text, 🧾 <b>JSONL</b> — one JSON object per line, "
+            f"📊 <b>CSV</b> — for spreadsheets. 🗜️ variants are gzip-compressed.\n\n"
+            f"⚠️ <i>Large histories may take a moment and arrive in several parts.</i>\n\n"
+            f"Choose a format:"
         )
     
     @staticmethod
@@ -143,6 +205,37 @@ class CabinetMessages:
             f"Are you sure you want to continue?"
         )
     
+    @staticmethod
+    def export_queued() -> str:
+        return (
+            f"📤 <b>Export Queued</b>\n\n"
+            f"⏳ Your export will start shortly. "
+            f"The file will be sent to this chat when it is ready."
+        )
+    
+    @staticmethod
+    def export_progress(written: int, total: Optional[int]) -> str:
+        if not total:
+            return (
+                f"📤 <b>Export Started</b>\n\n"
+                f"⏳ Preparing your history..."
+            )
+        percent = min(100, written * 100 // total)
+        filled = percent // 10
+        return (
+            f"📤 <b>Exporting History</b>\n\n"
+            f"{'▓' * filled}{'░' * (10 - filled)} {percent}%\n"
+            f"{written:,} / {total:,} messages"
+        )
+    
+    @staticmethod
+    def export_finished(messages: int, parts: int) -> str:
+        files = f"{parts} files" if parts > 1 else "1 file"
+        return (
+            f"✅ <b>Export Completed</b>\n\n"
+            f"📊 {messages:,} messages in {files}."
+        )
+    
     @staticmethod
     def export_success() -> str:
         return (
@@ -152,6 +245,16 @@ class CabinetMessages:
             f"💡 <i>You can save this file for your records.</i>"
         )
     
+    @staticmethod
+    def clear_progress(deleted: int, total: int) -> str:
+        percent = min(100, deleted * 100 // total) if total else 0
+        filled = percent // 10
+        return (
+            f"🗑️ <b>Clearing History</b>\n\n"
+            f"{'▓' * filled}{'░' * (10 - filled)} {percent}%\n"
+            f"{deleted:,} / {total:,} messages deleted"
+        )
+    
     @staticmethod
     def clear_success(deleted_count: int) -> str:
         return (
@@ -178,14 +281,13 @@ class CabinetMessages:
 
 
 @router.message(Command("cabinet"))
-async def open_cabinet(message: Message):
+async def open_cabinet(message: Message, container: Container, user: User):
     """Open personal cabinet"""
-    container = Container()
     cabinet_service = container.get_cabinet_service()
     
     try:
         # Get user profile for welcome message
-        profile_data = await cabinet_service.get_profile_info(message.from_user.id)
+        profile_data = await cabinet_service.get_profile_info(message.from_user.id, user=user)
         welcome_text = CabinetMessages.welcome_message(profile_data['full_name'])
         
         await message.answer(
@@ -201,13 +303,12 @@ async def open_cabinet(message: Message):
 
 
 @router.callback_query(F.data == "cabinet_main")
-async def cabinet_main_menu(callback: CallbackQuery):
+async def cabinet_main_menu(callback: CallbackQuery, container: Container, user: User):
     """Show main cabinet menu"""
-    container = Container()
     cabinet_service = container.get_cabinet_service()
     
     try:
-        profile_data = await cabinet_service.get_profile_info(callback.from_user.id)
+        profile_data = await cabinet_service.get_profile_info(callback.from_user.id, user=user)
         welcome_text = CabinetMessages.welcome_message(profile_data['full_name'])
         
         await callback.message.edit_text(
@@ -221,13 +322,12 @@ async def cabinet_main_menu(callback: CallbackQuery):
 
 
 @router.callback_query(F.data == "cabinet_profile")
-async def show_profile_info(callback: CallbackQuery):
+async def show_profile_info(callback: CallbackQuery, container: Container, user: User):
     """Show user profile information"""
-    container = Container()
     cabinet_service = container.get_cabinet_service()
     
     try:
-        profile_data = await cabinet_service.get_profile_info(callback.from_user.id)
+        profile_data = await cabinet_service.get_profile_info(callback.from_user.id, user=user)
         profile_text = CabinetMessages.profile_info_message(profile_data)
         
         await callback.message.edit_text(
@@ -257,13 +357,12 @@ async def show_stats_menu(callback: CallbackQuery):
 
 
 @router.callback_query(F.data == "stats_daily")
-async def show_daily_stats(callback: CallbackQuery):
+async def show_daily_stats(callback: CallbackQuery, container: Container, user: User):
     """Show daily usage statistics"""
-    container = Container()
     cabinet_service = container.get_cabinet_service()
     
     try:
-        stats = await cabinet_service.get_daily_usage_stats(callback.from_user.id)
+        stats = await cabinet_service.get_daily_usage_stats(callback.from_user.id, user=user)
         stats_text = CabinetMessages.daily_usage_message(stats)
         
         await callback.message.edit_text(
@@ -277,13 +376,14 @@ async def show_daily_stats(callback: CallbackQuery):
 
 
 @router.callback_query(F.data == "stats_weekly")
-async def show_weekly_stats(callback: CallbackQuery):
+async def show_weekly_stats(
+    callback: CallbackQuery, container: Container, identity: UserIdentity
+):
     """Show weekly usage statistics"""
-    container = Container()
     cabinet_service = container.get_cabinet_service()
     
     try:
-        stats = await cabinet_service.get_weekly_stats(callback.from_user.id)
+        stats = await cabinet_service.get_weekly_stats(callback.from_user.id, user_id=identity.id)
         stats_text = CabinetMessages.weekly_stats_message(stats)
         
         await callback.message.edit_text(
@@ -297,13 +397,12 @@ async def show_weekly_stats(callback: CallbackQuery):
 
 
 @router.callback_query(F.data == "stats_all_time")
-async def show_all_time_stats(callback: CallbackQuery):
+async def show_all_time_stats(callback: CallbackQuery, container: Container, user: User):
     """Show all-time usage statistics"""
-    container = Container()
     cabinet_service = container.get_cabinet_service()
     
     try:
-        stats = await cabinet_service.get_all_time_stats(callback.from_user.id)
+        stats = await cabinet_service.get_all_time_stats(callback.from_user.id, user=user)
         stats_text = CabinetMessages.all_time_stats_message(stats)
         
         await callback.message.edit_text(
@@ -330,35 +429,60 @@ async def show_history_menu(callback: CallbackQuery):
 
 
 @router.callback_query(F.data == "history_recent")
-async def show_recent_messages(callback: CallbackQuery):
+async def show_recent_messages(
+    callback: CallbackQuery, container: Container, identity: UserIdentity
+):
     """Show recent messages with pagination"""
-    await show_messages_page(callback, page=1)
+    await show_messages_page(callback, container, identity, page=1)
 
 
-@router.callback_query(F.data.startswith("history_recent_page_"))
-async def show_messages_page_handler(callback: CallbackQuery):
-    """Handle message history pagination"""
-    page = int(callback.data.split("_")[-1])
-    await show_messages_page(callback, page)
+@router.callback_query(
+    F.data.startswith("history_recent_older_") | F.data.startswith("history_recent_newer_")
+)
+async def show_messages_page_handler(
+    callback: CallbackQuery, container: Container, identity: UserIdentity
+):
+    """Handle message history pagination (keyset cursor in callback data)"""
+    try:
+        _, direction, page, cursor = callback.data.rsplit("_", 3)
+        page_number = int(page)
+    except ValueError:
+        await callback.answer("Error loading messages", show_alert=True)
+        return
+    await show_messages_page(callback, container, identity, page_number, cursor, direction)
 
 
-async def show_messages_page(callback: CallbackQuery, page: int):
+@router.callback_query(F.data.startswith("history_recent_page_"))
+async def show_legacy_messages_page(
+    callback: CallbackQuery, container: Container, identity: UserIdentity
+):
+    """Offset-based buttons from old messages: restart from the first page"""
+    await show_messages_page(callback, container, identity, page=1)
+
+
+async def show_messages_page(
+    callback: CallbackQuery,
+    container: Container,
+    identity: UserIdentity,
+    page: int,
+    cursor: Optional[str] = None,
+    direction: str = "older",
+):
     """Show messages page with pagination"""
-    container = Container()
     cabinet_service = container.get_cabinet_service()
     
     try:
         per_page = 5
-        offset = (page - 1) * per_page
         
-        # Get messages and total count
-        messages = await cabinet_service.get_recent_messages(
-            callback.from_user.id, 
-            limit=per_page, 
-            offset=offset
+        # Keyset pagination: cost does not depend on the page number
+        messages_page = await cabinet_service.get_messages_page(
+            callback.from_user.id,
+            cursor=cursor,
+            direction=direction,
+            limit=per_page,
+            user_id=identity.id,
         )
-        total_count = await cabinet_service.get_message_history_count(callback.from_user.id)
-        total_pages = (total_count + per_page - 1) // per_page
+        messages = messages_page.messages
         
         if not messages:
             no_messages_text = (
@@ -374,8 +498,18 @@ async def show_messages_page(callback: CallbackQuery, page: int):
             await callback.answer()
             return
         
+        if messages_page.newer_cursor is None:
+            page = 1
+        
+        # Total count is cached between pages
+        total_count = messages_page.total_count
+        total_pages = (total_count + per_page - 1) // per_page
+        offset = (page - 1) * per_page
+        
         # Build message text
-        header = CabinetMessages.recent_messages_header(total_count, page, per_page)
+        header = CabinetMessages.recent_messages_header(
+            max(total_count, offset + len(messages)), page, per_page
+        )
         message_text = header
         
         for i, msg in enumerate(messages, 1):
@@ -384,7 +518,11 @@ async def show_messages_page(callback: CallbackQuery, page: int):
         
         # Show with pagination keyboard
         keyboard = CabinetKeyboards.pagination_keyboard(
-            page, total_pages, "history_recent"
+            page,
+            total_pages,
+            "history_recent",
+            newer_cursor=messages_page.newer_cursor,
+            older_cursor=messages_page.older_cursor,
         )
         
         await callback.message.edit_text(
@@ -398,6 +536,114 @@ async def show_messages_page(callback: CallbackQuery, page: int):
         await callback.answer("Error loading messages", show_alert=True)
 
 
+@router.callback_query(F.data == "history_search")
+async def start_history_search(callback: CallbackQuery, state: FSMContext):
+    """Ask for a search query"""
+    await state.clear()
+    await state.set_state(HistorySearch.waiting_for_query)
+    
+    await callback.message.edit_text(
+        CabinetMessages.search_prompt(),
+        reply_markup=CabinetKeyboards.search_prompt(),
+        parse_mode="HTML"
+    )
+    await callback.answer()
+
+
+@router.callback_query(F.data == "history_search_cancel")
+async def cancel_history_search(callback: CallbackQuery, state: FSMContext):
+    """Leave the search flow and return to the history menu"""
+    await state.clear()
+    await show_history_menu(callback)
+
+
+@router.message(HistorySearch.waiting_for_query, F.text & ~F.text.startswith("/"))
+async def handle_search_query(
+    message: Message, state: FSMContext, container: Container, identity: UserIdentity
+):
+    """Run the search and show the first page of results"""
+    cabinet_service = container.get_cabinet_service()
+    query = message.text.strip()
+    per_page = 5
+    
+    try:
+        results = await cabinet_service.search_messages(
+            message.from_user.id, query, limit=per_page, user_id=identity.id
+        )
+    except InvalidMessageData:
+        await message.answer(
+            CabinetMessages.search_prompt(),
+            reply_markup=CabinetKeyboards.search_prompt(),
+            parse_mode="HTML"
+        )
+        return
+    except Exception:
+        await message.answer(CabinetMessages.error_message(), parse_mode="HTML")
+        return
+    
+    # Запрос остаётся в данных FSM для листания, следующий текст снова идёт в чат
+    await state.set_state(None)
+    await state.update_data(search_query=query)
+    
+    text, keyboard = _search_results_view(results, query, page=1, per_page=per_page)
+    await message.answer(text, reply_markup=keyboard, parse_mode="HTML")
+
+
+@router.callback_query(
+    F.data.startswith("history_search_older_") | F.data.startswith("history_search_newer_")
+)
+async def show_search_page(
+    callback: CallbackQuery, state: FSMContext, container: Container, identity: UserIdentity
+):
+    """Handle search results pagination (keyset cursor in callback data)"""
+    query = (await state.get_data()).get("search_query")
+    if query is None:
+        await callback.answer("Search expired, please start a new one", show_alert=True)
+        return
+    
+    cabinet_service = container.get_cabinet_service()
+    per_page = 5
+    
+    try:
+        _, direction, page, cursor = callback.data.rsplit("_", 3)
+        results = await cabinet_service.search_messages(
+            callback.from_user.id,
+            query,
+            cursor=cursor,
+            direction=direction,
+            limit=per_page,
+            user_id=identity.id,
+        )
+        page_number = int(page) if results.newer_cursor is not None else 1
+        
+        text, keyboard = _search_results_view(results, query, page_number, per_page)
+        await callback.message.edit_text(text, reply_markup=keyboard, parse_mode="HTML")
+        await callback.answer()
+    except Exception:
+        await callback.answer("Error loading search results", show_alert=True)
+
+
+def _search_results_view(results, query: str, page: int, per_page: int):
+    """Text and keyboard for one page of search results"""
+    if not results.messages:
+        return CabinetMessages.search_no_results(query), CabinetKeyboards.history_menu()
+    
+    text = CabinetMessages.search_results_header(query, page)
+    offset = (page - 1) * per_page
+    for i, msg in enumerate(results.messages, 1):
+        text += CabinetMessages.format_search_item(msg, offset + i, query)
+        text += "\n"
+    
+    keyboard = CabinetKeyboards.pagination_keyboard(
+        page,
+        None,
+        "history_search",
+        newer_cursor=results.newer_cursor,
+        older_cursor=results.older_cursor,
+    )
+    return text, keyboard
+
+
 @router.callback_query(F.data == "history_export")
 async def confirm_export(callback: CallbackQuery):
     """Confirm message history export"""
@@ -405,46 +651,114 @@ async def confirm_export(callback: CallbackQuery):
     
     await callback.message.edit_text(
         export_text,
-        reply_markup=CabinetKeyboards.confirmation_keyboard("export"),
+        reply_markup=CabinetKeyboards.export_format_keyboard(),
         parse_mode="HTML"
     )
     await callback.answer()
 
 
-@router.callback_query(F.data == "confirm_export")
-async def export_history(callback: CallbackQuery):
-    """Export message history"""
-    container = Container()
+@router.callback_query(F.data.startswith("confirm_export"))
+async def export_history(callback: CallbackQuery, container: Container, user: User):
+    """Start a background export in the chosen format"""
+    # confirm_export[_{format}[_gz]]; bare confirm_export from old keyboards means TXT
+    options = callback.data.split("_")[2:]
+    compress = options[-1:] == ["gz"]
+    try:
+        export_format = ExportFormat(options[0]) if options and options[0] != "gz" else ExportFormat.TXT
+    except ValueError:
+        await callback.answer("Unknown export format", show_alert=True)
+        return
+    
+    telegram_id = callback.from_user.id
+    status_message = callback.message
+    
+    async def job() -> None:
+        await run_export_job(
+            status_message, container, telegram_id, export_format, compress, user
+        )
+    
+    if container.export_jobs.is_running(telegram_id):
+        await callback.answer("An export is already running, please wait", show_alert=True)
+        return
+    
+    # Отвечаем сразу: сам экспорт идёт в фоне и не держит callback query
+    await callback.answer("Export started")
+    await status_message.edit_text(CabinetMessages.export_queued(), parse_mode="HTML")
+    
+    try:
+        container.export_jobs.start(telegram_id, job)
+    except ExportAlreadyRunning:
+        # Двойное нажатие: экспорт уже запущен параллельным обработчиком
+        pass
+
+
+async def run_export_job(
+    status_message: Message,
+    container: Container,
+    telegram_id: int,
+    export_format: ExportFormat,
+    compress: bool,
+    user: User,
+) -> None:
+    """Background export: stream to files, report progress, send documents"""
     cabinet_service = container.get_cabinet_service()
+    progress = ProgressReporter(
+        status_message, settings.EXPORT_PROGRESS_INTERVAL, CabinetMessages.export_progress
+    )
+    await progress.show(CabinetMessages.export_progress(0, None))
     
+    parts = []
     try:
-        # Export history
-        export_text = await cabinet_service.export_message_history(callback.from_user.id)
-        
-        # Send as document
-        from io import BytesIO
-        file_content = BytesIO(export_text.encode('utf-8'))
-        file_content.name = f"message_history_{callback.from_user.id}.txt"
-        
-        await callback.message.answer_document(
-            document=file_content,
-            caption=CabinetMessages.export_success(),
-            parse_mode="HTML"
+        parts = await cabinet_service.export_message_history(
+            telegram_id, export_format, compress=compress, progress=progress, user=user
         )
         
-        # Return to main menu
-        profile_data = await cabinet_service.get_profile_info(callback.from_user.id)
-        welcome_text = CabinetMessages.welcome_message(profile_data['full_name'])
+        # Send as documents
+        for number, part in enumerate(parts, 1):
+            is_last = number == len(parts)
+            await status_message.answer_document(
+                document=StreamInputFile(part.file, part.filename),
+                caption=CabinetMessages.export_success() if is_last else f"📎 Part {number}/{len(parts)}",
+                parse_mode="HTML"
+            )
         
-        await callback.message.edit_text(
-            welcome_text,
-            reply_markup=CabinetKeyboards.main_menu(),
-            parse_mode="HTML"
+        await progress.show(
+            CabinetMessages.export_finished(sum(part.messages for part in parts), len(parts)),
+            reply_markup=CabinetKeyboards.back_to_main(),
         )
-        await callback.answer("History exported successfully!")
-        
     except Exception:
-        await callback.answer("Error exporting history", show_alert=True)
+        await progress.show(
+            CabinetMessages.error_message(), reply_markup=CabinetKeyboards.back_to_main()
+        )
+        raise
+    finally:
+        for part in parts:
+            part.close()
+        await cabinet_service.session.close()
+
+
+class ProgressReporter:
+    """Edits the status message with job progress, at most once per interval"""
+    
+    def __init__(self, message: Message, interval: float, render: Callable[[int, int], str]):
+        self.message = message
+        self.interval = interval
+        self.render = render
+        self._last_update = 0.0
+    
+    async def __call__(self, done: int, total: int) -> None:
+        now = time.monotonic()
+        if now - self._last_update < self.interval:
+            return
+        self._last_update = now
+        await self.show(self.render(done, total))
+    
+    async def show(self, text: str, reply_markup=None) -> None:
+        try:
+            await self.message.edit_text(text, reply_markup=reply_markup, parse_mode="HTML")
+        except TelegramBadRequest:
+            # "message is not modified" или сообщение удалено — прогресс не критичен
+            pass
 
 
 @router.callback_query(F.data == "history_clear")
@@ -461,32 +775,67 @@ async def confirm_clear(callback: CallbackQuery):
 
 
 @router.callback_query(F.data == "confirm_clear")
-async def clear_history(callback: CallbackQuery):
-    """Clear message history"""
-    container = Container()
-    cabinet_service = container.get_cabinet_service()
+async def clear_history(callback: CallbackQuery, container: Container):
+    """Start a background batched purge of the message history"""
+    purge_service = container.get_purge_service()
     
     try:
-        # Get count before clearing
-        total_count = await cabinet_service.get_message_history_count(callback.from_user.id)
-        
-        # Clear history
-        success = await cabinet_service.clear_message_history(callback.from_user.id)
-        
-        if success:
-            success_text = CabinetMessages.clear_success(total_count)
-            
-            await callback.message.edit_text(
-                success_text,
-                reply_markup=CabinetKeyboards.back_to_main(),
-                parse_mode="HTML"
-            )
-            await callback.answer("History cleared successfully!")
-        else:
-            await callback.answer("Error clearing history", show_alert=True)
-            
+        job = await purge_service.create_user_purge(callback.from_user.id)
     except Exception:
         await callback.answer("Error clearing history", show_alert=True)
+        return
+    finally:
+        await purge_service.session.close()
+    
+    if container.purge_jobs.is_running(job.id):
+        await callback.answer("History is already being cleared, please wait", show_alert=True)
+        return
+    
+    status_message = callback.message
+    job_id, total = job.id, job.total
+    
+    async def purge() -> None:
+        await run_purge_job(status_message, container, job_id)
+    
+    # Удаление идёт батчами в фоне и не держит callback query
+    await callback.answer("Clearing history...")
+    await status_message.edit_text(CabinetMessages.clear_progress(0, total), parse_mode="HTML")
+    
+    try:
+        container.purge_jobs.start(job_id, purge)
+    except PurgeAlreadyRunning:
+        pass
+
+
+async def run_purge_job(status_message: Message, container: Container, job_id: int) -> None:
+    """Background purge: delete in batches, report progress, show the result"""
+    purge_service = container.get_purge_service()
+    progress = ProgressReporter(
+        status_message, settings.PURGE_PROGRESS_INTERVAL, CabinetMessages.clear_progress
+    )
+    
+    try:
+        job = await purge_service.get_job(job_id)
+        if job is None:
+            return
+        job = await purge_service.run(job, progress=progress)
+        await progress.show(
+            CabinetMessages.clear_success(job.deleted),
+            reply_markup=CabinetKeyboards.back_to_main(),
+        )
+    except PurgeAlreadyRunning:
+        # Задачу уже выполняет другая реплика
+        await progress.show(
+            "History is already being cleared, please wait",
+            reply_markup=CabinetKeyboards.back_to_main(),
+        )
+    except Exception:
+        await progress.show(
+            CabinetMessages.error_message(), reply_markup=CabinetKeyboards.back_to_main()
+        )
+        raise
+    finally:
+        await purge_service.session.close()
 
 
 @router.callback_query(F.data == "cabinet_settings")
@@ -503,13 +852,12 @@ async def show_settings_menu(callback: CallbackQuery):
 
 
 @router.callback_query(F.data == "settings_account")
-async def show_account_info(callback: CallbackQuery):
+async def show_account_info(callback: CallbackQuery, container: Container, user: User):
     """Show account information"""
-    container = Container()
     cabinet_service = container.get_cabinet_service()
     
     try:
-        settings = await cabinet_service.get_account_settings(callback.from_user.id)
+        settings = await cabinet_service.get_account_settings(callback.from_user.id, user=user)
         account_text = CabinetMessages.account_info_message(settings)
         
         await callback.message.edit_text(
@@ -523,19 +871,18 @@ async def show_account_info(callback: CallbackQuery):
 
 
 @router.callback_query(F.data == "settings_limits")
-async def show_limits_info(callback: CallbackQuery):
+async def show_limits_info(callback: CallbackQuery, container: Container, user: User):
     """Show limits information (redirect to daily stats)"""
-    await show_daily_stats(callback)
+    await show_daily_stats(callback, container, user)
 
 
 @router.callback_query(F.data == "settings_patterns")
-async def show_usage_patterns(callback: CallbackQuery):
+async def show_usage_patterns(callback: CallbackQuery, container: Container, user: User):
     """Show usage patterns"""
-    container = Container()
     cabinet_service = container.get_cabinet_service()
     
     try:
-        patterns = await cabinet_service.get_usage_patterns(callback.from_user.id)
+        patterns = await cabinet_service.get_usage_patterns(callback.from_user.id, user=user)
         patterns_text = CabinetMessages.usage_patterns_message(patterns)
         
         await callback.message.edit_text(
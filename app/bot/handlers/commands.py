@@ -47,7 +47,7 @@ async def help_command(message: Message):
         f"• ⚙️ Account settings\n\n"
         f"<b>Limits:</b>\n"
         f"• 20 requests per day (resets at midnight UTC)\n"
-        f"• Message length: up to 1000 characters\n\n"
+        f"• Message length: up to 4096 characters\n\n"
         f"Need more help? Use /cabinet to check your stats!"
     )
     
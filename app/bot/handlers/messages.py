@@ -3,6 +3,7 @@ from aiogram import Router, F
 from aiogram import types
 
 from app.core.models.message import Message, MessageRole
+from app.core.schemas.message import MessageRow
 from app.core.models.user import User
 from app.core.services.container import Container
 
@@ -29,12 +30,14 @@ async def handle_text_message(
 
         user_message: Message = await message_service.create_message(
             telegram_id=user.telegram_id,
+            user_id=user.id,
             role=MessageRole.USER,
             content=message.text,
         )
 
-        recent_messages: List[Message] = await message_service.get_conversation_context(
+        recent_messages: List[MessageRow] = await message_service.get_conversation_context(
             telegram_id=user.telegram_id,
+            user_id=user.id,
         )
 
         await user_service.process_user_request(
@@ -47,6 +50,7 @@ async def handle_text_message(
 
         await message_service.create_message(
             telegram_id=user.telegram_id,
+            user_id=user.id,
             role=MessageRole.ASSISTANT,
             content=response['content'],
             ai_metadata=response,
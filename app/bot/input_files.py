@@ -0,0 +1,23 @@
+from typing import IO, TYPE_CHECKING, AsyncGenerator
+
+from aiogram.types.input_file import DEFAULT_CHUNK_SIZE, InputFile
+
+if TYPE_CHECKING:
+    from aiogram.client.bot import Bot
+
+
+class StreamInputFile(InputFile):
+    """Загрузка из открытого бинарного файла (в т.ч. SpooledTemporaryFile) кусками
+
+    В отличие от BufferedInputFile не требует держать весь документ в памяти,
+    а в отличие от FSInputFile — пути на диске.
+    """
+
+    def __init__(self, file: IO[bytes], filename: str, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        super().__init__(filename=filename, chunk_size=chunk_size)
+        self.file = file
+
+    async def read(self, bot: "Bot") -> AsyncGenerator[bytes, None]:
+        self.file.seek(0)
+        while chunk := self.file.read(self.chunk_size):
+            yield chunk
@@ -1,3 +1,5 @@
+from typing import Optional
+
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 
@@ -149,6 +151,20 @@ class CabinetKeyboards:
         builder.adjust(2, 2, 1, 1)
         return builder.as_markup()
     
+    @staticmethod
+    def search_prompt() -> InlineKeyboardMarkup:
+        """Keyboard shown while waiting for a search query"""
+        builder = InlineKeyboardBuilder()
+        
+        builder.add(
+            InlineKeyboardButton(
+                text="❌ Cancel Search",
+                callback_data="history_search_cancel"
+            )
+        )
+        
+        return builder.as_markup()
+    
     @staticmethod
     def settings_menu() -> InlineKeyboardMarkup:
         """Settings submenu keyboard"""
@@ -209,35 +225,86 @@ class CabinetKeyboards:
         builder.adjust(1, 1)
         return builder.as_markup()
     
+    @staticmethod
+    def export_format_keyboard() -> InlineKeyboardMarkup:
+        """Export format choice: plain and gzip-compressed variants"""
+        builder = InlineKeyboardBuilder()
+        
+        for label, fmt in (("📄 TXT", "txt"), ("🧾 JSONL", "jsonl"), ("📊 CSV", "csv")):
+            builder.add(
+                InlineKeyboardButton(
+                    text=label,
+                    callback_data=f"confirm_export_{fmt}"
+                )
+            )
+        for label, fmt in (("🗜️ TXT.gz", "txt"), ("🗜️ JSONL.gz", "jsonl"), ("🗜️ CSV.gz", "csv")):
+            builder.add(
+                InlineKeyboardButton(
+                    text=label,
+                    callback_data=f"confirm_export_{fmt}_gz"
+                )
+            )
+        builder.add(
+            InlineKeyboardButton(
+                text="❌ Cancel",
+                callback_data="cabinet_main"
+            )
+        )
+        
+        builder.adjust(3, 3, 1)
+        return builder.as_markup()
+    
     @staticmethod
     def pagination_keyboard(
         current_page: int,
-        total_pages: int,
-        callback_prefix: str
+        total_pages: Optional[int],
+        callback_prefix: str,
+        newer_cursor: Optional[str] = None,
+        older_cursor: Optional[str] = None,
     ) -> InlineKeyboardMarkup:
-        """Pagination keyboard for lists"""
+        """Pagination keyboard for lists
+
+        With keyset cursors the buttons carry ``{prefix}_newer|older_{page}_{cursor}``
+        instead of a bare page number; a cursor is ~15 bytes, so callback data
+        stays well under Telegram's 64-byte limit. Pass ``total_pages=None``
+        when the total is unknown (e.g. search results).
+        """
         builder = InlineKeyboardBuilder()
-        
-        if current_page > 1:
+        keyset = newer_cursor is not None or older_cursor is not None
+
+        if keyset:
+            has_previous, has_next = newer_cursor is not None, older_cursor is not None
+        else:
+            has_previous, has_next = current_page > 1, current_page < (total_pages or 0)
+
+        def page_callback(page: int, direction: str, cursor: Optional[str]) -> str:
+            if keyset:
+                return f"{callback_prefix}_{direction}_{page}_{cursor}"
+            return f"{callback_prefix}_page_{page}"
+
+        if has_previous:
             builder.add(
                 InlineKeyboardButton(
                     text="⬅️ Previous",
-                    callback_data=f"{callback_prefix}_page_{current_page - 1}"
+                    callback_data=page_callback(current_page - 1, "newer", newer_cursor)
                 )
             )
         
+        page_label = f"📄 {current_page}"
+        if total_pages is not None:
+            page_label += f"/{max(total_pages, current_page)}"
         builder.add(
             InlineKeyboardButton(
-                text=f"📄 {current_page}/{total_pages}",
+                text=page_label,
                 callback_data="page_info"
             )
         )
         
-        if current_page < total_pages:
+        if has_next:
             builder.add(
                 InlineKeyboardButton(
                     text="➡️ Next",
-                    callback_data=f"{callback_prefix}_page_{current_page + 1}"
+                    callback_data=page_callback(current_page + 1, "older", older_cursor)
                 )
             )
         
@@ -254,12 +321,7 @@ class CabinetKeyboards:
             )
         )
         
-        # Adjust layout based on number of pagination buttons
-        if current_page == 1:
-            builder.adjust(2, 1, 1)  # No previous button
-        elif current_page == total_pages:
-            builder.adjust(2, 1, 1)  # No next button
-        else:
-            builder.adjust(3, 1, 1)  # All buttons
+        # Pagination row: page info plus whichever of Previous/Next are present
+        builder.adjust(1 + has_previous + has_next, 1, 1)
             
-        return builder.as_markup()
\ No newline at end of file
+        return builder.as_markup()
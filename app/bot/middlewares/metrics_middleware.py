@@ -0,0 +1,35 @@
+import time
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+from app.infrastructure.monitoring.metrics import observe_handler
+
+
+class MetricsMiddleware(BaseMiddleware):
+    """Гистограмма времени обработки апдейта по имени хендлера.
+
+    Регистрируется как inner-middleware, поэтому в data уже лежит
+    выбранный aiogram HandlerObject.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: Any,
+        data: Dict[str, Any],
+    ) -> Any:
+        handler_object = data.get("handler")
+        callback = getattr(handler_object, "callback", None)
+        name = getattr(callback, "__name__", "unknown")
+
+        status = "ok"
+        start = time.perf_counter()
+        try:
+            return await handler(event, data)
+        except Exception:
+            status = "error"
+            raise
+        finally:
+            observe_handler(name, status, time.perf_counter() - start)
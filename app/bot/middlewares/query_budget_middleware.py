@@ -0,0 +1,53 @@
+import logging
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+from app.infrastructure.database.query_budget import QueryLog, track_queries
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetMiddleware(BaseMiddleware):
+    """Считает SQL-запросы на один апдейт и логирует превышение бюджета.
+
+    Регистрируется как outer-middleware на dp.update, чтобы учитывать
+    и запросы других middleware (например, UserMiddleware).
+    """
+
+    def __init__(self, budget: int, repeat_threshold: int) -> None:
+        self.budget = budget
+        self.repeat_threshold = repeat_threshold
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: Any,
+        data: Dict[str, Any],
+    ) -> Any:
+        with track_queries() as log:
+            try:
+                return await handler(event, data)
+            finally:
+                self._check(event, log)
+
+    def _check(self, event: Any, log: QueryLog) -> None:
+        update_id = getattr(event, "update_id", None)
+
+        if log.count > self.budget:
+            logger.warning(
+                "Update %s exceeded query budget (%d > %d)\n%s",
+                update_id,
+                log.count,
+                self.budget,
+                log.report(),
+            )
+
+        for statement, times in log.repeated(self.repeat_threshold).items():
+            logger.warning(
+                "Update %s: possible N+1, statement executed %d times: %s",
+                update_id,
+                times,
+                statement,
+            )
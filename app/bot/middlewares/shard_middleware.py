@@ -0,0 +1,30 @@
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+from app.infrastructure.database.sharding import ShardRegistry
+
+
+class ShardMiddleware(BaseMiddleware):
+    """Направляет все запросы апдейта в шард его пользователя.
+
+    Регистрируется как outer-middleware на dp.update (до UserMiddleware).
+    Фоновые задачи, запущенные из хендлера, наследуют шард через контекст.
+    """
+
+    def __init__(self, shards: ShardRegistry) -> None:
+        self.shards = shards
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: Any,
+        data: Dict[str, Any],
+    ) -> Any:
+        user = data.get("event_from_user")
+        if user is None:
+            return await handler(event, data)
+
+        with self.shards.use_shard_of(user.id):
+            return await handler(event, data)
@@ -2,6 +2,7 @@ from aiogram import BaseMiddleware
 from typing import Callable, Dict, Any, Awaitable
 
 from aiogram.types import TelegramObject
+from app.core.schemas.user import UserIdentity
 from app.core.services.container import Container
 
 
@@ -32,6 +33,8 @@ class UserMiddleware(BaseMiddleware):
             )
 
             data["user"] = user
+            # Хендлеры передают identity.id в сервисы вместо SELECT'а по telegram_id
+            data["identity"] = UserIdentity(id=user.id, telegram_id=telegram_user.id)
 
             return await handler(event, data)
         except Exception as e:
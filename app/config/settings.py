@@ -1,4 +1,6 @@
-from pydantic import SecretStr
+from typing import Dict, Optional
+
+from pydantic import SecretStr, model_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -12,5 +14,112 @@ class Config(BaseSettings):
     GOOGLE_API_KEY: SecretStr
     TELEGRAM_BOT_TOKEN: SecretStr
 
+    # Hash sharding of user data by telegram_id. DATABASE_URL is shard "main",
+    # DATABASE_SHARDS adds name -> URL. SHARD_MAP assigns ranges of the
+    # SHARD_BUCKETS crc32 buckets to shards ({"0-127": "main", ...}); empty
+    # splits buckets evenly. Changing it requires moving data (rebalance tool)
+    DATABASE_SHARDS: Dict[str, SecretStr] = {}
+    SHARD_BUCKETS: int = 256
+    SHARD_MAP: Dict[str, str] = {}
+
+    # Optional read replica for cabinet reads. Unsharded deployments only:
+    # setting it together with DATABASE_SHARDS is rejected. Reads go to the
+    # primary when
+    # replication lag exceeds READ_REPLICA_MAX_LAG, for READ_YOUR_WRITES_WINDOW
+    # after the user's own write, and while the replica is down (seconds)
+    READ_DATABASE_URL: Optional[SecretStr] = None
+    READ_REPLICA_MAX_LAG: float = 5.0
+    READ_YOUR_WRITES_WINDOW: float = 10.0
+    READ_REPLICA_CHECK_INTERVAL: float = 5.0
+
+    # Connection pool: persistent connections, extra connections under load,
+    # checkout timeout and connection lifetime (seconds), liveness check
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    # Slow query log threshold and pool checkout wait warning (ms); DB_ECHO
+    # logs every statement with parameters, for local debugging only
+    DB_SLOW_QUERY_MS: int = 500
+    DB_POOL_WAIT_WARNING_MS: int = 100
+    DB_ECHO: bool = False
+
+    # Monitoring
+    METRICS_ENABLED: bool = False
+    METRICS_HOST: str = "0.0.0.0"
+    METRICS_PORT: int = 9100
+
+    # SQL query budget per Telegram update
+    QUERY_BUDGET_ENABLED: bool = True
+    QUERY_BUDGET_PER_UPDATE: int = 10
+    QUERY_REPEAT_THRESHOLD: int = 3
+
+    # Cached per-user message count for history pagination (seconds). The
+    # cache is per replica: other replicas may show a stale count for up to
+    # this long after a message or purge
+    MESSAGE_COUNT_CACHE_TTL: int = 300
+
+    # History export: rows per DB round trip, in-memory spool before spilling
+    # to disk, and max size of one document (Telegram bots may send up to 50 MB)
+    EXPORT_BATCH_SIZE: int = 1000
+    EXPORT_SPOOL_MAX_BYTES: int = 1024 * 1024
+    EXPORT_MAX_PART_BYTES: int = 45 * 1024 * 1024
+    # Background export jobs: global concurrency cap and status update period (seconds)
+    EXPORT_MAX_CONCURRENT_JOBS: int = 2
+    EXPORT_PROGRESS_INTERVAL: float = 3.0
+
+    # Batched purges ("Clear history", retention): rows per batch, pause
+    # between batches (seconds), concurrent purge jobs, status update period
+    PURGE_BATCH_SIZE: int = 1000
+    PURGE_BATCH_PAUSE: float = 0.05
+    PURGE_MAX_CONCURRENT_JOBS: int = 1
+    PURGE_PROGRESS_INTERVAL: float = 3.0
+    # How often the scheduler leader resumes interrupted purges (seconds)
+    PURGE_RESUME_INTERVAL: float = 300
+
+    # History retention per user tier in days (0 = keep forever; a per-user
+    # users.retention_days overrides it) and enforcement period (seconds)
+    RETENTION_DAYS_BY_TIER: Dict[str, int] = {"standard": 365, "premium": 730}
+    RETENTION_ENFORCE_INTERVAL: float = 6 * 3600
+
+    # Write-behind buffer for message inserts: flushed every N ms or M rows.
+    # At MAX_PENDING queued rows new messages wait for a flush instead
+    MESSAGE_WRITE_BUFFER_ENABLED: bool = False
+    MESSAGE_WRITE_BUFFER_FLUSH_MS: int = 200
+    MESSAGE_WRITE_BUFFER_MAX_ROWS: int = 100
+    MESSAGE_WRITE_BUFFER_MAX_PENDING: int = 10_000
+
+    # Monthly partitions of messages (PostgreSQL) created ahead of time
+    MESSAGE_PARTITION_MONTHS_AHEAD: int = 3
+
+    # Cold archive: messages older than ARCHIVE_AFTER_DAYS move from the
+    # database to gzip JSONL files under ARCHIVE_DIR (unset = disabled), every
+    # ARCHIVE_INTERVAL seconds in batches of ARCHIVE_BATCH_SIZE rows.
+    # ARCHIVE_DIR must be storage shared by all replicas (NFS, EFS, ...):
+    # startup fails if it is not the volume recorded in the database
+    ARCHIVE_DIR: Optional[str] = None
+    ARCHIVE_AFTER_DAYS: int = 90
+    ARCHIVE_INTERVAL: float = 24 * 3600
+    ARCHIVE_BATCH_SIZE: int = 1000
+
+    # In-process scheduler for periodic jobs. Cron expressions are UTC; each
+    # run is delayed by a random 0..SCHEDULER_JITTER seconds. With several
+    # replicas only the holder of the PostgreSQL advisory lock named
+    # SCHEDULER_LEADER_LOCK runs jobs
+    SCHEDULER_ENABLED: bool = True
+    SCHEDULER_JITTER: float = 30.0
+    SCHEDULER_LEADER_LOCK: str = "textflow-scheduler"
+    DAILY_LIMIT_RESET_CRON: str = "0 0 * * *"
+    PARTITION_MAINTENANCE_CRON: str = "0 3 * * *"
+
+    @model_validator(mode="after")
+    def _replica_requires_single_shard(self) -> "Config":
+        # Реплика одна, а шардов несколько: чтения ушли бы не в ту базу
+        replica = self.READ_DATABASE_URL and self.READ_DATABASE_URL.get_secret_value()
+        if replica and self.DATABASE_SHARDS:
+            raise ValueError("READ_DATABASE_URL cannot be combined with DATABASE_SHARDS")
+        return self
+
 
 settings = Config()  # type: ignore
@@ -1,3 +1,5 @@
+from typing import Optional
+
 from .base import TextFlowException
 
 
@@ -23,3 +25,45 @@ class ContextTooLarge(TextFlowException):
     """Исключение когда контекст диалога превышает лимиты"""
 
     pass
+
+
+class InvalidCursor(TextFlowException):
+    """Исключение при повреждённом курсоре пагинации"""
+
+    pass
+
+
+class JobAlreadyRunning(TextFlowException):
+    """Исключение при повторном запуске фоновой задачи с тем же ключом"""
+
+    def __init__(self, key: object, message: Optional[str] = None) -> None:
+        self.key = key
+        super().__init__(message or f"Job {key!r} is already running")
+
+
+class ExportAlreadyRunning(JobAlreadyRunning):
+    """Исключение при попытке запустить второй экспорт для того же пользователя"""
+
+    def __init__(self, telegram_id: int) -> None:
+        self.telegram_id = telegram_id
+        super().__init__(telegram_id, f"Export for user {telegram_id} is already running")
+
+
+class PurgeAlreadyRunning(JobAlreadyRunning):
+    """Исключение при повторном запуске той же очистки истории"""
+
+    def __init__(self, job_id: int) -> None:
+        self.job_id = job_id
+        super().__init__(job_id, f"Purge job {job_id} is already running")
+
+
+class ArchiveNotShared(TextFlowException):
+    """Исключение когда ARCHIVE_DIR реплики не совпадает с общим томом архива"""
+
+    def __init__(self, volume_id: str, expected: str) -> None:
+        self.volume_id = volume_id
+        self.expected = expected
+        super().__init__(
+            f"ARCHIVE_DIR holds archive volume {volume_id}, but the database expects "
+            f"{expected}: every replica must mount the same shared archive storage"
+        )
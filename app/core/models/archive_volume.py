@@ -0,0 +1,15 @@
+from sqlalchemy import String
+from sqlalchemy.orm import Mapped, mapped_column
+from .base import Base
+
+
+class ArchiveVolume(Base):
+    """Идентификатор тома холодного архива (одна строка, id = 1)
+
+    Первая реплика записывает сюда id из ARCHIVE_DIR; остальные при старте
+    сверяют с ним свой каталог, чтобы архив не разъехался по локальным дискам.
+    """
+
+    __tablename__ = "archive_volumes"
+
+    volume_id: Mapped[str] = mapped_column(String(36))
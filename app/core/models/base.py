@@ -14,6 +14,8 @@ metadata = MetaData(naming_convention={
 
 class Base(DeclarativeBase):
     metadata = metadata
+    # Серверные default'ы (created_at и т.п.) возвращаются RETURNING при flush
+    __mapper_args__ = {"eager_defaults": True}
 
     id: Mapped[int] = mapped_column(primary_key=True)
     created_at: Mapped[datetime] = mapped_column(
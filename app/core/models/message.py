@@ -1,7 +1,8 @@
 from .base import Base
 from sqlalchemy.orm import Mapped, mapped_column
 from enum import Enum
-from sqlalchemy import ForeignKey, JSON, String
+from sqlalchemy import DDL, ForeignKey, Index, JSON, Text, event
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.types import Enum as EnumType
 from typing import Optional
 
@@ -12,9 +13,86 @@ class MessageRole(Enum):
 
 
 class Message(Base):
+    # В PostgreSQL таблица партиционирована по месяцам created_at (миграция
+    # 352c537e085f, PK (id, created_at)); для ORM ключом остаётся id.
     __tablename__ = "messages"
 
-    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), index=True)
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"))
     role: Mapped[MessageRole] = mapped_column(EnumType(MessageRole))
-    content: Mapped[str] = mapped_column(String(1000))
-    ai_metadata: Mapped[Optional[dict]] = mapped_column(JSON, nullable=True)
+    # Полный текст: по нему строятся tsvector/триграммы/FTS5. Длинные значения
+    # PostgreSQL сам сжимает в TOAST (lz4, миграция 69bfbd560375)
+    content: Mapped[str] = mapped_column(Text)
+    # Метаданные ответа AI (см. slim_ai_metadata) нужны только роллапам и
+    # отладке: колонка не грузится с сообщением, только по undefer()/select
+    ai_metadata: Mapped[Optional[dict]] = mapped_column(
+        JSON(none_as_null=True).with_variant(JSONB(none_as_null=True), "postgresql"),
+        nullable=True,
+        deferred=True,
+        deferred_raiseload=True,
+    )
+
+
+# Горячие запросы фильтруют по user_id и сортируют/фильтруют по created_at.
+# Первый индекс отдаёт строки в порядке ORDER BY created_at DESC, id DESC без
+# сортировки, второй покрывает подсчёты по роли и времени (index-only scan).
+# Ведущий user_id заменяет отдельный ix_messages_user_id (в т.ч. для FK).
+Index(
+    "ix_messages_user_id_created_at_id",
+    Message.user_id,
+    Message.created_at.desc(),
+    Message.id.desc(),
+)
+Index(
+    "ix_messages_user_id_role_created_at",
+    Message.user_id,
+    Message.role,
+    Message.created_at,
+)
+
+
+# Полнотекстовый поиск по истории. Колонка и индексы живут вне ORM-модели
+# (для существующих БД их создаёт миграция, для create_all — события ниже).
+# PostgreSQL: сгенерированный tsvector + GIN вместе с user_id (btree_gin) и
+# триграммный GIN для поиска подстрок. SQLite (локальный запуск, тесты):
+# внешняя FTS5-таблица, синхронизируемая триггерами.
+SEARCH_TEXT_CONFIG = "simple"
+
+_POSTGRESQL_SEARCH_DDL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE EXTENSION IF NOT EXISTS btree_gin",
+    "ALTER TABLE messages ADD COLUMN content_tsv tsvector "
+    f"GENERATED ALWAYS AS (to_tsvector('{SEARCH_TEXT_CONFIG}', content)) STORED",
+    "CREATE INDEX ix_messages_user_id_content_tsv ON messages "
+    "USING gin (user_id, content_tsv)",
+    "CREATE INDEX ix_messages_user_id_content_trgm ON messages "
+    "USING gin (user_id, content gin_trgm_ops)",
+]
+
+_SQLITE_SEARCH_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5("
+    "content, content='messages', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER messages_fts_ai AFTER INSERT ON messages BEGIN "
+    "INSERT INTO messages_fts(rowid, content) VALUES (new.id, new.content); END",
+    "CREATE TRIGGER messages_fts_ad AFTER DELETE ON messages BEGIN "
+    "INSERT INTO messages_fts(messages_fts, rowid, content) "
+    "VALUES ('delete', old.id, old.content); END",
+    "CREATE TRIGGER messages_fts_au AFTER UPDATE OF content ON messages BEGIN "
+    "INSERT INTO messages_fts(messages_fts, rowid, content) "
+    "VALUES ('delete', old.id, old.content); "
+    "INSERT INTO messages_fts(rowid, content) VALUES (new.id, new.content); END",
+]
+
+for _statement in _POSTGRESQL_SEARCH_DDL:
+    event.listen(
+        Message.__table__, "after_create", DDL(_statement).execute_if(dialect="postgresql")
+    )
+for _statement in _SQLITE_SEARCH_DDL:
+    event.listen(
+        Message.__table__, "after_create", DDL(_statement).execute_if(dialect="sqlite")
+    )
+event.listen(
+    Message.__table__,
+    "before_drop",
+    DDL("DROP TABLE IF EXISTS messages_fts").execute_if(dialect="sqlite"),
+)
@@ -0,0 +1,18 @@
+from datetime import date
+from sqlalchemy import Date, ForeignKey, Integer, UniqueConstraint
+from sqlalchemy.orm import Mapped, mapped_column
+from .base import Base
+
+
+class MessageDailyStats(Base):
+    """Дневной роллап сообщений пользователя (обновляется вместе с create_message)"""
+
+    __tablename__ = "message_daily_stats"
+    __table_args__ = (UniqueConstraint("user_id", "day"),)
+
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"))
+    day: Mapped[date] = mapped_column(Date)
+    user_msgs: Mapped[int] = mapped_column(Integer, default=0)
+    assistant_msgs: Mapped[int] = mapped_column(Integer, default=0)
+    tokens_in: Mapped[int] = mapped_column(Integer, default=0)
+    tokens_out: Mapped[int] = mapped_column(Integer, default=0)
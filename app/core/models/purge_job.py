@@ -0,0 +1,38 @@
+from datetime import datetime
+from enum import Enum
+from typing import Optional
+from sqlalchemy import Boolean, DateTime, ForeignKey, Integer, String
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.types import Enum as EnumType
+from .base import Base
+
+
+class PurgeStatus(Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+
+class PurgeJob(Base):
+    """Пакетная очистка сообщений; строка хранит прогресс для возобновления
+
+    user_id = None — глобальная очистка по всем пользователям (before обязателен),
+    before = None — удалить всю историю пользователя вместе с роллапами,
+    policy — срок берётся из тарифа каждого пользователя, before — момент отсчёта.
+    """
+
+    __tablename__ = "purge_jobs"
+
+    user_id: Mapped[Optional[int]] = mapped_column(ForeignKey("users.id"), index=True)
+    before: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True))
+    status: Mapped[PurgeStatus] = mapped_column(
+        EnumType(PurgeStatus), default=PurgeStatus.PENDING, index=True
+    )
+    policy: Mapped[bool] = mapped_column(Boolean, default=False)
+    total: Mapped[int] = mapped_column(Integer, default=0)
+    deleted: Mapped[int] = mapped_column(Integer, default=0)
+    # Глобальная очистка идёт по пользователям в порядке id
+    last_user_id: Mapped[Optional[int]] = mapped_column(Integer)
+    error: Mapped[Optional[str]] = mapped_column(String(500))
+    finished_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True))
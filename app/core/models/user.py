@@ -1,9 +1,16 @@
+from enum import Enum
 from sqlalchemy import BigInteger, Integer, String
+from sqlalchemy.types import Enum as EnumType
 from .base import Base
 from sqlalchemy.orm import Mapped, mapped_column
 from typing import Optional
 
 
+class UserTier(Enum):
+    STANDARD = "standard"
+    PREMIUM = "premium"
+
+
 class User(Base):
     __tablename__ = "users"
 
@@ -12,3 +19,8 @@ class User(Base):
     first_name: Mapped[str] = mapped_column(String(64))
     daily_limit: Mapped[int] = mapped_column(Integer, default=20)
     requests_today: Mapped[int] = mapped_column(Integer, default=0)
+    tier: Mapped[UserTier] = mapped_column(
+        EnumType(UserTier), default=UserTier.STANDARD, server_default=UserTier.STANDARD.name
+    )
+    # Персональный срок хранения истории в днях (None — по тарифу, 0 — бессрочно)
+    retention_days: Mapped[Optional[int]] = mapped_column(Integer)
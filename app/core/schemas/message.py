@@ -0,0 +1,90 @@
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from app.core.models.message import MessageRole
+
+
+# Поля ответа провайдера, которые сохраняются в messages.ai_metadata; текст
+# ответа уже лежит в content, а сырой response_metadata слишком велик
+AI_METADATA_KEYS = ("model", "token_usage", "finish_reason")
+
+
+def slim_ai_metadata(response: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Урезать ответ провайдера до хранимых метаданных (None, если нечего хранить)"""
+    if not response:
+        return None
+    raw = response.get("usage")
+    finish_reason = raw.get("finish_reason") if isinstance(raw, dict) else None
+    metadata = {key: response[key] for key in AI_METADATA_KEYS if response.get(key) is not None}
+    if finish_reason is not None and "finish_reason" not in metadata:
+        metadata["finish_reason"] = finish_reason
+    return metadata or None
+
+
+@dataclass(slots=True)
+class MessageRow:
+    """Сообщение для чтения (контекст промпта, страницы истории, поиск)
+
+    Только нужные колонки из Core-select'а: без identity map, отслеживания
+    изменений и ai_metadata.
+    """
+
+    id: Optional[int]
+    role: MessageRole
+    content: str
+    created_at: datetime
+
+
+@dataclass(slots=True)
+class ActivitySummary:
+    """Агрегированная статистика сообщений пользователя за один проход по таблице"""
+
+    total: int = 0
+    user_messages: int = 0
+    assistant_messages: int = 0
+    # Сообщения пользователя по часам суток (UTC), индекс = час
+    hourly_user: List[int] = field(default_factory=lambda: [0] * 24)
+
+    @property
+    def peak_hour(self) -> Optional[int]:
+        """Час суток с наибольшим числом запросов (None, если данных нет)"""
+        if not any(self.hourly_user):
+            return None
+        return max(range(24), key=lambda hour: self.hourly_user[hour])
+
+
+@dataclass(slots=True)
+class DailyTotals:
+    """Суммы по дневным роллапам message_daily_stats"""
+
+    user_messages: int = 0
+    assistant_messages: int = 0
+    tokens_in: int = 0
+    tokens_out: int = 0
+    active_days: int = 0
+
+    @property
+    def total(self) -> int:
+        return self.user_messages + self.assistant_messages
+
+
+@dataclass(slots=True)
+class MessagePage:
+    """Страница истории сообщений для keyset-пагинации"""
+
+    messages: List[Dict[str, str]]
+    total_count: int = 0
+    # Курсоры первого и последнего сообщения страницы (None, если листать некуда)
+    newer_cursor: Optional[str] = None
+    older_cursor: Optional[str] = None
+
+
+@dataclass(slots=True)
+class MessageCleanup:
+    """Итог очистки старых сообщений"""
+
+    # Точное число строк, удалённых DELETE
+    deleted: int = 0
+    # Оценка строк в снятых месячных партициях (pg_class.reltuples)
+    dropped_estimate: int = 0
@@ -0,0 +1,9 @@
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True, slots=True)
+class UserIdentity:
+    """Уже разрешённый пользователь апдейта: внутренний id и telegram_id"""
+
+    id: int
+    telegram_id: int
@@ -1,5 +1,5 @@
 from typing import List, Any
-from app.core.models.message import Message
+from app.core.schemas.message import MessageRow
 from .prompt_builders.base_builder import PromptBuilder
 from .providers.base_provider import Provider
 
@@ -9,6 +9,6 @@ class AIGenerator[P: Provider, B: PromptBuilder]:
         self.provider = provider
         self.prompt_builder = prompt_builder
 
-    async def agenerate(self, messages: List[Message]) -> dict[str, Any]:
+    async def agenerate(self, messages: List[MessageRow]) -> dict[str, Any]:
         prompt = self.prompt_builder.build(messages)
         return await self.provider.agenerate(prompt)
@@ -1,7 +1,7 @@
 from typing import Protocol, List
-from app.core.models.message import Message
+from app.core.schemas.message import MessageRow
 
 
 class PromptBuilder(Protocol):
 
-    def build(self, messages: List[Message]) -> str: ...
+    def build(self, messages: List[MessageRow]) -> str: ...
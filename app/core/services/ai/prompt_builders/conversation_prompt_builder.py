@@ -1,10 +1,10 @@
 from typing import List
-from app.core.models.message import Message
+from app.core.schemas.message import MessageRow
 
 
 class ConversationPromptBuilder:
 
-    def build(self, messages: List[Message]) -> str:
+    def build(self, messages: List[MessageRow]) -> str:
 
         system_prompt = "You are a helpful assistant. Don't write yout message role in response."
 
@@ -1,11 +1,18 @@
+import time
 from typing import List, Any, Literal
 from app.core.models.message import Message
 from langchain_google_genai import ChatGoogleGenerativeAI
 from app.config.settings import settings
+from app.infrastructure.monitoring.metrics import (
+    observe_provider_call,
+    record_provider_tokens,
+)
 
 
 class GoogleProvider:
 
+    provider_name = "google"
+
     def __init__(self, model_name: Literal["gemini-2.0-flash"]):
         self.llm = ChatGoogleGenerativeAI(
             api_key=settings.GOOGLE_API_KEY.get_secret_value(),
@@ -14,12 +21,32 @@ class GoogleProvider:
         self.model_name = model_name
 
     async def agenerate(self, prompt: str) -> dict[str, Any]:
+        start = time.perf_counter()
         try:
             response = await self.llm.ainvoke(prompt)
-            return {
-                "content": response.content,
-                "model": self.model_name,
-                "usage": response.response_metadata,
-            }
         except Exception as e:
+            observe_provider_call(
+                self.provider_name, self.model_name, "error", time.perf_counter() - start
+            )
             raise
+
+        observe_provider_call(
+            self.provider_name, self.model_name, "ok", time.perf_counter() - start
+        )
+
+        result = {
+            "content": response.content,
+            "model": self.model_name,
+            "usage": response.response_metadata,
+        }
+
+        usage = getattr(response, "usage_metadata", None)
+        if isinstance(usage, dict):
+            token_usage = {
+                "input_tokens": usage.get("input_tokens", 0),
+                "output_tokens": usage.get("output_tokens", 0),
+            }
+            result["token_usage"] = token_usage
+            record_provider_tokens(self.provider_name, self.model_name, **token_usage)
+
+        return result
@@ -0,0 +1,134 @@
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Optional
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ...config.settings import settings
+from ..exceptions.message import ArchiveNotShared
+from ...infrastructure.archive.store import MessageArchive
+from ...infrastructure.cache.ttl_cache import message_count_cache
+from ...infrastructure.database.repositories.archive_volume_repository import (
+    ArchiveVolumeRepository,
+)
+from ...infrastructure.database.repositories.message_repository import MessageRepository
+from ...infrastructure.database.repositories.user_repository import UserRepository
+from ...infrastructure.database.leader import advisory_lock
+from ...infrastructure.database.sharding import current_engine
+
+logger = logging.getLogger(__name__)
+
+# Сколько пользователей читается за раз при обходе
+USER_SCAN_BATCH = 100
+
+
+class ArchiveService:
+    """Перенос старых сообщений из messages в холодный архив
+
+    Батч сначала дописывается в архив (fsync), потом удаляется из БД. Если
+    между ними процесс упал, следующий проход снова отдаст те же строки:
+    архив пропустит уже записанные id, и они будут только удалены.
+
+    Архив пользователя общий для всех реплик: перенос держит тот же advisory
+    lock, что и очистка, иначе запись после rmtree вернула бы очищенное.
+    """
+
+    def __init__(
+        self,
+        session: AsyncSession,
+        archive: MessageArchive,
+        batch_size: Optional[int] = None,
+    ) -> None:
+        self.session = session
+        self.archive = archive
+        self.user_repository = UserRepository(session)
+        self.message_repository = MessageRepository(session)
+        self.batch_size = batch_size or settings.ARCHIVE_BATCH_SIZE
+
+    async def verify_shared_volume(self) -> str:
+        """Проверить, что ARCHIVE_DIR — тот же том, что у остальных реплик
+
+        Архив читают экспорт и очистка истории на любой реплике, поэтому
+        каталог должен быть общим хранилищем. Первая реплика записывает id
+        тома в БД, остальные сверяются с ним и не стартуют при расхождении.
+        """
+        volume_id = await self.archive.volume_id()
+        repository = ArchiveVolumeRepository(self.session)
+        expected = await repository.get_volume_id()
+        if expected is None:
+            try:
+                await repository.register(volume_id)
+                await self.session.commit()
+                expected = volume_id
+            except IntegrityError:
+                await self.session.rollback()
+                expected = await repository.get_volume_id()
+        if expected != volume_id:
+            raise ArchiveNotShared(volume_id, str(expected))
+        return volume_id
+
+    async def archive_before(self, cutoff: datetime) -> int:
+        """Архивировать сообщения всех пользователей старше cutoff"""
+        archived = 0
+        last_user_id = 0
+        while True:
+            users = await self.user_repository.get_retention_after(
+                last_user_id, limit=USER_SCAN_BATCH
+            )
+            await self.session.commit()
+            if not users:
+                return archived
+            for user in users:
+                archived += await self.archive_user(user.id, user.telegram_id, cutoff)
+            last_user_id = users[-1].id
+
+    async def archive_user(self, user_id: int, telegram_id: int, cutoff: datetime) -> int:
+        engine = current_engine(self.session.bind)
+        async with advisory_lock(engine, MessageArchive.lock_name(telegram_id)):
+            return await self._archive_user(user_id, telegram_id, cutoff)
+
+    async def _archive_user(self, user_id: int, telegram_id: int, cutoff: datetime) -> int:
+        archived = 0
+        while True:
+            rows = await self.message_repository.get_oldest_before(
+                user_id, cutoff, limit=self.batch_size
+            )
+            if not rows:
+                return archived
+
+            written = await self.archive.append(telegram_id, rows)
+            # Именно заархивированные строки: повтор фильтра по времени
+            # задел бы более новые, если часть батча уже удалила очистка
+            await self.message_repository.delete_messages_by_keys(
+                user_id, [(row.id, row.created_at) for row in rows if row.id is not None]
+            )
+            await self.session.commit()
+            message_count_cache.invalidate(user_id)
+
+            archived += written
+            if len(rows) < self.batch_size:
+                return archived
+
+
+class MessageArchiver:
+    """Переносит сообщения старше after_days в архив (задача планировщика)"""
+
+    def __init__(
+        self,
+        archive_service_factory: Callable[[], ArchiveService],
+        after_days: int,
+    ) -> None:
+        self.archive_service_factory = archive_service_factory
+        self.after_days = after_days
+
+    async def run_once(self) -> int:
+        service = self.archive_service_factory()
+        try:
+            cutoff = datetime.now(timezone.utc) - timedelta(days=self.after_days)
+            archived = await service.archive_before(cutoff)
+        finally:
+            await service.session.close()
+        if archived:
+            logger.info("Archived %d messages older than %s", archived, cutoff)
+        return archived
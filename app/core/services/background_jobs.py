@@ -0,0 +1,67 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, Hashable
+
+from ..exceptions.message import JobAlreadyRunning
+from ...infrastructure.database.query_budget import detach_query_log
+from ...infrastructure.database.sharding import shard_key
+
+logger = logging.getLogger(__name__)
+
+Job = Callable[[], Awaitable[None]]
+
+
+class BackgroundJobManager:
+    """Фоновые задачи: не больше одной на ключ и общий лимит параллельности
+
+    Задача стартует сразу, но ждёт слота семафора, если уже выполняется
+    max_concurrent задач. Экземпляры живут в Container.
+    """
+
+    name = "job"
+
+    def __init__(self, max_concurrent: int = 2) -> None:
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self._jobs: Dict[Hashable, asyncio.Task[None]] = {}
+
+    def is_running(self, key: Hashable) -> bool:
+        return shard_key(key) in self._jobs
+
+    def start(self, key: Hashable, job: Job) -> "asyncio.Task[None]":
+        """Запустить задачу в фоне; already_running, если она уже идёт
+
+        Задача наследует шардовый контекст вызывающего (id задач очистки в
+        разных шардах совпадают, поэтому ключ включает шард).
+        """
+        if self.is_running(key):
+            raise self.already_running(key)
+
+        scoped = shard_key(key)
+        task = asyncio.create_task(self._run(job), name=f"{self.name}-{key}")
+        self._jobs[scoped] = task
+        task.add_done_callback(lambda _: self._jobs.pop(scoped, None))
+        return task
+
+    def already_running(self, key: Hashable) -> JobAlreadyRunning:
+        return JobAlreadyRunning(key)
+
+    async def shutdown(self, timeout: float = 0) -> None:
+        """Дождаться задач (не дольше timeout секунд) и отменить оставшиеся"""
+        tasks = list(self._jobs.values())
+        if not tasks:
+            return
+        if timeout > 0:
+            await asyncio.wait(tasks, timeout=timeout)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _run(self, job: Job) -> None:
+        detach_query_log()
+        async with self._semaphore:
+            try:
+                await job()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Background %s failed", self.name)
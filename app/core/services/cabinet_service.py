@@ -1,28 +1,92 @@
-from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Tuple
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Literal, Optional, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from ..models.user import User
-from ..models.message import Message, MessageRole
+from ...config.settings import settings
+from ..exceptions.message import InvalidMessageData
+from ..models.message import MessageRole
+from ..schemas.message import MessagePage, MessageRow
+from .history_export import ExportFormat, ExportPart, HistoryExportWriter
+from .purge_service import PurgeService
+from .retention import describe_retention, retention_days_for
 from .user_service import UserService
 from ..services.message_service import MessageService
 from ...infrastructure.database.repositories.message_repository import MessageRepository
 from ...infrastructure.database.repositories.user_repository import UserRepository
+from ...infrastructure.archive.store import ArchiveManifest, MessageArchive
+from ...infrastructure.cache.ttl_cache import message_count_cache
+from ...infrastructure.database.routing import ReplicaRouter, on_primary, replica_read
+from ...infrastructure.database.write_buffer import MessageWriteBuffer
+from ...utils.cursor import (
+    MessageCursor,
+    SearchCursor,
+    decode_cursor,
+    decode_search_cursor,
+    encode_cursor,
+    encode_search_cursor,
+)
+
+# Окно, по которому строится гистограмма активности для Usage Patterns
+USAGE_PATTERN_DAYS = 30
+
+# Сколько активных дней из последних 7 нужно, чтобы считаться постоянным пользователем
+REGULAR_USER_DAYS = 4
+
+# Границы длины поискового запроса (триграммный индекс работает от 3 символов)
+SEARCH_QUERY_MIN_LENGTH = 3
+SEARCH_QUERY_MAX_LENGTH = 100
+
+DAY_PARTS = {
+    "🌙 Night": (0, 6),
+    "🌅 Morning": (6, 12),
+    "☀️ Afternoon": (12, 18),
+    "🌆 Evening": (18, 24),
+}
 
 
 class CabinetService:
     """Service for personal cabinet functionality"""
     
-    def __init__(self, session: AsyncSession):
+    def __init__(
+        self,
+        session: AsyncSession,
+        replica_router: Optional[ReplicaRouter] = None,
+        archive: Optional[MessageArchive] = None,
+        write_buffer: Optional[MessageWriteBuffer] = None,
+    ):
         self.session = session
+        self.replica_router = replica_router
+        self.archive = archive
+        self.write_buffer = write_buffer
         self.user_repository = UserRepository(session)
         self.message_repository = MessageRepository(session)
         self.user_service = UserService(self.user_repository)
         self.message_service = MessageService(self.user_repository, self.message_repository)
     
-    async def get_profile_info(self, telegram_id: int) -> Dict[str, str]:
+    async def _get_user(self, telegram_id: int) -> User:
+        # Пользователь мог быть только что создан — строку читаем с primary
+        with on_primary():
+            return await self.user_service.handle_new_user(telegram_id, "", "")
+
+    async def _resolve_user(self, telegram_id: int, user: Optional[User]) -> User:
+        # Хендлер передаёт пользователя из UserMiddleware — повторный
+        # handle_new_user (SELECT и commit) не нужен
+        if user is None:
+            user = await self._get_user(telegram_id)
+        return user
+
+    async def _get_user_id(self, telegram_id: int, user_id: Optional[int]) -> int:
+        # Хендлер передаёт id, уже загруженный UserMiddleware, — SELECT не нужен
+        if user_id is None:
+            user_id = (await self._get_user(telegram_id)).id
+        return user_id
+
+    async def get_profile_info(
+        self, telegram_id: int, user: Optional[User] = None
+    ) -> Dict[str, str]:
         """Get user profile information"""
-        user = await self.user_service.handle_new_user(telegram_id, "", "")
+        user = await self._resolve_user(telegram_id, user)
         
         profile_data = {
             "full_name": user.first_name,
@@ -34,9 +98,11 @@ class CabinetService:
         
         return profile_data
     
-    async def get_daily_usage_stats(self, telegram_id: int) -> Dict[str, str]:
+    async def get_daily_usage_stats(
+        self, telegram_id: int, user: Optional[User] = None
+    ) -> Dict[str, str]:
         """Get daily usage statistics"""
-        user = await self.user_service.handle_new_user(telegram_id, "", "")
+        user = await self._resolve_user(telegram_id, user)
         
         remaining = max(0, user.daily_limit - user.requests_today)
         usage_percentage = (user.requests_today / user.daily_limit) * 100
@@ -51,52 +117,50 @@ class CabinetService:
         
         return stats
     
-    async def get_weekly_stats(self, telegram_id: int) -> Dict[str, str]:
+    @replica_read
+    async def get_weekly_stats(
+        self, telegram_id: int, user_id: Optional[int] = None
+    ) -> Dict[str, str]:
         """Get weekly usage statistics"""
-        user = await self.user_service.handle_new_user(telegram_id, "", "")
+        user_id = await self._get_user_id(telegram_id, user_id)
         
-        # Get messages from the last 7 days (168 hours)
-        weekly_messages = await self.message_repository.get_user_message_count(
-            user.id, 
-            hours_back=168
-        )
-        
-        # Get user messages only (not assistant responses)
-        user_messages = await self.message_repository.get_messages_by_role_count(
-            user.id,
-            MessageRole.USER,
-            hours_back=168
+        # Last 7 days (today included) from the daily rollups
+        week_start = datetime.now(timezone.utc).date() - timedelta(days=6)
+        totals = await self.message_repository.daily_stats.get_totals(
+            user_id,
+            since=week_start
         )
         
         stats = {
-            "total_messages": str(weekly_messages),
-            "user_requests": str(user_messages),
-            "ai_responses": str(weekly_messages - user_messages),
-            "daily_average": f"{user_messages / 7:.1f}",
+            "total_messages": str(totals.total),
+            "user_requests": str(totals.user_messages),
+            "ai_responses": str(totals.assistant_messages),
+            "daily_average": f"{totals.user_messages / 7:.1f}",
             "period": "Last 7 days"
         }
         
         return stats
     
-    async def get_all_time_stats(self, telegram_id: int) -> Dict[str, str]:
+    @replica_read
+    async def get_all_time_stats(
+        self, telegram_id: int, user: Optional[User] = None
+    ) -> Dict[str, str]:
         """Get all-time usage statistics"""
-        user = await self.user_service.handle_new_user(telegram_id, "", "")
+        user = await self._resolve_user(telegram_id, user)
         
-        total_messages = await self.message_repository.get_user_message_count(user.id)
-        user_messages = await self.message_repository.get_messages_by_role_count(
-            user.id, 
-            MessageRole.USER
-        )
-        ai_messages = total_messages - user_messages
+        totals = await self.message_repository.daily_stats.get_totals(user.id)
         
         # Calculate days since registration
-        days_registered = (datetime.now() - user.created_at).days + 1
-        avg_daily_requests = user_messages / days_registered if days_registered > 0 else 0
+        created_at = user.created_at
+        if created_at.tzinfo is None:
+            created_at = created_at.replace(tzinfo=timezone.utc)
+        days_registered = (datetime.now(timezone.utc) - created_at).days + 1
+        avg_daily_requests = totals.user_messages / days_registered if days_registered > 0 else 0
         
         stats = {
-            "total_messages": str(total_messages),
-            "user_requests": str(user_messages),
-            "ai_responses": str(ai_messages),
+            "total_messages": str(totals.total),
+            "user_requests": str(totals.user_messages),
+            "ai_responses": str(totals.assistant_messages),
             "days_registered": str(days_registered),
             "avg_daily_requests": f"{avg_daily_requests:.1f}",
             "most_active_day": "Today" if user.requests_today > 0 else "Not today"
@@ -104,113 +168,288 @@ class CabinetService:
         
         return stats
     
+    @replica_read
     async def get_recent_messages(
         self, 
         telegram_id: int, 
         limit: int = 10,
-        offset: int = 0
+        offset: int = 0,
+        user_id: Optional[int] = None,
     ) -> List[Dict[str, str]]:
         """Get recent message history"""
-        user = await self.user_service.handle_new_user(telegram_id, "", "")
+        user_id = await self._get_user_id(telegram_id, user_id)
         
         messages = await self.message_repository.get_user_messages(
-            user.id,
+            user_id,
             limit=limit,
             offset=offset
         )
         
-        formatted_messages = []
-        for msg in messages:
-            role_emoji = "👤" if msg.role == MessageRole.USER else "🤖"
-            formatted_msg = {
-                "id": str(msg.id),
-                "role": f"{role_emoji} {msg.role.value.title()}",
-                "content": msg.content[:100] + "..." if len(msg.content) > 100 else msg.content,
-                "timestamp": msg.created_at.strftime("%m/%d %H:%M"),
-                "full_content": msg.content
-            }
-            formatted_messages.append(formatted_msg)
-        
-        return formatted_messages
-    
-    async def get_message_history_count(self, telegram_id: int) -> int:
-        """Get total count of user messages for pagination"""
-        user = await self.user_service.handle_new_user(telegram_id, "", "")
-        return await self.message_repository.get_user_message_count(user.id)
+        return [self._format_message(msg) for msg in messages]
+
+    @replica_read
+    async def get_messages_page(
+        self,
+        telegram_id: int,
+        cursor: Optional[str] = None,
+        direction: Literal["older", "newer"] = "older",
+        limit: int = 10,
+        user_id: Optional[int] = None,
+    ) -> MessagePage:
+        """Get a page of message history by keyset cursor (newest first)"""
+        user_id = await self._get_user_id(telegram_id, user_id)
+
+        # Берём на одну строку больше, чтобы узнать, есть ли следующая страница
+        if direction == "newer" and cursor is not None:
+            messages = await self.message_repository.get_user_messages_before(
+                user_id, decode_cursor(cursor), limit=limit + 1
+            )
+            has_newer, has_older = len(messages) > limit, True
+            messages = messages[-limit:]
+        else:
+            position = decode_cursor(cursor) if cursor is not None else None
+            messages = await self.message_repository.get_user_messages_after(
+                user_id, position, limit=limit + 1
+            )
+            has_newer, has_older = position is not None, len(messages) > limit
+            messages = messages[:limit]
+
+        if not messages:
+            return MessagePage(messages=[])
+
+        return MessagePage(
+            messages=[self._format_message(msg) for msg in messages],
+            total_count=await self._cached_message_count(user_id),
+            newer_cursor=self._cursor_of(messages[0]) if has_newer else None,
+            older_cursor=self._cursor_of(messages[-1]) if has_older else None,
+        )
+
+    @replica_read
+    async def search_messages(
+        self,
+        telegram_id: int,
+        query: str,
+        cursor: Optional[str] = None,
+        direction: Literal["older", "newer"] = "older",
+        limit: int = 10,
+        user_id: Optional[int] = None,
+    ) -> MessagePage:
+        """Search message history, best matches first (keyset by rank)"""
+        query = query.strip()
+        if not SEARCH_QUERY_MIN_LENGTH <= len(query) <= SEARCH_QUERY_MAX_LENGTH:
+            raise InvalidMessageData(
+                f"Search query must be {SEARCH_QUERY_MIN_LENGTH}-"
+                f"{SEARCH_QUERY_MAX_LENGTH} characters long"
+            )
+
+        user_id = await self._get_user_id(telegram_id, user_id)
+        position = decode_search_cursor(cursor) if cursor is not None else None
+
+        hits = await self.message_repository.search_messages(
+            user_id, query, cursor=position, limit=limit + 1, direction=direction
+        )
+        if direction == "newer" and position is not None:
+            has_newer, has_older = len(hits) > limit, True
+            hits = hits[-limit:]
+        else:
+            has_newer, has_older = position is not None, len(hits) > limit
+            hits = hits[:limit]
+
+        if not hits:
+            return MessagePage(messages=[])
+
+        return MessagePage(
+            messages=[self._format_message(msg) for msg, _ in hits],
+            newer_cursor=self._search_cursor_of(hits[0]) if has_newer else None,
+            older_cursor=self._search_cursor_of(hits[-1]) if has_older else None,
+        )
+
+    @replica_read
+    async def get_message_history_count(
+        self, telegram_id: int, user_id: Optional[int] = None
+    ) -> int:
+        """Get total count of user messages for pagination (cached per user)"""
+        user_id = await self._get_user_id(telegram_id, user_id)
+        return await self._cached_message_count(user_id)
+
+    async def _cached_message_count(self, user_id: int) -> int:
+        # Инвалидируется репозиторием при создании и удалении сообщений
+        count = message_count_cache.get(user_id)
+        if count is None:
+            count = await self.message_repository.get_user_message_count(user_id)
+            message_count_cache.set(user_id, count)
+        return count
     
-    async def export_message_history(self, telegram_id: int) -> str:
-        """Export message history as formatted text"""
-        user = await self.user_service.handle_new_user(telegram_id, "", "")
-        
-        messages = await self.message_repository.get_user_messages(user.id, limit=1000)
-        
-        export_text = f"📄 Message History Export\n"
-        export_text += f"👤 User: {user.first_name}\n"
-        export_text += f"📅 Exported: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n"
-        export_text += f"📊 Total Messages: {len(messages)}\n"
-        export_text += "=" * 50 + "\n\n"
-        
-        for i, msg in enumerate(messages, 1):
-            role_name = "You" if msg.role == MessageRole.USER else "AI Assistant"
-            timestamp = msg.created_at.strftime("%Y-%m-%d %H:%M:%S")
-            
-            export_text += f"[{i}] {role_name} ({timestamp}):\n"
-            export_text += f"{msg.content}\n\n"
-            
-            if i % 50 == 0:  # Add separator every 50 messages
-                export_text += "-" * 30 + "\n\n"
-        
-        return export_text
+    @replica_read
+    async def export_message_history(
+        self,
+        telegram_id: int,
+        format: ExportFormat = ExportFormat.TXT,
+        compress: bool = False,
+        progress: Optional[Callable[[int, int], Awaitable[None]]] = None,
+        user: Optional[User] = None,
+    ) -> List[ExportPart]:
+        """Export the whole message history as one or more documents
+
+        Messages are streamed from the cold archive and then from the database
+        and written record by record, so memory use does not depend on history
+        size. ``progress(written, total)`` is awaited after every fetched
+        batch. Callers must close the returned parts.
+        """
+        user = await self._resolve_user(telegram_id, user)
+        archived = self.archive.manifest(telegram_id) if self.archive is not None else None
+        total = await self._cached_message_count(user.id)
+        if archived is not None:
+            total += archived.total
+
+        title = (
+            f"📄 Message History Export\n"
+            f"👤 User: {user.first_name}\n"
+            f"📅 Exported: {datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')} UTC\n"
+            f"📊 Total Messages: {total}"
+        )
+        writer = HistoryExportWriter(
+            format,
+            basename=f"message_history_{telegram_id}",
+            title=title,
+            compress=compress,
+            max_part_bytes=settings.EXPORT_MAX_PART_BYTES,
+            spool_max_bytes=settings.EXPORT_SPOOL_MAX_BYTES,
+        )
+
+        batch_size = settings.EXPORT_BATCH_SIZE
+        written = 0
+        try:
+            async for row in self._history_rows(user.id, telegram_id, archived, batch_size):
+                writer.write_message(row.id, row.role, row.content, row.created_at)
+                written += 1
+                if progress is not None and written % batch_size == 0:
+                    await progress(written, total)
+            if progress is not None:
+                await progress(written, max(total, written))
+            return writer.finish()
+        except BaseException:
+            writer.abort()
+            raise
     
+    async def _history_rows(
+        self,
+        user_id: int,
+        telegram_id: int,
+        archived: Optional[ArchiveManifest],
+        batch_size: int,
+    ) -> AsyncIterator[MessageRow]:
+        """Архивные сообщения, затем живые (всё, что новее архива)"""
+        after = None
+        if self.archive is not None and archived is not None and archived.months:
+            async for row in self.archive.read(telegram_id):
+                yield row
+            after = archived.last_at
+
+        async for row in self.message_repository.stream_user_messages(
+            user_id, batch_size=batch_size, after=after
+        ):
+            yield row
+
     async def clear_message_history(self, telegram_id: int) -> bool:
-        """Clear user's message history"""
+        """Clear user's message history (batched purge, runs to completion)"""
         try:
-            user = await self.user_service.handle_new_user(telegram_id, "", "")
-            await self.message_repository.delete_all_user_messages(user.id)
+            purge_service = PurgeService(
+                self.session, archive=self.archive, write_buffer=self.write_buffer
+            )
+            job = await purge_service.create_user_purge(telegram_id)
+            await purge_service.run(job)
             return True
         except Exception:
             return False
     
-    async def get_account_settings(self, telegram_id: int) -> Dict[str, str]:
+    async def get_account_settings(
+        self, telegram_id: int, user: Optional[User] = None
+    ) -> Dict[str, str]:
         """Get account settings information"""
-        user = await self.user_service.handle_new_user(telegram_id, "", "")
+        user = await self._resolve_user(telegram_id, user)
         
         settings = {
             "daily_limit": str(user.daily_limit),
             "current_usage": str(user.requests_today),
-            "account_type": "Standard User",
-            "data_retention": "Indefinite",
+            "account_type": f"{user.tier.value.title()} User",
+            "data_retention": describe_retention(
+                retention_days_for(user.tier, user.retention_days)
+            ),
             "last_reset": "Daily at midnight UTC",
             "account_id": str(user.id)
         }
         
         return settings
     
-    async def get_usage_patterns(self, telegram_id: int) -> Dict[str, str]:
+    @replica_read
+    async def get_usage_patterns(
+        self, telegram_id: int, user: Optional[User] = None
+    ) -> Dict[str, str]:
         """Get usage pattern analysis"""
-        user = await self.user_service.handle_new_user(telegram_id, "", "")
+        user = await self._resolve_user(telegram_id, user)
         
-        # Get recent activity patterns - today vs yesterday
-        today_messages = user.requests_today
-        
-        # Get yesterday's messages (24-48 hours back)
-        yesterday_messages = await self.message_repository.get_messages_by_role_count(
+        # Today vs yesterday and weekly activity from the daily rollups
+        today = datetime.now(timezone.utc).date()
+        days = await self.message_repository.daily_stats.get_days(
             user.id,
-            MessageRole.USER,
-            hours_back=48
-        ) - await self.message_repository.get_messages_by_role_count(
+            since=today - timedelta(days=6)
+        )
+        user_msgs_by_day = {day.day: day.user_msgs for day in days}
+        active_days = sum(1 for count in user_msgs_by_day.values() if count > 0)
+        
+        # Hour-of-day histogram needs raw timestamps, bounded to a recent window
+        summary = await self.message_repository.get_activity_summary(
             user.id,
-            MessageRole.USER,
-            hours_back=24
+            since=datetime.now(timezone.utc) - timedelta(days=USAGE_PATTERN_DAYS)
         )
+        today_messages = user.requests_today
+        yesterday_messages = user_msgs_by_day.get(today - timedelta(days=1), 0)
         
         patterns = {
             "today_requests": str(today_messages),
             "yesterday_requests": str(yesterday_messages),
             "trend": "📈 Increasing" if today_messages > yesterday_messages else "📉 Decreasing" if today_messages < yesterday_messages else "➡️ Stable",
-            "peak_usage": "Throughout the day",
-            "preferred_time": "Current session",
-            "consistency": "Regular user" if user.requests_today > 0 else "Casual user"
+            "peak_usage": self._format_peak_hour(summary.peak_hour),
+            "preferred_time": self._preferred_time(summary.hourly_user),
+            "consistency": "Regular user" if active_days >= REGULAR_USER_DAYS else "Casual user"
+        }
+        
+        return patterns
+    
+    @staticmethod
+    def _format_message(msg: MessageRow) -> Dict[str, str]:
+        role_emoji = "👤" if msg.role == MessageRole.USER else "🤖"
+        return {
+            "id": str(msg.id),
+            "role": f"{role_emoji} {msg.role.value.title()}",
+            "content": msg.content[:100] + "..." if len(msg.content) > 100 else msg.content,
+            "timestamp": msg.created_at.strftime("%m/%d %H:%M"),
+            "full_content": msg.content
         }
+
+    @staticmethod
+    def _cursor_of(msg: MessageRow) -> str:
+        return encode_cursor(MessageCursor(msg.created_at, msg.id))
+
+    @staticmethod
+    def _search_cursor_of(hit: Tuple[MessageRow, float]) -> str:
+        msg, rank = hit
+        return encode_search_cursor(SearchCursor(rank, msg.id))
+
+    @staticmethod
+    def _format_peak_hour(hour: Optional[int]) -> str:
+        if hour is None:
+            return "Not enough data"
+        return f"{hour:02d}:00–{(hour + 1) % 24:02d}:00 UTC"
+    
+    @staticmethod
+    def _preferred_time(hourly: List[int]) -> str:
+        if not any(hourly):
+            return "Not enough data"
         
-        return patterns
\ No newline at end of file
+        day_parts = {
+            name: sum(hourly[start:end])
+            for name, (start, end) in DAY_PARTS.items()
+        }
+        return max(day_parts, key=lambda name: day_parts[name])
@@ -1,3 +1,5 @@
+from typing import Optional
+
 from app.core.services.ai.providers.google_provider import GoogleProvider
 from app.core.services.ai.generator import AIGenerator
 from app.core.services.ai.prompt_builders.conversation_prompt_builder import (
@@ -6,7 +8,9 @@ from app.core.services.ai.prompt_builders.conversation_prompt_builder import (
 from app.core.services.ai.providers.google_provider import GoogleProvider
 
 
-from app.infrastructure.database.connection import SessionLocal
+from app.infrastructure.database.connection import SessionLocal, replica_router, shards
+from app.infrastructure.database.sharding import Shard, ShardRegistry
+from app.infrastructure.database.write_buffer import MessageWriteBuffer
 from app.infrastructure.database.repositories.user_repository import UserRepository
 from app.infrastructure.database.repositories.message_repository import (
     MessageRepository,
@@ -14,6 +18,11 @@ from app.infrastructure.database.repositories.message_repository import (
 from app.core.services.user_service import UserService
 from app.core.services.message_service import MessageService
 from app.core.services.cabinet_service import CabinetService
+from app.core.services.export_jobs import ExportJobManager
+from app.core.services.purge_service import PurgeJobManager, PurgeService
+from app.core.services.archive_service import ArchiveService
+from app.infrastructure.archive.store import MessageArchive
+from app.config.settings import settings
 
 
 class Container:
@@ -25,6 +34,22 @@ class Container:
             provider=self._provider, prompt_builder=ConversationPromptBuilder()
         )
 
+        self._export_jobs = ExportJobManager(settings.EXPORT_MAX_CONCURRENT_JOBS)
+        self._purge_jobs = PurgeJobManager(settings.PURGE_MAX_CONCURRENT_JOBS)
+
+        self._write_buffer: Optional[MessageWriteBuffer] = None
+        if settings.MESSAGE_WRITE_BUFFER_ENABLED:
+            self._write_buffer = MessageWriteBuffer(
+                SessionLocal,
+                max_rows=settings.MESSAGE_WRITE_BUFFER_MAX_ROWS,
+                flush_interval=settings.MESSAGE_WRITE_BUFFER_FLUSH_MS / 1000,
+                max_pending=settings.MESSAGE_WRITE_BUFFER_MAX_PENDING,
+            )
+
+        self._archive: Optional[MessageArchive] = None
+        if settings.ARCHIVE_DIR:
+            self._archive = MessageArchive(settings.ARCHIVE_DIR)
+
     async def get_user_service(self):
         session = SessionLocal()
         user_repository = UserRepository(session)
@@ -33,17 +58,59 @@ class Container:
     async def get_message_service(self):
         session = SessionLocal()
         user_repository = UserRepository(session)
-        message_repository = MessageRepository(session)
-        return MessageService(user_repository, message_repository)
+        message_repository = MessageRepository(session, self._write_buffer)
+        return MessageService(user_repository, message_repository, replica_router)
 
     def get_cabinet_service(self):
         session = SessionLocal()
-        return CabinetService(session)
+        return CabinetService(session, replica_router, self._archive, self._write_buffer)
+
+    def get_purge_service(self):
+        session = SessionLocal()
+        return PurgeService(session, archive=self._archive, write_buffer=self._write_buffer)
+
+    def get_archive_service(self) -> ArchiveService:
+        if self._archive is None:
+            raise RuntimeError("Cold archive is disabled (ARCHIVE_DIR is not set)")
+        session = SessionLocal()
+        return ArchiveService(session, self._archive)
+
+    async def reset_daily_limits(self) -> int:
+        """Сбросить дневные лимиты во всех шардах параллельно"""
+
+        async def reset(shard: Shard) -> int:
+            user_service = await self.get_user_service()
+            try:
+                return await user_service.reset_all_daily_limits()
+            finally:
+                await user_service.user_repository.session.close()
+
+        return sum((await shards.fan_out(reset)).values())
+
+    @property
+    def shards(self) -> ShardRegistry:
+        return shards
 
     @property
     def conversation_ai(self) -> AIGenerator:
         return self._conversation_ai
 
+    @property
+    def export_jobs(self) -> ExportJobManager:
+        return self._export_jobs
+
+    @property
+    def purge_jobs(self) -> PurgeJobManager:
+        return self._purge_jobs
+
+    @property
+    def write_buffer(self) -> Optional[MessageWriteBuffer]:
+        return self._write_buffer
+
+    @property
+    def archive(self) -> Optional[MessageArchive]:
+        return self._archive
+
     # @property
     # def translator_ai(self) -> AIGenerator:
     #     return self._translator_ai
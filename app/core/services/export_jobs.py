@@ -0,0 +1,15 @@
+from typing import Hashable
+
+from ..exceptions.message import ExportAlreadyRunning
+from .background_jobs import BackgroundJobManager, Job
+
+ExportJob = Job
+
+
+class ExportJobManager(BackgroundJobManager):
+    """Фоновые экспорты: не больше одного на пользователя (ключ — telegram_id)"""
+
+    name = "export"
+
+    def already_running(self, key: Hashable) -> ExportAlreadyRunning:
+        return ExportAlreadyRunning(key)
@@ -0,0 +1,175 @@
+import csv
+import gzip
+import io
+import json
+from dataclasses import dataclass
+from datetime import datetime
+from enum import Enum
+from tempfile import SpooledTemporaryFile
+from typing import IO, List, Optional, Sequence
+
+from ..models.message import MessageRole
+
+# Запас на данные, ещё не вытолкнутые компрессором в файл
+_GZIP_HEADROOM = 1024 * 1024
+
+
+class ExportFormat(str, Enum):
+    TXT = "txt"
+    JSONL = "jsonl"
+    CSV = "csv"
+
+
+@dataclass(slots=True)
+class ExportPart:
+    """Один документ экспорта (файл открыт до вызова close)"""
+
+    file: IO[bytes]
+    filename: str
+    size: int
+    messages: int
+
+    def close(self) -> None:
+        self.file.close()
+
+
+@dataclass(slots=True)
+class _OpenPart:
+    raw: IO[bytes]
+    sink: IO[bytes]
+    written: int = 0
+    messages: int = 0
+
+
+class HistoryExportWriter:
+    """Пишет экспорт записями в spooled-файлы, деля его на части по размеру
+
+    Память ограничена spool_max_bytes на часть: остальное уходит во временный
+    файл на диске. При compress размер части считается по сжатым байтам.
+    """
+
+    def __init__(
+        self,
+        format: ExportFormat,
+        basename: str,
+        title: str = "",
+        compress: bool = False,
+        max_part_bytes: int = 45 * 1024 * 1024,
+        spool_max_bytes: int = 1024 * 1024,
+    ) -> None:
+        self.format = format
+        self.basename = basename
+        self.title = title
+        self.compress = compress
+        self.max_part_bytes = max_part_bytes
+        self.spool_max_bytes = spool_max_bytes
+        self._parts: List[ExportPart] = []
+        self._current: Optional[_OpenPart] = None
+        self._index = 0
+        self._csv_buffer = io.StringIO()
+
+    def write_message(
+        self, message_id: int, role: MessageRole, content: str, created_at: datetime
+    ) -> None:
+        self._index += 1
+        record = self._format(message_id, role, content, created_at).encode("utf-8")
+
+        part = self._current
+        # Новая часть, если запись не влезает (но хотя бы одна запись на часть)
+        if part is None or (
+            part.messages and self._size(part) + len(record) > self.max_part_bytes
+        ):
+            part = self._open_part()
+
+        part.sink.write(record)
+        part.written += len(record)
+        part.messages += 1
+
+    def finish(self) -> List[ExportPart]:
+        """Закрыть текущую часть и вернуть все части, перемотанные в начало"""
+        if self._current is None:
+            self._open_part()
+        self._close_part()
+
+        parts, self._parts = self._parts, []
+        extension = self.format.value + (".gz" if self.compress else "")
+        for number, part in enumerate(parts, 1):
+            suffix = f"_part{number}" if len(parts) > 1 else ""
+            part.filename = f"{self.basename}{suffix}.{extension}"
+        return parts
+
+    def abort(self) -> None:
+        """Освободить временные файлы при ошибке"""
+        if self._current is not None:
+            self._current.raw.close()
+            self._current = None
+        for part in self._parts:
+            part.close()
+        self._parts = []
+
+    def _size(self, part: _OpenPart) -> int:
+        if self.compress:
+            return part.raw.tell() + _GZIP_HEADROOM
+        return part.written
+
+    def _open_part(self) -> _OpenPart:
+        if self._current is not None:
+            self._close_part()
+
+        raw = SpooledTemporaryFile(max_size=self.spool_max_bytes, mode="w+b")
+        sink = gzip.GzipFile(fileobj=raw, mode="wb", mtime=0) if self.compress else raw
+        self._current = _OpenPart(raw=raw, sink=sink)
+
+        header = self._header(len(self._parts) + 1).encode("utf-8")
+        sink.write(header)
+        self._current.written = len(header)
+        return self._current
+
+    def _close_part(self) -> None:
+        part, self._current = self._current, None
+        if part is None:
+            return
+        if part.sink is not part.raw:
+            part.sink.close()  # дописывает хвост gzip, raw остаётся открытым
+        size = part.raw.tell()
+        part.raw.seek(0)
+        self._parts.append(
+            ExportPart(file=part.raw, filename="", size=size, messages=part.messages)
+        )
+
+    def _header(self, part_number: int) -> str:
+        if self.format is ExportFormat.CSV:
+            return self._csv_row(["id", "role", "created_at", "content"])
+        if self.format is ExportFormat.TXT:
+            part = f" (part {part_number})" if part_number > 1 else ""
+            return f"{self.title}{part}\n" + "=" * 50 + "\n\n"
+        return ""
+
+    def _format(
+        self, message_id: int, role: MessageRole, content: str, created_at: datetime
+    ) -> str:
+        if self.format is ExportFormat.JSONL:
+            record = {
+                "id": message_id,
+                "role": role.value,
+                "created_at": created_at.isoformat(),
+                "content": content,
+            }
+            return json.dumps(record, ensure_ascii=False) + "\n"
+
+        if self.format is ExportFormat.CSV:
+            return self._csv_row([message_id, role.value, created_at.isoformat(), content])
+
+        role_name = "You" if role == MessageRole.USER else "AI Assistant"
+        timestamp = created_at.strftime("%Y-%m-%d %H:%M:%S")
+        text = f"[{self._index}] {role_name} ({timestamp}):\n{content}\n\n"
+        if self._index % 50 == 0:  # Add separator every 50 messages
+            text += "-" * 30 + "\n\n"
+        return text
+
+    def _csv_row(self, values: Sequence[object]) -> str:
+        buffer = self._csv_buffer
+        buffer.seek(0)
+        buffer.truncate()
+        csv.writer(buffer).writerow(values)
+        return buffer.getvalue()
@@ -1,3 +1,4 @@
+from datetime import datetime, timedelta, timezone
 from typing import Any, List, Optional, Dict
 from app.infrastructure.database.repositories.user_repository import UserRepository
 from app.infrastructure.database.repositories.message_repository import (
@@ -5,20 +6,29 @@ from app.infrastructure.database.repositories.message_repository import (
     MessageRole,
     Message,
 )
+from app.core.schemas.message import MessageCleanup, MessageRow, slim_ai_metadata
 from app.core.exceptions.user import UserNotFound
 from app.core.exceptions.message import InvalidMessageData
 from app.core.exceptions.base import TextFlowException
 from sqlalchemy.exc import SQLAlchemyError
+from app.infrastructure.cache.ttl_cache import message_count_cache
+from app.infrastructure.database.partitions import PartitionManager
+from app.infrastructure.database.routing import ReplicaRouter
+from app.infrastructure.database.sharding import current_engine
 from app.utils.validators import validate_telegram_id
 
 
 class MessageService:
 
     def __init__(
-        self, user_repository: UserRepository, message_repository: MessageRepository
+        self,
+        user_repository: UserRepository,
+        message_repository: MessageRepository,
+        replica_router: Optional[ReplicaRouter] = None,
     ) -> None:
         self.user_repository = user_repository
         self.message_repository = message_repository
+        self.replica_router = replica_router
 
     async def create_message(
         self,
@@ -26,24 +36,25 @@ class MessageService:
         role: MessageRole,
         content: str,
         ai_metadata: Optional[Dict[str, Any]] = None,
+        user_id: Optional[int] = None,
     ) -> Message:
 
         self._validate_message_input(telegram_id=telegram_id, content=content)
 
         try:
-            user = await self.user_repository.get_by_telegram_id(
-                telegram_id=telegram_id
-            )
-
-            if not user:
-                raise UserNotFound(telegram_id=telegram_id)
+            user_id = await self._get_user_id(telegram_id, user_id)
 
             message: Message = await self.message_repository.create_message(
-                user_id=user.id,
+                user_id=user_id,
                 role=role,
                 content=content,
-                ai_metadata=ai_metadata,
+                ai_metadata=slim_ai_metadata(ai_metadata),
             )
+            # Сообщение и роллап дня фиксируются одним коммитом
+            await self.message_repository.commit()
+            if self.replica_router is not None:
+                # Кабинет сразу после записи читает пользователя с primary
+                self.replica_router.note_write(telegram_id)
 
             return message
 
@@ -53,20 +64,15 @@ class MessageService:
             raise
 
     async def get_conversation_context(
-        self, telegram_id: int, context_limit: int = 10
-    ) -> List[Message]:
+        self, telegram_id: int, context_limit: int = 10, user_id: Optional[int] = None
+    ) -> List[MessageRow]:
         validate_telegram_id(telegram_id=telegram_id)
 
         try:
-            user = await self.user_repository.get_by_telegram_id(
-                telegram_id=telegram_id
-            )
-
-            if not user:
-                raise UserNotFound(telegram_id=telegram_id)
+            user_id = await self._get_user_id(telegram_id, user_id)
 
             return await self.message_repository.get_recent_context(
-                user_id=user.id,
+                user_id=user_id,
                 limit=context_limit,
             )
 
@@ -76,20 +82,19 @@ class MessageService:
             raise
 
     async def get_user_messages(
-        self, telegram_id: int, limit: int = 20, offset: int = 0
-    ) -> List[Message]:
+        self,
+        telegram_id: int,
+        limit: int = 20,
+        offset: int = 0,
+        user_id: Optional[int] = None,
+    ) -> List[MessageRow]:
         validate_telegram_id(telegram_id=telegram_id)
 
         try:
-            user = await self.user_repository.get_by_telegram_id(
-                telegram_id=telegram_id
-            )
-
-            if not user:
-                raise UserNotFound(telegram_id=telegram_id)
+            user_id = await self._get_user_id(telegram_id, user_id)
 
             return await self.message_repository.get_user_messages(
-                user_id=user.id,
+                user_id=user_id,
                 limit=limit,
                 offset=offset,
             )
@@ -101,31 +106,54 @@ class MessageService:
 
     async def cleanup_old_messages(
         self, days_old: int = 30, telegram_id: Optional[int] = None
-    ) -> int:
+    ) -> MessageCleanup:
         try:
             user_id = None
+            dropped = 0
 
             if telegram_id is not None:
-                user = await self.user_repository.get_by_telegram_id(
-                    telegram_id=telegram_id
-                )
-
-                if not user:
-                    raise UserNotFound(telegram_id=telegram_id)
-                user_id = user.id
+                user_id = await self._get_user_id(telegram_id, None)
+            else:
+                dropped = await self._drop_old_partitions(days_old)
 
             deleted_count = await self.message_repository.delete_old_messages(
                 days_old=days_old,
                 user_id=user_id,
             )
+            await self.message_repository.commit()
 
-            return deleted_count
+            return MessageCleanup(deleted=deleted_count, dropped_estimate=dropped)
 
         except SQLAlchemyError as e:
             raise TextFlowException(f"Failed to cleanup old messages: {e}")
         except Exception as e:
             raise
 
+    async def _drop_old_partitions(self, days_old: int) -> int:
+        """Снять месячные партиции старше срока (глобальная очистка)"""
+        engine = current_engine(self.message_repository.session.bind)
+        if engine is None:
+            return 0
+        cutoff = datetime.now(timezone.utc) - timedelta(days=days_old)
+        # DETACH CONCURRENTLY идёт на своём соединении: открытая транзакция
+        # сессии его бы заблокировала
+        await self.message_repository.commit()
+        dropped = await PartitionManager(engine).drop_partitions_before(cutoff)
+        if dropped:
+            # Строки ушли с партициями у всех пользователей сразу
+            message_count_cache.clear()
+        return dropped
+
+    async def _get_user_id(self, telegram_id: int, user_id: Optional[int]) -> int:
+        # Хендлер передаёт id, уже загруженный UserMiddleware, — SELECT не нужен
+        if user_id is not None:
+            return user_id
+
+        user = await self.user_repository.get_by_telegram_id(telegram_id=telegram_id)
+        if not user:
+            raise UserNotFound(telegram_id=telegram_id)
+        return user.id
+
     def _validate_message_input(self, telegram_id: int, content: str) -> None:
         validate_telegram_id(telegram_id=telegram_id)
 
@@ -0,0 +1,291 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Hashable, List, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ...config.settings import settings
+from ..exceptions.message import PurgeAlreadyRunning
+from ..exceptions.user import UserNotFound
+from ..models.purge_job import PurgeJob, PurgeStatus
+from ..models.user import UserTier
+from .background_jobs import BackgroundJobManager
+from .retention import retention_days_for
+from ...infrastructure.archive.store import MessageArchive
+from ...infrastructure.cache.ttl_cache import message_count_cache
+from ...infrastructure.database.leader import LeaderLock, advisory_lock
+from ...infrastructure.database.partitions import PartitionManager
+from ...infrastructure.database.sharding import current_engine
+from ...infrastructure.database.write_buffer import MessageWriteBuffer
+from ...infrastructure.database.repositories.message_repository import MessageRepository
+from ...infrastructure.database.repositories.purge_job_repository import PurgeJobRepository
+from ...infrastructure.database.repositories.user_repository import UserRepository
+
+logger = logging.getLogger(__name__)
+
+# (удалено, ожидаемый итог) — ожидаемый итог оценивается при создании задачи
+PurgeProgress = Callable[[int, int], Awaitable[None]]
+
+# Сколько пользователей читается за раз при глобальной очистке
+USER_SCAN_BATCH = 100
+
+
+class PurgeJobManager(BackgroundJobManager):
+    """Фоновые очистки истории (ключ — id задачи в purge_jobs)"""
+
+    name = "purge"
+
+    def already_running(self, key: Hashable) -> PurgeAlreadyRunning:
+        return PurgeAlreadyRunning(key)
+
+
+class PurgeService:
+    """Удаление сообщений keyset-батчами с паузой между ними
+
+    Каждый батч — отдельная короткая транзакция, в которой же обновляется
+    прогресс задачи, поэтому после падения очистка продолжается с места
+    остановки, а блокировки строк не держатся дольше одного батча.
+    """
+
+    def __init__(
+        self,
+        session: AsyncSession,
+        batch_size: Optional[int] = None,
+        pause: Optional[float] = None,
+        sleep: Callable[[float], Awaitable[None]] = asyncio.sleep,
+        archive: Optional[MessageArchive] = None,
+        write_buffer: Optional[MessageWriteBuffer] = None,
+    ):
+        self.session = session
+        self.archive = archive
+        self.write_buffer = write_buffer
+        self.user_repository = UserRepository(session)
+        self.message_repository = MessageRepository(session)
+        self.purge_job_repository = PurgeJobRepository(session)
+        self.batch_size = batch_size or settings.PURGE_BATCH_SIZE
+        self.pause = settings.PURGE_BATCH_PAUSE if pause is None else pause
+        self._sleep = sleep
+
+    async def create_user_purge(self, telegram_id: int) -> PurgeJob:
+        """Задача полной очистки истории; незавершённая задача переиспользуется"""
+        user = await self.user_repository.get_by_telegram_id(telegram_id)
+        if user is None:
+            raise UserNotFound(telegram_id=telegram_id)
+
+        job = await self.purge_job_repository.get_unfinished_for_user(user.id)
+        if job is not None:
+            return job
+
+        total = await self.message_repository.get_user_message_count(user.id)
+        job = await self.purge_job_repository.create(user_id=user.id, total=total)
+        await self.session.commit()
+        return job
+
+    async def create_retention_purge(
+        self, before: datetime, user_id: Optional[int] = None
+    ) -> PurgeJob:
+        """Задача удаления сообщений старше before (всех пользователей при user_id=None)"""
+        job = await self.purge_job_repository.create(user_id=user_id, before=before)
+        await self.session.commit()
+        return job
+
+    async def create_policy_purge(self, as_of: Optional[datetime] = None) -> PurgeJob:
+        """Задача retention по тарифам: у каждого пользователя свой срок от as_of"""
+        as_of = as_of or datetime.now(timezone.utc)
+        job = await self.purge_job_repository.create(before=as_of, policy=True)
+        await self.session.commit()
+        return job
+
+    async def get_job(self, job_id: int) -> Optional[PurgeJob]:
+        return await self.purge_job_repository.get_by_id(job_id)
+
+    async def get_unfinished_jobs(self) -> List[PurgeJob]:
+        return await self.purge_job_repository.get_unfinished()
+
+    async def run(
+        self, job: PurgeJob, progress: Optional[PurgeProgress] = None
+    ) -> PurgeJob:
+        """Выполнить (или продолжить) задачу до конца
+
+        Задачу выполняет одна реплика: она держит advisory lock задачи до
+        конца прогона; остальные получают PurgeAlreadyRunning.
+        """
+        claim = self._claim(job.id)
+        if claim is not None and not await claim.is_leader():
+            raise PurgeAlreadyRunning(job.id)
+        try:
+            return await self._run(job, progress)
+        finally:
+            if claim is not None:
+                await claim.release()
+
+    def _claim(self, job_id: int) -> Optional[LeaderLock]:
+        engine = current_engine(self.session.bind)
+        return None if engine is None else LeaderLock(engine, f"purge-job-{job_id}")
+
+    async def _run(self, job: PurgeJob, progress: Optional[PurgeProgress]) -> PurgeJob:
+        job.status = PurgeStatus.RUNNING
+        job.error = None
+        await self.session.commit()
+
+        try:
+            if job.user_id is not None:
+                if job.before is None and self.write_buffer is not None:
+                    # Ещё не записанные сообщения иначе появились бы после очистки
+                    await self.write_buffer.discard_user(job.user_id)
+                await self._purge_user(job, job.user_id, job.before, progress)
+                if job.before is None:
+                    await self.message_repository.daily_stats.delete_for_user(job.user_id)
+                if self.archive is not None:
+                    user = await self.user_repository.get_by_id(job.user_id)
+                    if user is not None:
+                        await self._purge_archive(user.telegram_id, job.before)
+            else:
+                await self._purge_all_users(job, progress)
+
+            job.status = PurgeStatus.COMPLETED
+            job.finished_at = datetime.now(timezone.utc)
+            await self.session.commit()
+        except Exception as e:
+            # Отмена (остановка бота) оставляет RUNNING — задача возобновится
+            await self.session.rollback()
+            job.status = PurgeStatus.FAILED
+            job.error = str(e)[:500]
+            await self.session.commit()
+            raise
+
+        logger.info("Purge job %s finished: %d messages deleted", job.id, job.deleted)
+        return job
+
+    async def _purge_user(
+        self,
+        job: PurgeJob,
+        user_id: int,
+        before: Optional[datetime],
+        progress: Optional[PurgeProgress],
+    ) -> None:
+        while True:
+            deleted = await self.message_repository.delete_messages_batch(
+                user_id, before=before, limit=self.batch_size
+            )
+            job.deleted += deleted
+            await self.session.commit()
+
+            if deleted:
+                message_count_cache.invalidate(user_id)
+                if progress is not None:
+                    await progress(job.deleted, max(job.total, job.deleted))
+            if deleted < self.batch_size:
+                return
+            await self._sleep(self.pause)
+
+    async def _purge_all_users(
+        self, job: PurgeJob, progress: Optional[PurgeProgress]
+    ) -> None:
+        if job.before is None:
+            raise ValueError("Global purge requires a cutoff")
+
+        # Целые месяцы снимаются партициями; построчно дочищается граничный
+        if job.last_user_id is None:
+            partition_cutoff = (
+                await self._policy_partition_cutoff(job.before) if job.policy else job.before
+            )
+            engine = current_engine(self.session.bind)
+            if partition_cutoff is not None and engine is not None:
+                dropped = await PartitionManager(engine).drop_partitions_before(
+                    partition_cutoff
+                )
+                if dropped:
+                    # Строки ушли с партициями у всех пользователей сразу
+                    message_count_cache.clear()
+                job.deleted += dropped
+            job.last_user_id = 0
+            await self.session.commit()
+
+        while True:
+            users = await self.user_repository.get_retention_after(
+                job.last_user_id or 0, limit=USER_SCAN_BATCH
+            )
+            if not users:
+                return
+            for user in users:
+                before: Optional[datetime] = job.before
+                if job.policy:
+                    days = retention_days_for(user.tier, user.retention_days)
+                    before = job.before - timedelta(days=days) if days else None
+                if before is not None:
+                    await self._purge_user(job, user.id, before, progress)
+                    await self._purge_archive(user.telegram_id, before)
+                job.last_user_id = user.id
+            await self.session.commit()
+
+    async def _purge_archive(self, telegram_id: int, before: Optional[datetime]) -> None:
+        """Архив чистится вместе с БД (по месяцам, целиком лежащим до before)"""
+        if self.archive is None:
+            return
+        # Не параллельно с переносом в архив на реплике-лидере
+        engine = current_engine(self.session.bind)
+        async with advisory_lock(engine, MessageArchive.lock_name(telegram_id)):
+            if before is None:
+                await self.archive.delete_user(telegram_id)
+            else:
+                await self.archive.drop_before(telegram_id, before)
+
+    async def _policy_partition_cutoff(self, as_of: datetime) -> Optional[datetime]:
+        """Граница, старше которой сообщения удаляются у всех (None — такой нет)"""
+        max_override, has_indefinite = await self.user_repository.get_retention_override_bounds()
+        days = [retention_days_for(tier, None) for tier in UserTier]
+        if has_indefinite or 0 in days:
+            return None
+        return as_of - timedelta(days=max(days + [max_override or 0]))
+
+
+async def run_stored_purge(
+    service: PurgeService, job_id: int, progress: Optional[PurgeProgress] = None
+) -> Optional[PurgeJob]:
+    """Выполнить сохранённую задачу по id и закрыть сессию сервиса"""
+    try:
+        job = await service.get_job(job_id)
+        if job is None:
+            return None
+        return await service.run(job, progress=progress)
+    except PurgeAlreadyRunning:
+        logger.info("Purge job %s is running on another replica", job_id)
+        return None
+    finally:
+        await service.session.close()
+
+
+class RetentionEnforcer:
+    """Ставит в очередь очистку по тарифным срокам хранения (задача планировщика)
+
+    Сама очистка идёт через PurgeService батчами; новая задача не создаётся,
+    пока предыдущая не завершена.
+    """
+
+    def __init__(
+        self,
+        purge_service_factory: Callable[[], PurgeService],
+        jobs: PurgeJobManager,
+    ) -> None:
+        self.purge_service_factory = purge_service_factory
+        self.jobs = jobs
+
+    async def enforce(self) -> int:
+        """Запустить (или продолжить) retention-задачу; вернуть её id"""
+        service = self.purge_service_factory()
+        try:
+            unfinished = await service.get_unfinished_jobs()
+            job = next((j for j in unfinished if j.policy), None)
+            if job is None:
+                job = await service.create_policy_purge()
+        finally:
+            await service.session.close()
+
+        job_id = job.id
+        if not self.jobs.is_running(job_id):
+            self.jobs.start(
+                job_id, lambda: run_stored_purge(self.purge_service_factory(), job_id)
+            )
+        return job_id
@@ -0,0 +1,17 @@
+from typing import Optional
+
+from ...config.settings import settings
+from ..models.user import UserTier
+
+
+def retention_days_for(tier: UserTier, override: Optional[int] = None) -> int:
+    """Срок хранения истории в днях: персональный или по тарифу (0 — бессрочно)"""
+    if override is not None:
+        return max(override, 0)
+    return max(settings.RETENTION_DAYS_BY_TIER.get(tier.value, 0), 0)
+
+
+def describe_retention(days: int) -> str:
+    if days <= 0:
+        return "Indefinite"
+    return f"{days} days" if days != 1 else "1 day"
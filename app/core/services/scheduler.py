@@ -0,0 +1,235 @@
+import asyncio
+import logging
+import random
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, FrozenSet, List, Optional, Set, Union
+
+from ...infrastructure.database.leader import LeaderLock
+from ...infrastructure.monitoring.metrics import observe_scheduled_job, record_scheduled_skip
+
+logger = logging.getLogger(__name__)
+
+# (минимум, максимум) для полей cron: минута, час, день месяца, месяц, день недели
+_CRON_FIELDS = [(0, 59), (0, 23), (1, 31), (1, 12), (0, 7)]
+
+# Дальше этого next_after не ищет: выражение вроде "0 0 31 2 *" не сработает никогда
+_CRON_SEARCH_YEARS = 5
+
+
+def _parse_cron_field(spec: str, low: int, high: int) -> FrozenSet[int]:
+    values: Set[int] = set()
+    for part in spec.split(","):
+        step = 1
+        if "/" in part:
+            part, step_spec = part.split("/", 1)
+            step = int(step_spec)
+            if step < 1:
+                raise ValueError(f"Invalid cron step in {spec!r}")
+        if part == "*":
+            start, end = low, high
+        elif "-" in part:
+            start_spec, end_spec = part.split("-", 1)
+            start, end = int(start_spec), int(end_spec)
+        else:
+            start = int(part)
+            # "5/15" — с 5 до конца диапазона
+            end = high if step > 1 else start
+        if not low <= start <= end <= high:
+            raise ValueError(f"Cron field {spec!r} is out of range {low}-{high}")
+        values.update(range(start, end + 1, step))
+    return frozenset(values)
+
+
+class CronSchedule:
+    """Расписание в формате cron из пяти полей (UTC)
+
+    Поддерживаются *, списки, диапазоны и шаги: "*/15 * * * *", "0 3 * * 1-5".
+    День недели 0 и 7 — воскресенье. Как в cron, если заданы и день месяца,
+    и день недели, достаточно совпадения любого из них.
+    """
+
+    def __init__(self, expression: str) -> None:
+        parts = expression.split()
+        if len(parts) != 5:
+            raise ValueError(f"Cron expression needs 5 fields: {expression!r}")
+        self.expression = expression
+        minutes, hours, days, months, weekdays = (
+            _parse_cron_field(part, low, high)
+            for part, (low, high) in zip(parts, _CRON_FIELDS)
+        )
+        self.minutes, self.hours, self.days, self.months = minutes, hours, days, months
+        self.weekdays = frozenset(day % 7 for day in weekdays)
+        self._any_day = parts[2].startswith("*")
+        self._any_weekday = parts[4].startswith("*")
+
+    def _day_matches(self, moment: datetime) -> bool:
+        # isoweekday: пн=1 ... вс=7 -> вс=0
+        weekday = moment.isoweekday() % 7
+        if self._any_day or self._any_weekday:
+            return moment.day in self.days and weekday in self.weekdays
+        return moment.day in self.days or weekday in self.weekdays
+
+    def next_after(self, moment: datetime) -> datetime:
+        """Ближайшее время срабатывания строго позже moment"""
+        moment = moment.astimezone(timezone.utc)
+        candidate = moment.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = candidate.year + _CRON_SEARCH_YEARS
+        while candidate.year <= limit:
+            if candidate.month not in self.months:
+                month_index = candidate.year * 12 + candidate.month
+                candidate = candidate.replace(
+                    year=month_index // 12, month=month_index % 12 + 1, day=1, hour=0, minute=0
+                )
+            elif not self._day_matches(candidate):
+                candidate = candidate.replace(hour=0, minute=0) + timedelta(days=1)
+            elif candidate.hour not in self.hours:
+                candidate = candidate.replace(minute=0) + timedelta(hours=1)
+            elif candidate.minute not in self.minutes:
+                candidate += timedelta(minutes=1)
+            else:
+                return candidate
+        raise ValueError(f"Cron expression never fires: {self.expression!r}")
+
+
+@dataclass(frozen=True)
+class IntervalSchedule:
+    """Каждые seconds секунд, считая от окончания прошлого запуска"""
+
+    seconds: float
+
+    def next_after(self, moment: datetime) -> datetime:
+        return moment + timedelta(seconds=self.seconds)
+
+
+Schedule = Union[CronSchedule, IntervalSchedule]
+
+
+@dataclass
+class ScheduledJob:
+    name: str
+    schedule: Schedule
+    run: Callable[[], Awaitable[Any]]
+    jitter: float = 0.0
+    # Первый запуск сразу при старте, а не через интервал
+    run_at_start: bool = False
+    runs: int = field(default=0, init=False)
+
+
+class Scheduler:
+    """Периодические задачи внутри процесса бота
+
+    У каждой задачи свой цикл: дождаться срабатывания (+ случайный jitter),
+    выполнить, посчитать следующее время от момента окончания. Запуски одной
+    задачи поэтому не перекрываются — долгий прогон просто съедает пропущенные
+    срабатывания. Если передан leader, задачи выполняет только реплика,
+    держащая advisory lock; остальные пропускают срабатывание и пробуют
+    снова на следующем (так лидерство переходит, если лидер упал).
+    """
+
+    def __init__(self, leader: Optional[LeaderLock] = None, jitter: float = 0.0) -> None:
+        self.leader = leader
+        self.jitter = jitter
+        self._jobs: Dict[str, ScheduledJob] = {}
+        self._running: Set[str] = set()
+        self._tasks: List["asyncio.Task[None]"] = []
+
+    @property
+    def jobs(self) -> List[ScheduledJob]:
+        return list(self._jobs.values())
+
+    def cron(
+        self,
+        name: str,
+        expression: str,
+        run: Callable[[], Awaitable[Any]],
+        jitter: Optional[float] = None,
+    ) -> ScheduledJob:
+        return self._add(ScheduledJob(name, CronSchedule(expression), run, self._jitter(jitter)))
+
+    def every(
+        self,
+        name: str,
+        seconds: float,
+        run: Callable[[], Awaitable[Any]],
+        jitter: Optional[float] = None,
+        run_at_start: bool = True,
+    ) -> ScheduledJob:
+        return self._add(
+            ScheduledJob(
+                name, IntervalSchedule(seconds), run, self._jitter(jitter), run_at_start
+            )
+        )
+
+    def _jitter(self, jitter: Optional[float]) -> float:
+        return self.jitter if jitter is None else jitter
+
+    def _add(self, job: ScheduledJob) -> ScheduledJob:
+        if job.name in self._jobs:
+            raise ValueError(f"Job {job.name!r} is already scheduled")
+        self._jobs[job.name] = job
+        return job
+
+    def start(self) -> None:
+        for job in self._jobs.values():
+            self._tasks.append(asyncio.create_task(self._loop(job), name=f"scheduler-{job.name}"))
+
+    async def shutdown(self) -> None:
+        """Отменить циклы (и текущие запуски) и отпустить лидерство"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+        if self.leader is not None:
+            await self.leader.release()
+
+    async def run_now(self, name: str) -> Optional[str]:
+        """Запустить задачу вне расписания (с теми же проверками лидерства)"""
+        return await self.run_job(self._jobs[name])
+
+    async def run_job(self, job: ScheduledJob) -> Optional[str]:
+        """Один запуск задачи; вернуть статус (None — пропущен)"""
+        if job.name in self._running:
+            logger.warning("Scheduled job %s is still running, skipping", job.name)
+            return None
+        if not await self._is_leader(job):
+            record_scheduled_skip(job.name)
+            return None
+
+        self._running.add(job.name)
+        started = time.perf_counter()
+        status = "ok"
+        try:
+            await job.run()
+        except asyncio.CancelledError:
+            status = "cancelled"
+            raise
+        except Exception:
+            status = "error"
+            logger.exception("Scheduled job %s failed", job.name)
+        finally:
+            self._running.discard(job.name)
+            seconds = time.perf_counter() - started
+            job.runs += 1
+            observe_scheduled_job(job.name, status, seconds)
+            logger.info("Scheduled job %s: %s in %.2fs", job.name, status, seconds)
+        return status
+
+    async def _is_leader(self, job: ScheduledJob) -> bool:
+        if self.leader is None:
+            return True
+        try:
+            return await self.leader.is_leader()
+        except Exception:
+            logger.exception("Leader election failed, skipping %s", job.name)
+            return False
+
+    async def _loop(self, job: ScheduledJob) -> None:
+        now = datetime.now(timezone.utc)
+        next_run = now if job.run_at_start else job.schedule.next_after(now)
+        while True:
+            delay = (next_run - datetime.now(timezone.utc)).total_seconds()
+            await asyncio.sleep(max(delay, 0) + random.uniform(0, job.jitter))
+            await self.run_job(job)
+            next_run = job.schedule.next_after(datetime.now(timezone.utc))
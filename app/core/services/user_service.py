@@ -22,6 +22,7 @@ class UserService:
             user = await self.user_repository.get_or_create_user(
                 telegram_id=telegram_id, first_name=first_name, username=username
             )
+            await self.user_repository.commit()
 
             return user
         except SQLAlchemyError as e:
@@ -65,6 +66,7 @@ class UserService:
                 )
 
             await self.user_repository.increment_requests_today(telegram_id=telegram_id)
+            await self.user_repository.commit()
             return await self.user_repository.get_by_telegram_id(
                 telegram_id=telegram_id
             )
@@ -100,7 +102,9 @@ class UserService:
 
     async def reset_all_daily_limits(self) -> int:
         try:
-            return await self.user_repository.reset_daily_limits()
+            reset = await self.user_repository.reset_daily_limits()
+            await self.user_repository.commit()
+            return reset
         except SQLAlchemyError as e:
             raise TextFlowException(f"Failed to reset daily limits: {e}")
         except Exception as e:
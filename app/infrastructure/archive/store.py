@@ -0,0 +1,251 @@
+import asyncio
+import gzip
+import json
+import os
+import shutil
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Set
+
+from app.core.models.message import MessageRole
+from app.core.schemas.message import MessageRow
+
+MANIFEST_NAME = "manifest.json"
+VOLUME_NAME = "volume.json"
+
+
+@dataclass(slots=True)
+class ArchivedMonth:
+    """Строка манифеста: один файл <YYYY-MM>.jsonl.gz"""
+
+    messages: int
+    first_at: datetime
+    last_at: datetime
+
+
+@dataclass(slots=True)
+class ArchiveManifest:
+    """Индекс архива пользователя: какие месяцы есть и сколько в них сообщений"""
+
+    months: Dict[str, ArchivedMonth] = field(default_factory=dict)
+
+    @property
+    def total(self) -> int:
+        return sum(month.messages for month in self.months.values())
+
+    @property
+    def last_at(self) -> Optional[datetime]:
+        return max((month.last_at for month in self.months.values()), default=None)
+
+
+def _utc(value: datetime) -> datetime:
+    """SQLite отдаёт наивное время; считаем его UTC"""
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+
+def _month_of(value: datetime) -> str:
+    return _utc(value).astimezone(timezone.utc).strftime("%Y-%m")
+
+
+def _encode(message: MessageRow) -> bytes:
+    record = {
+        "id": message.id,
+        "role": message.role.value,
+        "content": message.content,
+        "created_at": _utc(message.created_at).isoformat(),
+    }
+    return (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+
+
+def _decode(line: bytes) -> MessageRow:
+    record = json.loads(line)
+    return MessageRow(
+        record["id"],
+        MessageRole(record["role"]),
+        record["content"],
+        datetime.fromisoformat(record["created_at"]),
+    )
+
+
+class MessageArchive:
+    """Холодный архив сообщений на диске
+
+    <root>/<telegram_id>/<YYYY-MM>.jsonl.gz — append-only: каждая запись
+    дописывает новый gzip-member (gzip читает их подряд как один поток), рядом
+    manifest.json с числом сообщений и границами по времени. Ключ —
+    telegram_id, поэтому архив не зависит от шарда и переживает rebalance.
+    Дисковый ввод-вывод выполняется в потоках, чтобы не блокировать бота.
+
+    _lock упорядочивает запись внутри процесса; между репликами архивирование
+    и очистку пользователя сериализует advisory lock с именем lock_name().
+    """
+
+    def __init__(self, root: str, compress_level: int = 6) -> None:
+        self.root = Path(root)
+        self.compress_level = compress_level
+        self._lock = asyncio.Lock()
+
+    async def volume_id(self) -> str:
+        """Идентификатор тома: создаётся при первом обращении к ARCHIVE_DIR"""
+        return await asyncio.to_thread(self._volume_id)
+
+    def _volume_id(self) -> str:
+        path = self.root / VOLUME_NAME
+        if not path.exists():
+            self.root.mkdir(parents=True, exist_ok=True)
+            tmp = self.root / f"{VOLUME_NAME}.{uuid.uuid4().hex}.tmp"
+            tmp.write_text(json.dumps({"volume_id": str(uuid.uuid4())}), "utf-8")
+            # link не перезаписывает: при гонке остаётся id первой реплики
+            try:
+                os.link(tmp, path)
+            except FileExistsError:
+                pass
+            finally:
+                tmp.unlink()
+        return json.loads(path.read_text("utf-8"))["volume_id"]
+
+    @staticmethod
+    def lock_name(telegram_id: int) -> str:
+        return f"archive-user-{telegram_id}"
+
+    def _user_dir(self, telegram_id: int) -> Path:
+        return self.root / str(telegram_id)
+
+    def manifest(self, telegram_id: int) -> ArchiveManifest:
+        path = self._user_dir(telegram_id) / MANIFEST_NAME
+        if not path.exists():
+            return ArchiveManifest()
+        data = json.loads(path.read_text("utf-8"))
+        return ArchiveManifest(
+            months={
+                name: ArchivedMonth(
+                    messages=month["messages"],
+                    first_at=datetime.fromisoformat(month["first_at"]),
+                    last_at=datetime.fromisoformat(month["last_at"]),
+                )
+                for name, month in data["months"].items()
+            }
+        )
+
+    def _write_manifest(self, telegram_id: int, manifest: ArchiveManifest) -> None:
+        user_dir = self._user_dir(telegram_id)
+        data = {
+            "months": {
+                name: {
+                    "messages": month.messages,
+                    "first_at": month.first_at.isoformat(),
+                    "last_at": month.last_at.isoformat(),
+                }
+                for name, month in sorted(manifest.months.items())
+            }
+        }
+        # Запись через временный файл: манифест всегда целый
+        # Имя уникально: каталог общий, реплики не затирают чужой tmp
+        tmp = user_dir / f"{MANIFEST_NAME}.{uuid.uuid4().hex}.tmp"
+        tmp.write_text(json.dumps(data), "utf-8")
+        os.replace(tmp, user_dir / MANIFEST_NAME)
+
+    async def append(self, telegram_id: int, messages: Iterable[MessageRow]) -> int:
+        """Дописать сообщения в месячные файлы; вернуть число записанных
+
+        Сообщения, чей id уже есть в архиве (повтор после сбоя), пропускаются.
+        """
+        async with self._lock:
+            return await asyncio.to_thread(self._append, telegram_id, list(messages))
+
+    def _append(self, telegram_id: int, messages: List[MessageRow]) -> int:
+        if not messages:
+            return 0
+        user_dir = self._user_dir(telegram_id)
+        user_dir.mkdir(parents=True, exist_ok=True)
+        manifest = self.manifest(telegram_id)
+
+        by_month: Dict[str, List[MessageRow]] = {}
+        for message in messages:
+            by_month.setdefault(_month_of(message.created_at), []).append(message)
+
+        written = 0
+        for name, batch in by_month.items():
+            path = user_dir / f"{name}.jsonl.gz"
+            month = manifest.months.get(name)
+            # Файл месяца читается, только если батч пересекается с ним по
+            # времени: при обычном архивировании строки идут по возрастанию
+            if month is not None and min(_utc(m.created_at) for m in batch) <= month.last_at:
+                archived = self._archived_ids(path)
+                batch = [message for message in batch if message.id not in archived]
+                if not batch:
+                    continue
+            payload = b"".join(_encode(message) for message in batch)
+            with open(path, "ab") as file:
+                file.write(gzip.compress(payload, self.compress_level))
+                file.flush()
+                os.fsync(file.fileno())
+
+            first_at = min(_utc(message.created_at) for message in batch)
+            last_at = max(_utc(message.created_at) for message in batch)
+            written += len(batch)
+            if month is None:
+                manifest.months[name] = ArchivedMonth(len(batch), first_at, last_at)
+            else:
+                month.messages += len(batch)
+                month.first_at = min(month.first_at, first_at)
+                month.last_at = max(month.last_at, last_at)
+
+        if written:
+            self._write_manifest(telegram_id, manifest)
+        return written
+
+    async def read(self, telegram_id: int) -> AsyncIterator[MessageRow]:
+        """Все архивные сообщения в хронологическом порядке (помесячно)"""
+        for name in sorted(self.manifest(telegram_id).months):
+            path = self._user_dir(telegram_id) / f"{name}.jsonl.gz"
+            for message in await asyncio.to_thread(self._read_month, path):
+                yield message
+
+    @staticmethod
+    def _archived_ids(path: Path) -> Set[Optional[int]]:
+        if not path.exists():
+            return set()
+        with gzip.open(path, "rb") as file:
+            return {json.loads(line)["id"] for line in file if line.strip()}
+
+    @staticmethod
+    def _read_month(path: Path) -> List[MessageRow]:
+        if not path.exists():
+            return []
+        with gzip.open(path, "rb") as file:
+            messages = [_decode(line) for line in file if line.strip()]
+        # Повтор после сбоя между записью в архив и DELETE даёт дубли
+        seen: Set[Optional[int]] = set()
+        unique = []
+        for message in messages:
+            if message.id not in seen:
+                seen.add(message.id)
+                unique.append(message)
+        return sorted(unique, key=lambda m: (m.created_at, m.id or 0))
+
+    async def drop_before(self, telegram_id: int, cutoff: datetime) -> int:
+        """Удалить месяцы, целиком лежащие раньше cutoff; вернуть число сообщений"""
+        async with self._lock:
+            return await asyncio.to_thread(self._drop_before, telegram_id, cutoff)
+
+    def _drop_before(self, telegram_id: int, cutoff: datetime) -> int:
+        manifest = self.manifest(telegram_id)
+        expired = [name for name, month in manifest.months.items() if month.last_at < cutoff]
+        if not expired:
+            return 0
+        dropped = 0
+        for name in expired:
+            (self._user_dir(telegram_id) / f"{name}.jsonl.gz").unlink(missing_ok=True)
+            dropped += manifest.months.pop(name).messages
+        self._write_manifest(telegram_id, manifest)
+        return dropped
+
+    async def delete_user(self, telegram_id: int) -> None:
+        """Удалить весь архив пользователя (очистка истории)"""
+        async with self._lock:
+            await asyncio.to_thread(
+                shutil.rmtree, self._user_dir(telegram_id), ignore_errors=True
+            )
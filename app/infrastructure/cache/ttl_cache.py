@@ -0,0 +1,103 @@
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Generic, Hashable, Optional, TypeVar
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.config.settings import settings
+from app.infrastructure.database.sharding import shard_key
+from app.infrastructure.monitoring.metrics import record_cache_lookup
+
+V = TypeVar("V")
+
+# session.info: инвалидации, отложенные до COMMIT
+_PENDING_INVALIDATIONS = "ttl_cache_pending_invalidations"
+
+
+class TTLCache(Generic[V]):
+    """Простой in-process кэш с TTL и LRU-вытеснением
+
+    Кэш свой у каждой реплики, а инвалидация (invalidate, clear) локальна:
+    запись или очистка на одной реплике не сбрасывает значения на других.
+    Поэтому кэшировать можно только то, что допустимо показывать устаревшим:
+    на остальных репликах значение отстаёт не дольше ttl секунд.
+    Ключи разделены по шардам: id строк в разных шардах совпадают.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        ttl: float,
+        maxsize: int = 10_000,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.name = name
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._clock = clock
+        self._data: OrderedDict[Hashable, tuple[float, V]] = OrderedDict()
+
+    def get(self, key: Hashable) -> Optional[V]:
+        key = shard_key(key)
+        entry = self._data.get(key)
+        if entry is not None and entry[0] <= self._clock():
+            del self._data[key]
+            entry = None
+
+        record_cache_lookup(self.name, entry is not None)
+        if entry is None:
+            return None
+
+        self._data.move_to_end(key)
+        return entry[1]
+
+    def set(self, key: Hashable, value: V) -> None:
+        key = shard_key(key)
+        self._data[key] = (self._clock() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def invalidate(self, key: Hashable) -> None:
+        self._data.pop(shard_key(key), None)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def invalidate_on_commit(self, session: Any, key: Optional[Hashable] = None) -> None:
+        """Сбросить key (None — весь кэш) после COMMIT транзакции session
+
+        Сброс до COMMIT не помогает: параллельный читатель успевает положить
+        в кэш ещё старое значение. При ROLLBACK данные не менялись — сброса нет.
+        """
+        pending = session.info.setdefault(_PENDING_INVALIDATIONS, [])
+        pending.append((self, None if key is None else shard_key(key)))
+
+    def _apply_invalidation(self, key: Optional[Hashable]) -> None:
+        if key is None:
+            self._data.clear()
+        else:
+            self._data.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session: Session) -> None:
+    for cache, key in session.info.pop(_PENDING_INVALIDATIONS, ()):
+        cache._apply_invalidation(key)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_after_rollback(session: Session, previous_transaction: Any) -> None:
+    # Откат SAVEPOINT не отменяет изменений внешней транзакции
+    if not previous_transaction.nested:
+        session.info.pop(_PENDING_INVALIDATIONS, None)
+
+
+# Общее число сообщений пользователя (для пагинации истории)
+message_count_cache: TTLCache[int] = TTLCache(
+    "message_count", ttl=settings.MESSAGE_COUNT_CACHE_TTL
+)
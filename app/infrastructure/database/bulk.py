@@ -0,0 +1,192 @@
+"""Массовый импорт/экспорт таблиц через COPY (только PostgreSQL + asyncpg)
+
+Экспорт — COPY (SELECT ...) TO STDOUT прямо в файл/stdout, без разбора
+строк в Python. Импорт идёт через временную таблицу: COPY FROM STDIN в неё,
+затем создаются недостающие месячные партиции и INSERT ... SELECT ... ON
+CONFLICT DO NOTHING, поэтому повторная загрузка того же дампа ничего не
+дублирует. id сохраняются, последовательность подтягивается к max(id).
+Для messages в том же запросе дневные роллапы (message_daily_stats)
+увеличиваются на реально вставленные строки — статистика кабинета видит
+импортированную историю.
+"""
+
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from datetime import datetime
+from enum import Enum
+from typing import Any, AsyncIterator, Iterable, List, Optional, Sequence, Tuple
+
+import asyncpg
+from sqlalchemy import Table
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.core.models.message import Message, MessageRole
+from app.core.models.user import User
+from app.infrastructure.database.partitions import partitions_between
+
+
+class CopyFormat(Enum):
+    CSV = "csv"
+    BINARY = "binary"
+
+
+@dataclass(frozen=True, slots=True)
+class BulkTable:
+    """Таблица, которую можно выгрузить/загрузить целиком"""
+
+    name: str
+    columns: Tuple[str, ...]
+
+    @classmethod
+    def of(cls, table: Table) -> "BulkTable":
+        # Только колонки модели: сгенерированная content_tsv в дамп не попадает
+        return cls(table.name, tuple(column.name for column in table.columns))
+
+    @property
+    def column_list(self) -> str:
+        return ", ".join(self.columns)
+
+
+# Порядок важен для импорта: messages ссылается на users
+BULK_TABLES = {
+    "users": BulkTable.of(User.__table__),  # type: ignore[arg-type]
+    "messages": BulkTable.of(Message.__table__),  # type: ignore[arg-type]
+}
+
+
+def with_daily_rollups(insert: str) -> str:
+    """INSERT в messages, который заодно прибавляет вставленные строки к роллапам
+
+    Вставленные строки берутся из RETURNING, поэтому пропущенные ON CONFLICT
+    не считаются. День и токены — как в MessageRepository.create_message
+    (день по UTC, token_usage из ai_metadata). Запрос возвращает число
+    вставленных сообщений.
+    """
+    tokens = "coalesce(sum((ai_metadata -> 'token_usage' ->> '{}')::int), 0)"
+    return (
+        f"WITH inserted AS ({insert} RETURNING user_id, created_at, role, ai_metadata), "
+        "daily AS ("
+        "SELECT user_id, (created_at AT TIME ZONE 'UTC')::date AS day, "
+        f"count(*) FILTER (WHERE role = '{MessageRole.USER.name}') AS user_msgs, "
+        f"count(*) FILTER (WHERE role <> '{MessageRole.USER.name}') AS assistant_msgs, "
+        f"{tokens.format('input_tokens')} AS tokens_in, "
+        f"{tokens.format('output_tokens')} AS tokens_out "
+        "FROM inserted GROUP BY 1, 2"
+        "), rollups AS ("
+        "INSERT INTO message_daily_stats "
+        "(user_id, day, user_msgs, assistant_msgs, tokens_in, tokens_out) "
+        "SELECT user_id, day, user_msgs, assistant_msgs, tokens_in, tokens_out FROM daily "
+        "ON CONFLICT (user_id, day) DO UPDATE SET "
+        "user_msgs = message_daily_stats.user_msgs + EXCLUDED.user_msgs, "
+        "assistant_msgs = message_daily_stats.assistant_msgs + EXCLUDED.assistant_msgs, "
+        "tokens_in = message_daily_stats.tokens_in + EXCLUDED.tokens_in, "
+        "tokens_out = message_daily_stats.tokens_out + EXCLUDED.tokens_out"
+        ") "
+        "SELECT count(*) FROM inserted"
+    )
+
+
+def copy_count(status: str) -> int:
+    """Число строк из статуса команды: 'COPY 10', 'INSERT 0 10' -> 10"""
+    return int(status.rsplit(" ", 1)[-1])
+
+
+def export_query(table: BulkTable, since: Optional[datetime] = None) -> Tuple[str, List[Any]]:
+    query = f"SELECT {table.column_list} FROM {table.name}"
+    if since is None:
+        return query, []
+    return f"{query} WHERE created_at >= $1", [since]
+
+
+@asynccontextmanager
+async def raw_connection(engine: AsyncEngine) -> AsyncIterator[asyncpg.Connection]:
+    """asyncpg-соединение из пула engine (COPY в SQLAlchemy недоступен)"""
+    if engine.dialect.driver != "asyncpg":
+        raise RuntimeError("Bulk COPY needs a postgresql+asyncpg database")
+    async with engine.connect() as conn:
+        raw = await conn.get_raw_connection()
+        yield raw.driver_connection  # type: ignore[misc]
+
+
+async def copy_out(
+    conn: asyncpg.Connection,
+    table: BulkTable,
+    output: Any,
+    copy_format: CopyFormat = CopyFormat.BINARY,
+    since: Optional[datetime] = None,
+) -> int:
+    """Выгрузить таблицу в output (путь, бинарный файл или корутина)"""
+    query, args = export_query(table, since)
+    options = {"header": True} if copy_format is CopyFormat.CSV else {}
+    status = await conn.copy_from_query(
+        query, *args, output=output, format=copy_format.value, **options
+    )
+    return copy_count(status)
+
+
+async def _ensure_partitions(conn: asyncpg.Connection, table: str, staging: str) -> None:
+    """Партиции под все месяцы загружаемых строк (если таблица партиционирована)"""
+    partitioned = await conn.fetchval(
+        "SELECT relkind = 'p' FROM pg_class WHERE oid = to_regclass($1)", table
+    )
+    if not partitioned:
+        return
+    bounds = await conn.fetchrow(f"SELECT min(created_at), max(created_at) FROM {staging}")
+    if bounds is None or bounds[0] is None:
+        return
+    for partition in partitions_between(table, bounds[0], bounds[1]):
+        await conn.execute(partition.create_sql())
+
+
+async def copy_in(
+    conn: asyncpg.Connection,
+    table: BulkTable,
+    source: Any,
+    copy_format: CopyFormat = CopyFormat.BINARY,
+) -> int:
+    """Загрузить дамп из source; вернуть число новых строк"""
+    staging = f"_bulk_{table.name}"
+    options = {"header": True} if copy_format is CopyFormat.CSV else {}
+    async with conn.transaction():
+        await conn.execute(
+            f"CREATE TEMP TABLE {staging} (LIKE {table.name} INCLUDING DEFAULTS) "
+            "ON COMMIT DROP"
+        )
+        await conn.copy_to_table(
+            staging,
+            source=source,
+            columns=list(table.columns),
+            format=copy_format.value,
+            **options,
+        )
+        await _ensure_partitions(conn, table.name, staging)
+        insert = (
+            f"INSERT INTO {table.name} ({table.column_list}) "
+            f"SELECT {table.column_list} FROM {staging} ON CONFLICT DO NOTHING"
+        )
+        if table.name == Message.__tablename__:
+            inserted = await conn.fetchval(with_daily_rollups(insert))
+        else:
+            inserted = copy_count(await conn.execute(insert))
+        await conn.execute(
+            f"SELECT setval(pg_get_serial_sequence('{table.name}', 'id'), "
+            f"greatest(max(id), 1)) FROM {table.name}"
+        )
+    return inserted
+
+
+async def copy_records(
+    conn: asyncpg.Connection,
+    table: BulkTable,
+    records: Iterable[Sequence[Any]],
+    columns: Optional[Sequence[str]] = None,
+) -> int:
+    """Записать кортежи из Python одним COPY (вместо INSERT по строкам)
+
+    Значения передаются как есть в формате asyncpg: enum-колонки — именем
+    (MessageRole.USER.name), JSONB — строкой JSON.
+    """
+    status = await conn.copy_records_to_table(
+        table.name, records=records, columns=list(columns or table.columns)
+    )
+    return copy_count(status)
@@ -4,15 +4,75 @@ from sqlalchemy.ext.asyncio import (
     AsyncEngine,
     AsyncSession,
 )
-from typing import AsyncGenerator
+from typing import AsyncGenerator, Optional
 from app.config.settings import settings
+from app.infrastructure.monitoring.metrics import install_engine_metrics
+from app.infrastructure.database.query_budget import install_query_tracker
+from app.infrastructure.database.diagnostics import (
+    MonitoredQueuePool,
+    install_slow_query_log,
+)
+from app.infrastructure.database.routing import ReplicaRouter, RoutingSession
+from app.infrastructure.database.sharding import ShardMap, ShardRegistry
+
+
+def _create_engine(url: str, name: str = "main") -> AsyncEngine:
+    # echo выключен: каждый запрос форматировался и писался в лог. Вместо
+    # него — лог медленных запросов с вырезанными значениями параметров
+    engine = create_async_engine(
+        url=url,
+        echo=settings.DB_ECHO,
+        poolclass=MonitoredQueuePool,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+    )
+
+    install_slow_query_log(engine.sync_engine, settings.DB_SLOW_QUERY_MS)
+
+    if settings.METRICS_ENABLED:
+        install_engine_metrics(engine.sync_engine, name)
+
+    if settings.QUERY_BUDGET_ENABLED:
+        install_query_tracker(engine.sync_engine)
 
-engine: AsyncEngine = create_async_engine(
-    url=settings.DATABASE_URL.get_secret_value(),
-    echo=True,
+    return engine
+
+
+engine: AsyncEngine = _create_engine(settings.DATABASE_URL.get_secret_value())
+
+# Шарды данных пользователей; без DATABASE_SHARDS единственный шард — main
+shards = ShardRegistry(
+    {
+        "main": engine,
+        **{
+            name: _create_engine(url.get_secret_value(), name)
+            for name, url in settings.DATABASE_SHARDS.items()
+        },
+    },
+    ShardMap(
+        ["main", *settings.DATABASE_SHARDS], settings.SHARD_BUCKETS, settings.SHARD_MAP
+    ),
 )
 
-SessionLocal = async_sessionmaker(engine, expire_on_commit=False)
+# Реплика для чтений кабинета (@replica_read); без неё всё идёт в primary
+read_engine: Optional[AsyncEngine] = None
+replica_router: Optional[ReplicaRouter] = None
+
+if settings.READ_DATABASE_URL and settings.READ_DATABASE_URL.get_secret_value():
+    read_engine = _create_engine(settings.READ_DATABASE_URL.get_secret_value(), "replica")
+    replica_router = ReplicaRouter(
+        read_engine,
+        max_lag=settings.READ_REPLICA_MAX_LAG,
+        read_your_writes=settings.READ_YOUR_WRITES_WINDOW,
+        check_interval=settings.READ_REPLICA_CHECK_INTERVAL,
+    )
+
+SessionLocal = async_sessionmaker(
+    engine, sync_session_class=RoutingSession, expire_on_commit=False
+)
 
 
 async def get_session() -> AsyncGenerator[AsyncSession, None]:
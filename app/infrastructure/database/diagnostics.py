@@ -0,0 +1,79 @@
+import logging
+import time
+from typing import Any
+
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from app.config.settings import settings
+from app.infrastructure.database.query_budget import normalize_statement
+from app.infrastructure.database.query_timing import observe_query_time
+
+logger = logging.getLogger(__name__)
+
+_MAX_STATEMENT_LENGTH = 2000
+
+
+def redact_parameters(parameters: Any) -> str:
+    """Описание bound-параметров без значений: только типы (или число наборов)"""
+    if isinstance(parameters, (list, tuple)) and parameters and isinstance(
+        parameters[0], (dict, list, tuple)
+    ):
+        return f"<{len(parameters)} parameter sets>"
+    if isinstance(parameters, dict):
+        return "{" + ", ".join(
+            f"{key}: <{type(value).__name__}>" for key, value in parameters.items()
+        ) + "}"
+    if isinstance(parameters, (list, tuple)):
+        return "(" + ", ".join(f"<{type(value).__name__}>" for value in parameters) + ")"
+    return "<redacted>"
+
+
+def install_slow_query_log(engine: Engine, threshold_ms: float) -> None:
+    """Логировать запросы дольше threshold_ms — замена echo=True
+
+    В лог попадает только текст запроса (литералы заменены на "?") и типы
+    параметров, без самих значений: в них может быть переписка пользователей.
+    """
+    threshold = threshold_ms / 1000
+
+    def log_if_slow(statement: str, parameters: Any, elapsed: float) -> None:
+        if elapsed < threshold:
+            return
+        logger.warning(
+            "Slow query (%.1f ms): %s | parameters: %s",
+            elapsed * 1000,
+            normalize_statement(statement)[:_MAX_STATEMENT_LENGTH],
+            redact_parameters(parameters),
+        )
+
+    observe_query_time(engine, log_if_slow)
+
+
+class MonitoredQueuePool(AsyncAdaptedQueuePool):
+    """Пул соединений, предупреждающий о долгом ожидании свободного соединения
+
+    Время меряется, только если checkout встаёт в очередь: все pool_size +
+    max_overflow соединений заняты. Иначе это выдача свободного соединения
+    или открытие нового (DNS/TLS/аутентификация), а медленный connect —
+    не переполнение пула.
+    """
+
+    def _is_exhausted(self) -> bool:
+        return self._max_overflow > -1 and self.checkedout() >= self.size() + self._max_overflow
+
+    def _do_get(self) -> Any:
+        if not self._is_exhausted():
+            return super()._do_get()
+
+        started = time.perf_counter()
+        connection = super()._do_get()
+        waited = time.perf_counter() - started
+
+        if waited * 1000 >= settings.DB_POOL_WAIT_WARNING_MS:
+            logger.warning(
+                "Waited %.1f ms for a database connection, pool saturated: %s",
+                waited * 1000,
+                self.status(),
+            )
+        return connection
@@ -0,0 +1,120 @@
+import asyncio
+import logging
+import zlib
+from contextlib import asynccontextmanager, suppress
+from typing import AsyncIterator, Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+logger = logging.getLogger(__name__)
+
+
+def lock_key(name: str) -> int:
+    """Стабильный ключ advisory lock по имени (crc32 помещается в bigint)"""
+    return zlib.crc32(name.encode("utf-8"))
+
+
+class LeaderLock:
+    """Лидерство между репликами бота на сессионном advisory lock PostgreSQL
+
+    Лидер держит отдельное соединение с pg_try_advisory_lock(key): пока оно
+    живо, остальные реплики получают False. Если лидер упал, PostgreSQL
+    снимает блокировку вместе с его сессией, и её забирает первая реплика,
+    спросившая is_leader(). Вне PostgreSQL (SQLite, одна реплика) процесс
+    всегда лидер.
+    """
+
+    def __init__(self, engine: AsyncEngine, name: str) -> None:
+        self.engine = engine
+        self.key = lock_key(name)
+        self._conn: Optional[AsyncConnection] = None
+        # Задачи планировщика спрашивают одновременно (run_at_start): без
+        # блокировки каждая открыла бы своё соединение, и все, кроме одной,
+        # проиграли бы выборы самому лидеру
+        self._election = asyncio.Lock()
+
+    async def is_leader(self) -> bool:
+        if self.engine.dialect.name != "postgresql":
+            return True
+        async with self._election:
+            return await self._elect()
+
+    async def _elect(self) -> bool:
+        if self._conn is not None:
+            if await self._alive():
+                return True
+            logger.warning("Lost leader lock connection, re-electing")
+            await self._close()
+
+        conn = await self.engine.connect()
+        try:
+            # Сессионная блокировка живёт вне транзакций: без AUTOCOMMIT
+            # соединение держало бы открытую транзакцию (idle in transaction)
+            conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+            acquired = await conn.scalar(
+                text("SELECT pg_try_advisory_lock(:key)"), {"key": self.key}
+            )
+        except Exception:
+            await conn.close()
+            raise
+        if not acquired:
+            await conn.close()
+            return False
+
+        logger.info("Acquired leader lock %d", self.key)
+        self._conn = conn
+        return True
+
+    async def release(self) -> None:
+        async with self._election:
+            if self._conn is None:
+                return
+            try:
+                await self._conn.execute(
+                    text("SELECT pg_advisory_unlock(:key)"), {"key": self.key}
+                )
+            except Exception:
+                logger.warning("Failed to unlock leader lock %d", self.key, exc_info=True)
+            await self._close()
+
+    async def _alive(self) -> bool:
+        assert self._conn is not None
+        try:
+            await self._conn.execute(text("SELECT 1"))
+            return True
+        except Exception:
+            return False
+
+    async def _close(self) -> None:
+        conn, self._conn = self._conn, None
+        if conn is None:
+            return
+        # Соединение могло уже разорваться — тогда пул его просто выбросит
+        with suppress(Exception):
+            await conn.close()
+
+
+@asynccontextmanager
+async def advisory_lock(engine: Optional[AsyncEngine], name: str) -> AsyncIterator[None]:
+    """Держать advisory lock name на время блока, дождавшись его у других реплик
+
+    В отличие от LeaderLock не пропускает работу, а ждёт. Без engine и вне
+    PostgreSQL (одна реплика) ничего не блокирует.
+    """
+    if engine is None or engine.dialect.name != "postgresql":
+        yield
+        return
+
+    key = lock_key(name)
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        await conn.execute(text("SELECT pg_advisory_lock(:key)"), {"key": key})
+        try:
+            yield
+        finally:
+            # Если соединение разорвалось, PostgreSQL уже снял блокировку
+            try:
+                await conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": key})
+            except Exception:
+                logger.warning("Failed to unlock advisory lock %d", key, exc_info=True)
@@ -0,0 +1,190 @@
+import logging
+import re
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+logger = logging.getLogger(__name__)
+
+# Месячные партиции именуются <table>_pYYYYMM; чужие/DEFAULT не трогаем
+_PARTITION_SUFFIX = re.compile(r"_p(\d{4})(\d{2})$")
+
+
+@dataclass(frozen=True, slots=True)
+class MonthPartition:
+    """Партиция за месяц: [start, end) в UTC"""
+
+    table: str
+    start: datetime
+    end: datetime
+
+    @property
+    def name(self) -> str:
+        return f"{self.table}_p{self.start:%Y%m}"
+
+    def create_sql(self) -> str:
+        return (
+            f"CREATE TABLE IF NOT EXISTS {self.name} PARTITION OF {self.table} "
+            f"FOR VALUES FROM ('{self.start.isoformat()}') TO ('{self.end.isoformat()}')"
+        )
+
+
+def month_start(value: datetime) -> datetime:
+    """Начало месяца (UTC); наивное время считается UTC"""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    value = value.astimezone(timezone.utc)
+    return value.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def add_months(value: datetime, months: int) -> datetime:
+    index = value.year * 12 + value.month - 1 + months
+    return value.replace(year=index // 12, month=index % 12 + 1)
+
+
+def month_partition(table: str, value: datetime) -> MonthPartition:
+    start = month_start(value)
+    return MonthPartition(table=table, start=start, end=add_months(start, 1))
+
+
+def partitions_between(table: str, first: datetime, last: datetime) -> List[MonthPartition]:
+    """Месячные партиции, покрывающие [first, last] (оба конца включительно)"""
+    current, end = month_start(first), month_start(last)
+    partitions = []
+    while current <= end:
+        partitions.append(month_partition(table, current))
+        current = add_months(current, 1)
+    return partitions
+
+
+def parse_partition_name(table: str, name: str) -> Optional[MonthPartition]:
+    if not name.startswith(f"{table}_p"):
+        return None
+    match = _PARTITION_SUFFIX.search(name)
+    if match is None or not 1 <= int(match.group(2)) <= 12:
+        return None
+    start = datetime(int(match.group(1)), int(match.group(2)), 1, tzinfo=timezone.utc)
+    partition = MonthPartition(table=table, start=start, end=add_months(start, 1))
+    return partition if partition.name == name else None
+
+
+class PartitionManager:
+    """Месячные RANGE-партиции таблицы по created_at (только PostgreSQL)
+
+    Партиционирование включает миграция; если таблица обычная (SQLite,
+    create_all), все операции — no-op, и удаление идёт через DELETE.
+    """
+
+    def __init__(self, engine: AsyncEngine, table: str = "messages") -> None:
+        self.engine = engine
+        self.table = table
+
+    async def is_partitioned(self) -> bool:
+        if self.engine.dialect.name != "postgresql":
+            return False
+        async with self.engine.connect() as conn:
+            result = await conn.execute(
+                text(
+                    "SELECT relkind = 'p' FROM pg_class "
+                    "WHERE oid = to_regclass(:table)"
+                ),
+                {"table": self.table},
+            )
+            return bool(result.scalar())
+
+    async def list_partitions(self) -> List[MonthPartition]:
+        async with self.engine.connect() as conn:
+            result = await conn.execute(
+                text(
+                    "SELECT c.relname FROM pg_inherits i "
+                    "JOIN pg_class c ON c.oid = i.inhrelid "
+                    "WHERE i.inhparent = to_regclass(:table)"
+                ),
+                {"table": self.table},
+            )
+            names = result.scalars().all()
+
+        partitions = [parse_partition_name(self.table, name) for name in names]
+        return sorted((p for p in partitions if p is not None), key=lambda p: p.start)
+
+    async def ensure_future_partitions(
+        self, months_ahead: int, now: Optional[datetime] = None
+    ) -> List[str]:
+        """Создать партиции с текущего месяца на months_ahead вперёд"""
+        if not await self.is_partitioned():
+            return []
+
+        current = month_start(now or datetime.now(timezone.utc))
+        existing = {p.name for p in await self.list_partitions()}
+        wanted = [
+            month_partition(self.table, add_months(current, offset))
+            for offset in range(months_ahead + 1)
+        ]
+        missing = [p for p in wanted if p.name not in existing]
+
+        async with self.engine.begin() as conn:
+            for partition in missing:
+                await conn.execute(text(partition.create_sql()))
+
+        created = [p.name for p in missing]
+        if created:
+            logger.info("Created partitions: %s", ", ".join(created))
+        return created
+
+    async def ensure_partitions_between(self, first: datetime, last: datetime) -> List[str]:
+        """Создать партиции под строки с created_at в [first, last] (перенос, импорт)"""
+        if not await self.is_partitioned():
+            return []
+
+        existing = {p.name for p in await self.list_partitions()}
+        missing = [
+            p for p in partitions_between(self.table, first, last) if p.name not in existing
+        ]
+        async with self.engine.begin() as conn:
+            for partition in missing:
+                await conn.execute(text(partition.create_sql()))
+
+        created = [p.name for p in missing]
+        if created:
+            logger.info("Created partitions: %s", ", ".join(created))
+        return created
+
+    async def drop_partitions_before(self, cutoff: datetime) -> int:
+        """Отсоединить и удалить партиции, целиком лежащие раньше cutoff
+
+        Возвращает оценку удалённых строк (pg_class.reltuples). Строки из
+        партиции, на которую приходится cutoff, остаются — их дочищает DELETE.
+        """
+        if not await self.is_partitioned():
+            return 0
+
+        expired = [p for p in await self.list_partitions() if p.end <= cutoff]
+        if not expired:
+            return 0
+
+        removed = 0
+        # DETACH ... CONCURRENTLY не работает внутри транзакции
+        async with self.engine.connect() as conn:
+            conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+            for partition in expired:
+                result = await conn.execute(
+                    text(
+                        "SELECT greatest(reltuples, 0)::bigint FROM pg_class "
+                        "WHERE oid = to_regclass(:name)"
+                    ),
+                    {"name": partition.name},
+                )
+                rows = result.scalar() or 0
+                await conn.execute(
+                    text(
+                        f"ALTER TABLE {self.table} "
+                        f"DETACH PARTITION {partition.name} CONCURRENTLY"
+                    )
+                )
+                await conn.execute(text(f"DROP TABLE {partition.name}"))
+                logger.info("Dropped partition %s (~%d rows)", partition.name, rows)
+                removed += rows
+        return removed
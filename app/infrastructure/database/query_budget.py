@@ -0,0 +1,75 @@
+import re
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+_LITERAL_RE = re.compile(r"'(?:[^']|'')*'|\b\d+\b")
+
+
+def normalize_statement(statement: str) -> str:
+    """Схлопнуть литералы и пробелы, чтобы одинаковые запросы совпадали"""
+    return " ".join(_LITERAL_RE.sub("?", statement).split())
+
+
+@dataclass
+class QueryLog:
+    """SQL-запросы, выполненные в рамках одного апдейта (или теста)"""
+
+    statements: List[str] = field(default_factory=list)
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def repeated(self, threshold: int) -> Dict[str, int]:
+        """Запросы, повторившиеся threshold+ раз — типичный признак N+1"""
+        counts = Counter(normalize_statement(s) for s in self.statements)
+        return {stmt: n for stmt, n in counts.items() if n >= threshold}
+
+    def report(self) -> str:
+        lines = [f"{self.count} queries:"]
+        lines.extend(
+            f"  {i}. {normalize_statement(s)}" for i, s in enumerate(self.statements, 1)
+        )
+        return "\n".join(lines)
+
+
+_active_log: ContextVar[Optional[QueryLog]] = ContextVar("query_log", default=None)
+
+
+@contextmanager
+def track_queries() -> Iterator[QueryLog]:
+    """Собирать все запросы текущего контекста (asyncio task) в QueryLog"""
+    log = QueryLog()
+    token = _active_log.set(log)
+    try:
+        yield log
+    finally:
+        _active_log.reset(token)
+
+
+def detach_query_log() -> None:
+    """Не считать запросы текущей задачи в лог апдейта
+
+    Задача из asyncio.create_task наследует контекст, а с ним и лог апдейта;
+    фоновая работа переживает апдейт и не должна попадать в его бюджет.
+    """
+    _active_log.set(None)
+
+
+def _before_cursor_execute(
+    conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, executemany: bool
+) -> None:
+    log = _active_log.get()
+    if log is not None:
+        log.statements.append(statement)
+
+
+def install_query_tracker(engine: Engine) -> None:
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
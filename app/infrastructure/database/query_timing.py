@@ -0,0 +1,44 @@
+import time
+from typing import Any, Callable, List
+from weakref import WeakKeyDictionary
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# (statement, parameters, seconds) — вызывается после успешного выполнения
+QueryObserver = Callable[[str, Any, float], None]
+
+_observers: "WeakKeyDictionary[Engine, List[QueryObserver]]" = WeakKeyDictionary()
+
+_START_ATTR = "_textflow_query_started"
+
+
+def _before_cursor_execute(
+    conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, executemany: bool
+) -> None:
+    # Время старта живёт на контексте выполнения, а не в стеке conn.info:
+    # при ошибке after_cursor_execute не вызывается, и стек разъезжался бы
+    if context is not None:
+        setattr(context, _START_ATTR, time.perf_counter())
+
+
+def _after_cursor_execute(
+    conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, executemany: bool
+) -> None:
+    started = getattr(context, _START_ATTR, None)
+    if started is None:
+        return
+    elapsed = time.perf_counter() - started
+    for observer in _observers.get(conn.engine, ()):
+        observer(statement, parameters, elapsed)
+
+
+def observe_query_time(engine: Engine, observer: QueryObserver) -> None:
+    """Передавать observer время каждого запроса engine (один общий хук на движок)"""
+    observers = _observers.get(engine)
+    if observers is None:
+        observers = _observers[engine] = []
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    if observer not in observers:
+        observers.append(observer)
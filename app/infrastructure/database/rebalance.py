@@ -0,0 +1,164 @@
+"""Офлайн-перенос бакетов пользователей между шардами.
+
+    python -m app.infrastructure.database.rebalance --buckets 0-63 --to eu2
+
+Бот должен быть остановлен. Пользователи из указанных бакетов копируются
+в целевой шард вместе с сообщениями и дневными роллапами (одна транзакция
+на пользователя), затем удаляются из исходного. Повторный запуск после
+сбоя безопасен: уже скопированный пользователь только удаляется из
+источника. В конце печатается новая SHARD_MAP для настроек.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+from dataclasses import dataclass
+from typing import List, Set
+
+from sqlalchemy import Table, delete, func, insert, select
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+from app.core.models.message import Message
+from app.core.models.message_daily_stats import MessageDailyStats
+from app.core.models.purge_job import PurgeJob
+from app.core.models.user import User
+from app.infrastructure.database.partitions import PartitionManager
+from app.infrastructure.database.sharding import ShardRegistry, bucket_of, parse_bucket_range
+
+logger = logging.getLogger(__name__)
+
+USER_SCAN_BATCH = 500
+
+# Таблицы, строки которых принадлежат пользователю (user_id) и переезжают с ним
+_USER_TABLES: List[Table] = [Message.__table__, MessageDailyStats.__table__]  # type: ignore[list-item]
+
+
+@dataclass
+class RebalanceResult:
+    users: int = 0
+    messages: int = 0
+
+
+async def _copy_user_rows(
+    source: AsyncConnection,
+    target: AsyncConnection,
+    table: Table,
+    source_user_id: int,
+    target_user_id: int,
+    batch_size: int,
+) -> int:
+    columns = [c for c in table.columns if c.name != "id"]
+    result = await source.stream(
+        select(*columns).where(table.c.user_id == source_user_id).order_by(table.c.id)
+    )
+    copied = 0
+    async for rows in result.partitions(batch_size):
+        await target.execute(
+            insert(table),
+            [{**row._asdict(), "user_id": target_user_id} for row in rows],
+        )
+        copied += len(rows)
+    return copied
+
+
+async def move_user(
+    source: AsyncEngine, target: AsyncEngine, user_id: int, batch_size: int = 5000
+) -> int:
+    """Перенести пользователя; вернуть число перенесённых сообщений"""
+    users = User.__table__
+    moved = 0
+
+    async with source.connect() as src:
+        user = (await src.execute(select(users).where(users.c.id == user_id))).one()
+
+        # В новом шарде партиции есть только с текущего месяца, а DEFAULT-партиции
+        # нет: под старую историю их нужно создать до копирования
+        messages = Message.__table__
+        first, last = (
+            await src.execute(
+                select(func.min(messages.c.created_at), func.max(messages.c.created_at))
+                .where(messages.c.user_id == user_id)
+            )
+        ).one()
+        if first is not None:
+            await PartitionManager(target).ensure_partitions_between(first, last)
+
+        async with target.begin() as dst:
+            exists = await dst.scalar(
+                select(users.c.id).where(users.c.telegram_id == user.telegram_id)
+            )
+            if exists is None:
+                values = {k: v for k, v in user._asdict().items() if k != "id"}
+                new_id = await dst.scalar(insert(users).values(**values).returning(users.c.id))
+                for table in _USER_TABLES:
+                    copied = await _copy_user_rows(src, dst, table, user_id, new_id, batch_size)
+                    if table is Message.__table__:
+                        moved = copied
+
+    async with source.begin() as src:
+        for table in [*_USER_TABLES, PurgeJob.__table__]:
+            await src.execute(delete(table).where(table.c.user_id == user_id))
+        await src.execute(delete(users).where(users.c.id == user_id))
+
+    return moved
+
+
+async def move_buckets(
+    registry: ShardRegistry, buckets: List[int], target: str, batch_size: int = 5000
+) -> RebalanceResult:
+    """Перенести всех пользователей buckets в шард target"""
+    shard_map = registry.shard_map
+    moving: Set[int] = set(buckets)
+    sources = {shard_map.assignment[b] for b in moving} - {target}
+    target_engine = registry.shards[target].engine
+    result = RebalanceResult()
+
+    for name in sorted(sources):
+        source = registry.shards[name].engine
+        last_id = 0
+        while True:
+            async with source.connect() as conn:
+                rows = (
+                    await conn.execute(
+                        select(User.id, User.telegram_id)
+                        .where(User.id > last_id)
+                        .order_by(User.id)
+                        .limit(USER_SCAN_BATCH)
+                    )
+                ).all()
+            if not rows:
+                break
+            last_id = rows[-1].id
+
+            for row in rows:
+                if bucket_of(row.telegram_id, shard_map.buckets) not in moving:
+                    continue
+                result.messages += await move_user(source, target_engine, row.id, batch_size)
+                result.users += 1
+            logger.info("%s -> %s: %d users moved so far", name, target, result.users)
+
+    return result
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--buckets", required=True, help="Bucket ranges, e.g. 0-63,100")
+    parser.add_argument("--to", required=True, dest="target", help="Target shard name")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    from app.infrastructure.database.connection import shards
+
+    buckets = parse_bucket_range(args.buckets)
+    new_map = shards.shard_map.moved(buckets, args.target)
+    result = await move_buckets(shards, buckets, args.target, args.batch_size)
+    await shards.dispose()
+
+    print(f"Moved {result.users} users, {result.messages} messages to {args.target}")
+    print(f"SHARD_MAP={json.dumps(new_map.to_ranges())}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,24 @@
+from typing import Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.models.archive_volume import ArchiveVolume
+from .base import BaseRepository
+
+# Том архива один на всю установку: строка с фиксированным id
+VOLUME_ROW_ID = 1
+
+
+class ArchiveVolumeRepository(BaseRepository[ArchiveVolume]):
+
+    def __init__(self, session: AsyncSession) -> None:
+        super().__init__(session, ArchiveVolume)
+
+    async def get_volume_id(self) -> Optional[str]:
+        stmt = select(ArchiveVolume.volume_id).where(ArchiveVolume.id == VOLUME_ROW_ID)
+        return await self.session.scalar(stmt)
+
+    async def register(self, volume_id: str) -> ArchiveVolume:
+        """Записать том архива; при гонке реплик второй INSERT упадёт по PK"""
+        return await self.create(id=VOLUME_ROW_ID, volume_id=volume_id)
@@ -1,13 +1,25 @@
 from typing import Any, TypeVar, Generic, Type, Optional
 
-from sqlalchemy import select
+from sqlalchemy import delete, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.models.base import Base
+from app.infrastructure.monitoring.metrics import instrument_repository
 
 ModelType = TypeVar("ModelType", bound=Base)
 
 
 class BaseRepository(Generic[ModelType]):
+    """Доступ к данным одной модели
+
+    Репозитории не коммитят: изменения отправляются flush'ем в открытую
+    транзакцию сессии, а фиксирует их сервис, владеющий единицей работы
+    (commit/rollback ниже). Серверные значения (id, created_at) приходят
+    через RETURNING того же INSERT/UPDATE, без отдельного refresh.
+    """
+
+    def __init_subclass__(cls, **kwargs: Any) -> None:
+        super().__init_subclass__(**kwargs)
+        instrument_repository(cls)
 
     def __init__(self, session: AsyncSession, model_class: Type[ModelType]):
         self.session = session
@@ -25,34 +37,38 @@ class BaseRepository(Generic[ModelType]):
         model = self.model(**kwargs)
         self.session.add(model)
 
-        await self.session.commit()
-        await self.session.refresh(model)
+        # INSERT ... RETURNING id и серверных default'ов (eager_defaults у Base)
+        await self.session.flush([model])
 
         return model
 
     async def update(self, id: int, **kwargs: Any) -> Optional[ModelType]:
 
-        instance: Optional[ModelType] = await self.get_by_id(id)
-
-        if instance is None:
-            return None
-
-        for key, value in kwargs.items():
-            setattr(instance, key, value)
-
-        await self.session.commit()
-        await self.session.refresh(instance)
+        # Один UPDATE ... RETURNING вместо SELECT + UPDATE + refresh
+        stmt = (
+            update(self.model)
+            .where(self.model.id == id)
+            .values(**kwargs)
+            .returning(self.model)
+            .execution_options(populate_existing=True)
+        )
+        result = await self.session.execute(stmt)
 
-        return instance
+        return result.scalar_one_or_none()
 
     async def delete(self, id: int) -> bool:
 
-        instance: Optional[ModelType] = await self.get_by_id(id)
+        stmt = delete(self.model).where(self.model.id == id)
+        result = await self.session.execute(stmt)
 
-        if instance is None:
-            return False
+        return result.rowcount > 0
 
-        await self.session.delete(instance)
+    async def commit(self) -> None:
+        """Зафиксировать единицу работы (вызывает сервис, не репозиторий)"""
         await self.session.commit()
 
-        return True
+    async def rollback(self) -> None:
+        await self.session.rollback()
+
+
+instrument_repository(BaseRepository)
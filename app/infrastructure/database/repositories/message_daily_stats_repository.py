@@ -0,0 +1,114 @@
+from datetime import date
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.models.message import MessageRole
+from app.core.models.message_daily_stats import MessageDailyStats
+from app.core.schemas.message import DailyTotals
+from .base import BaseRepository
+
+_UPSERT_INSERTS = {
+    "postgresql": postgresql.insert,
+    "sqlite": sqlite.insert,
+}
+
+
+class MessageDailyStatsRepository(BaseRepository[MessageDailyStats]):
+
+    def __init__(self, session: AsyncSession) -> None:
+        super().__init__(session, MessageDailyStats)
+
+    async def increment(
+        self,
+        user_id: int,
+        day: date,
+        role: MessageRole,
+        tokens_in: int = 0,
+        tokens_out: int = 0,
+    ) -> None:
+        """Атомарно увеличить счётчики дня (INSERT ... ON CONFLICT DO UPDATE).
+
+        Не коммитит — выполняется в транзакции вызывающего кода.
+        """
+        user_msgs = 1 if role == MessageRole.USER else 0
+        await self.add_counts(
+            [
+                {
+                    "user_id": user_id,
+                    "day": day,
+                    "user_msgs": user_msgs,
+                    "assistant_msgs": 1 - user_msgs,
+                    "tokens_in": tokens_in,
+                    "tokens_out": tokens_out,
+                }
+            ]
+        )
+
+    async def add_counts(self, rows: List[Dict[str, Any]]) -> None:
+        """Прибавить счётчики к дням одним executemany (не коммитит)
+
+        Каждая строка: user_id, day, user_msgs, assistant_msgs, tokens_in, tokens_out.
+        """
+        if not rows:
+            return
+
+        insert = _UPSERT_INSERTS[self.session.get_bind().dialect.name]
+        stmt = insert(MessageDailyStats)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[MessageDailyStats.user_id, MessageDailyStats.day],
+            set_={
+                "user_msgs": MessageDailyStats.user_msgs + stmt.excluded.user_msgs,
+                "assistant_msgs": MessageDailyStats.assistant_msgs
+                + stmt.excluded.assistant_msgs,
+                "tokens_in": MessageDailyStats.tokens_in + stmt.excluded.tokens_in,
+                "tokens_out": MessageDailyStats.tokens_out + stmt.excluded.tokens_out,
+            },
+        )
+
+        await self.session.execute(stmt, rows)
+
+    async def get_totals(
+        self, user_id: int, since: Optional[date] = None
+    ) -> DailyTotals:
+        """Суммы по роллапам пользователя (за период с since включительно или всего)"""
+        conditions = [MessageDailyStats.user_id == user_id]
+        if since is not None:
+            conditions.append(MessageDailyStats.day >= since)
+
+        stmt = select(
+            func.coalesce(func.sum(MessageDailyStats.user_msgs), 0),
+            func.coalesce(func.sum(MessageDailyStats.assistant_msgs), 0),
+            func.coalesce(func.sum(MessageDailyStats.tokens_in), 0),
+            func.coalesce(func.sum(MessageDailyStats.tokens_out), 0),
+            func.count(),
+        ).where(*conditions)
+
+        row = (await self.session.execute(stmt)).one()
+
+        return DailyTotals(
+            user_messages=row[0],
+            assistant_messages=row[1],
+            tokens_in=row[2],
+            tokens_out=row[3],
+            active_days=row[4],
+        )
+
+    async def get_days(self, user_id: int, since: date) -> List[MessageDailyStats]:
+        """Роллапы пользователя начиная с since (по возрастанию дня)"""
+        stmt = (
+            select(MessageDailyStats)
+            .where(MessageDailyStats.user_id == user_id, MessageDailyStats.day >= since)
+            .order_by(MessageDailyStats.day)
+        )
+
+        result = await self.session.execute(stmt)
+        return list(result.scalars().all())
+
+    async def delete_for_user(self, user_id: int) -> int:
+        """Удалить роллапы пользователя (не коммитит)"""
+        stmt = delete(MessageDailyStats).where(MessageDailyStats.user_id == user_id)
+        result = await self.session.execute(stmt)
+        return result.rowcount
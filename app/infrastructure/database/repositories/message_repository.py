@@ -1,16 +1,38 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, desc, delete, func
-from typing import Optional, List
+import re
+from sqlalchemy import Float, Integer, Row, Select, select, desc, delete, func, case, extract, literal_column, or_, text, tuple_
+from sqlalchemy.sql.elements import ColumnElement
+from typing import TYPE_CHECKING, Any, AsyncIterator, Literal, Optional, List, Sequence, Tuple
 from datetime import datetime, timedelta, timezone
 
-from app.core.models.message import Message, MessageRole
+from app.core.models.message import SEARCH_TEXT_CONFIG, Message, MessageRole
+from app.core.schemas.message import ActivitySummary, MessageRow
+from app.infrastructure.cache.ttl_cache import message_count_cache
+from app.utils.cursor import MessageCursor, SearchCursor
 from .base import BaseRepository
+from .message_daily_stats_repository import MessageDailyStatsRepository
+
+if TYPE_CHECKING:
+    from app.infrastructure.database.write_buffer import MessageWriteBuffer
+
+# Диалекты с поддержкой агрегатного FILTER (WHERE ...)
+_FILTER_DIALECTS = {"postgresql", "sqlite"}
+
+# Сколько самых новых совпадений ранжируется при поиске в PostgreSQL
+_SEARCH_MAX_CANDIDATES = 5000
+
+# Колонки MessageRow для путей чтения (без ai_metadata и user_id)
+_ROW_COLUMNS = (Message.id, Message.role, Message.content, Message.created_at)
 
 
 class MessageRepository(BaseRepository[Message]):
 
-    def __init__(self, session: AsyncSession) -> None:
+    def __init__(
+        self, session: AsyncSession, write_buffer: Optional["MessageWriteBuffer"] = None
+    ) -> None:
         super().__init__(session, Message)
+        self.daily_stats = MessageDailyStatsRepository(session)
+        self.write_buffer = write_buffer
 
     async def create_message(
         self,
@@ -19,7 +41,25 @@ class MessageRepository(BaseRepository[Message]):
         content: str,
         ai_metadata: Optional[dict] = None,
     ) -> Message:
-        """Создать новое сообщение"""
+        """Создать новое сообщение (роллап дня обновляется в той же транзакции)
+
+        С write-behind буфером сообщение только ставится в очередь: запись и
+        роллап выполнит пакетный сброс, id появится после него.
+        """
+        if self.write_buffer is not None:
+            return await self.write_buffer.add(user_id, role, content, ai_metadata)
+
+        tokens_in, tokens_out = self._token_usage(ai_metadata)
+        await self.daily_stats.increment(
+            user_id=user_id,
+            day=datetime.now(timezone.utc).date(),
+            role=role,
+            tokens_in=tokens_in,
+            tokens_out=tokens_out,
+        )
+
+        message_count_cache.invalidate_on_commit(self.session, user_id)
+
         return await self.create(
             user_id=user_id,
             role=role,
@@ -29,56 +69,136 @@ class MessageRepository(BaseRepository[Message]):
 
     async def get_user_messages(
         self, user_id: int, limit: int = 50, offset: int = 0
-    ) -> List[Message]:
+    ) -> List[MessageRow]:
         """Получить сообщения пользователя с пагинацией"""
         stmt = (
-            select(Message)
+            select(*_ROW_COLUMNS)
             .where(Message.user_id == user_id)
-            .order_by(desc(Message.created_at))
+            .order_by(desc(Message.created_at), desc(Message.id))
             .limit(limit)
             .offset(offset)
         )
 
-        result = await self.session.execute(stmt)
-        return list(result.scalars().all())
+        return await self._fetch_rows(stmt)
+
+    async def get_user_messages_after(
+        self, user_id: int, cursor: Optional[MessageCursor] = None, limit: int = 50
+    ) -> List[MessageRow]:
+        """Keyset-пагинация: сообщения старше курсора (новые -> старые)
+
+        В отличие от OFFSET стоимость не растёт с номером страницы: индекс
+        (user_id, created_at DESC, id DESC) сразу позиционируется на курсор.
+        """
+        conditions = [Message.user_id == user_id]
+        if cursor is not None:
+            conditions.append(
+                tuple_(Message.created_at, Message.id)
+                < tuple_(cursor.created_at, cursor.id)
+            )
+
+        stmt = (
+            select(*_ROW_COLUMNS)
+            .where(*conditions)
+            .order_by(desc(Message.created_at), desc(Message.id))
+            .limit(limit)
+        )
+
+        return await self._fetch_rows(stmt)
+
+    async def get_user_messages_before(
+        self, user_id: int, cursor: MessageCursor, limit: int = 50
+    ) -> List[MessageRow]:
+        """Keyset-пагинация назад: сообщения новее курсора (новые -> старые)"""
+        stmt = (
+            select(*_ROW_COLUMNS)
+            .where(
+                Message.user_id == user_id,
+                tuple_(Message.created_at, Message.id)
+                > tuple_(cursor.created_at, cursor.id),
+            )
+            .order_by(Message.created_at, Message.id)
+            .limit(limit)
+        )
+
+        # Ближайшие к курсору выбираются по возрастанию, отдаём в порядке страницы
+        return list(reversed(await self._fetch_rows(stmt)))
+
+    async def stream_user_messages(
+        self, user_id: int, batch_size: int = 1000, after: Optional[datetime] = None
+    ) -> AsyncIterator[MessageRow]:
+        """Все сообщения пользователя (новее after) в хронологическом порядке, потоково
+
+        Серверный курсор (yield_per) отдаёт строки пачками по batch_size, а
+        выбираются только нужные колонки — ORM-объекты не создаются, и память
+        не зависит от размера истории.
+        """
+        conditions = [Message.user_id == user_id]
+        if after is not None:
+            conditions.append(Message.created_at > after)
+
+        stmt = (
+            select(*_ROW_COLUMNS)
+            .where(*conditions)
+            .order_by(Message.created_at, Message.id)
+            .execution_options(yield_per=batch_size)
+        )
+
+        result = await self.session.stream(stmt)
+        try:
+            async for row in result:
+                yield self._to_row(row)
+        finally:
+            await result.close()
+
+    async def get_oldest_before(
+        self, user_id: int, before: datetime, limit: int = 1000
+    ) -> List[MessageRow]:
+        """Самые старые сообщения пользователя до before (по created_at, id)"""
+        stmt = (
+            select(*_ROW_COLUMNS)
+            .where(Message.user_id == user_id, Message.created_at < before)
+            .order_by(Message.created_at, Message.id)
+            .limit(limit)
+        )
+
+        return await self._fetch_rows(stmt)
 
-    async def get_recent_context(self, user_id: int, limit: int = 10) -> List[Message]:
+    async def get_recent_context(self, user_id: int, limit: int = 10) -> List[MessageRow]:
         """Получить последние N сообщений для контекста AI (в правильном порядке)"""
         stmt = (
-            select(Message)
+            select(*_ROW_COLUMNS)
             .where(Message.user_id == user_id)
-            .order_by(desc(Message.created_at))
+            .order_by(desc(Message.created_at), desc(Message.id))
             .limit(limit)
         )
 
-        result = await self.session.execute(stmt)
-        messages = list(result.scalars().all())
+        messages = list(reversed(await self._fetch_rows(stmt)))
 
         # Возвращаем в хронологическом порядке (старые -> новые)
-        return list(reversed(messages))
+        return self._with_pending(user_id, messages)[-limit:]
 
     async def get_conversation_context(
         self, user_id: int, hours_back: int = 24, max_messages: int = 20
-    ) -> List[Message]:
+    ) -> List[MessageRow]:
         """Получить контекст диалога за последние N часов"""
         time_threshold = datetime.now(timezone.utc) - timedelta(hours=hours_back)
 
         stmt = (
-            select(Message)
+            select(*_ROW_COLUMNS)
             .where(Message.user_id == user_id, Message.created_at >= time_threshold)
-            .order_by(Message.created_at)  # В хронологическом порядке
+            .order_by(Message.created_at, Message.id)  # В хронологическом порядке
             .limit(max_messages)
         )
 
-        result = await self.session.execute(stmt)
-        return list(result.scalars().all())
+        messages = self._with_pending(user_id, await self._fetch_rows(stmt))
+        return messages[:max_messages]
 
     async def get_pending_messages(self, user_id: int) -> List[Message]:
         """Получить сообщения в статусе PENDING для конкретного пользователя"""
         stmt = (
             select(Message)
             .where(Message.user_id == user_id)
-            .order_by(Message.created_at)
+            .order_by(Message.created_at, Message.id)
         )
 
         result = await self.session.execute(stmt)
@@ -97,7 +217,11 @@ class MessageRepository(BaseRepository[Message]):
         if user_id is not None:
             conditions.append(Message.user_id == user_id)
 
-        stmt = select(Message).where(*conditions).order_by(desc(Message.created_at))
+        stmt = (
+            select(Message)
+            .where(*conditions)
+            .order_by(desc(Message.created_at), desc(Message.id))
+        )
 
         result = await self.session.execute(stmt)
         return list(result.scalars().all())
@@ -105,7 +229,11 @@ class MessageRepository(BaseRepository[Message]):
     async def delete_old_messages(
         self, days_old: int = 30, user_id: Optional[int] = None
     ) -> int:
-        """Удалить старые сообщения (для очистки БД)"""
+        """Удалить старые сообщения (для очистки БД). Не коммитит.
+
+        Целые месячные партиции снимает сервис до вызова (PartitionManager);
+        DELETE дочищает остальное.
+        """
         time_threshold = datetime.now(timezone.utc) - timedelta(days=days_old)
 
         conditions = [Message.created_at < time_threshold]
@@ -115,7 +243,7 @@ class MessageRepository(BaseRepository[Message]):
         stmt = delete(Message).where(*conditions)
 
         result = await self.session.execute(stmt)
-        await self.session.commit()
+        message_count_cache.invalidate_on_commit(self.session, user_id)
 
         return result.rowcount
 
@@ -129,11 +257,11 @@ class MessageRepository(BaseRepository[Message]):
             time_threshold = datetime.now(timezone.utc) - timedelta(hours=hours_back)
             conditions.append(Message.created_at >= time_threshold)
 
-        stmt = select(Message).where(*conditions)
+        # COUNT(*) считается на стороне БД — строки не гидрируются в ORM-объекты
+        stmt = select(func.count()).select_from(Message).where(*conditions)
         result = await self.session.execute(stmt)
-        messages = result.scalars().all()
 
-        return len(list(messages))
+        return result.scalar_one()
 
     async def get_messages_by_role(
         self, user_id: int, role: MessageRole, limit: int = 50
@@ -142,7 +270,7 @@ class MessageRepository(BaseRepository[Message]):
         stmt = (
             select(Message)
             .where(Message.user_id == user_id, Message.role == role)
-            .order_by(desc(Message.created_at))
+            .order_by(desc(Message.created_at), desc(Message.id))
             .limit(limit)
         )
 
@@ -159,7 +287,7 @@ class MessageRepository(BaseRepository[Message]):
             time_threshold = datetime.now(timezone.utc) - timedelta(hours=hours_back)
             conditions.append(Message.created_at >= time_threshold)
         
-        stmt = select(func.count(Message.id)).where(*conditions)
+        stmt = select(func.count()).select_from(Message).where(*conditions)
         result = await self.session.execute(stmt)
         return result.scalar() or 0
 
@@ -179,7 +307,7 @@ class MessageRepository(BaseRepository[Message]):
                 Message.created_at >= start_date,
                 Message.created_at <= end_date
             )
-            .order_by(desc(Message.created_at))
+            .order_by(desc(Message.created_at), desc(Message.id))
             .limit(limit)
             .offset(offset)
         )
@@ -191,7 +319,7 @@ class MessageRepository(BaseRepository[Message]):
         self, user_id: int, start_date: datetime, end_date: datetime
     ) -> int:
         """Get count of messages within specific date range"""
-        stmt = select(func.count(Message.id)).where(
+        stmt = select(func.count()).select_from(Message).where(
             Message.user_id == user_id,
             Message.created_at >= start_date,
             Message.created_at <= end_date
@@ -200,9 +328,240 @@ class MessageRepository(BaseRepository[Message]):
         result = await self.session.execute(stmt)
         return result.scalar() or 0
 
+    async def delete_messages_batch(
+        self, user_id: int, before: Optional[datetime] = None, limit: int = 1000
+    ) -> int:
+        """Удалить до limit самых старых сообщений пользователя (старше before).
+
+        Не коммитит — короткие транзакции по батчу ведёт вызывающий код.
+        """
+        conditions = [Message.user_id == user_id]
+        if before is not None:
+            conditions.append(Message.created_at < before)
+
+        # Пара (id, created_at) — первичный ключ партиционированной таблицы
+        batch = (
+            select(Message.id, Message.created_at)
+            .where(*conditions)
+            .order_by(Message.created_at, Message.id)
+            .limit(limit)
+        )
+        stmt = (
+            delete(Message)
+            .where(tuple_(Message.id, Message.created_at).in_(batch))
+            .execution_options(synchronize_session=False)
+        )
+
+        result = await self.session.execute(stmt)
+        return result.rowcount
+
+    async def delete_messages_by_keys(
+        self, user_id: int, keys: Sequence[Tuple[int, datetime]]
+    ) -> int:
+        """Удалить сообщения пользователя по парам (id, created_at). Не коммитит.
+
+        id уникален сам по себе; диапазон created_at нужен, чтобы PostgreSQL
+        отсёк лишние партиции.
+        """
+        if not keys:
+            return 0
+        created = [created_at for _, created_at in keys]
+        stmt = (
+            delete(Message)
+            .where(
+                Message.user_id == user_id,
+                Message.id.in_([message_id for message_id, _ in keys]),
+                Message.created_at.between(min(created), max(created)),
+            )
+            .execution_options(synchronize_session=False)
+        )
+
+        result = await self.session.execute(stmt)
+        return result.rowcount
+
     async def delete_all_user_messages(self, user_id: int) -> int:
-        """Delete all messages for a specific user"""
+        """Delete all messages for a specific user (with their daily rollups)"""
         stmt = delete(Message).where(Message.user_id == user_id)
         result = await self.session.execute(stmt)
-        await self.session.commit()
+        await self.daily_stats.delete_for_user(user_id)
+        message_count_cache.invalidate_on_commit(self.session, user_id)
         return result.rowcount
+
+    async def get_activity_summary(
+        self, user_id: int, since: Optional[datetime] = None
+    ) -> ActivitySummary:
+        """Вся статистика для экрана кабинета одним запросом.
+
+        GROUP BY по часу суток даёт гистограмму активности, а отфильтрованный
+        COUNT по роли суммируется по группам в Python.
+        """
+        is_user = Message.role == MessageRole.USER
+        created_at: Any = Message.created_at
+        if self.session.get_bind().dialect.name == "postgresql":
+            # EXTRACT из timestamptz берёт час в TimeZone сессии; гистограмма в UTC
+            created_at = func.timezone("UTC", Message.created_at)
+        hour = extract("hour", created_at).label("hour")
+
+        conditions = [Message.user_id == user_id]
+        if since is not None:
+            conditions.append(Message.created_at >= since)
+
+        stmt = (
+            select(
+                hour,
+                func.count().label("total"),
+                self._count_if(is_user).label("user_messages"),
+            )
+            .where(*conditions)
+            .group_by(hour)
+        )
+
+        result = await self.session.execute(stmt)
+
+        summary = ActivitySummary()
+        for row in result:
+            summary.total += row.total
+            summary.user_messages += row.user_messages
+            if row.hour is not None:
+                summary.hourly_user[int(row.hour)] = row.user_messages
+
+        summary.assistant_messages = summary.total - summary.user_messages
+        return summary
+
+    async def search_messages(
+        self,
+        user_id: int,
+        query: str,
+        cursor: Optional[SearchCursor] = None,
+        limit: int = 20,
+        direction: Literal["older", "newer"] = "older",
+    ) -> List[Tuple[MessageRow, float]]:
+        """Поиск по истории пользователя: (сообщение, ранг), лучшие первыми
+
+        Совпадения по словам ранжируются, совпадения только по подстроке
+        получают ранг 0. Пагинация keyset по (rank, id): "older" — следующая
+        страница после курсора, "newer" — предыдущая до него.
+        """
+        if self.session.get_bind().dialect.name == "postgresql":
+            stmt, rank = self._postgresql_search(user_id, query)
+        else:
+            stmt, rank = self._sqlite_search(user_id, query)
+
+        key = tuple_(rank, Message.id)
+        if direction == "newer":
+            if cursor is not None:
+                stmt = stmt.where(key > tuple_(cursor.rank, cursor.id))
+            stmt = stmt.order_by(rank, Message.id)
+        else:
+            if cursor is not None:
+                stmt = stmt.where(key < tuple_(cursor.rank, cursor.id))
+            stmt = stmt.order_by(rank.desc(), desc(Message.id))
+
+        result = await self.session.execute(stmt.limit(limit))
+        rows = [(self._to_row(row), float(row.rank)) for row in result]
+        return list(reversed(rows)) if direction == "newer" else rows
+
+    @staticmethod
+    def _postgresql_search(user_id: int, query: str) -> Tuple[Select, ColumnElement[float]]:
+        """tsvector + GIN для слов, pg_trgm для подстрок (BitmapOr двух индексов)
+
+        Ранжируются только _SEARCH_MAX_CANDIDATES самых новых совпадений:
+        ts_rank_cd считается построчно, и для частых слов в истории из сотен
+        тысяч сообщений именно он, а не поиск по индексу, съедает время.
+        """
+        config = literal_column(f"'{SEARCH_TEXT_CONFIG}'::regconfig")
+        tsquery = func.websearch_to_tsquery(config, query)
+        content_tsv = literal_column("messages.content_tsv")
+
+        candidates = (
+            select(Message.id)
+            .where(
+                Message.user_id == user_id,
+                or_(
+                    content_tsv.op("@@")(tsquery),
+                    Message.content.icontains(query, autoescape=True),
+                ),
+            )
+            .order_by(desc(Message.id))
+            .limit(_SEARCH_MAX_CANDIDATES)
+            .subquery("candidates")
+        )
+        rank = func.ts_rank_cd(content_tsv, tsquery, type_=Float)
+
+        stmt = select(*_ROW_COLUMNS, rank.label("rank")).join(
+            candidates, candidates.c.id == Message.id
+        )
+        return stmt, rank
+
+    @staticmethod
+    def _sqlite_search(user_id: int, query: str) -> Tuple[Select, ColumnElement[float]]:
+        """Локальный fallback: FTS5 (bm25) по словам и LIKE для подстрок"""
+        substring = Message.content.icontains(query, autoescape=True)
+        # Каждое слово — префиксный терм в кавычках: спецсинтаксис FTS5 не пробрасывается
+        terms = [word.replace('"', '""') for word in re.findall(r"\w+", query)]
+        if not terms:
+            rank = literal_column("0.0", type_=Float)
+            stmt = select(*_ROW_COLUMNS, rank.label("rank")).where(
+                Message.user_id == user_id, substring
+            )
+            return stmt, rank
+
+        fts = (
+            text(
+                "SELECT rowid AS rowid, -bm25(messages_fts) AS score "
+                "FROM messages_fts WHERE messages_fts MATCH :match"
+            )
+            .bindparams(match=" ".join(f'"{term}"*' for term in terms))
+            .columns(rowid=Integer, score=Float)
+            .subquery("fts")
+        )
+        rank = func.coalesce(fts.c.score, 0.0, type_=Float)
+
+        stmt = (
+            select(*_ROW_COLUMNS, rank.label("rank"))
+            .outerjoin(fts, fts.c.rowid == Message.id)
+            .where(Message.user_id == user_id, or_(fts.c.rowid.is_not(None), substring))
+        )
+        return stmt, rank
+
+    async def _fetch_rows(self, stmt: Select) -> List[MessageRow]:
+        result = await self.session.execute(stmt)
+        return [self._to_row(row) for row in result]
+
+    @staticmethod
+    def _to_row(row: Row) -> MessageRow:
+        return MessageRow(row.id, row.role, row.content, row.created_at)
+
+    def _with_pending(self, user_id: int, messages: List[MessageRow]) -> List[MessageRow]:
+        """Добавить к прочитанным (по возрастанию) ещё не записанные из буфера"""
+        if self.write_buffer is None:
+            return messages
+        pending = self.write_buffer.pending_for(user_id)
+        if not pending:
+            return messages
+
+        # Сообщение, записанное во время чтения, есть и в БД, и в буфере
+        stored = {message.id for message in messages}
+        merged = messages + [
+            MessageRow(m.id, m.role, m.content, m.created_at)
+            for m in pending
+            if m.id is None or m.id not in stored
+        ]
+        return sorted(merged, key=lambda m: self._utc(m.created_at))
+
+    @staticmethod
+    def _utc(value: datetime) -> datetime:
+        """SQLite отдаёт наивное время; считаем его UTC"""
+        return value if value.tzinfo is not None else value.replace(tzinfo=timezone.utc)
+
+    @staticmethod
+    def _token_usage(ai_metadata: Optional[dict]) -> tuple[int, int]:
+        """Токены запроса/ответа из метаданных провайдера (0, если их нет)"""
+        usage = (ai_metadata or {}).get("token_usage") or {}
+        return int(usage.get("input_tokens", 0)), int(usage.get("output_tokens", 0))
+
+    def _count_if(self, condition: ColumnElement[bool]) -> ColumnElement[Any]:
+        """count(*) FILTER (WHERE ...) либо переносимый SUM(CASE ...)"""
+        if self.session.get_bind().dialect.name in _FILTER_DIALECTS:
+            return func.count().filter(condition)
+        return func.coalesce(func.sum(case((condition, 1), else_=0)), 0)
@@ -0,0 +1,40 @@
+from typing import List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.models.purge_job import PurgeJob, PurgeStatus
+from .base import BaseRepository
+
+_UNFINISHED = (PurgeStatus.PENDING, PurgeStatus.RUNNING)
+
+
+class PurgeJobRepository(BaseRepository[PurgeJob]):
+
+    def __init__(self, session: AsyncSession) -> None:
+        super().__init__(session, PurgeJob)
+
+    async def get_unfinished(self) -> List[PurgeJob]:
+        """Очистки, прерванные остановкой бота или ещё не начатые"""
+        stmt = (
+            select(PurgeJob)
+            .where(PurgeJob.status.in_(_UNFINISHED))
+            .order_by(PurgeJob.id)
+        )
+        result = await self.session.execute(stmt)
+        return list(result.scalars().all())
+
+    async def get_unfinished_for_user(self, user_id: int) -> Optional[PurgeJob]:
+        """Незавершённая полная очистка истории пользователя"""
+        stmt = (
+            select(PurgeJob)
+            .where(
+                PurgeJob.user_id == user_id,
+                PurgeJob.before.is_(None),
+                PurgeJob.status.in_(_UNFINISHED),
+            )
+            .order_by(PurgeJob.id)
+            .limit(1)
+        )
+        result = await self.session.execute(stmt)
+        return result.scalar_one_or_none()
@@ -1,8 +1,8 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.models.user import User
 from .base import BaseRepository
-from typing import Optional, Sequence
-from sqlalchemy import select, update
+from typing import List, Optional, Tuple
+from sqlalchemy import Row, func, select, update
 
 
 class UserRepository(BaseRepository[User]):
@@ -50,16 +50,37 @@ class UserRepository(BaseRepository[User]):
         )
 
         await self.session.execute(stmt)
-        await self.session.commit()
 
         return True
 
     async def reset_daily_limits(self) -> int:
-        stmt = select(User).where(User.requests_today > 0)
+        # Один UPDATE вместо SELECT + UPDATE/COMMIT на каждого пользователя
+        stmt = (
+            update(User)
+            .where(User.requests_today > 0)
+            .values(requests_today=0)
+        )
 
-        users: Sequence[User] = (await self.session.execute(stmt)).scalars().all()
+        result = await self.session.execute(stmt)
 
-        for user in users:
-            await self.update(user.id, requests_today=0)
+        return result.rowcount
 
-        return len(users)
+    async def get_retention_after(self, after_id: int, limit: int = 100) -> List[Row]:
+        """Keyset-обход пользователей по id: (id, telegram_id, tier, retention_days)"""
+        stmt = (
+            select(User.id, User.telegram_id, User.tier, User.retention_days)
+            .where(User.id > after_id)
+            .order_by(User.id)
+            .limit(limit)
+        )
+        result = await self.session.execute(stmt)
+        return list(result.all())
+
+    async def get_retention_override_bounds(self) -> Tuple[Optional[int], bool]:
+        """Максимальный персональный срок хранения и есть ли бессрочные (0)"""
+        stmt = select(
+            func.max(User.retention_days),
+            func.count().filter(User.retention_days == 0),
+        )
+        max_days, indefinite = (await self.session.execute(stmt)).one()
+        return max_days, indefinite > 0
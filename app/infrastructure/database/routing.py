@@ -0,0 +1,169 @@
+import asyncio
+import functools
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, Iterator, Optional, TypeVar
+
+from sqlalchemy import Select, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import DBAPIError, InterfaceError, OperationalError
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.orm import Session
+
+from app.infrastructure.database.sharding import current_shard
+
+logger = logging.getLogger(__name__)
+
+F = TypeVar("F", bound=Callable[..., Awaitable[Any]])
+
+# Отставание реплики в секундах; 0, если всё полученное уже применено
+# (иначе простаивающий primary выглядел бы как растущее отставание)
+_LAG_SQL = text(
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+
+# Движок реплики для SELECT'ов текущего контекста (None — всё на primary)
+_replica_bind: ContextVar[Optional[Engine]] = ContextVar("replica_bind", default=None)
+
+
+class RoutingSession(Session):
+    """Сессия, отправляющая чтения в реплику внутри @replica_read
+
+    Flush, INSERT/UPDATE/DELETE, SELECT ... FOR UPDATE и текстовые запросы
+    всегда идут в primary: шард из контекста (см. sharding) или bind сессии.
+    """
+
+    def get_bind(self, mapper: Any = None, clause: Any = None, **kw: Any) -> Any:
+        replica = _replica_bind.get()
+        if (
+            replica is not None
+            and not self._flushing
+            and isinstance(clause, Select)
+            and clause._for_update_arg is None
+        ):
+            return replica
+        shard = current_shard()
+        if shard is not None:
+            return shard.engine.sync_engine
+        return super().get_bind(mapper=mapper, clause=clause, **kw)
+
+
+class ReplicaRouter:
+    """Решает, можно ли сейчас читать из реплики для данного пользователя
+
+    Реплика не используется, если пользователь писал в последние
+    read_your_writes секунд (его запись могла ещё не доехать), если она
+    недоступна или отстаёт больше max_lag. Состояние реплики проверяется не
+    чаще раза в check_interval секунд.
+    """
+
+    def __init__(
+        self,
+        engine: AsyncEngine,
+        max_lag: float,
+        read_your_writes: float,
+        check_interval: float,
+        check_timeout: float = 2.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.engine = engine
+        self.max_lag = max_lag
+        self.read_your_writes = read_your_writes
+        self.check_interval = check_interval
+        self.check_timeout = check_timeout
+        self._clock = clock
+        self._writes: Dict[int, float] = {}
+        self._available = False
+        self._checked_at: Optional[float] = None
+
+    def note_write(self, telegram_id: int) -> None:
+        """Пользователь только что записал данные: читать его с primary"""
+        now = self._clock()
+        if len(self._writes) > 10_000:
+            self._writes = {k: t for k, t in self._writes.items() if t > now}
+        self._writes[telegram_id] = now + self.read_your_writes
+
+    def wrote_recently(self, telegram_id: int) -> bool:
+        return self._writes.get(telegram_id, 0.0) > self._clock()
+
+    def mark_unavailable(self) -> None:
+        """Не использовать реплику до следующей проверки"""
+        self._available = False
+        self._checked_at = self._clock()
+
+    async def is_available(self) -> bool:
+        now = self._clock()
+        if self._checked_at is None or now - self._checked_at >= self.check_interval:
+            self._checked_at = now
+            available = await self._check()
+            if available != self._available:
+                logger.warning("Read replica %s", "is back" if available else "disabled")
+            self._available = available
+        return self._available
+
+    async def use_for(self, telegram_id: int) -> bool:
+        return not self.wrote_recently(telegram_id) and await self.is_available()
+
+    async def _check(self) -> bool:
+        try:
+            lag = await asyncio.wait_for(self.replication_lag(), timeout=self.check_timeout)
+        except Exception as e:
+            logger.warning("Read replica health check failed: %s", e)
+            return False
+        if lag > self.max_lag:
+            logger.warning("Read replica lags %.1f s (max %.1f s)", lag, self.max_lag)
+            return False
+        return True
+
+    async def replication_lag(self) -> float:
+        async with self.engine.connect() as conn:
+            if conn.dialect.name != "postgresql":
+                await conn.execute(text("SELECT 1"))
+                return 0.0
+            return float((await conn.execute(_LAG_SQL)).scalar_one() or 0)
+
+
+@contextmanager
+def on_primary() -> Iterator[None]:
+    """Выполнить блок на primary даже внутри @replica_read"""
+    token = _replica_bind.set(None)
+    try:
+        yield
+    finally:
+        _replica_bind.reset(token)
+
+
+def replica_read(method: F) -> F:
+    """Метод сервиса только читает: его SELECT'ы можно отдать реплике
+
+    Первый аргумент метода — telegram_id (для read-your-writes), у сервиса
+    должны быть атрибуты replica_router и session. Если реплика падает посреди
+    вызова, метод повторяется на primary.
+    """
+
+    @functools.wraps(method)
+    async def wrapper(self: Any, telegram_id: int, *args: Any, **kwargs: Any) -> Any:
+        router: Optional[ReplicaRouter] = self.replica_router
+        if router is None or not await router.use_for(telegram_id):
+            return await method(self, telegram_id, *args, **kwargs)
+
+        token = _replica_bind.set(router.engine.sync_engine)
+        try:
+            return await method(self, telegram_id, *args, **kwargs)
+        except (DBAPIError, OSError) as e:
+            if isinstance(e, DBAPIError) and not (
+                e.connection_invalidated or isinstance(e, (OperationalError, InterfaceError))
+            ):
+                raise
+            logger.warning("Read replica failed, retrying on primary: %s", e)
+            router.mark_unavailable()
+            await self.session.rollback()
+        finally:
+            _replica_bind.reset(token)
+
+        return await method(self, telegram_id, *args, **kwargs)
+
+    return wrapper  # type: ignore[return-value]
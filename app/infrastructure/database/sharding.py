@@ -0,0 +1,184 @@
+import asyncio
+import re
+import zlib
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, Iterator, List, Mapping, Optional, TypeVar
+
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+T = TypeVar("T")
+
+# Шард, в который сейчас отправляются запросы (ставится на апдейт / задачу)
+_current_shard: ContextVar[Optional["Shard"]] = ContextVar("current_shard", default=None)
+
+_RANGE_RE = re.compile(r"^(\d+)(?:-(\d+))?$")
+
+
+@dataclass(frozen=True)
+class Shard:
+    name: str
+    engine: AsyncEngine
+
+
+def bucket_of(telegram_id: int, buckets: int) -> int:
+    """Хэш-бакет пользователя; crc32 стабилен между процессами и версиями"""
+    return zlib.crc32(telegram_id.to_bytes(8, "big", signed=True)) % buckets
+
+
+def current_shard() -> Optional[Shard]:
+    return _current_shard.get()
+
+
+@contextmanager
+def shard_context(shard: Optional[Shard]) -> Iterator[None]:
+    """Направить запросы блока в shard (None — в bind сессии)"""
+    token = _current_shard.set(shard)
+    try:
+        yield
+    finally:
+        _current_shard.reset(token)
+
+
+def shard_key(key: Hashable) -> Hashable:
+    """Ключ, уникальный между шардами (id строк в каждом шарде свои)"""
+    shard = _current_shard.get()
+    return key if shard is None else (shard.name, key)
+
+
+class ShardMap:
+    """Назначение бакетов шардам
+
+    Пользователь попадает в бакет bucket_of(telegram_id) из buckets штук, а
+    бакет — в шард по диапазонам вида {"0-127": "main", "128-255": "eu2"}.
+    Без явной карты бакеты делятся между шардами поровну, подряд.
+    """
+
+    def __init__(
+        self, names: List[str], buckets: int, ranges: Optional[Mapping[str, str]] = None
+    ) -> None:
+        if not names:
+            raise ValueError("At least one shard is required")
+        self.names = list(names)
+        self.buckets = buckets
+
+        if not ranges:
+            self.assignment = [self.names[b * len(self.names) // buckets] for b in range(buckets)]
+            return
+
+        assignment: List[Optional[str]] = [None] * buckets
+        for spec, name in ranges.items():
+            if name not in self.names:
+                raise ValueError(f"Shard map refers to unknown shard {name!r}")
+            for bucket in parse_bucket_range(spec):
+                if not 0 <= bucket < buckets:
+                    raise ValueError(f"Bucket {bucket} is out of range 0-{buckets - 1}")
+                if assignment[bucket] is not None:
+                    raise ValueError(f"Bucket {bucket} is assigned twice")
+                assignment[bucket] = name
+
+        missing = [b for b, name in enumerate(assignment) if name is None]
+        if missing:
+            raise ValueError(f"Buckets without a shard: {to_ranges(missing)}")
+        self.assignment = [name for name in assignment if name is not None]
+
+    def shard_for(self, telegram_id: int) -> str:
+        return self.assignment[bucket_of(telegram_id, self.buckets)]
+
+    def buckets_of(self, name: str) -> List[int]:
+        return [b for b, shard in enumerate(self.assignment) if shard == name]
+
+    def moved(self, buckets: Iterable[int], target: str) -> "ShardMap":
+        """Копия карты, в которой buckets принадлежат target"""
+        if target not in self.names:
+            raise ValueError(f"Unknown shard {target!r}")
+        result = ShardMap(self.names, self.buckets, self.to_ranges())
+        for bucket in buckets:
+            result.assignment[bucket] = target
+        return result
+
+    def to_ranges(self) -> Dict[str, str]:
+        """Компактная карта для SHARD_MAP"""
+        ranges: Dict[str, str] = {}
+        for name in self.names:
+            for spec in to_ranges(self.buckets_of(name)).split(","):
+                if spec:
+                    ranges[spec] = name
+        return ranges
+
+
+def parse_bucket_range(spec: str) -> List[int]:
+    """'0-127' или '5' (можно через запятую) -> номера бакетов"""
+    buckets: List[int] = []
+    for part in spec.split(","):
+        match = _RANGE_RE.match(part.strip())
+        if match is None:
+            raise ValueError(f"Invalid bucket range {part!r}")
+        start = int(match.group(1))
+        end = int(match.group(2) or start)
+        buckets.extend(range(start, end + 1))
+    return buckets
+
+
+def to_ranges(buckets: Iterable[int]) -> str:
+    parts: List[str] = []
+    ordered = sorted(buckets)
+    i = 0
+    while i < len(ordered):
+        j = i
+        while j + 1 < len(ordered) and ordered[j + 1] == ordered[j] + 1:
+            j += 1
+        parts.append(str(ordered[i]) if i == j else f"{ordered[i]}-{ordered[j]}")
+        i = j + 1
+    return ",".join(parts)
+
+
+class ShardRegistry:
+    """Движки шардов и выбор шарда по telegram_id
+
+    RoutingSession отправляет запросы в шард из контекста (use_shard /
+    use_shard_of), поэтому репозитории о шардировании не знают. Данные
+    одного пользователя целиком лежат в одном шарде.
+    """
+
+    def __init__(self, engines: Mapping[str, AsyncEngine], shard_map: ShardMap) -> None:
+        self.shards = {name: Shard(name, engine) for name, engine in engines.items()}
+        self.shard_map = shard_map
+
+    @property
+    def names(self) -> List[str]:
+        return list(self.shards)
+
+    def shard_for(self, telegram_id: int) -> Shard:
+        return self.shards[self.shard_map.shard_for(telegram_id)]
+
+    @contextmanager
+    def use_shard(self, name: str) -> Iterator[Shard]:
+        with shard_context(self.shards[name]):
+            yield self.shards[name]
+
+    @contextmanager
+    def use_shard_of(self, telegram_id: int) -> Iterator[Shard]:
+        with self.use_shard(self.shard_for(telegram_id).name) as shard:
+            yield shard
+
+    async def fan_out(self, operation: Callable[[Shard], Awaitable[T]]) -> Dict[str, T]:
+        """Выполнить operation на всех шардах параллельно (каждый в своём контексте)"""
+
+        async def run(name: str) -> T:
+            with self.use_shard(name) as shard:
+                return await operation(shard)
+
+        results = await asyncio.gather(*(run(name) for name in self.shards))
+        return dict(zip(self.shards, results))
+
+    async def dispose(self) -> None:
+        for shard in self.shards.values():
+            await shard.engine.dispose()
+
+
+def current_engine(default: Any) -> Any:
+    """Движок текущего шарда (или default вне шардового контекста)"""
+    shard = _current_shard.get()
+    return default if shard is None else shard.engine
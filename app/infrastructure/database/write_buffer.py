@@ -0,0 +1,229 @@
+import asyncio
+import logging
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import insert
+from sqlalchemy.exc import DBAPIError, InterfaceError, OperationalError, StatementError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.models.message import Message, MessageRole
+from app.infrastructure.cache.ttl_cache import message_count_cache
+from app.infrastructure.database.repositories.message_daily_stats_repository import (
+    MessageDailyStatsRepository,
+)
+from app.infrastructure.database.repositories.message_repository import MessageRepository
+from app.infrastructure.database.sharding import Shard, current_shard, shard_context
+
+logger = logging.getLogger(__name__)
+
+
+def _is_transient(error: StatementError) -> bool:
+    """Сбой соединения/БД, а не отказ принять конкретные строки"""
+    return isinstance(error, DBAPIError) and (
+        error.connection_invalidated or isinstance(error, (OperationalError, InterfaceError))
+    )
+
+
+class MessageWriteBuffer:
+    """Write-behind буфер сообщений: копит вставки и пишет их пачкой
+
+    Сброс — каждые flush_interval секунд или при max_rows строк: один
+    INSERT ... RETURNING id через executemany плюс upsert дневных роллапов,
+    всё в одной транзакции. Пока сообщение не записано, оно видно чтениям
+    контекста через pending_for (read-your-writes). Сообщение пишется в
+    шард, активный в момент add().
+
+    При сбое соединения строки остаются в буфере до следующей попытки;
+    close() сбрасывает остаток. Если БД отвергает пачку (данные), она
+    делится пополам, пока не найдутся плохие строки — они отбрасываются с
+    ошибкой в логе, остальные записываются. Очередь ограничена max_pending:
+    add() в полную очередь сам ждёт сброса (и получает его ошибку).
+    """
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker[AsyncSession],
+        max_rows: int = 100,
+        flush_interval: float = 0.2,
+        max_pending: int = 10_000,
+    ) -> None:
+        self.session_factory = session_factory
+        self.max_rows = max_rows
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._pending: List[Message] = []
+        self._shard_of: Dict[int, Optional[Shard]] = {}
+        self._wakeup = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task[None]] = None
+
+    async def add(
+        self,
+        user_id: int,
+        role: MessageRole,
+        content: str,
+        ai_metadata: Optional[dict] = None,
+    ) -> Message:
+        """Поставить сообщение в очередь; id появится после сброса"""
+        if len(self._pending) >= self.max_pending:
+            # Backpressure: пока БД недоступна, ошибка доходит до хендлера,
+            # а не копится в памяти
+            await self.flush()
+
+        # created_at задаётся здесь, чтобы порядок не зависел от момента сброса
+        message = Message(
+            user_id=user_id,
+            role=role,
+            content=content,
+            ai_metadata=ai_metadata,
+            created_at=datetime.now(timezone.utc),
+        )
+        self._pending.append(message)
+        self._shard_of[id(message)] = current_shard()
+        message_count_cache.invalidate(user_id)
+
+        if len(self._pending) >= self.max_rows:
+            self._wakeup.set()
+        return message
+
+    def pending_for(self, user_id: int) -> List[Message]:
+        """Ещё не закоммиченные (или только что записанные) сообщения пользователя"""
+        shard = current_shard()
+        return [
+            message
+            for message in self._pending
+            if message.user_id == user_id and self._shard_of.get(id(message)) == shard
+        ]
+
+    async def discard_user(self, user_id: int) -> int:
+        """Убрать из очереди сообщения пользователя (очистка истории)
+
+        Под блокировкой сброса: идущий сброс успеет записать строки, и их
+        удалит сама очистка, а не попавшие в него уже не будут записаны.
+        """
+        async with self._flush_lock:
+            discarded = self.pending_for(user_id)
+            self._forget(discarded)
+        if discarded:
+            message_count_cache.invalidate(user_id)
+        return len(discarded)
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="message-write-buffer")
+
+    async def close(self) -> None:
+        """Остановить фоновый сброс и записать всё, что осталось"""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.flush()
+
+    async def flush(self) -> int:
+        async with self._flush_lock:
+            batches: Dict[Optional[Shard], List[Message]] = defaultdict(list)
+            for message in self._pending:
+                batches[self._shard_of.get(id(message))].append(message)
+
+            written = 0
+            for shard, batch in batches.items():
+                with shard_context(shard):
+                    written += await self._write_isolating(batch)
+            return written
+
+    async def _write_isolating(self, batch: List[Message]) -> int:
+        """Записать batch без строк, которые БД не принимает; вернуть число записанных"""
+        try:
+            await self._write(batch)
+        except StatementError as e:
+            if _is_transient(e):
+                raise
+            if len(batch) > 1:
+                middle = len(batch) // 2
+                first = await self._write_isolating(batch[:middle])
+                return first + await self._write_isolating(batch[middle:])
+            logger.error(
+                "Dropping buffered message of user %s rejected by the database: %s",
+                batch[0].user_id,
+                e.orig if isinstance(e, DBAPIError) else e,
+            )
+            self._forget(batch)
+            return 0
+
+        self._forget(batch)
+        for user_id in {message.user_id for message in batch}:
+            message_count_cache.invalidate(user_id)
+        return len(batch)
+
+    def _forget(self, batch: List[Message]) -> None:
+        done = set(map(id, batch))
+        self._pending = [m for m in self._pending if id(m) not in done]
+        for key in done:
+            self._shard_of.pop(key, None)
+
+    async def _write(self, batch: List[Message]) -> None:
+        async with self.session_factory() as session:
+            rows = [
+                {
+                    "user_id": message.user_id,
+                    "role": message.role,
+                    "content": message.content,
+                    "ai_metadata": message.ai_metadata,
+                    "created_at": message.created_at,
+                }
+                for message in batch
+            ]
+            # PostgreSQL отдаёт это одним многострочным INSERT ... RETURNING
+            # (insertmanyvalues); SQLite с упорядоченным RETURNING — построчно
+            result = await session.execute(
+                insert(Message).returning(Message.id, sort_by_parameter_order=True),
+                rows,
+            )
+            ids = result.scalars().all()
+            await MessageDailyStatsRepository(session).add_counts(
+                self._daily_counts(batch)
+            )
+            # id проставляется до коммита: читатель, увидевший строку и
+            # в БД, и в буфере, отбросит дубль по id
+            for message, message_id in zip(batch, ids):
+                message.id = message_id
+            try:
+                await session.commit()
+            except BaseException:
+                for message in batch:
+                    message.id = None
+                raise
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("Message write buffer flush failed, will retry")
+
+    @staticmethod
+    def _daily_counts(batch: List[Message]) -> List[Dict[str, Any]]:
+        counts: Dict[Tuple[int, Any], Dict[str, Any]] = defaultdict(
+            lambda: {"user_msgs": 0, "assistant_msgs": 0, "tokens_in": 0, "tokens_out": 0}
+        )
+        for message in batch:
+            row = counts[(message.user_id, message.created_at.date())]
+            row["user_msgs" if message.role == MessageRole.USER else "assistant_msgs"] += 1
+            tokens_in, tokens_out = MessageRepository._token_usage(message.ai_metadata)
+            row["tokens_in"] += tokens_in
+            row["tokens_out"] += tokens_out
+
+        return [
+            {"user_id": user_id, "day": day, **row} for (user_id, day), row in counts.items()
+        ]
@@ -0,0 +1,210 @@
+import functools
+import inspect
+import time
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Optional, TypeVar
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+from sqlalchemy.engine import Engine
+
+from app.config.settings import settings
+from app.infrastructure.database.query_timing import observe_query_time
+
+F = TypeVar("F", bound=Callable[..., Awaitable[Any]])
+
+# Все метрики приложения живут в отдельном реестре, чтобы /metrics
+# не зависел от глобального состояния prometheus_client
+REGISTRY = CollectorRegistry(auto_describe=True)
+
+HANDLER_LATENCY = Histogram(
+    "textflow_handler_duration_seconds",
+    "Telegram update handler latency",
+    ["handler", "status"],
+    registry=REGISTRY,
+)
+REPOSITORY_CALL_LATENCY = Histogram(
+    "textflow_repository_call_duration_seconds",
+    "Repository method latency",
+    ["method"],
+    registry=REGISTRY,
+)
+DB_QUERIES = Counter(
+    "textflow_db_queries_total",
+    "SQL statements executed, by repository method",
+    ["method"],
+    registry=REGISTRY,
+)
+DB_QUERY_LATENCY = Histogram(
+    "textflow_db_query_duration_seconds",
+    "SQL statement execution time, by repository method",
+    ["method"],
+    registry=REGISTRY,
+)
+PROVIDER_LATENCY = Histogram(
+    "textflow_provider_request_duration_seconds",
+    "AI provider request latency",
+    ["provider", "model", "status"],
+    buckets=(0.25, 0.5, 1, 2, 4, 8, 16, 32, 64),
+    registry=REGISTRY,
+)
+PROVIDER_TOKENS = Counter(
+    "textflow_provider_tokens_total",
+    "Tokens consumed by AI provider requests",
+    ["provider", "model", "direction"],
+    registry=REGISTRY,
+)
+CACHE_LOOKUPS = Counter(
+    "textflow_cache_lookups_total",
+    "Cache lookups by result (hit ratio = hit / (hit + miss))",
+    ["cache", "result"],
+    registry=REGISTRY,
+)
+DB_POOL_CHECKED_OUT = Gauge(
+    "textflow_db_pool_checked_out",
+    "Connections currently checked out of the pool",
+    ["engine"],
+    registry=REGISTRY,
+)
+DB_POOL_OVERFLOW = Gauge(
+    "textflow_db_pool_overflow",
+    "Connections opened above pool_size",
+    ["engine"],
+    registry=REGISTRY,
+)
+SCHEDULED_JOB_DURATION = Histogram(
+    "textflow_scheduled_job_duration_seconds",
+    "Scheduled job run time",
+    ["job", "status"],
+    buckets=(0.1, 0.5, 1, 5, 15, 60, 300, 900, 3600),
+    registry=REGISTRY,
+)
+SCHEDULED_JOB_SKIPS = Counter(
+    "textflow_scheduled_job_skips_total",
+    "Scheduled runs skipped (another replica is the leader)",
+    ["job"],
+    registry=REGISTRY,
+)
+
+UNSCOPED = "unscoped"
+
+_current_method: ContextVar[str] = ContextVar("repository_method", default=UNSCOPED)
+
+
+def metrics_enabled() -> bool:
+    return settings.METRICS_ENABLED
+
+
+def render_metrics() -> tuple[bytes, str]:
+    """Сериализовать реестр в текстовый формат Prometheus"""
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
+
+
+def observe_handler(handler: str, status: str, seconds: float) -> None:
+    HANDLER_LATENCY.labels(handler=handler, status=status).observe(seconds)
+
+
+def observe_provider_call(
+    provider: str, model: str, status: str, seconds: float
+) -> None:
+    if not metrics_enabled():
+        return
+    PROVIDER_LATENCY.labels(provider=provider, model=model, status=status).observe(
+        seconds
+    )
+
+
+def record_provider_tokens(
+    provider: str, model: str, input_tokens: int, output_tokens: int
+) -> None:
+    if not metrics_enabled():
+        return
+    PROVIDER_TOKENS.labels(provider=provider, model=model, direction="input").inc(
+        input_tokens
+    )
+    PROVIDER_TOKENS.labels(provider=provider, model=model, direction="output").inc(
+        output_tokens
+    )
+
+
+def observe_scheduled_job(job: str, status: str, seconds: float) -> None:
+    if not metrics_enabled():
+        return
+    SCHEDULED_JOB_DURATION.labels(job=job, status=status).observe(seconds)
+
+
+def record_scheduled_skip(job: str) -> None:
+    if not metrics_enabled():
+        return
+    SCHEDULED_JOB_SKIPS.labels(job=job).inc()
+
+
+def record_cache_lookup(cache: str, hit: bool) -> None:
+    if not metrics_enabled():
+        return
+    CACHE_LOOKUPS.labels(cache=cache, result="hit" if hit else "miss").inc()
+
+
+def track_repository_call(func: F) -> F:
+    """Декоратор: время вызова метода репозитория + метка для SQL-событий"""
+
+    @functools.wraps(func)
+    async def wrapper(self: Any, *args: Any, **kwargs: Any) -> Any:
+        method = f"{type(self).__name__}.{func.__name__}"
+        token = _current_method.set(method)
+        start = time.perf_counter()
+        try:
+            return await func(self, *args, **kwargs)
+        finally:
+            REPOSITORY_CALL_LATENCY.labels(method=method).observe(
+                time.perf_counter() - start
+            )
+            _current_method.reset(token)
+
+    return wrapper  # type: ignore[return-value]
+
+
+def instrument_repository(cls: type) -> None:
+    """Обернуть публичные async-методы класса репозитория.
+
+    При выключенных метриках класс не трогаем вовсе — никакого overhead.
+    """
+    if not metrics_enabled():
+        return
+
+    for name, attr in list(vars(cls).items()):
+        if name.startswith("_") or not inspect.iscoroutinefunction(attr):
+            continue
+        setattr(cls, name, track_repository_call(attr))
+
+
+def _observe_query(statement: str, parameters: Any, seconds: float) -> None:
+    method = _current_method.get()
+    DB_QUERIES.labels(method=method).inc()
+    DB_QUERY_LATENCY.labels(method=method).observe(seconds)
+
+
+def install_engine_metrics(engine: Engine, name: str = "main") -> None:
+    """Подписаться на события движка: счётчики запросов и состояние пула
+
+    name — метка engine у метрик пула (шард или "replica"), иначе пулы
+    нескольких движков перетирали бы одну серию.
+    """
+    observe_query_time(engine, _observe_query)
+
+    pool = engine.pool
+    checkedout: Optional[Callable[[], int]] = getattr(pool, "checkedout", None)
+    overflow: Optional[Callable[[], int]] = getattr(pool, "overflow", None)
+
+    if checkedout is not None:
+        DB_POOL_CHECKED_OUT.labels(engine=name).set_function(lambda: float(checkedout()))
+    if overflow is not None:
+        DB_POOL_OVERFLOW.labels(engine=name).set_function(
+            lambda: float(max(overflow(), 0))
+        )
@@ -0,0 +1,27 @@
+from aiohttp import web
+
+from .metrics import render_metrics
+
+
+async def metrics_handler(request: web.Request) -> web.Response:
+    payload, content_type = render_metrics()
+    # aiohttp не принимает charset внутри content_type, передаём отдельно
+    media_type, _, _ = content_type.partition(";")
+    return web.Response(body=payload, content_type=media_type, charset="utf-8")
+
+
+def create_metrics_app() -> web.Application:
+    app = web.Application()
+    app.router.add_get("/metrics", metrics_handler)
+    return app
+
+
+async def start_metrics_server(host: str, port: int) -> web.AppRunner:
+    """Поднять HTTP-сервер с эндпоинтом /metrics в текущем event loop"""
+    runner = web.AppRunner(create_metrics_app())
+    await runner.setup()
+
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+
+    return runner
@@ -0,0 +1,87 @@
+import struct
+from datetime import datetime, timedelta, timezone
+from typing import NamedTuple
+
+from app.core.exceptions.message import InvalidCursor
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_MICROSECOND = timedelta(microseconds=1)
+_ALPHABET = "0123456789abcdefghijklmnopqrstuvwxyz"
+
+
+class MessageCursor(NamedTuple):
+    """Позиция в истории сообщений: ключ сортировки (created_at, id)"""
+
+    created_at: datetime
+    id: int
+
+
+class SearchCursor(NamedTuple):
+    """Позиция в результатах поиска: ключ сортировки (rank, id)"""
+
+    rank: float
+    id: int
+
+
+def _to_base36(value: int) -> str:
+    if value < 0:
+        raise InvalidCursor(f"Negative cursor component: {value}")
+    digits = []
+    while True:
+        value, rem = divmod(value, 36)
+        digits.append(_ALPHABET[rem])
+        if value == 0:
+            return "".join(reversed(digits))
+
+
+def encode_cursor(cursor: MessageCursor) -> str:
+    """Компактная строка для callback_data: микросекунды эпохи и id в base36
+
+    Например ``"hncc5ff6o2.2n9c"`` — 15 байт вместо ~40 у ISO-даты с id.
+    Наивные даты (SQLite) считаются UTC.
+    """
+    created_at = cursor.created_at
+    if created_at.tzinfo is None:
+        created_at = created_at.replace(tzinfo=timezone.utc)
+    micros = (created_at - _EPOCH) // _MICROSECOND
+    return f"{_to_base36(micros)}.{_to_base36(cursor.id)}"
+
+
+def decode_cursor(token: str) -> MessageCursor:
+    """Обратное к encode_cursor; InvalidCursor при некорректном вводе"""
+    try:
+        micros_part, id_part = token.split(".")
+        micros, message_id = int(micros_part, 36), int(id_part, 36)
+    except ValueError:
+        raise InvalidCursor(f"Malformed cursor: {token!r}")
+
+    if micros < 0 or message_id < 0:
+        raise InvalidCursor(f"Malformed cursor: {token!r}")
+
+    try:
+        created_at = _EPOCH + micros * _MICROSECOND
+    except OverflowError:
+        raise InvalidCursor(f"Malformed cursor: {token!r}")
+
+    return MessageCursor(created_at, message_id)
+
+
+def encode_search_cursor(cursor: SearchCursor) -> str:
+    """Ранг кодируется битами IEEE 754, чтобы сравнение в БД было точным"""
+    (bits,) = struct.unpack(">Q", struct.pack(">d", cursor.rank))
+    return f"{_to_base36(bits)}.{_to_base36(cursor.id)}"
+
+
+def decode_search_cursor(token: str) -> SearchCursor:
+    """Обратное к encode_search_cursor; InvalidCursor при некорректном вводе"""
+    try:
+        bits_part, id_part = token.split(".")
+        bits, message_id = int(bits_part, 36), int(id_part, 36)
+        (rank,) = struct.unpack(">d", struct.pack(">Q", bits))
+    except (ValueError, struct.error):
+        raise InvalidCursor(f"Malformed cursor: {token!r}")
+
+    if message_id < 0 or rank != rank:  # NaN
+        raise InvalidCursor(f"Malformed cursor: {token!r}")
+
+    return SearchCursor(rank, message_id)
@@ -0,0 +1,127 @@
+"""Массовая загрузка/выгрузка сообщений: ORM против COPY (asyncpg).
+
+    python -m benchmarks.bulk_copy --url postgresql+asyncpg://.../scratch_db --destroy --messages 100000
+
+Только PostgreSQL: COPY в SQLite нет. База пересоздаётся — берите пустую!
+"""
+
+import asyncio
+import csv
+import io
+import json
+from datetime import datetime, timedelta, timezone
+from typing import List, Tuple
+
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker
+
+from app.core.models.message import Message, MessageRole
+from app.core.models.user import User
+from app.infrastructure.database.bulk import (
+    BULK_TABLES,
+    CopyFormat,
+    copy_out,
+    copy_records,
+    raw_connection,
+)
+
+from .common import base_parser, create_engine, measure
+
+COLUMNS = ("user_id", "role", "content", "ai_metadata", "created_at")
+
+
+def make_rows(user_id: int, messages: int) -> List[Tuple]:
+    start = datetime.now(timezone.utc) - timedelta(days=20)
+    return [
+        (
+            user_id,
+            MessageRole.USER if i % 2 == 0 else MessageRole.ASSISTANT,
+            f"Benchmark message {i} " + "lorem ipsum " * 20,
+            None if i % 2 == 0 else {"model": "bench"},
+            start + timedelta(seconds=i * 10),
+        )
+        for i in range(messages)
+    ]
+
+
+async def orm_import(engine: AsyncEngine, rows: List[Tuple]) -> None:
+    """Цикл session.add() — так пишет обычный код приложения"""
+    sessionmaker = async_sessionmaker(engine, expire_on_commit=False)
+    async with sessionmaker() as session:
+        for row in rows:
+            session.add(Message(**dict(zip(COLUMNS, row))))
+        await session.commit()
+
+
+async def copy_import(engine: AsyncEngine, rows: List[Tuple]) -> None:
+    records = [
+        (user_id, role.name, content, None if meta is None else json.dumps(meta), created_at)
+        for user_id, role, content, meta, created_at in rows
+    ]
+    async with raw_connection(engine) as conn:
+        await copy_records(conn, BULK_TABLES["messages"], records, COLUMNS)
+
+
+async def orm_export(engine: AsyncEngine) -> int:
+    sessionmaker = async_sessionmaker(engine, expire_on_commit=False)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    async with sessionmaker() as session:
+        result = await session.stream(select(*Message.__table__.columns))
+        async for row in result:
+            writer.writerow(row)
+    return len(buffer.getvalue().encode("utf-8"))
+
+
+async def copy_export(engine: AsyncEngine, copy_format: CopyFormat) -> int:
+    size = 0
+
+    async def sink(chunk: bytes) -> None:
+        nonlocal size
+        size += len(chunk)
+
+    async with raw_connection(engine) as conn:
+        await copy_out(conn, BULK_TABLES["messages"], sink, copy_format)
+    return size
+
+
+async def main() -> None:
+    args = base_parser(__doc__ or "").parse_args()
+    if not args.url.startswith("postgresql+asyncpg"):
+        raise SystemExit("COPY needs --url postgresql+asyncpg://...")
+
+    engine = await create_engine(args.url, args.destroy)
+    sessionmaker = async_sessionmaker(engine, expire_on_commit=False)
+    async with sessionmaker() as session:
+        user = User(telegram_id=123456789, first_name="Bench")
+        session.add(user)
+        await session.commit()
+
+    rows = make_rows(user.id, args.messages)
+    print(f"messages: {args.messages}")
+
+    with measure() as orm:
+        await orm_import(engine, rows)
+    print(f"import orm add():   {orm}")
+
+    async with engine.begin() as conn:
+        await conn.execute(delete(Message))
+
+    with measure() as copied:
+        await copy_import(engine, rows)
+    print(f"import COPY:        {copied}")
+
+    with measure() as orm:
+        size = await orm_export(engine)
+    print(f"export orm csv:     {orm}  {size / 1024 / 1024:8.2f} MiB")
+
+    for copy_format in CopyFormat:
+        with measure() as copied:
+            size = await copy_export(engine, copy_format)
+        print(f"export COPY {copy_format.value:7}{copied}  {size / 1024 / 1024:8.2f} MiB")
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
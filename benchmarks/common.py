@@ -0,0 +1,117 @@
+"""Общие утилиты для бенчмарков: движок, схема и быстрое наполнение данными"""
+
+import argparse
+import time
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Iterator
+
+from sqlalchemy import insert
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from app.core.models.base import Base
+from app.core.models.message import Message, MessageRole
+from app.core.models.user import User
+
+DEFAULT_URL = "sqlite+aiosqlite:///:memory:"
+
+
+def base_parser(description: str) -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument(
+        "--url",
+        default=DEFAULT_URL,
+        help="Database URL (default: in-memory SQLite). Use a scratch database!",
+    )
+    parser.add_argument(
+        "--destroy",
+        action="store_true",
+        help="Allow dropping every table at --url (required unless it is in-memory SQLite)",
+    )
+    parser.add_argument("--messages", type=int, default=100_000)
+    return parser
+
+
+def is_throwaway(url: str) -> bool:
+    """In-memory SQLite: после бенчмарка от базы ничего не остаётся"""
+    parsed = make_url(url)
+    return parsed.get_backend_name() == "sqlite" and parsed.database in (None, "", ":memory:")
+
+
+async def create_engine(url: str, destroy: bool = False) -> AsyncEngine:
+    """Движок с чистой схемой: все таблицы по url удаляются и создаются заново"""
+    if not destroy and not is_throwaway(url):
+        raise SystemExit(
+            f"Refusing to drop all tables at {make_url(url).render_as_string()}: "
+            "pass --destroy if this is a scratch database"
+        )
+    if url.startswith("sqlite"):
+        engine = create_async_engine(url, poolclass=StaticPool)
+    else:
+        engine = create_async_engine(url)
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+
+    return engine
+
+
+async def seed_user_with_messages(
+    engine: AsyncEngine, messages: int, telegram_id: int = 123456789
+) -> int:
+    """Создать пользователя и messages сообщений пачками по 5000"""
+    sessionmaker = async_sessionmaker(engine, expire_on_commit=False)
+    start = datetime.now(timezone.utc) - timedelta(days=365)
+
+    async with sessionmaker() as session:
+        user = User(telegram_id=telegram_id, first_name="Bench", daily_limit=20, requests_today=0)
+        session.add(user)
+        await session.flush()
+
+        batch = []
+        for i in range(messages):
+            batch.append(
+                {
+                    "user_id": user.id,
+                    "role": MessageRole.USER if i % 2 == 0 else MessageRole.ASSISTANT,
+                    "content": f"Benchmark message {i} " + "lorem ipsum " * 20,
+                    "ai_metadata": None if i % 2 == 0 else {"model": "bench", "content": "x" * 200},
+                    "created_at": start + timedelta(seconds=i * 30),
+                }
+            )
+            if len(batch) == 5000:
+                await session.execute(insert(Message), batch)
+                batch.clear()
+        if batch:
+            await session.execute(insert(Message), batch)
+
+        await session.commit()
+        return user.id
+
+
+@dataclass
+class Measurement:
+    seconds: float = 0.0
+    peak_bytes: int = 0
+
+    def __str__(self) -> str:
+        return f"{self.seconds * 1000:10.2f} ms  peak {self.peak_bytes / 1024 / 1024:8.2f} MiB"
+
+
+@contextmanager
+def measure() -> Iterator[Measurement]:
+    """Время выполнения и пик аллокаций Python (tracemalloc)"""
+    result = Measurement()
+    tracemalloc.start()
+    started = time.perf_counter()
+    try:
+        yield result
+    finally:
+        result.seconds = time.perf_counter() - started
+        _, result.peak_bytes = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
@@ -0,0 +1,190 @@
+"""Хранение длинных сообщений в TOAST: pglz против lz4 (только PostgreSQL).
+
+    python -m benchmarks.content_compression --url postgresql+asyncpg://.../scratch_db --destroy
+    python -m benchmarks.content_compression --url ... --destroy --corpus message_history.jsonl
+
+Для каждого метода колонке messages.content задаётся SET COMPRESSION, корпус
+записывается заново (метод применяется только к новым значениям) и
+печатается то, что реально хранит PostgreSQL: сумма pg_column_size(content)
+против octet_length, отдельно для значений длиннее TOAST_THRESHOLD (короче
+PostgreSQL не сжимает), и время чтения, распаковывающего каждое значение.
+
+Лучше всего мерить на настоящей переписке: --corpus принимает JSONL-экспорт
+истории из кабинета (поле content в каждой строке). Без него корпус
+генерируется: вопросы и ответы разной длины из случайных предложений,
+markdown-списков и блоков кода на русском и английском.
+"""
+
+import asyncio
+import json
+import random
+import time
+from typing import List, Optional
+
+from sqlalchemy import insert, text
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker
+
+from app.core.models.message import Message, MessageRole
+from app.core.models.user import User
+
+from .common import base_parser, create_engine
+
+# TOAST_TUPLE_THRESHOLD при странице 8 КБ: короче значения не сжимаются
+TOAST_THRESHOLD = 2032
+
+COMPRESSION_METHODS = ("pglz", "lz4")
+
+# Сколько раз повторяется чтение; печатается лучшее время
+READ_REPEATS = 5
+
+WORDS_EN = (
+    "the algorithm memory request database index query cache value result "
+    "function thread process server client error timeout response version "
+    "simple fast large small first then because however example usually "
+    "returns stores sorts merges splits reads writes checks handles"
+).split()
+WORDS_RU = (
+    "алгоритм память запрос база индекс кэш значение результат функция поток "
+    "процесс сервер клиент ошибка ответ версия простой быстрый большой "
+    "сначала затем потому однако например обычно возвращает хранит читает "
+    "пишет проверяет обрабатывает данные таблица строка список"
+).split()
+
+
+def sentence(rng: random.Random) -> str:
+    words = WORDS_RU if rng.random() < 0.4 else WORDS_EN
+    body = " ".join(rng.choice(words) for _ in range(rng.randint(6, 20)))
+    if rng.random() < 0.3:
+        body += f" {rng.randint(0, 10_000)}"
+    return body.capitalize() + rng.choice(".!?:")
+
+
+def code_block(rng: random.Random) -> str:
+    lines = []
+    for _ in range(rng.randint(3, 12)):
+        name = "_".join(rng.choice(WORDS_EN) for _ in range(2))
+        lines.append(f"    {name} = {rng.choice(WORDS_EN)}({rng.randint(0, 999)})")
+    return "```python\ndef " + rng.choice(WORDS_EN) + "():\n" + "\n".join(lines) + "\n```"
+
+
+def synthetic_corpus(messages: int, seed: int = 42) -> List[str]:
+    rng = random.Random(seed)
+    texts = []
+    for i in range(messages):
+        if i % 2 == 0:
+            texts.append(" ".join(sentence(rng) for _ in range(rng.randint(1, 3))))
+            continue
+        blocks = []
+        # Длина ответа: от пары предложений до упора в лимит 4096 символов
+        for _ in range(rng.choice([1, 2, 4, 8, 12, 16])):
+            kind = rng.random()
+            if kind < 0.6:
+                blocks.append(" ".join(sentence(rng) for _ in range(rng.randint(2, 5))))
+            elif kind < 0.85:
+                blocks.append("\n".join(f"- {sentence(rng)}" for _ in range(rng.randint(2, 5))))
+            else:
+                blocks.append(code_block(rng))
+        texts.append("\n\n".join(blocks)[:4096])
+    return texts
+
+
+def load_corpus(path: str, messages: int) -> List[str]:
+    """Тексты из JSONL-экспорта истории (не больше messages)"""
+    texts = []
+    with open(path, encoding="utf-8") as file:
+        for line in file:
+            if len(texts) >= messages:
+                break
+            if line.strip():
+                texts.append(json.loads(line)["content"])
+    return texts
+
+
+async def load(engine: AsyncEngine, user_id: int, texts: List[str], method: str) -> None:
+    async with engine.begin() as conn:
+        await conn.execute(text("DELETE FROM messages"))
+        await conn.execute(
+            text(f"ALTER TABLE messages ALTER COLUMN content SET COMPRESSION {method}")
+        )
+        for start in range(0, len(texts), 5000):
+            await conn.execute(
+                insert(Message),
+                [
+                    {
+                        "user_id": user_id,
+                        "role": MessageRole.USER if i % 2 == 0 else MessageRole.ASSISTANT,
+                        "content": content,
+                    }
+                    for i, content in enumerate(texts[start:start + 5000], start)
+                ],
+            )
+
+
+def ratio(stored: Optional[int], plain: Optional[int]) -> str:
+    return f"{stored / plain:6.1%}" if stored and plain else "   n/a"
+
+
+async def report(engine: AsyncEngine, method: str) -> None:
+    async with engine.connect() as conn:
+        row = (
+            await conn.execute(
+                text(
+                    "SELECT sum(octet_length(content)), sum(pg_column_size(content)), "
+                    "sum(octet_length(content)) FILTER (WHERE octet_length(content) >= :threshold), "
+                    "sum(pg_column_size(content)) FILTER (WHERE octet_length(content) >= :threshold), "
+                    "count(*) FILTER (WHERE pg_column_compression(content) = :method) "
+                    "FROM messages"
+                ),
+                {"threshold": TOAST_THRESHOLD, "method": method},
+            )
+        ).one()
+        plain, stored, plain_long, stored_long, compressed = row
+
+        # length() в символах распаковывает каждое значение на сервере
+        best: Optional[float] = None
+        for _ in range(READ_REPEATS):
+            started = time.perf_counter()
+            await conn.execute(text("SELECT sum(length(content)) FROM messages"))
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+
+    print(
+        f"{method:5} stored {stored / 1024 / 1024:8.2f} MiB ({ratio(stored, plain)}, "
+        f"long {ratio(stored_long, plain_long)}), {compressed} values compressed, "
+        f"read all {(best or 0) * 1000:8.2f} ms"
+    )
+
+
+async def main() -> None:
+    parser = base_parser(__doc__ or "")
+    parser.add_argument("--corpus", help="JSONL history export to use instead of generated text")
+    parser.set_defaults(messages=20_000)
+    args = parser.parse_args()
+    if not args.url.startswith("postgresql"):
+        raise SystemExit("TOAST compression needs --url postgresql+asyncpg://...")
+
+    texts = load_corpus(args.corpus, args.messages) if args.corpus else synthetic_corpus(args.messages)
+    if not texts:
+        raise SystemExit("Corpus is empty")
+    long_texts = sum(1 for content in texts if len(content.encode("utf-8")) >= TOAST_THRESHOLD)
+
+    engine = await create_engine(args.url, args.destroy)
+    sessionmaker = async_sessionmaker(engine, expire_on_commit=False)
+    async with sessionmaker() as session:
+        user = User(telegram_id=123456789, first_name="Bench")
+        session.add(user)
+        await session.commit()
+
+    print(f"messages: {len(texts)}, long enough to compress (>= {TOAST_THRESHOLD} B): {long_texts}")
+    if not long_texts:
+        print("no message reaches the TOAST threshold: nothing is compressed")
+
+    for method in COMPRESSION_METHODS:
+        await load(engine, user.id, texts, method)
+        await report(engine, method)
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
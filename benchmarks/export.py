@@ -0,0 +1,71 @@
+"""Экспорт истории: строка в памяти против потоковой записи во временный файл.
+
+    python -m benchmarks.export --messages 100000
+"""
+
+import asyncio
+from io import BytesIO
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.models.message import Message, MessageRole
+from app.core.services.history_export import ExportFormat, HistoryExportWriter
+from app.infrastructure.database.repositories.message_repository import MessageRepository
+
+from .common import base_parser, create_engine, measure, seed_user_with_messages
+
+
+async def legacy_export(session: AsyncSession, user_id: int) -> int:
+    """Прежняя реализация без лимита: все ORM-объекты, += и BytesIO"""
+    result = await session.execute(
+        select(Message).where(Message.user_id == user_id).order_by(Message.created_at)
+    )
+    export_text = ""
+    for i, msg in enumerate(result.scalars().all(), 1):
+        role_name = "You" if msg.role == MessageRole.USER else "AI Assistant"
+        export_text += f"[{i}] {role_name} ({msg.created_at:%Y-%m-%d %H:%M:%S}):\n"
+        export_text += f"{msg.content}\n\n"
+    return len(BytesIO(export_text.encode("utf-8")).getvalue())
+
+
+async def streaming_export(
+    session: AsyncSession, user_id: int, export_format: ExportFormat, compress: bool
+) -> int:
+    writer = HistoryExportWriter(export_format, "bench", compress=compress)
+    async for row in MessageRepository(session).stream_user_messages(user_id):
+        writer.write_message(row.id, row.role, row.content, row.created_at)
+    parts = writer.finish()
+    size = sum(part.size for part in parts)
+    for part in parts:
+        part.close()
+    return size
+
+
+async def main() -> None:
+    args = base_parser(__doc__ or "").parse_args()
+
+    engine = await create_engine(args.url, args.destroy)
+    user_id = await seed_user_with_messages(engine, args.messages)
+    sessionmaker = async_sessionmaker(engine, expire_on_commit=False)
+
+    print(f"messages: {args.messages}")
+
+    async with sessionmaker() as session:
+        with measure() as legacy:
+            size = await legacy_export(session, user_id)
+    print(f"legacy txt:        {legacy}  {size / 1024 / 1024:8.2f} MiB")
+
+    for export_format in ExportFormat:
+        for compress in (False, True):
+            async with sessionmaker() as session:
+                with measure() as streamed:
+                    size = await streaming_export(session, user_id, export_format, compress)
+            label = f"{export_format.value}{'.gz' if compress else ''}"
+            print(f"streaming {label:8} {streamed}  {size / 1024 / 1024:8.2f} MiB")
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
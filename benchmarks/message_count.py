@@ -0,0 +1,48 @@
+"""COUNT(*) vs гидрация всех строк в get_user_message_count.
+
+    python -m benchmarks.message_count --messages 100000
+"""
+
+import asyncio
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.models.message import Message
+from app.infrastructure.database.repositories.message_repository import MessageRepository
+
+from .common import base_parser, create_engine, measure, seed_user_with_messages
+
+
+async def legacy_count(session: AsyncSession, user_id: int) -> int:
+    """Прежняя реализация: SELECT всех сообщений и len() в Python"""
+    result = await session.execute(select(Message).where(Message.user_id == user_id))
+    return len(list(result.scalars().all()))
+
+
+async def main() -> None:
+    args = base_parser(__doc__ or "").parse_args()
+
+    engine = await create_engine(args.url, args.destroy)
+    user_id = await seed_user_with_messages(engine, args.messages)
+    sessionmaker = async_sessionmaker(engine, expire_on_commit=False)
+
+    async with sessionmaker() as session:
+        with measure() as legacy:
+            legacy_total = await legacy_count(session, user_id)
+
+    async with sessionmaker() as session:
+        with measure() as pushed_down:
+            total = await MessageRepository(session).get_user_message_count(user_id)
+
+    assert legacy_total == total == args.messages
+
+    print(f"messages: {total}")
+    print(f"select + len():  {legacy}")
+    print(f"SELECT count(*): {pushed_down}")
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,141 @@
+"""Запись сообщений: прежний commit + refresh против пути, которым пишет бот.
+
+    python -m benchmarks.message_write --messages 2000 --per-commit 2
+
+Считает обращения к БД на сообщение: SQL-запросы и COMMIT. Замеряются
+MessageRepository.create_message (upsert дневного роллапа + INSERT ...
+RETURNING) с коммитом на единицу работы — по умолчанию вопрос и ответ
+(2 сообщения) — и MessageService.create_message, который бот вызывает на
+каждое сообщение и который коммитит каждое.
+"""
+
+import asyncio
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+
+from app.core.models.message import Message, MessageRole
+from app.core.models.user import User
+from app.core.services.message_service import MessageService
+from app.infrastructure.database.repositories.message_repository import MessageRepository
+from app.infrastructure.database.repositories.user_repository import UserRepository
+
+from .common import base_parser, create_engine, measure
+
+
+@dataclass
+class RoundTrips:
+    statements: int = 0
+    commits: int = 0
+
+    def per_message(self, messages: int) -> str:
+        total = (self.statements + self.commits) / messages
+        return (
+            f"{self.statements / messages:.2f} queries + "
+            f"{self.commits / messages:.2f} commits = {total:.2f} round trips/message"
+        )
+
+
+@contextmanager
+def count_round_trips(engine: AsyncEngine) -> Iterator[RoundTrips]:
+    trips = RoundTrips()
+
+    def on_execute(*args: Any) -> None:
+        trips.statements += 1
+
+    def on_commit(*args: Any) -> None:
+        trips.commits += 1
+
+    event.listen(engine.sync_engine, "before_cursor_execute", on_execute)
+    event.listen(engine.sync_engine, "commit", on_commit)
+    try:
+        yield trips
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", on_execute)
+        event.remove(engine.sync_engine, "commit", on_commit)
+
+
+async def legacy_create(session: AsyncSession, **kwargs: Any) -> Message:
+    """Прежний BaseRepository.create: COMMIT и SELECT на каждую запись"""
+    message = Message(**kwargs)
+    session.add(message)
+    await session.commit()
+    await session.refresh(message)
+    return message
+
+
+def message_kwargs(user_id: int, i: int) -> Dict[str, Any]:
+    return {
+        "user_id": user_id,
+        "role": MessageRole.USER if i % 2 == 0 else MessageRole.ASSISTANT,
+        "content": f"Benchmark message {i}",
+    }
+
+
+def bot_message_kwargs(user_id: int, i: int) -> Dict[str, Any]:
+    """Как пишет бот: у ответа ассистента есть token_usage для роллапа"""
+    kwargs = message_kwargs(user_id, i)
+    if kwargs["role"] == MessageRole.ASSISTANT:
+        kwargs["ai_metadata"] = {"token_usage": {"input_tokens": 120, "output_tokens": 80}}
+    return kwargs
+
+
+async def main() -> None:
+    parser = base_parser(__doc__ or "")
+    parser.add_argument("--per-commit", type=int, default=2)
+    parser.set_defaults(messages=2000)
+    args = parser.parse_args()
+
+    engine = await create_engine(args.url, args.destroy)
+    sessionmaker = async_sessionmaker(engine, expire_on_commit=False)
+
+    async with sessionmaker() as session:
+        user = User(telegram_id=123456789, first_name="Bench")
+        session.add(user)
+        await session.commit()
+        user_id = user.id
+
+    async with sessionmaker() as session:
+        with count_round_trips(engine) as legacy_trips, measure() as legacy:
+            for i in range(args.messages):
+                await legacy_create(session, **message_kwargs(user_id, i))
+
+    async with sessionmaker() as session:
+        repo = MessageRepository(session)
+        with count_round_trips(engine) as repo_trips, measure() as repo_time:
+            for i in range(args.messages):
+                message = await repo.create_message(**bot_message_kwargs(user_id, i))
+                assert message.id is not None and message.created_at is not None
+                if (i + 1) % args.per_commit == 0:
+                    await repo.commit()
+            await repo.commit()
+
+    async with sessionmaker() as session:
+        service = MessageService(UserRepository(session), MessageRepository(session))
+        with count_round_trips(engine) as service_trips, measure() as service_time:
+            for i in range(args.messages):
+                kwargs = bot_message_kwargs(user_id, i)
+                await service.create_message(
+                    telegram_id=123456789,
+                    role=kwargs["role"],
+                    content=kwargs["content"],
+                    ai_metadata=kwargs.get("ai_metadata"),
+                    user_id=kwargs["user_id"],
+                )
+
+    print(f"messages: {args.messages}, repository unit of work: {args.per_commit} messages")
+    for label, timing, trips in (
+        ("old commit + refresh:", legacy, legacy_trips),
+        ("MessageRepository.create_message:", repo_time, repo_trips),
+        ("MessageService.create_message:", service_time, service_trips),
+    ):
+        print(f"{label:<34} {timing}  {trips.per_message(args.messages)}")
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
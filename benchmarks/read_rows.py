@@ -0,0 +1,69 @@
+"""ORM-гидрация Message vs MessageRow из Core-select'а на путях чтения.
+
+    python -m benchmarks.read_rows --messages 20000
+
+Повторяет чтение контекста промпта и страницы истории --repeat раз в одной
+сессии (как за время жизни апдейта) и полную выборку истории за раз.
+"""
+
+import asyncio
+from typing import List
+
+from sqlalchemy import desc, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.models.message import Message
+from app.infrastructure.database.repositories.message_repository import MessageRepository
+
+from .common import base_parser, create_engine, measure, seed_user_with_messages
+
+
+async def legacy_recent(session: AsyncSession, user_id: int, limit: int) -> List[Message]:
+    """Прежняя реализация: полные ORM-объекты вместе с ai_metadata"""
+    result = await session.execute(
+        select(Message)
+        .where(Message.user_id == user_id)
+        .order_by(desc(Message.created_at), desc(Message.id))
+        .limit(limit)
+    )
+    return list(reversed(result.scalars().all()))
+
+
+async def main() -> None:
+    parser = base_parser(__doc__ or "")
+    parser.set_defaults(messages=20_000)
+    parser.add_argument("--repeat", type=int, default=500)
+    parser.add_argument("--limit", type=int, default=10)
+    args = parser.parse_args()
+
+    engine = await create_engine(args.url, args.destroy)
+    user_id = await seed_user_with_messages(engine, args.messages)
+    sessionmaker = async_sessionmaker(engine, expire_on_commit=False)
+
+    print(f"messages: {args.messages}, {args.repeat} x limit {args.limit}")
+    for label, limit, repeat in (
+        ("context", args.limit, args.repeat),
+        ("full history", args.messages, 1),
+    ):
+        async with sessionmaker() as session:
+            with measure() as orm:
+                for _ in range(repeat):
+                    legacy = await legacy_recent(session, user_id, limit)
+            session.expunge_all()
+
+        async with sessionmaker() as session:
+            repo = MessageRepository(session)
+            with measure() as rows:
+                for _ in range(repeat):
+                    current = await repo.get_recent_context(user_id, limit)
+
+        assert [m.id for m in legacy] == [m.id for m in current]
+        print(f"{label}:")
+        print(f"  ORM Message: {orm}")
+        print(f"  MessageRow:  {rows}")
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
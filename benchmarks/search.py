@@ -0,0 +1,61 @@
+"""Поиск по истории: первая и глубокая страница для редких и частых слов.
+
+    python -m benchmarks.search --messages 100000
+    python -m benchmarks.search --url postgresql+asyncpg://.../scratch_db --destroy
+
+SQLite использует FTS5-fallback, PostgreSQL — tsvector/GIN и pg_trgm.
+"""
+
+import asyncio
+
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.infrastructure.database.repositories.message_repository import MessageRepository
+from app.utils.cursor import SearchCursor
+
+from .common import base_parser, create_engine, measure, seed_user_with_messages
+
+PAGE_SIZE = 6
+QUERIES = {
+    "rare word": "4242",
+    "frequent word": "lorem",
+    "substring": "chmark mess",
+}
+
+
+async def main() -> None:
+    parser = base_parser(__doc__ or "")
+    parser.add_argument("--pages", type=int, default=20, help="Depth of the last measured page")
+    args = parser.parse_args()
+
+    engine = await create_engine(args.url, args.destroy)
+    user_id = await seed_user_with_messages(engine, args.messages)
+    sessionmaker = async_sessionmaker(engine, expire_on_commit=False)
+
+    print(f"messages: {args.messages}")
+    for label, query in QUERIES.items():
+        async with sessionmaker() as session:
+            repo = MessageRepository(session)
+
+            with measure() as first_page:
+                hits = await repo.search_messages(user_id, query, limit=PAGE_SIZE)
+
+            cursor = None
+            for _ in range(args.pages - 1):
+                if len(hits) < PAGE_SIZE:
+                    break
+                message, rank = hits[-1]
+                cursor = SearchCursor(rank, message.id)
+                hits = await repo.search_messages(user_id, query, cursor=cursor, limit=PAGE_SIZE)
+
+            with measure() as deep_page:
+                await repo.search_messages(user_id, query, cursor=cursor, limit=PAGE_SIZE)
+
+        print(f"{label:14} first page: {first_page}")
+        print(f"{label:14} page {args.pages:>3}:   {deep_page}")
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,11 +1,91 @@
 from aiogram import Bot, Dispatcher
 import asyncio
+from functools import partial
 
 from app.config.settings import settings
 from app.core.services.container import Container
 from app.bot.middlewares.user_middleware import UserMiddleware
+from app.bot.middlewares.metrics_middleware import MetricsMiddleware
+from app.bot.middlewares.query_budget_middleware import QueryBudgetMiddleware
+from app.bot.middlewares.shard_middleware import ShardMiddleware
 from app.core.services.user_service import UserService
 from app.core.services.message_service import MessageService
+from app.core.services.purge_service import RetentionEnforcer, run_stored_purge
+from app.core.services.archive_service import MessageArchiver
+from app.core.services.scheduler import Scheduler
+from app.infrastructure.monitoring.server import start_metrics_server
+from app.infrastructure.database.leader import LeaderLock
+from app.infrastructure.database.partitions import PartitionManager
+from app.infrastructure.database.sharding import Shard
+
+
+async def resume_purge_jobs(container: Container) -> None:
+    """Продолжить очистки, прерванные остановкой или падением реплики
+
+    Вызывается в контексте шарда: задачи наследуют его. Задачу, которую
+    выполняет другая реплика, PurgeService.run не запустит (advisory lock).
+    """
+    purge_service = container.get_purge_service()
+    try:
+        jobs = await purge_service.get_unfinished_jobs()
+    finally:
+        await purge_service.session.close()
+
+    for job in jobs:
+        if container.purge_jobs.is_running(job.id):
+            continue
+        container.purge_jobs.start(
+            job.id, partial(run_stored_purge, container.get_purge_service(), job.id)
+        )
+
+
+async def ensure_partitions(shard: Shard) -> None:
+    await PartitionManager(shard.engine).ensure_future_partitions(
+        settings.MESSAGE_PARTITION_MONTHS_AHEAD
+    )
+
+
+def build_scheduler(container: Container) -> Scheduler:
+    """Периодические задачи; задачи по данным пользователей идут в каждом шарде"""
+    shards = container.shards
+    scheduler = Scheduler(
+        LeaderLock(shards.shards["main"].engine, settings.SCHEDULER_LEADER_LOCK),
+        jitter=settings.SCHEDULER_JITTER,
+    )
+
+    scheduler.cron(
+        "reset_daily_limits", settings.DAILY_LIMIT_RESET_CRON, container.reset_daily_limits
+    )
+    scheduler.cron(
+        "message_partitions",
+        settings.PARTITION_MAINTENANCE_CRON,
+        partial(shards.fan_out, ensure_partitions),
+    )
+
+    # Прерванные очистки подхватывает лидер, в том числе после смены лидера
+    scheduler.every(
+        "resume_purge_jobs",
+        settings.PURGE_RESUME_INTERVAL,
+        partial(shards.fan_out, lambda _: resume_purge_jobs(container)),
+    )
+
+    retention = RetentionEnforcer(container.get_purge_service, container.purge_jobs)
+    scheduler.every(
+        "retention",
+        settings.RETENTION_ENFORCE_INTERVAL,
+        partial(shards.fan_out, lambda _: retention.enforce()),
+    )
+
+    # Старые сообщения уходят в холодный архив, messages остаётся горячей
+    if container.archive is not None:
+        archiver = MessageArchiver(container.get_archive_service, settings.ARCHIVE_AFTER_DAYS)
+        scheduler.every(
+            "archive",
+            settings.ARCHIVE_INTERVAL,
+            partial(shards.fan_out, lambda _: archiver.run_once()),
+        )
+
+    return scheduler
 
 
 async def main() -> None:
@@ -14,8 +94,50 @@ async def main() -> None:
     bot = Bot(token=settings.TELEGRAM_BOT_TOKEN.get_secret_value())
     dp = Dispatcher()
 
+    if container.write_buffer is not None:
+        container.write_buffer.start()
+
+    # Архив читают экспорт и очистка на любой реплике: не стартуем, если
+    # ARCHIVE_DIR не тот общий том, что у остальных
+    if container.archive is not None:
+        archive_service = container.get_archive_service()
+        try:
+            await archive_service.verify_shared_volume()
+        finally:
+            await archive_service.session.close()
+
+    # Фоновые задачи (включая партиции и возобновление очисток) выполняет
+    # только реплика-лидер
+    scheduler = None
+    if settings.SCHEDULER_ENABLED:
+        scheduler = build_scheduler(container)
+        # Вставка в месяц без партиции упадёт — создаём их до приёма апдейтов
+        await scheduler.run_now("message_partitions")
+        scheduler.start()
+
+    # Шард пользователя выбирается до всех остальных middleware
+    dp.update.outer_middleware(ShardMiddleware(container.shards))
+
     # Передаем контейнер в middleware
     dp.message.middleware(UserMiddleware(container))
+    dp.callback_query.middleware(UserMiddleware(container))
+
+    if settings.QUERY_BUDGET_ENABLED:
+        dp.update.outer_middleware(
+            QueryBudgetMiddleware(
+                budget=settings.QUERY_BUDGET_PER_UPDATE,
+                repeat_threshold=settings.QUERY_REPEAT_THRESHOLD,
+            )
+        )
+
+    # Метрики подключаем только когда они включены — иначе ноль overhead
+    metrics_runner = None
+    if settings.METRICS_ENABLED:
+        dp.message.middleware(MetricsMiddleware())
+        dp.callback_query.middleware(MetricsMiddleware())
+        metrics_runner = await start_metrics_server(
+            settings.METRICS_HOST, settings.METRICS_PORT
+        )
 
     # Передаем контейнер в handlers
     dp["container"] = container
@@ -24,11 +146,24 @@ async def main() -> None:
     from app.bot.handlers.messages import router as messages_router
     from app.bot.handlers.cabinet import router as cabinet_router
 
+    # Кабинет раньше чата: текст в состоянии поиска не должен уходить в AI
     dp.include_router(commands_router)
-    dp.include_router(messages_router)
     dp.include_router(cabinet_router)
+    dp.include_router(messages_router)
 
-    await dp.start_polling(bot)
+    try:
+        await dp.start_polling(bot)
+    finally:
+        if scheduler is not None:
+            await scheduler.shutdown()
+        # Буфер сбрасывается после остановки polling — новых сообщений уже не будет
+        if container.write_buffer is not None:
+            await container.write_buffer.close()
+        await container.export_jobs.shutdown(timeout=10)
+        # Прерванная очистка останется RUNNING и продолжится при следующем старте
+        await container.purge_jobs.shutdown()
+        if metrics_runner is not None:
+            await metrics_runner.cleanup()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,94 @@
+"""Служебные команды: массовая выгрузка и загрузка таблиц через COPY.
+
+    python manage.py export messages --format binary -o messages.bin
+    python manage.py export messages --format csv --since 2026-01-01 | gzip > messages.csv.gz
+    python manage.py import users -i users.bin
+    python manage.py import messages -i messages.bin --shard eu2
+
+Без -o/-i данные идут в stdout/из stdin. Таблицы загружаются в порядке
+users, messages (внешний ключ). Нужен PostgreSQL (asyncpg).
+"""
+
+import argparse
+import asyncio
+import logging
+import sys
+from datetime import datetime, timezone
+from typing import Any, Optional
+
+from app.infrastructure.database.bulk import (
+    BULK_TABLES,
+    CopyFormat,
+    copy_in,
+    copy_out,
+    raw_connection,
+)
+
+logger = logging.getLogger("manage")
+
+
+def _since(value: str) -> datetime:
+    parsed = datetime.fromisoformat(value)
+    return parsed if parsed.tzinfo is not None else parsed.replace(tzinfo=timezone.utc)
+
+
+def _stream(path: Optional[str], stdio: Any) -> Any:
+    return stdio.buffer if path in (None, "-") else path
+
+
+async def run(args: argparse.Namespace) -> int:
+    from app.infrastructure.database.connection import shards
+
+    table = BULK_TABLES[args.table]
+    copy_format = CopyFormat(args.format)
+    try:
+        async with raw_connection(shards.shards[args.shard].engine) as conn:
+            if args.command == "export":
+                output = _stream(args.output, sys.stdout)
+                rows = await copy_out(conn, table, output, copy_format, args.since)
+                if output is sys.stdout.buffer:
+                    sys.stdout.buffer.flush()
+            else:
+                source = _stream(args.input, sys.stdin)
+                rows = await copy_in(conn, table, source, copy_format)
+    finally:
+        await shards.dispose()
+    return rows
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    for name, help_text in (("export", "COPY a table out"), ("import", "COPY a dump in")):
+        command = commands.add_parser(name, help=help_text)
+        command.add_argument("table", choices=list(BULK_TABLES))
+        command.add_argument(
+            "--format", choices=[f.value for f in CopyFormat], default=CopyFormat.BINARY.value
+        )
+        command.add_argument("--shard", default="main", help="Shard name (default: main)")
+        if name == "export":
+            command.add_argument("-o", "--output", help="Output file (default: stdout)")
+            command.add_argument(
+                "--since", type=_since, help="Only rows with created_at >= this ISO date"
+            )
+        else:
+            command.add_argument("-i", "--input", help="Dump file (default: stdin)")
+
+    return parser
+
+
+def main() -> None:
+    args = build_parser().parse_args()
+    # stdout может быть занят дампом — лог только в stderr
+    logging.basicConfig(level=logging.INFO, stream=sys.stderr)
+
+    rows = asyncio.run(run(args))
+    verb = "Exported" if args.command == "export" else "Imported"
+    logger.info("%s %d %s rows (%s)", verb, rows, args.table, args.format)
+
+
+if __name__ == "__main__":
+    main()
@@ -21,9 +21,32 @@ if config.config_file_name is not None:
 from app.core.models.base import Base
 from app.core.models.user import User
 from app.core.models.message import Message
+from app.core.models.message_daily_stats import MessageDailyStats
+from app.core.models.purge_job import PurgeJob
+from app.core.models.archive_volume import ArchiveVolume
+from app.infrastructure.database.partitions import parse_partition_name
 
 target_metadata = Base.metadata
 
+# Объекты полнотекстового поиска создаются DDL вне ORM-модели —
+# autogenerate не должен предлагать их удалить
+UNMANAGED_OBJECTS = {
+    "content_tsv",
+    "ix_messages_user_id_content_tsv",
+    "ix_messages_user_id_content_trgm",
+    "messages_fts",
+}
+
+
+def include_object(object, name, type_, reflected, compare_to):
+    if reflected and compare_to is None:
+        if name in UNMANAGED_OBJECTS:
+            return False
+        # Месячные партиции messages создаёт PartitionManager
+        if type_ == "table" and parse_partition_name("messages", name):
+            return False
+    return True
+
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
 # my_important_option = config.get_main_option("my_important_option")
@@ -46,6 +69,7 @@ def run_migrations_offline() -> None:
     context.configure(
         url=url,
         target_metadata=target_metadata,
+        include_object=include_object,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
     )
@@ -68,7 +92,11 @@ def run_migrations_online() -> None:
     )
 
     with connectable.connect() as connection:
-        context.configure(connection=connection, target_metadata=target_metadata)
+        context.configure(
+            connection=connection,
+            target_metadata=target_metadata,
+            include_object=include_object,
+        )
 
         with context.begin_transaction():
             context.run_migrations()
@@ -0,0 +1,115 @@
+"""Partition messages by month on created_at
+
+Revision ID: 352c537e085f
+Revises: d39e0f6f739f
+Create Date: 2026-10-19 14:02:51.604117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '352c537e085f'
+down_revision: Union[str, Sequence[str], None] = 'd39e0f6f739f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Сколько будущих месяцев создаётся сразу (дальше — PartitionManager)
+MONTHS_AHEAD = 3
+
+_COLUMNS = "user_id, role, content, ai_metadata, id, created_at"
+
+_INDEXES = [
+    "CREATE INDEX ix_messages_user_id_created_at_id "
+    "ON messages (user_id, created_at DESC, id DESC)",
+    "CREATE INDEX ix_messages_user_id_role_created_at "
+    "ON messages (user_id, role, created_at)",
+    "CREATE INDEX ix_messages_user_id_content_tsv "
+    "ON messages USING gin (user_id, content_tsv)",
+    "CREATE INDEX ix_messages_user_id_content_trgm "
+    "ON messages USING gin (user_id, content gin_trgm_ops)",
+]
+
+
+def _create_messages_table(partitioned: bool) -> None:
+    # Первичный ключ партиционированной таблицы обязан включать created_at
+    primary_key = "id, created_at" if partitioned else "id"
+    partition_by = " PARTITION BY RANGE (created_at)" if partitioned else ""
+    op.execute(
+        f"""
+        CREATE TABLE messages (
+            user_id integer NOT NULL,
+            role messagerole NOT NULL,
+            content varchar(1000) NOT NULL,
+            ai_metadata json,
+            id integer NOT NULL DEFAULT nextval('messages_id_seq'),
+            created_at timestamptz NOT NULL DEFAULT now(),
+            content_tsv tsvector
+                GENERATED ALWAYS AS (to_tsvector('simple', content)) STORED,
+            CONSTRAINT pk_messages PRIMARY KEY ({primary_key}),
+            CONSTRAINT fk_messages_user_id_users
+                FOREIGN KEY (user_id) REFERENCES users (id)
+        ){partition_by}
+        """
+    )
+
+
+def _swap_in_new_table(old_name: str, partitioned: bool) -> None:
+    op.execute(f"ALTER TABLE messages RENAME TO {old_name}")
+    op.execute(f"ALTER TABLE {old_name} RENAME CONSTRAINT pk_messages TO pk_{old_name}")
+
+    _create_messages_table(partitioned)
+
+    if partitioned:
+        # Месяцы от самого старого сообщения до текущего + MONTHS_AHEAD
+        op.execute(
+            f"""
+            DO $$
+            DECLARE
+                cur_month timestamptz := date_trunc(
+                    'month', coalesce((SELECT min(created_at) FROM {old_name}), now())
+                );
+                last_month timestamptz := date_trunc('month', now())
+                    + interval '{MONTHS_AHEAD} months';
+            BEGIN
+                WHILE cur_month <= last_month LOOP
+                    EXECUTE format(
+                        'CREATE TABLE %I PARTITION OF messages FOR VALUES FROM (%L) TO (%L)',
+                        'messages_p' || to_char(cur_month, 'YYYYMM'),
+                        cur_month,
+                        cur_month + interval '1 month'
+                    );
+                    cur_month := cur_month + interval '1 month';
+                END LOOP;
+            END $$
+            """
+        )
+
+    op.execute(
+        f"INSERT INTO messages ({_COLUMNS}) SELECT {_COLUMNS} FROM {old_name}"
+    )
+    # Иначе DROP старой таблицы унесёт и последовательность id
+    op.execute("ALTER SEQUENCE messages_id_seq OWNED BY messages.id")
+    op.execute(f"DROP TABLE {old_name}")
+
+    # Индексы на родителе создаются во всех партициях (в т.ч. будущих)
+    for statement in _INDEXES:
+        op.execute(statement)
+    op.execute("ANALYZE messages")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Таблица копируется целиком под ACCESS EXCLUSIVE — запускать в окно
+    # обслуживания с остановленным ботом. Границы месяцев считаются в UTC.
+    op.execute("SET LOCAL TimeZone = 'UTC'")
+    _swap_in_new_table("messages_unpartitioned", partitioned=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("SET LOCAL TimeZone = 'UTC'")
+    _swap_in_new_table("messages_partitioned", partitioned=False)
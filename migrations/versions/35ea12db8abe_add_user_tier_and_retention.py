@@ -0,0 +1,43 @@
+"""Add user tier and retention policy
+
+Revision ID: 35ea12db8abe
+Revises: db5f63701fef
+Create Date: 2026-10-19 16:40:12.905316
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '35ea12db8abe'
+down_revision: Union[str, Sequence[str], None] = 'db5f63701fef'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+user_tier = sa.Enum('STANDARD', 'PREMIUM', name='usertier')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    user_tier.create(op.get_bind(), checkfirst=True)
+    # Константный DEFAULT не переписывает таблицу (PostgreSQL 11+)
+    op.add_column(
+        'users',
+        sa.Column('tier', user_tier, server_default='STANDARD', nullable=False),
+    )
+    op.add_column('users', sa.Column('retention_days', sa.Integer(), nullable=True))
+    op.add_column(
+        'purge_jobs',
+        sa.Column('policy', sa.Boolean(), server_default=sa.false(), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('purge_jobs', 'policy')
+    op.drop_column('users', 'retention_days')
+    op.drop_column('users', 'tier')
+    user_tier.drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,72 @@
+"""Add composite (user_id, created_at) indexes on messages
+
+Revision ID: 4163746b6b60
+Revises: 7cda1121d3ed
+Create Date: 2026-10-19 11:03:27.540913
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4163746b6b60'
+down_revision: Union[str, Sequence[str], None] = '7cda1121d3ed'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CREATE INDEX CONCURRENTLY не может выполняться внутри транзакции
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_messages_user_id_created_at_id',
+            'messages',
+            ['user_id', sa.text('created_at DESC'), sa.text('id DESC')],
+            unique=False,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.create_index(
+            'ix_messages_user_id_role_created_at',
+            'messages',
+            ['user_id', 'role', 'created_at'],
+            unique=False,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        # Покрывается ведущим столбцом составных индексов
+        op.drop_index(
+            'ix_messages_user_id',
+            table_name='messages',
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_messages_user_id',
+            'messages',
+            ['user_id'],
+            unique=False,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.drop_index(
+            'ix_messages_user_id_role_created_at',
+            table_name='messages',
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+        op.drop_index(
+            'ix_messages_user_id_created_at_id',
+            table_name='messages',
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
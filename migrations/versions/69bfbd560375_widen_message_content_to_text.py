@@ -0,0 +1,83 @@
+"""Widen messages.content to text with lz4 TOAST compression
+
+Revision ID: 69bfbd560375
+Revises: fb9b20810ed8
+Create Date: 2026-10-19 20:14:05.771930
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '69bfbd560375'
+down_revision: Union[str, Sequence[str], None] = 'fb9b20810ed8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+_CONTENT_TSV = (
+    "ALTER TABLE messages ADD COLUMN content_tsv tsvector "
+    "GENERATED ALWAYS AS (to_tsvector('simple', content)) STORED"
+)
+
+
+def _create_tsv_index() -> None:
+    # messages партиционирована (352c537e085f): CREATE INDEX CONCURRENTLY на
+    # партиционированной таблице не поддерживается. Обычный индекс на родителе
+    # создаётся и на всех партициях; таблица и так под ACCESS EXCLUSIVE
+    op.create_index(
+        'ix_messages_user_id_content_tsv',
+        'messages',
+        ['user_id', 'content_tsv'],
+        unique=False,
+        postgresql_using='gin',
+        if_not_exists=True,
+    )
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Тип колонки, от которой зависит сгенерированная content_tsv, менять
+    # нельзя: content_tsv (вместе с её GIN-индексом) пересоздаётся. Это
+    # перезаписывает таблицу под ACCESS EXCLUSIVE — запускать в окно
+    # обслуживания. varchar -> text сам по себе таблицу не переписывает.
+    op.execute("ALTER TABLE messages DROP COLUMN IF EXISTS content_tsv")
+    op.alter_column(
+        'messages',
+        'content',
+        existing_type=sa.String(length=1000),
+        type_=sa.Text(),
+        existing_nullable=False,
+    )
+    # Длинные ответы сжимает сам PostgreSQL (TOAST, от ~2 КБ): полный текст
+    # остаётся в content и виден поиску. lz4 (PostgreSQL 14+) распаковывается
+    # быстрее pglz по умолчанию, если сервер собран с ним; действует для новых значений
+    if op.get_bind().dialect.server_version_info >= (14,):
+        op.execute(
+            """
+            DO $$ BEGIN
+                ALTER TABLE messages ALTER COLUMN content SET COMPRESSION lz4;
+            EXCEPTION WHEN feature_not_supported THEN NULL;
+            END $$
+            """
+        )
+    op.execute(_CONTENT_TSV)
+    _create_tsv_index()
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Сообщения длиннее 1000 символов обрезаются
+    op.execute("ALTER TABLE messages DROP COLUMN IF EXISTS content_tsv")
+    op.alter_column(
+        'messages',
+        'content',
+        existing_type=sa.Text(),
+        type_=sa.String(length=1000),
+        existing_nullable=False,
+        postgresql_using='left(content, 1000)',
+    )
+    op.execute(_CONTENT_TSV)
+    _create_tsv_index()
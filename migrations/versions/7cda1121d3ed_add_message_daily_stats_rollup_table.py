@@ -0,0 +1,58 @@
+"""Add message_daily_stats rollup table
+
+Revision ID: 7cda1121d3ed
+Revises: d12ca9473fac
+Create Date: 2026-10-19 10:12:41.118204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7cda1121d3ed'
+down_revision: Union[str, Sequence[str], None] = 'd12ca9473fac'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'message_daily_stats',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('user_msgs', sa.Integer(), nullable=False),
+        sa.Column('assistant_msgs', sa.Integer(), nullable=False),
+        sa.Column('tokens_in', sa.Integer(), nullable=False),
+        sa.Column('tokens_out', sa.Integer(), nullable=False),
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], name=op.f('fk_message_daily_stats_user_id_users')),
+        sa.PrimaryKeyConstraint('id', name=op.f('pk_message_daily_stats')),
+        sa.UniqueConstraint('user_id', 'day', name=op.f('uq_message_daily_stats_user_id')),
+    )
+
+    # Backfill from existing history (token usage was not recorded before)
+    op.execute(
+        """
+        INSERT INTO message_daily_stats
+            (user_id, day, user_msgs, assistant_msgs, tokens_in, tokens_out)
+        SELECT
+            user_id,
+            (created_at AT TIME ZONE 'UTC')::date,
+            count(*) FILTER (WHERE role = 'USER'),
+            count(*) FILTER (WHERE role = 'ASSISTANT'),
+            0,
+            0
+        FROM messages
+        GROUP BY user_id, (created_at AT TIME ZONE 'UTC')::date
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('message_daily_stats')
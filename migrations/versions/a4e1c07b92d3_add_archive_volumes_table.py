@@ -0,0 +1,34 @@
+"""Add archive_volumes table
+
+Revision ID: a4e1c07b92d3
+Revises: 69bfbd560375
+Create Date: 2026-10-19 22:41:37.204518
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4e1c07b92d3'
+down_revision: Union[str, Sequence[str], None] = '69bfbd560375'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'archive_volumes',
+        sa.Column('volume_id', sa.String(length=36), nullable=False),
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.PrimaryKeyConstraint('id', name=op.f('pk_archive_volumes')),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('archive_volumes')
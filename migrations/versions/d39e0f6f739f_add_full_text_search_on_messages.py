@@ -0,0 +1,68 @@
+"""Add full-text search on messages
+
+Revision ID: d39e0f6f739f
+Revises: 4163746b6b60
+Create Date: 2026-10-19 12:07:44.363922
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd39e0f6f739f'
+down_revision: Union[str, Sequence[str], None] = '4163746b6b60'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.execute("CREATE EXTENSION IF NOT EXISTS btree_gin")
+
+    # STORED-колонка перезаписывает таблицу под ACCESS EXCLUSIVE — запускать в окно обслуживания
+    op.execute(
+        "ALTER TABLE messages ADD COLUMN IF NOT EXISTS content_tsv tsvector "
+        "GENERATED ALWAYS AS (to_tsvector('simple', content)) STORED"
+    )
+
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_messages_user_id_content_tsv',
+            'messages',
+            ['user_id', 'content_tsv'],
+            unique=False,
+            postgresql_using='gin',
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.create_index(
+            'ix_messages_user_id_content_trgm',
+            'messages',
+            ['user_id', sa.text('content gin_trgm_ops')],
+            unique=False,
+            postgresql_using='gin',
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_messages_user_id_content_trgm',
+            table_name='messages',
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+        op.drop_index(
+            'ix_messages_user_id_content_tsv',
+            table_name='messages',
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+    op.drop_column('messages', 'content_tsv')
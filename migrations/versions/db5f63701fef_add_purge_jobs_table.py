@@ -0,0 +1,51 @@
+"""Add purge_jobs table
+
+Revision ID: db5f63701fef
+Revises: 352c537e085f
+Create Date: 2026-10-19 15:21:08.412730
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'db5f63701fef'
+down_revision: Union[str, Sequence[str], None] = '352c537e085f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'purge_jobs',
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.Column('before', sa.DateTime(timezone=True), nullable=True),
+        sa.Column(
+            'status',
+            sa.Enum('PENDING', 'RUNNING', 'COMPLETED', 'FAILED', name='purgestatus'),
+            nullable=False,
+        ),
+        sa.Column('total', sa.Integer(), nullable=False),
+        sa.Column('deleted', sa.Integer(), nullable=False),
+        sa.Column('last_user_id', sa.Integer(), nullable=True),
+        sa.Column('error', sa.String(length=500), nullable=True),
+        sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], name=op.f('fk_purge_jobs_user_id_users')),
+        sa.PrimaryKeyConstraint('id', name=op.f('pk_purge_jobs')),
+    )
+    op.create_index(op.f('ix_purge_jobs_status'), 'purge_jobs', ['status'], unique=False)
+    op.create_index(op.f('ix_purge_jobs_user_id'), 'purge_jobs', ['user_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_purge_jobs_user_id'), table_name='purge_jobs')
+    op.drop_index(op.f('ix_purge_jobs_status'), table_name='purge_jobs')
+    op.drop_table('purge_jobs')
+    sa.Enum(name='purgestatus').drop(op.get_bind(), checkfirst=True)
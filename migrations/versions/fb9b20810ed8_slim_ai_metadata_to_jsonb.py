@@ -0,0 +1,57 @@
+"""Store slimmed ai_metadata as jsonb
+
+Revision ID: fb9b20810ed8
+Revises: 35ea12db8abe
+Create Date: 2026-10-19 19:02:47.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'fb9b20810ed8'
+down_revision: Union[str, Sequence[str], None] = '35ea12db8abe'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Смена типа всё равно переписывает таблицу (все партиции), поэтому
+    # урезание до slim_ai_metadata делается тем же проходом: без копии
+    # content и сырого usage, JSON null -> SQL NULL
+    op.execute(
+        """
+        ALTER TABLE messages ALTER COLUMN ai_metadata TYPE jsonb USING (
+            CASE WHEN json_typeof(ai_metadata) = 'object' THEN
+                NULLIF(
+                    jsonb_strip_nulls(
+                        jsonb_build_object(
+                            'model', ai_metadata::jsonb -> 'model',
+                            'token_usage', ai_metadata::jsonb -> 'token_usage',
+                            'finish_reason', COALESCE(
+                                ai_metadata::jsonb -> 'finish_reason',
+                                ai_metadata::jsonb #> '{usage,finish_reason}'
+                            )
+                        )
+                    ),
+                    '{}'::jsonb
+                )
+            END
+        )
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Удалённые поля (content, usage) не восстанавливаются
+    op.alter_column(
+        'messages',
+        'ai_metadata',
+        type_=sa.JSON(),
+        postgresql_using='ai_metadata::json',
+    )
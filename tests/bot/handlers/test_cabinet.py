@@ -0,0 +1,298 @@
+import inspect
+import pytest
+import pytest_asyncio
+from datetime import datetime, timedelta, timezone
+from unittest.mock import AsyncMock, Mock
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.storage.base import StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+from aiogram.types import CallbackQuery, Message as TelegramMessage, User as TelegramUser
+from app.bot.handlers import cabinet
+from app.config.settings import settings
+from app.core.models.message import MessageRole
+from app.core.schemas.user import UserIdentity
+from app.core.services.cabinet_service import CabinetService
+from app.core.services.container import Container
+from app.core.services.export_jobs import ExportJobManager
+from app.core.services.purge_service import PurgeJobManager, PurgeService
+from app.infrastructure.database.repositories.message_repository import MessageRepository
+from app.infrastructure.database.repositories.user_repository import UserRepository
+
+
+TELEGRAM_ID = 123456789
+
+
+class TestCabinetHandlersQueryBudget:
+    """Each cabinet screen must stay within its SQL query budget"""
+
+    @pytest_asyncio.fixture
+    async def user_with_history(self, async_session):
+        user = await UserRepository(async_session).create(
+            telegram_id=TELEGRAM_ID, first_name="Test User", username="test_user"
+        )
+        message_repo = MessageRepository(async_session)
+        for i in range(6):
+            await message_repo.create_message(
+                user_id=user.id,
+                role=MessageRole.USER if i % 2 == 0 else MessageRole.ASSISTANT,
+                content=f"Message {i}",
+            )
+        return user
+
+    @pytest_asyncio.fixture
+    async def container(self, async_session):
+        container = Mock(spec=Container)
+        container.get_cabinet_service.side_effect = lambda: CabinetService(async_session)
+        container.export_jobs = ExportJobManager()
+        container.get_purge_service.side_effect = lambda: PurgeService(async_session, pause=0)
+        container.purge_jobs = PurgeJobManager()
+        return container
+
+    @pytest_asyncio.fixture
+    async def callback(self):
+        callback = Mock(spec=CallbackQuery)
+        callback.from_user = Mock(spec=TelegramUser)
+        callback.from_user.id = TELEGRAM_ID
+        callback.data = "history_recent"
+        callback.message = Mock(spec=TelegramMessage)
+        callback.message.edit_text = AsyncMock()
+        callback.message.answer_document = AsyncMock()
+        callback.answer = AsyncMock()
+        return callback
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize(
+        "handler, max_queries",
+        [
+            (cabinet.cabinet_main_menu, 0),
+            (cabinet.show_profile_info, 0),
+            (cabinet.show_daily_stats, 0),
+            (cabinet.show_weekly_stats, 1),
+            (cabinet.show_all_time_stats, 1),
+            (cabinet.show_account_info, 0),
+            (cabinet.show_usage_patterns, 2),
+            (cabinet.show_recent_messages, 2),
+        ],
+    )
+    async def test_handler_query_budget(
+        self, handler, max_queries, callback, container, user_with_history, assert_max_queries
+    ):
+        # Как aiogram: user и identity от UserMiddleware получают хендлеры,
+        # которые их объявили
+        data = {
+            "user": user_with_history,
+            "identity": UserIdentity(id=user_with_history.id, telegram_id=TELEGRAM_ID),
+        }
+        kwargs = {
+            name: value for name, value in data.items()
+            if name in inspect.signature(handler).parameters
+        }
+        with assert_max_queries(max_queries):
+            await handler(callback, container, **kwargs)
+
+        callback.message.edit_text.assert_called_once()
+        callback.answer.assert_called_once_with()
+
+    @pytest.mark.asyncio
+    async def test_export_history_query_budget(
+        self, callback, container, user_with_history, assert_max_queries
+    ):
+        callback.data = "confirm_export_jsonl_gz"
+        # Обработчик отвечает сразу, экспорт идёт фоновой задачей, запросы
+        # которой в бюджет апдейта не входят
+        with assert_max_queries(0):
+            await cabinet.export_history(callback, container, user_with_history)
+            callback.answer.assert_called_once_with("Export started")
+            await container.export_jobs.shutdown(timeout=5)
+
+        callback.message.answer_document.assert_called_once()
+        document = callback.message.answer_document.call_args.kwargs["document"]
+        assert document.filename == f"message_history_{TELEGRAM_ID}.jsonl.gz"
+        # Временный файл закрывается после отправки
+        assert document.file.closed
+
+    @pytest.mark.asyncio
+    async def test_export_reports_progress_and_rejects_second_export(
+        self, callback, container, user_with_history, monkeypatch
+    ):
+        monkeypatch.setattr(settings, "EXPORT_BATCH_SIZE", 2)
+        monkeypatch.setattr(settings, "EXPORT_PROGRESS_INTERVAL", 0)
+        callback.data = "confirm_export_txt"
+
+        await cabinet.export_history(callback, container, user_with_history)
+        await cabinet.export_history(callback, container, user_with_history)
+
+        assert callback.answer.call_args_list[-1].args == ("An export is already running, please wait",)
+        await container.export_jobs.shutdown(timeout=5)
+
+        texts = [call.args[0] for call in callback.message.edit_text.call_args_list]
+        assert "Export Queued" in texts[0]
+        assert any("2 / 6 messages" in text for text in texts)
+        assert "6 messages in 1 file" in texts[-1]
+        assert not container.export_jobs.is_running(TELEGRAM_ID)
+
+    @pytest.mark.asyncio
+    async def test_clear_history_query_budget(
+        self, callback, container, user_with_history, assert_max_queries
+    ):
+        # Пользователь, незавершённая задача, подсчёт и создание задачи;
+        # само удаление идёт фоновой задачей вне бюджета апдейта
+        with assert_max_queries(4):
+            await cabinet.clear_history(callback, container)
+            callback.answer.assert_called_once_with("Clearing history...")
+            await container.purge_jobs.shutdown(timeout=5)
+
+        texts = [call.args[0] for call in callback.message.edit_text.call_args_list]
+        assert "0 / 6 messages deleted" in texts[0]
+        assert "Successfully deleted 6 messages" in texts[-1]
+
+    @pytest_asyncio.fixture
+    async def user_with_timeline(self, async_session):
+        # Явные created_at: server_default в SQLite хранится без микросекунд,
+        # и сравнение строк с курсором было бы неточным
+        user = await UserRepository(async_session).create(
+            telegram_id=TELEGRAM_ID, first_name="Test User", username="test_user"
+        )
+        message_repo = MessageRepository(async_session)
+        base = datetime(2026, 1, 1, tzinfo=timezone.utc)
+        for i in range(6):
+            await message_repo.create(
+                user_id=user.id,
+                role=MessageRole.USER,
+                content=f"Message {i}",
+                created_at=base + timedelta(minutes=i),
+            )
+        return user
+
+    @pytest.mark.asyncio
+    async def test_message_pages_follow_cursor(
+        self, callback, container, user_with_timeline, assert_max_queries
+    ):
+        identity = UserIdentity(id=user_with_timeline.id, telegram_id=TELEGRAM_ID)
+        await cabinet.show_recent_messages(callback, container, identity)
+        next_button = self._button(callback, "➡️ Next")
+        assert len(next_button.callback_data.encode()) <= 64
+
+        callback.data = next_button.callback_data
+        # Общее число сообщений берётся из кэша, id пользователя — из identity
+        with assert_max_queries(1):
+            await cabinet.show_messages_page_handler(callback, container, identity)
+
+        text = callback.message.edit_text.call_args.args[0]
+        assert "Showing 6-6 of 6 messages" in text
+        assert "Message 0" in text
+        previous_button = self._button(callback, "⬅️ Previous")
+        assert previous_button.callback_data.startswith("history_recent_newer_1_")
+
+    @pytest.mark.asyncio
+    async def test_malformed_cursor(self, callback, container, user_with_history):
+        callback.data = "history_recent_older_2_not-a-cursor"
+        identity = UserIdentity(id=user_with_history.id, telegram_id=TELEGRAM_ID)
+
+        await cabinet.show_messages_page_handler(callback, container, identity)
+
+        callback.answer.assert_called_once_with("Error loading messages", show_alert=True)
+
+    @staticmethod
+    def _button(callback, text):
+        markup = callback.message.edit_text.call_args.kwargs["reply_markup"]
+        return next(
+            button for row in markup.inline_keyboard for button in row if button.text == text
+        )
+
+
+class TestCabinetSearchFlow:
+    @pytest_asyncio.fixture
+    async def user(self, async_session):
+        return await UserRepository(async_session).create(
+            telegram_id=TELEGRAM_ID, first_name="Test User", username="test_user"
+        )
+
+    @pytest.fixture
+    def identity(self, user):
+        return UserIdentity(id=user.id, telegram_id=TELEGRAM_ID)
+
+    @pytest_asyncio.fixture
+    async def container(self, async_session, user):
+        message_repo = MessageRepository(async_session)
+        for i in range(7):
+            await message_repo.create_message(
+                user_id=user.id, role=MessageRole.USER, content=f"Trip <plan> {i}"
+            )
+
+        container = Mock(spec=Container)
+        container.get_cabinet_service.side_effect = lambda: CabinetService(async_session)
+        return container
+
+    @pytest.fixture
+    def state(self):
+        return FSMContext(
+            storage=MemoryStorage(),
+            key=StorageKey(bot_id=1, chat_id=TELEGRAM_ID, user_id=TELEGRAM_ID),
+        )
+
+    @pytest.fixture
+    def message(self):
+        message = Mock(spec=TelegramMessage)
+        message.from_user = Mock(spec=TelegramUser)
+        message.from_user.id = TELEGRAM_ID
+        message.answer = AsyncMock()
+        return message
+
+    @pytest.fixture
+    def callback(self):
+        callback = Mock(spec=CallbackQuery)
+        callback.from_user = Mock(spec=TelegramUser)
+        callback.from_user.id = TELEGRAM_ID
+        callback.message = Mock(spec=TelegramMessage)
+        callback.message.edit_text = AsyncMock()
+        callback.answer = AsyncMock()
+        return callback
+
+    @pytest.mark.asyncio
+    async def test_search_flow(
+        self, callback, message, state, container, identity, assert_max_queries
+    ):
+        await cabinet.start_history_search(callback, state)
+        assert await state.get_state() == cabinet.HistorySearch.waiting_for_query.state
+
+        message.text = "trip"
+        with assert_max_queries(1):
+            await cabinet.handle_search_query(message, state, container, identity)
+
+        assert await state.get_state() is None
+        text = message.answer.call_args.args[0]
+        assert "<b>Trip</b> &lt;plan&gt; 6" in text
+        markup = message.answer.call_args.kwargs["reply_markup"]
+        next_button = next(
+            button for row in markup.inline_keyboard for button in row if button.text == "➡️ Next"
+        )
+        assert len(next_button.callback_data.encode()) <= 64
+
+        callback.data = next_button.callback_data
+        await cabinet.show_search_page(callback, state, container, identity)
+
+        text = callback.message.edit_text.call_args.args[0]
+        assert "page 2" in text
+        assert "Trip</b> &lt;plan&gt; 1" in text
+        callback.answer.assert_called_with()
+
+    @pytest.mark.asyncio
+    async def test_short_query_asks_again(self, message, state, container, identity):
+        await state.set_state(cabinet.HistorySearch.waiting_for_query)
+        message.text = "ab"
+
+        await cabinet.handle_search_query(message, state, container, identity)
+
+        assert await state.get_state() == cabinet.HistorySearch.waiting_for_query.state
+        assert "Search History" in message.answer.call_args.args[0]
+
+    @pytest.mark.asyncio
+    async def test_page_without_saved_query(self, callback, state, container, identity):
+        callback.data = "history_search_older_2_0.1"
+
+        await cabinet.show_search_page(callback, state, container, identity)
+
+        callback.answer.assert_called_once_with(
+            "Search expired, please start a new one", show_alert=True
+        )
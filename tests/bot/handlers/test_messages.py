@@ -76,7 +76,8 @@ class TestMessagesHandler:
         # Should be called twice - user message and AI response
         assert message_service.create_message.call_count == 2
         message_service.get_conversation_context.assert_called_once_with(
-            telegram_id=mock_user.telegram_id
+            telegram_id=mock_user.telegram_id,
+            user_id=mock_user.id,
         )
         user_service.process_user_request.assert_called_once_with(
             telegram_id=mock_user.telegram_id,
@@ -127,6 +128,7 @@ class TestMessagesHandler:
         message_service = await mock_container.get_message_service()
         message_service.create_message.assert_any_call(
             telegram_id=mock_user.telegram_id,
+            user_id=mock_user.id,
             role=MessageRole.USER,
             content="Hello, bot!"
         )
@@ -145,6 +147,7 @@ class TestMessagesHandler:
         # Check AI response call
         ai_response_call = message_service.create_message.call_args_list[1]
         assert ai_response_call[1]['telegram_id'] == mock_user.telegram_id
+        assert ai_response_call[1]['user_id'] == mock_user.id
         assert ai_response_call[1]['role'] == MessageRole.ASSISTANT
         assert ai_response_call[1]['content'] == "AI response to your message"
         assert 'ai_metadata' in ai_response_call[1]
@@ -163,7 +166,8 @@ class TestMessagesHandler:
         
         # Assert - context is retrieved and passed to AI
         message_service.get_conversation_context.assert_called_once_with(
-            telegram_id=mock_user.telegram_id
+            telegram_id=mock_user.telegram_id,
+            user_id=mock_user.id,
         )
         mock_container.conversation_ai.agenerate.assert_called_once_with(context_messages)
 
@@ -0,0 +1,51 @@
+import pytest
+from unittest.mock import AsyncMock, Mock
+from app.bot.middlewares.metrics_middleware import MetricsMiddleware
+from app.infrastructure.monitoring.metrics import REGISTRY
+
+
+def handler_count(name, status):
+    return REGISTRY.get_sample_value(
+        "textflow_handler_duration_seconds_count", {"handler": name, "status": status}
+    ) or 0.0
+
+
+async def some_handler():
+    pass
+
+
+class TestMetricsMiddleware:
+    @pytest.mark.asyncio
+    async def test_observes_handler_latency(self):
+        middleware = MetricsMiddleware()
+        handler = AsyncMock(return_value="result")
+        data = {"handler": Mock(callback=some_handler)}
+        before = handler_count("some_handler", "ok")
+
+        result = await middleware(handler, Mock(), data)
+
+        assert result == "result"
+        handler.assert_called_once()
+        assert handler_count("some_handler", "ok") == before + 1
+
+    @pytest.mark.asyncio
+    async def test_observes_errors(self):
+        middleware = MetricsMiddleware()
+        handler = AsyncMock(side_effect=RuntimeError("boom"))
+        data = {"handler": Mock(callback=some_handler)}
+        before = handler_count("some_handler", "error")
+
+        with pytest.raises(RuntimeError):
+            await middleware(handler, Mock(), data)
+
+        assert handler_count("some_handler", "error") == before + 1
+
+    @pytest.mark.asyncio
+    async def test_without_handler_object(self):
+        middleware = MetricsMiddleware()
+        handler = AsyncMock()
+        before = handler_count("unknown", "ok")
+
+        await middleware(handler, Mock(), {})
+
+        assert handler_count("unknown", "ok") == before + 1
@@ -0,0 +1,76 @@
+import logging
+import pytest
+from unittest.mock import Mock
+from sqlalchemy import text
+from app.bot.middlewares.query_budget_middleware import QueryBudgetMiddleware
+from app.infrastructure.database.query_budget import install_query_tracker, normalize_statement
+
+
+class TestQueryBudgetMiddleware:
+    @pytest.mark.asyncio
+    async def test_within_budget_does_not_warn(self, async_engine, async_session, caplog):
+        install_query_tracker(async_engine.sync_engine)
+        middleware = QueryBudgetMiddleware(budget=2, repeat_threshold=3)
+
+        async def handler(event, data):
+            await async_session.execute(text("SELECT 1"))
+            return "done"
+
+        with caplog.at_level(logging.WARNING):
+            result = await middleware(handler, Mock(update_id=1), {})
+
+        assert result == "done"
+        assert caplog.records == []
+
+    @pytest.mark.asyncio
+    async def test_over_budget_logs_statements(self, async_engine, async_session, caplog):
+        install_query_tracker(async_engine.sync_engine)
+        middleware = QueryBudgetMiddleware(budget=1, repeat_threshold=10)
+
+        async def handler(event, data):
+            await async_session.execute(text("SELECT 1"))
+            await async_session.execute(text("SELECT 'other'"))
+
+        with caplog.at_level(logging.WARNING):
+            await middleware(handler, Mock(update_id=42), {})
+
+        assert len(caplog.records) == 1
+        message = caplog.records[0].getMessage()
+        assert "Update 42 exceeded query budget (2 > 1)" in message
+        assert "SELECT ?" in message
+
+    @pytest.mark.asyncio
+    async def test_repeated_statements_flagged_as_n_plus_one(self, async_engine, async_session, caplog):
+        install_query_tracker(async_engine.sync_engine)
+        middleware = QueryBudgetMiddleware(budget=100, repeat_threshold=3)
+
+        async def handler(event, data):
+            for user_id in range(3):
+                await async_session.execute(
+                    text(f"SELECT * FROM users WHERE id = {user_id}")
+                )
+
+        with caplog.at_level(logging.WARNING):
+            await middleware(handler, Mock(update_id=7), {})
+
+        assert len(caplog.records) == 1
+        assert "possible N+1, statement executed 3 times" in caplog.records[0].getMessage()
+
+    @pytest.mark.asyncio
+    async def test_queries_counted_even_when_handler_fails(self, async_engine, async_session, caplog):
+        install_query_tracker(async_engine.sync_engine)
+        middleware = QueryBudgetMiddleware(budget=0, repeat_threshold=3)
+
+        async def handler(event, data):
+            await async_session.execute(text("SELECT 1"))
+            raise RuntimeError("boom")
+
+        with caplog.at_level(logging.WARNING), pytest.raises(RuntimeError):
+            await middleware(handler, Mock(update_id=3), {})
+
+        assert "exceeded query budget (1 > 0)" in caplog.records[0].getMessage()
+
+    def test_normalize_statement(self):
+        assert normalize_statement("SELECT  *\nFROM t WHERE id = 5 AND name = 'x'") == (
+            "SELECT * FROM t WHERE id = ? AND name = ?"
+        )
@@ -0,0 +1,32 @@
+import pytest
+from unittest.mock import Mock
+from app.bot.middlewares.shard_middleware import ShardMiddleware
+from app.infrastructure.database.sharding import ShardMap, ShardRegistry, bucket_of, current_shard
+
+
+class TestShardMiddleware:
+    @pytest.fixture
+    def registry(self):
+        return ShardRegistry({"main": Mock(), "b": Mock()}, ShardMap(["main", "b"], buckets=2))
+
+    @pytest.mark.asyncio
+    async def test_handler_runs_on_users_shard(self, registry):
+        middleware = ShardMiddleware(registry)
+        telegram_id = next(i for i in range(1, 100) if bucket_of(i, 2) == 1)
+
+        async def handler(event, data):
+            return current_shard().name
+
+        result = await middleware(handler, Mock(), {"event_from_user": Mock(id=telegram_id)})
+
+        assert result == "b"
+        assert current_shard() is None
+
+    @pytest.mark.asyncio
+    async def test_update_without_user_is_not_routed(self, registry):
+        middleware = ShardMiddleware(registry)
+
+        async def handler(event, data):
+            return current_shard()
+
+        assert await middleware(handler, Mock(), {}) is None
@@ -5,6 +5,7 @@ from aiogram.types import Message as TelegramMessage, User as TelegramUser
 from app.bot.middlewares.user_middleware import UserMiddleware
 from app.core.services.container import Container
 from app.core.models.user import User
+from app.core.schemas.user import UserIdentity
 
 
 class TestUserMiddleware:
@@ -82,6 +83,29 @@ class TestUserMiddleware:
         # Verify handler is called
         mock_handler.assert_called_once_with(mock_event_with_user, data)
 
+    @pytest.mark.asyncio
+    async def test_middleware_passes_identity_to_handler(self, mock_container, mock_event_with_user):
+        # Setup
+        middleware = UserMiddleware(mock_container)
+        data = {}
+
+        mock_user = Mock(spec=User)
+        mock_user.id = 42
+        user_service = AsyncMock()
+        user_service.handle_new_user.return_value = mock_user
+        mock_container.get_user_service.return_value = user_service
+
+        seen = []
+
+        async def handler(event, data):
+            seen.append(data["identity"])
+
+        # Execute
+        await middleware(handler, mock_event_with_user, data)
+
+        # Assert - handlers pass identity.id to services explicitly
+        assert seen == [UserIdentity(id=42, telegram_id=123456789)]
+
     @pytest.mark.asyncio
     async def test_middleware_without_user(self, mock_container, mock_event_without_user, mock_handler):
         # Setup
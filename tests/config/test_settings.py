@@ -0,0 +1,20 @@
+import pytest
+from pydantic import ValidationError
+
+from app.config.settings import Config
+
+
+def test_replica_is_rejected_with_shards():
+    with pytest.raises(ValidationError, match="READ_DATABASE_URL"):
+        Config(
+            DATABASE_SHARDS={"eu2": "postgresql+asyncpg://u:p@eu2/db"},
+            READ_DATABASE_URL="postgresql+asyncpg://u:p@replica/db",
+        )
+
+
+def test_empty_replica_url_is_allowed_with_shards():
+    config = Config(
+        DATABASE_SHARDS={"eu2": "postgresql+asyncpg://u:p@eu2/db"}, READ_DATABASE_URL=""
+    )
+
+    assert config.DATABASE_SHARDS
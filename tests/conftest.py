@@ -1,9 +1,20 @@
 import pytest
 import pytest_asyncio
+from contextlib import contextmanager
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.pool import StaticPool
 
 from app.core.models.base import Base
+from app.infrastructure.cache.ttl_cache import message_count_cache
+from app.infrastructure.database.query_budget import install_query_tracker, track_queries
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    """In-process кэши переживают тест, а id пользователей в новой БД повторяются"""
+    message_count_cache.clear()
+    yield
+    message_count_cache.clear()
 
 
 @pytest_asyncio.fixture
@@ -30,4 +41,24 @@ async def async_session(async_engine):
     )
     
     async with AsyncSessionLocal() as session:
-        yield session
\ No newline at end of file
+        yield session
+
+@pytest.fixture
+def assert_max_queries(async_engine):
+    """Контекстный менеджер: упасть, если блок выполнил больше N SQL-запросов
+
+    Usage:
+        with assert_max_queries(3):
+            await handler(...)
+    """
+    install_query_tracker(async_engine.sync_engine)
+
+    @contextmanager
+    def _assert_max_queries(max_queries: int):
+        with track_queries() as log:
+            yield log
+        assert log.count <= max_queries, (
+            f"Expected at most {max_queries} queries, got {log.report()}"
+        )
+
+    return _assert_max_queries
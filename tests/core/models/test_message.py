@@ -118,4 +118,4 @@ class TestMessage:
             role=MessageRole.USER,
             content="Test"
         )
-        assert message.user_id == 999
\ No newline at end of file
+        assert message.user_id == 999
@@ -94,6 +94,34 @@ class TestGoogleProvider:
                 assert result["content"] == "Default response"
                 mock_llm.ainvoke.assert_called_once_with("")
 
+    @pytest.mark.asyncio
+    async def test_agenerate_includes_token_usage(self):
+        # Setup
+        with patch('app.core.services.ai.providers.google_provider.ChatGoogleGenerativeAI') as mock_chat_ai:
+            with patch('app.core.services.ai.providers.google_provider.settings') as mock_settings:
+                mock_settings.GOOGLE_API_KEY.get_secret_value.return_value = "test-api-key"
+                
+                mock_response = Mock()
+                mock_response.content = "AI generated response"
+                mock_response.response_metadata = {}
+                mock_response.usage_metadata = {
+                    "input_tokens": 12,
+                    "output_tokens": 34,
+                    "total_tokens": 46,
+                }
+                
+                mock_llm = AsyncMock()
+                mock_llm.ainvoke.return_value = mock_response
+                mock_chat_ai.return_value = mock_llm
+                
+                provider = GoogleProvider("gemini-2.0-flash")
+                
+                # Execute
+                result = await provider.agenerate("Test prompt")
+                
+                # Assert
+                assert result["token_usage"] == {"input_tokens": 12, "output_tokens": 34}
+
     @pytest.mark.asyncio
     async def test_model_name_stored_correctly(self):
         # Setup
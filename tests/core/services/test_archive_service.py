@@ -0,0 +1,169 @@
+import json
+import pytest
+import pytest_asyncio
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+
+from app.core.exceptions.message import ArchiveNotShared
+from app.core.models.message import MessageRole
+from app.core.services import archive_service, purge_service
+from app.core.services.archive_service import ArchiveService
+from app.core.services.cabinet_service import CabinetService
+from app.core.services.history_export import ExportFormat
+from app.core.services.purge_service import PurgeService
+from app.infrastructure.archive.store import MessageArchive
+from app.infrastructure.database.repositories.message_repository import MessageRepository
+from app.infrastructure.database.repositories.user_repository import UserRepository
+
+TELEGRAM_ID = 123456789
+NOW = datetime.now(timezone.utc)
+
+
+class TestArchiveService:
+    @pytest.fixture
+    def archive(self, tmp_path):
+        return MessageArchive(str(tmp_path))
+
+    @pytest_asyncio.fixture
+    async def user(self, async_session):
+        user = await UserRepository(async_session).create(telegram_id=TELEGRAM_ID, first_name="Test")
+        repo = MessageRepository(async_session)
+        for days_ago in (200, 150, 100, 10, 1):
+            await repo.create(
+                user_id=user.id,
+                role=MessageRole.USER,
+                content=f"{days_ago} days ago",
+                created_at=NOW - timedelta(days=days_ago),
+            )
+        await async_session.commit()
+        return user
+
+    async def _export(self, async_session, archive):
+        [part] = await CabinetService(async_session, archive=archive).export_message_history(
+            TELEGRAM_ID, ExportFormat.JSONL
+        )
+        lines = part.file.read().decode("utf-8").splitlines()
+        part.close()
+        return [json.loads(line)["content"] for line in lines]
+
+    @pytest.mark.asyncio
+    async def test_old_messages_move_to_archive(self, async_session, archive, user):
+        service = ArchiveService(async_session, archive, batch_size=2)
+
+        archived = await service.archive_before(NOW - timedelta(days=90))
+
+        assert archived == 3
+        assert await MessageRepository(async_session).get_user_message_count(user.id) == 2
+        assert archive.manifest(TELEGRAM_ID).total == 3
+
+    @pytest.mark.asyncio
+    async def test_export_merges_archive_and_live(self, async_session, archive, user):
+        await ArchiveService(async_session, archive).archive_before(NOW - timedelta(days=90))
+
+        assert await self._export(async_session, archive) == [
+            "200 days ago", "150 days ago", "100 days ago", "10 days ago", "1 days ago",
+        ]
+
+    @pytest.mark.asyncio
+    async def test_rows_already_archived_are_only_deleted(self, async_session, archive, user):
+        # Сбой после записи в архив, но до DELETE
+        repo = MessageRepository(async_session)
+        rows = await repo.get_oldest_before(user.id, NOW - timedelta(days=90))
+        await archive.append(TELEGRAM_ID, rows)
+
+        archived = await ArchiveService(async_session, archive).archive_before(NOW - timedelta(days=90))
+
+        assert archived == 0
+        assert archive.manifest(TELEGRAM_ID).total == 3
+        assert await repo.get_user_message_count(user.id) == 2
+        assert len(await self._export(async_session, archive)) == 5
+
+    @pytest.mark.asyncio
+    async def test_row_older_than_archive_is_archived_not_lost(self, async_session, archive, user):
+        await ArchiveService(async_session, archive).archive_before(NOW - timedelta(days=90))
+        # Строка, появившаяся после прохода, но старше уже заархивированных
+        await MessageRepository(async_session).create(
+            user_id=user.id,
+            role=MessageRole.USER,
+            content="late import",
+            created_at=NOW - timedelta(days=175),
+        )
+        await async_session.commit()
+
+        archived = await ArchiveService(async_session, archive).archive_before(NOW - timedelta(days=90))
+
+        assert archived == 1
+        assert archive.manifest(TELEGRAM_ID).total == 4
+        assert await self._export(async_session, archive) == [
+            "200 days ago", "late import", "150 days ago", "100 days ago", "10 days ago", "1 days ago",
+        ]
+
+    @pytest.mark.asyncio
+    async def test_rows_deleted_during_batch_do_not_shift_delete(self, async_session, archive, user):
+        repo = MessageRepository(async_session)
+        append = archive.append
+
+        async def append_while_purging(telegram_id, rows):
+            written = await append(telegram_id, rows)
+            # Очистка на другой реплике удаляет часть батча до его DELETE
+            await repo.delete_messages_batch(user.id, limit=1)
+            return written
+
+        archive.append = append_while_purging
+        await ArchiveService(async_session, archive, batch_size=2).archive_before(
+            NOW - timedelta(days=90)
+        )
+
+        assert await repo.get_user_message_count(user.id) == 2
+        assert await self._export(async_session, archive) == [
+            "200 days ago", "150 days ago", "100 days ago", "10 days ago", "1 days ago",
+        ]
+
+    @pytest.mark.asyncio
+    async def test_archive_and_purge_share_user_lock(self, async_session, archive, user, monkeypatch):
+        taken = []
+
+        @asynccontextmanager
+        async def record_lock(engine, name):
+            taken.append(name)
+            yield
+
+        monkeypatch.setattr(archive_service, "advisory_lock", record_lock)
+        monkeypatch.setattr(purge_service, "advisory_lock", record_lock)
+        await ArchiveService(async_session, archive).archive_before(NOW - timedelta(days=90))
+        service = PurgeService(async_session, archive=archive)
+        await service.run(await service.create_user_purge(TELEGRAM_ID))
+
+        assert taken == [MessageArchive.lock_name(TELEGRAM_ID)] * 2
+
+    @pytest.mark.asyncio
+    async def test_clear_history_deletes_archive(self, async_session, archive, user):
+        await ArchiveService(async_session, archive).archive_before(NOW - timedelta(days=90))
+        service = PurgeService(async_session, archive=archive)
+
+        await service.run(await service.create_user_purge(TELEGRAM_ID))
+
+        assert archive.manifest(TELEGRAM_ID).total == 0
+        assert await self._export(async_session, archive) == []
+
+
+class TestSharedArchiveVolume:
+    @pytest.mark.asyncio
+    async def test_first_replica_registers_volume(self, async_session, tmp_path):
+        archive = MessageArchive(str(tmp_path))
+
+        volume_id = await ArchiveService(async_session, archive).verify_shared_volume()
+
+        assert volume_id == await archive.volume_id()
+        # Тот же каталог у второй реплики проходит проверку
+        second = ArchiveService(async_session, MessageArchive(str(tmp_path)))
+        assert await second.verify_shared_volume() == volume_id
+
+    @pytest.mark.asyncio
+    async def test_replica_with_local_directory_is_rejected(self, async_session, tmp_path):
+        await ArchiveService(async_session, MessageArchive(str(tmp_path / "shared"))).verify_shared_volume()
+
+        with pytest.raises(ArchiveNotShared):
+            await ArchiveService(
+                async_session, MessageArchive(str(tmp_path / "local"))
+            ).verify_shared_volume()
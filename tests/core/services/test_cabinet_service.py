@@ -0,0 +1,229 @@
+import json
+import pytest
+import pytest_asyncio
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import insert
+from app.config.settings import settings
+from app.core.exceptions.message import InvalidMessageData
+from app.core.models.message import Message, MessageRole
+from app.core.models.user import UserTier
+from app.core.services.cabinet_service import CabinetService
+from app.core.services.history_export import ExportFormat
+from app.infrastructure.database.repositories.message_repository import MessageRepository
+from app.infrastructure.database.repositories.user_repository import UserRepository
+
+
+TELEGRAM_ID = 123456789
+
+
+class TestCabinetService:
+    @pytest_asyncio.fixture
+    async def user(self, async_session):
+        return await UserRepository(async_session).create(
+            telegram_id=TELEGRAM_ID, first_name="Test User", username="test_user"
+        )
+
+    @pytest_asyncio.fixture
+    async def cabinet_service(self, async_session):
+        return CabinetService(async_session)
+
+    async def _add_message(self, session, user, role, created_at):
+        await MessageRepository(session).create(
+            user_id=user.id, role=role, content="msg", created_at=created_at
+        )
+
+    @pytest.mark.asyncio
+    async def test_weekly_stats_from_rollups(self, async_session, cabinet_service, user):
+        repo = MessageRepository(async_session)
+        today = datetime.now(timezone.utc).date()
+        await repo.create_message(user_id=user.id, role=MessageRole.USER, content="hi")
+        await repo.create_message(user_id=user.id, role=MessageRole.ASSISTANT, content="hello")
+        await repo.daily_stats.increment(user.id, today - timedelta(days=6), MessageRole.USER)
+        await repo.daily_stats.increment(user.id, today - timedelta(days=7), MessageRole.USER)
+
+        stats = await cabinet_service.get_weekly_stats(TELEGRAM_ID)
+
+        assert stats["total_messages"] == "3"
+        assert stats["user_requests"] == "2"
+        assert stats["ai_responses"] == "1"
+        assert stats["daily_average"] == "0.3"
+
+    @pytest.mark.asyncio
+    async def test_all_time_stats_from_rollups(self, async_session, cabinet_service, user):
+        repo = MessageRepository(async_session)
+        today = datetime.now(timezone.utc).date()
+        await repo.daily_stats.increment(user.id, today - timedelta(days=20), MessageRole.USER)
+        await repo.daily_stats.increment(user.id, today - timedelta(days=20), MessageRole.ASSISTANT)
+        await repo.daily_stats.increment(user.id, today - timedelta(days=400), MessageRole.USER)
+
+        stats = await cabinet_service.get_all_time_stats(TELEGRAM_ID)
+
+        assert stats["total_messages"] == "3"
+        assert stats["user_requests"] == "2"
+        assert stats["ai_responses"] == "1"
+        assert stats["days_registered"] == "1"
+
+    @pytest.mark.asyncio
+    async def test_stats_do_not_scan_messages(self, async_session, cabinet_service, user, assert_max_queries):
+        with assert_max_queries(2) as log:
+            await cabinet_service.get_all_time_stats(TELEGRAM_ID)
+
+        assert not any("FROM messages" in statement for statement in log.statements)
+
+    @pytest.mark.asyncio
+    async def test_usage_patterns_from_hour_histogram(self, async_session, cabinet_service, user):
+        evening = datetime.now(timezone.utc).replace(hour=20, minute=15) - timedelta(days=3)
+        morning = evening.replace(hour=8)
+        for _ in range(3):
+            await self._add_message(async_session, user, MessageRole.USER, evening)
+        await self._add_message(async_session, user, MessageRole.USER, morning)
+        await self._add_message(async_session, user, MessageRole.ASSISTANT, morning)
+
+        patterns = await cabinet_service.get_usage_patterns(TELEGRAM_ID)
+
+        assert patterns["peak_usage"] == "20:00–21:00 UTC"
+        assert patterns["preferred_time"] == "🌆 Evening"
+
+    @pytest.mark.asyncio
+    async def test_usage_patterns_yesterday_requests(self, async_session, cabinet_service, user):
+        stats = MessageRepository(async_session).daily_stats
+        yesterday = datetime.now(timezone.utc).date() - timedelta(days=1)
+        await stats.increment(user.id, yesterday, MessageRole.USER)
+        await stats.increment(user.id, yesterday, MessageRole.ASSISTANT)
+
+        patterns = await cabinet_service.get_usage_patterns(TELEGRAM_ID)
+
+        assert patterns["yesterday_requests"] == "1"
+        assert patterns["trend"] == "📉 Decreasing"
+        assert patterns["consistency"] == "Casual user"
+
+    @pytest.mark.asyncio
+    async def test_usage_patterns_regular_user(self, async_session, cabinet_service, user):
+        stats = MessageRepository(async_session).daily_stats
+        today = datetime.now(timezone.utc).date()
+        for days_back in range(4):
+            await stats.increment(user.id, today - timedelta(days=days_back), MessageRole.USER)
+
+        patterns = await cabinet_service.get_usage_patterns(TELEGRAM_ID)
+
+        assert patterns["consistency"] == "Regular user"
+
+    @pytest.mark.asyncio
+    async def test_usage_patterns_without_history(self, cabinet_service, user):
+        patterns = await cabinet_service.get_usage_patterns(TELEGRAM_ID)
+
+        assert patterns["peak_usage"] == "Not enough data"
+        assert patterns["preferred_time"] == "Not enough data"
+
+    @pytest.mark.asyncio
+    async def test_account_settings_show_retention_policy(self, async_session, cabinet_service, user, monkeypatch):
+        monkeypatch.setattr(settings, "RETENTION_DAYS_BY_TIER", {"standard": 365, "premium": 0})
+
+        account = await cabinet_service.get_account_settings(TELEGRAM_ID)
+        assert account["account_type"] == "Standard User"
+        assert account["data_retention"] == "365 days"
+
+        await UserRepository(async_session).update(user.id, tier=UserTier.PREMIUM)
+        account = await cabinet_service.get_account_settings(TELEGRAM_ID)
+        assert account["account_type"] == "Premium User"
+        assert account["data_retention"] == "Indefinite"
+
+        await UserRepository(async_session).update(user.id, retention_days=30)
+        account = await cabinet_service.get_account_settings(TELEGRAM_ID)
+        assert account["data_retention"] == "30 days"
+
+    @pytest.mark.asyncio
+    async def test_messages_page_keyset_navigation(self, async_session, cabinet_service, user):
+        base = datetime(2026, 1, 1, tzinfo=timezone.utc)
+        for minute in range(7):
+            await self._add_message(async_session, user, MessageRole.USER, base + timedelta(minutes=minute))
+
+        first = await cabinet_service.get_messages_page(TELEGRAM_ID, limit=3)
+        second = await cabinet_service.get_messages_page(
+            TELEGRAM_ID, cursor=first.older_cursor, direction="older", limit=3
+        )
+        last = await cabinet_service.get_messages_page(
+            TELEGRAM_ID, cursor=second.older_cursor, direction="older", limit=3
+        )
+        back = await cabinet_service.get_messages_page(
+            TELEGRAM_ID, cursor=second.newer_cursor, direction="newer", limit=3
+        )
+
+        assert [m["timestamp"] for m in first.messages] == ["01/01 00:06", "01/01 00:05", "01/01 00:04"]
+        assert first.newer_cursor is None
+        assert [m["timestamp"] for m in second.messages] == ["01/01 00:03", "01/01 00:02", "01/01 00:01"]
+        assert [m["timestamp"] for m in last.messages] == ["01/01 00:00"]
+        assert last.older_cursor is None
+        assert back.messages == first.messages
+        assert back.newer_cursor is None
+
+    @pytest.mark.asyncio
+    async def test_message_history_count_is_cached(self, async_session, cabinet_service, user, assert_max_queries):
+        repo = MessageRepository(async_session)
+        await repo.create_message(user_id=user.id, role=MessageRole.USER, content="hi")
+
+        assert await cabinet_service.get_message_history_count(TELEGRAM_ID) == 1
+        with assert_max_queries(1) as log:
+            assert await cabinet_service.get_message_history_count(TELEGRAM_ID) == 1
+        assert not any("FROM messages" in statement for statement in log.statements)
+
+        # Новое сообщение инвалидирует кэш
+        await repo.create_message(user_id=user.id, role=MessageRole.ASSISTANT, content="hello")
+        assert await cabinet_service.get_message_history_count(TELEGRAM_ID) == 2
+
+    @pytest.mark.asyncio
+    async def test_known_user_id_skips_user_lookup(self, async_session, cabinet_service, user, assert_max_queries):
+        await MessageRepository(async_session).create_message(
+            user_id=user.id, role=MessageRole.USER, content="hi"
+        )
+
+        with assert_max_queries(1) as log:
+            assert await cabinet_service.get_message_history_count(TELEGRAM_ID, user_id=user.id) == 1
+        assert not any("FROM users" in statement for statement in log.statements)
+
+    @pytest.mark.asyncio
+    async def test_search_messages_pages(self, async_session, cabinet_service, user):
+        repo = MessageRepository(async_session)
+        for i in range(3):
+            await repo.create_message(user_id=user.id, role=MessageRole.USER, content=f"invoice {i}")
+        await repo.create_message(user_id=user.id, role=MessageRole.USER, content="unrelated")
+
+        first = await cabinet_service.search_messages(TELEGRAM_ID, "  invoice ", limit=2)
+        second = await cabinet_service.search_messages(
+            TELEGRAM_ID, "invoice", cursor=first.older_cursor, limit=2
+        )
+
+        assert len(first.messages) == 2
+        assert first.newer_cursor is None
+        assert [m["content"] for m in second.messages] == ["invoice 0"]
+        assert second.newer_cursor is not None
+        assert second.older_cursor is None
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("query", ["", "ab", "   ab   ", "x" * 101])
+    async def test_search_messages_rejects_bad_query(self, cabinet_service, user, query):
+        with pytest.raises(InvalidMessageData):
+            await cabinet_service.search_messages(TELEGRAM_ID, query)
+
+    @pytest.mark.asyncio
+    async def test_export_message_history_is_not_capped(self, async_session, cabinet_service, user, monkeypatch):
+        monkeypatch.setattr(settings, "EXPORT_BATCH_SIZE", 100)
+        repo = MessageRepository(async_session)
+        base = datetime(2026, 1, 1, tzinfo=timezone.utc)
+        await async_session.execute(
+            insert(Message),
+            [
+                {"user_id": user.id, "role": MessageRole.USER, "content": f"msg {i}",
+                 "created_at": base + timedelta(seconds=i)}
+                for i in range(1200)
+            ],
+        )
+        await async_session.commit()
+
+        [part] = await cabinet_service.export_message_history(TELEGRAM_ID, ExportFormat.JSONL)
+
+        lines = part.file.read().decode("utf-8").splitlines()
+        part.close()
+        assert len(lines) == 1200
+        assert json.loads(lines[0])["content"] == "msg 0"
+        assert json.loads(lines[-1])["content"] == "msg 1199"
@@ -0,0 +1,83 @@
+import asyncio
+
+import pytest
+from sqlalchemy import text
+
+from app.core.exceptions.message import ExportAlreadyRunning
+from app.core.services.export_jobs import ExportJobManager
+
+
+class TestExportJobManager:
+    @pytest.mark.asyncio
+    async def test_one_job_per_user(self):
+        manager = ExportJobManager()
+        release = asyncio.Event()
+
+        manager.start(1, release.wait)
+        with pytest.raises(ExportAlreadyRunning):
+            manager.start(1, release.wait)
+        manager.start(2, release.wait)
+
+        release.set()
+        await manager.shutdown(timeout=1)
+        assert not manager.is_running(1)
+        assert not manager.is_running(2)
+
+    @pytest.mark.asyncio
+    async def test_global_concurrency_cap(self):
+        manager = ExportJobManager(max_concurrent=2)
+        release = asyncio.Event()
+        running = 0
+        peak = 0
+
+        async def job():
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await release.wait()
+            running -= 1
+
+        for telegram_id in range(5):
+            manager.start(telegram_id, job)
+        await asyncio.sleep(0.01)
+
+        assert peak == 2
+        release.set()
+        await manager.shutdown(timeout=1)
+        assert peak == 2
+
+    @pytest.mark.asyncio
+    async def test_failed_job_frees_slot(self):
+        manager = ExportJobManager(max_concurrent=1)
+
+        async def failing():
+            raise RuntimeError("boom")
+
+        task = manager.start(1, failing)
+        await task
+
+        assert not manager.is_running(1)
+        finished = manager.start(1, lambda: asyncio.sleep(0))
+        await asyncio.wait_for(finished, timeout=1)
+
+    @pytest.mark.asyncio
+    async def test_shutdown_cancels_pending_jobs(self):
+        manager = ExportJobManager()
+        task = manager.start(1, asyncio.Event().wait)
+
+        await manager.shutdown()
+
+        assert task.cancelled()
+        assert not manager.is_running(1)
+
+    @pytest.mark.asyncio
+    async def test_job_queries_are_not_counted_in_update_budget(self, async_session, assert_max_queries):
+        manager = ExportJobManager()
+
+        async def job():
+            await async_session.execute(text("SELECT 1"))
+
+        with assert_max_queries(0) as log:
+            await manager.start(1, job)
+
+        assert log.count == 0
@@ -0,0 +1,108 @@
+import csv
+import gzip
+import io
+import json
+from datetime import datetime, timezone
+
+import pytest
+
+from app.core.models.message import MessageRole
+from app.core.services.history_export import ExportFormat, HistoryExportWriter
+
+
+CREATED_AT = datetime(2026, 1, 1, 12, 30, tzinfo=timezone.utc)
+
+
+def write_messages(writer, count, content="hello"):
+    for i in range(count):
+        role = MessageRole.USER if i % 2 == 0 else MessageRole.ASSISTANT
+        writer.write_message(i + 1, role, f"{content} {i}", CREATED_AT)
+    return writer.finish()
+
+
+def read(part, compressed=False):
+    data = part.file.read()
+    return (gzip.decompress(data) if compressed else data).decode("utf-8")
+
+
+class TestHistoryExportWriter:
+    def test_txt_export(self):
+        writer = HistoryExportWriter(ExportFormat.TXT, "history", title="Export")
+
+        [part] = write_messages(writer, 2)
+
+        text = read(part)
+        assert part.filename == "history.txt"
+        assert part.messages == 2
+        assert text.startswith("Export\n" + "=" * 50)
+        assert "[1] You (2026-01-01 12:30:00):\nhello 0" in text
+        assert "[2] AI Assistant (2026-01-01 12:30:00):\nhello 1" in text
+
+    def test_jsonl_export(self):
+        writer = HistoryExportWriter(ExportFormat.JSONL, "history")
+
+        [part] = write_messages(writer, 3, content="привет")
+
+        records = [json.loads(line) for line in read(part).splitlines()]
+        assert [r["id"] for r in records] == [1, 2, 3]
+        assert records[0] == {
+            "id": 1,
+            "role": "user",
+            "created_at": "2026-01-01T12:30:00+00:00",
+            "content": "привет 0",
+        }
+
+    def test_csv_export_quotes_content(self):
+        writer = HistoryExportWriter(ExportFormat.CSV, "history")
+        writer.write_message(1, MessageRole.USER, 'line one\nsaid "hi", then left', CREATED_AT)
+
+        [part] = writer.finish()
+
+        rows = list(csv.reader(io.StringIO(read(part))))
+        assert rows[0] == ["id", "role", "created_at", "content"]
+        assert rows[1][3] == 'line one\nsaid "hi", then left'
+
+    @pytest.mark.parametrize("export_format", list(ExportFormat))
+    def test_splits_by_size(self, export_format):
+        writer = HistoryExportWriter(export_format, "history", max_part_bytes=2000)
+
+        parts = write_messages(writer, 100, content="x" * 50)
+
+        assert len(parts) > 1
+        assert [p.filename for p in parts[:2]] == [
+            f"history_part1.{export_format.value}",
+            f"history_part2.{export_format.value}",
+        ]
+        assert sum(p.messages for p in parts) == 100
+        assert all(p.size <= 2000 for p in parts)
+        if export_format is ExportFormat.CSV:
+            # Каждая часть — самостоятельный CSV с заголовком
+            assert all(read(p).startswith("id,role,created_at,content") for p in parts)
+
+    def test_gzip_split_uses_compressed_size(self):
+        writer = HistoryExportWriter(
+            ExportFormat.JSONL, "history", compress=True, max_part_bytes=1024 * 1024 + 4096
+        )
+
+        parts = write_messages(writer, 2000, content="y" * 500)
+
+        # ~1 MB несжатых данных сжимаются в одну часть
+        assert len(parts) == 1
+        assert parts[0].filename == "history.jsonl.gz"
+        assert len(read(parts[0], compressed=True).splitlines()) == 2000
+
+    def test_large_export_spills_to_disk(self):
+        writer = HistoryExportWriter(ExportFormat.TXT, "history", spool_max_bytes=1024)
+
+        [part] = write_messages(writer, 100)
+
+        assert part.file._rolled
+        assert part.size > 1024
+
+    def test_empty_history(self):
+        writer = HistoryExportWriter(ExportFormat.CSV, "history")
+
+        [part] = writer.finish()
+
+        assert part.messages == 0
+        assert read(part) == "id,role,created_at,content\r\n"
@@ -9,6 +9,9 @@ from app.core.models.message import Message, MessageRole
 from app.core.exceptions.user import UserNotFound, InvalidTelegramID
 from app.core.exceptions.message import InvalidMessageData
 from app.core.exceptions.base import TextFlowException
+from app.core.schemas.message import MessageCleanup
+from app.infrastructure.cache.ttl_cache import message_count_cache
+from app.infrastructure.database.partitions import PartitionManager
 from sqlalchemy.exc import SQLAlchemyError
 
 
@@ -21,7 +24,9 @@ class TestMessageService:
     @pytest_asyncio.fixture
     async def mock_message_repository(self):
         """Mock MessageRepository for testing"""
-        return AsyncMock(spec=MessageRepository)
+        repository = AsyncMock(spec=MessageRepository)
+        repository.session = Mock(bind=None)
+        return repository
 
     @pytest_asyncio.fixture
     async def message_service(self, mock_user_repository, mock_message_repository):
@@ -72,6 +77,65 @@ class TestMessageService:
             content="Test message",
             ai_metadata={"model": "gemini"}
         )
+        mock_message_repository.commit.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_create_message_uses_known_user_id(self, message_service, mock_user_repository, mock_message_repository, sample_message):
+        # Setup
+        mock_message_repository.create_message.return_value = sample_message
+
+        # Execute
+        await message_service.create_message(
+            telegram_id=123456789,
+            user_id=7,
+            role=MessageRole.USER,
+            content="Test message",
+        )
+        await message_service.get_conversation_context(telegram_id=123456789, user_id=7)
+
+        # Assert - user_id comes from the caller, no users lookup
+        mock_user_repository.get_by_telegram_id.assert_not_called()
+        assert mock_message_repository.create_message.call_args.kwargs["user_id"] == 7
+        mock_message_repository.get_recent_context.assert_called_once_with(user_id=7, limit=10)
+
+    @pytest.mark.asyncio
+    async def test_user_id_is_looked_up_when_not_given(self, message_service, mock_user_repository, mock_message_repository, sample_user):
+        # Setup
+        mock_user_repository.get_by_telegram_id.return_value = sample_user
+
+        # Execute
+        await message_service.get_user_messages(telegram_id=123456789)
+
+        # Assert
+        mock_user_repository.get_by_telegram_id.assert_called_once_with(telegram_id=123456789)
+        mock_message_repository.get_user_messages.assert_called_once_with(user_id=1, limit=20, offset=0)
+
+    @pytest.mark.asyncio
+    async def test_create_message_slims_ai_metadata(self, message_service, mock_user_repository, mock_message_repository, sample_user, sample_message):
+        # Setup
+        mock_user_repository.get_by_telegram_id.return_value = sample_user
+        mock_message_repository.create_message.return_value = sample_message
+        response = {
+            "content": "Answer",
+            "model": "gemini-2.0-flash",
+            "usage": {"finish_reason": "STOP", "safety_ratings": [{"category": "x"}] * 4},
+            "token_usage": {"input_tokens": 5, "output_tokens": 9},
+        }
+
+        # Execute
+        await message_service.create_message(
+            telegram_id=123456789,
+            role=MessageRole.ASSISTANT,
+            content="Answer",
+            ai_metadata=response,
+        )
+
+        # Assert - no second copy of content, no raw provider metadata
+        assert mock_message_repository.create_message.call_args.kwargs["ai_metadata"] == {
+            "model": "gemini-2.0-flash",
+            "token_usage": {"input_tokens": 5, "output_tokens": 9},
+            "finish_reason": "STOP",
+        }
 
     @pytest.mark.asyncio
     async def test_create_message_without_metadata(self, message_service, mock_user_repository, mock_message_repository, sample_user, sample_message):
@@ -280,12 +344,31 @@ class TestMessageService:
         result = await message_service.cleanup_old_messages(days_old=30)
         
         # Assert
-        assert result == 10
+        assert result == MessageCleanup(deleted=10, dropped_estimate=0)
         mock_message_repository.delete_old_messages.assert_called_once_with(
             days_old=30,
             user_id=None
         )
 
+    @pytest.mark.asyncio
+    async def test_cleanup_old_messages_reports_partition_drop_separately(
+        self, message_service, mock_message_repository, monkeypatch
+    ):
+        engine = Mock()
+        mock_message_repository.session = Mock(bind=engine)
+        mock_message_repository.delete_old_messages.return_value = 3
+        drop = AsyncMock(return_value=1000)
+        monkeypatch.setattr(PartitionManager, "drop_partitions_before", drop)
+        message_count_cache.set(1, 5)
+
+        result = await message_service.cleanup_old_messages(days_old=30)
+
+        assert result == MessageCleanup(deleted=3, dropped_estimate=1000)
+        drop.assert_awaited_once()
+        assert message_count_cache.get(1) is None
+        # Сессия закоммичена до DETACH и после DELETE
+        assert mock_message_repository.commit.await_count == 2
+
     @pytest.mark.asyncio
     async def test_cleanup_old_messages_specific_user(self, message_service, mock_user_repository, mock_message_repository, sample_user):
         # Setup
@@ -299,7 +382,7 @@ class TestMessageService:
         )
         
         # Assert
-        assert result == 5
+        assert result == MessageCleanup(deleted=5)
         mock_user_repository.get_by_telegram_id.assert_called_once_with(telegram_id=123456789)
         mock_message_repository.delete_old_messages.assert_called_once_with(
             days_old=7,
@@ -0,0 +1,205 @@
+import asyncio
+import pytest
+import pytest_asyncio
+from datetime import datetime, timedelta, timezone
+from unittest.mock import AsyncMock, patch
+from app.config.settings import settings
+from app.core.exceptions.message import PurgeAlreadyRunning
+from app.core.models.message import MessageRole
+from app.core.models.purge_job import PurgeStatus
+from app.core.models.user import UserTier
+from app.core.services.purge_service import PurgeJobManager, PurgeService, RetentionEnforcer
+from app.infrastructure.cache.ttl_cache import message_count_cache
+from app.infrastructure.database.partitions import PartitionManager
+from app.infrastructure.database.repositories.message_repository import MessageRepository
+from app.infrastructure.database.repositories.user_repository import UserRepository
+
+
+TELEGRAM_ID = 123456789
+NOW = datetime.now(timezone.utc)
+
+
+class TestPurgeService:
+    @pytest_asyncio.fixture
+    async def users(self, async_session):
+        user_repo = UserRepository(async_session)
+        message_repo = MessageRepository(async_session)
+        users = [
+            await user_repo.create(telegram_id=TELEGRAM_ID + i, first_name=f"User {i}")
+            for i in range(2)
+        ]
+        for user in users:
+            await message_repo.daily_stats.increment(user.id, NOW.date(), MessageRole.USER)
+            for days_ago in range(5):
+                await message_repo.create(
+                    user_id=user.id,
+                    role=MessageRole.USER,
+                    content=f"Message {days_ago}",
+                    created_at=NOW - timedelta(days=days_ago * 10),
+                )
+        return users
+
+    @pytest.mark.asyncio
+    async def test_user_purge_deletes_in_batches(self, async_session, users):
+        sleep = AsyncMock()
+        progress = AsyncMock()
+        service = PurgeService(async_session, batch_size=2, pause=0.5, sleep=sleep)
+
+        job = await service.create_user_purge(TELEGRAM_ID)
+        assert job.total == 5
+        job = await service.run(job, progress=progress)
+
+        assert job.status == PurgeStatus.COMPLETED
+        assert job.deleted == 5
+        assert job.finished_at is not None
+        assert [call.args for call in progress.call_args_list] == [(2, 5), (4, 5), (5, 5)]
+        # Пауза только между полными батчами
+        assert sleep.await_count == 2
+        sleep.assert_awaited_with(0.5)
+
+        repo = MessageRepository(async_session)
+        assert await repo.get_user_message_count(users[0].id) == 0
+        assert await repo.get_user_message_count(users[1].id) == 5
+        assert (await repo.daily_stats.get_totals(users[0].id)).total == 0
+
+    @pytest.mark.asyncio
+    async def test_job_claimed_by_another_replica_is_not_run(self, async_session, users):
+        service = PurgeService(async_session)
+        job = await service.create_user_purge(TELEGRAM_ID)
+
+        with patch(
+            "app.core.services.purge_service.LeaderLock.is_leader", AsyncMock(return_value=False)
+        ):
+            with pytest.raises(PurgeAlreadyRunning):
+                await service.run(job)
+
+        assert job.status == PurgeStatus.PENDING
+        assert await MessageRepository(async_session).get_user_message_count(users[0].id) == 5
+
+    @pytest.mark.asyncio
+    async def test_create_user_purge_reuses_unfinished_job(self, async_session, users):
+        service = PurgeService(async_session)
+
+        first = await service.create_user_purge(TELEGRAM_ID)
+        second = await service.create_user_purge(TELEGRAM_ID)
+
+        assert second.id == first.id
+
+    @pytest.mark.asyncio
+    async def test_interrupted_purge_resumes(self, async_session, users):
+        # Остановка бота посреди очистки: задача остаётся RUNNING
+        interrupted = PurgeService(
+            async_session, batch_size=2, sleep=AsyncMock(side_effect=asyncio.CancelledError)
+        )
+        job = await interrupted.create_user_purge(TELEGRAM_ID)
+        with pytest.raises(asyncio.CancelledError):
+            await interrupted.run(job)
+
+        service = PurgeService(async_session, batch_size=2, sleep=AsyncMock())
+        unfinished = await service.get_unfinished_jobs()
+        assert [j.id for j in unfinished] == [job.id]
+        assert unfinished[0].status == PurgeStatus.RUNNING
+        assert unfinished[0].deleted == 2
+
+        job = await service.run(unfinished[0])
+
+        assert job.deleted == 5
+        assert await service.get_unfinished_jobs() == []
+
+    @pytest.mark.asyncio
+    async def test_retention_purge_covers_all_users(self, async_session, users):
+        service = PurgeService(async_session, batch_size=2, sleep=AsyncMock())
+
+        job = await service.create_retention_purge(NOW - timedelta(days=25))
+        job = await service.run(job)
+
+        # У каждого удалены сообщения 30 и 40 дней назад
+        assert job.deleted == 4
+        assert job.last_user_id == users[-1].id
+        repo = MessageRepository(async_session)
+        for user in users:
+            assert await repo.get_user_message_count(user.id) == 3
+            # Дневные роллапы при retention сохраняются
+            assert (await repo.daily_stats.get_totals(user.id)).total == 1
+
+    @pytest.mark.asyncio
+    async def test_dropped_partitions_reset_message_counts(self, async_session, users, monkeypatch):
+        for user in users:
+            message_count_cache.set(user.id, 5)
+        monkeypatch.setattr(
+            PartitionManager, "drop_partitions_before", AsyncMock(return_value=3)
+        )
+        service = PurgeService(async_session, sleep=AsyncMock())
+
+        await service.run(await service.create_retention_purge(NOW - timedelta(days=45)))
+
+        assert all(message_count_cache.get(user.id) is None for user in users)
+
+    @pytest.mark.asyncio
+    async def test_user_purge_discards_buffered_messages(self, async_session, users):
+        write_buffer = AsyncMock()
+        service = PurgeService(async_session, sleep=AsyncMock(), write_buffer=write_buffer)
+
+        await service.run(await service.create_user_purge(TELEGRAM_ID))
+
+        write_buffer.discard_user.assert_awaited_once_with(users[0].id)
+
+    @pytest.mark.asyncio
+    async def test_failed_purge_records_error(self, async_session, users, monkeypatch):
+        service = PurgeService(async_session)
+        job = await service.create_user_purge(TELEGRAM_ID)
+        monkeypatch.setattr(
+            service.message_repository,
+            "delete_messages_batch",
+            AsyncMock(side_effect=RuntimeError("boom")),
+        )
+
+        with pytest.raises(RuntimeError):
+            await service.run(job)
+
+        job = await service.get_job(job.id)
+        assert job.status == PurgeStatus.FAILED
+        assert job.error == "boom"
+
+    @pytest.mark.asyncio
+    async def test_policy_purge_uses_tier_and_override(self, async_session, users, monkeypatch):
+        monkeypatch.setattr(settings, "RETENTION_DAYS_BY_TIER", {"standard": 25, "premium": 0})
+        user_repo = UserRepository(async_session)
+        await user_repo.update(users[1].id, tier=UserTier.PREMIUM)
+        premium_with_override = await user_repo.create(
+            telegram_id=TELEGRAM_ID + 2, first_name="User 2", tier=UserTier.PREMIUM, retention_days=15
+        )
+        message_repo = MessageRepository(async_session)
+        for days_ago in (10, 20):
+            await message_repo.create(
+                user_id=premium_with_override.id,
+                role=MessageRole.USER,
+                content="msg",
+                created_at=NOW - timedelta(days=days_ago),
+            )
+        service = PurgeService(async_session, sleep=AsyncMock())
+
+        job = await service.run(await service.create_policy_purge(NOW))
+
+        assert job.deleted == 3
+        assert await message_repo.get_user_message_count(users[0].id) == 3
+        # Бессрочный тариф не трогается
+        assert await message_repo.get_user_message_count(users[1].id) == 5
+        assert await message_repo.get_user_message_count(premium_with_override.id) == 1
+
+
+class TestRetentionEnforcer:
+    @pytest.mark.asyncio
+    async def test_enforce_reuses_unfinished_policy_job(self, async_session):
+        jobs = PurgeJobManager()
+        release = asyncio.Event()
+        enforcer = RetentionEnforcer(lambda: PurgeService(async_session), jobs)
+
+        with patch("app.core.services.purge_service.run_stored_purge", lambda *_: release.wait()):
+            first = await enforcer.enforce()
+            second = await enforcer.enforce()
+
+        assert first == second
+        assert jobs.is_running(first)
+        release.set()
+        await jobs.shutdown(timeout=1)
@@ -0,0 +1,26 @@
+import pytest
+from app.config.settings import settings
+from app.core.models.user import UserTier
+from app.core.services.retention import describe_retention, retention_days_for
+
+
+class TestRetentionPolicy:
+    @pytest.fixture(autouse=True)
+    def tiers(self, monkeypatch):
+        monkeypatch.setattr(settings, "RETENTION_DAYS_BY_TIER", {"standard": 90})
+
+    def test_tier_default(self):
+        assert retention_days_for(UserTier.STANDARD) == 90
+
+    def test_unconfigured_tier_keeps_forever(self):
+        assert retention_days_for(UserTier.PREMIUM) == 0
+
+    def test_user_override_wins(self):
+        assert retention_days_for(UserTier.STANDARD, 30) == 30
+        assert retention_days_for(UserTier.STANDARD, 0) == 0
+
+    @pytest.mark.parametrize(
+        "days, text", [(0, "Indefinite"), (1, "1 day"), (365, "365 days")]
+    )
+    def test_describe_retention(self, days, text):
+        assert describe_retention(days) == text
@@ -0,0 +1,119 @@
+import asyncio
+import pytest
+from datetime import datetime, timezone
+from unittest.mock import AsyncMock
+
+from app.core.services.scheduler import CronSchedule, IntervalSchedule, Scheduler
+
+
+def utc(*args):
+    return datetime(*args, tzinfo=timezone.utc)
+
+
+class TestCronSchedule:
+    @pytest.mark.parametrize(
+        "expression, after, expected",
+        [
+            ("0 0 * * *", utc(2026, 10, 19, 12, 30), utc(2026, 10, 20)),
+            ("*/15 * * * *", utc(2026, 10, 19, 12, 30, 5), utc(2026, 10, 19, 12, 45)),
+            ("30 3 * * 1-5", utc(2026, 10, 23, 4), utc(2026, 10, 26, 3, 30)),
+            ("0 0 1 */3 *", utc(2026, 11, 5), utc(2027, 1, 1)),
+            ("0 12 * * 0", utc(2026, 10, 19), utc(2026, 10, 25, 12)),
+            ("0 12 * * 7", utc(2026, 10, 19), utc(2026, 10, 25, 12)),
+        ],
+    )
+    def test_next_after(self, expression, after, expected):
+        assert CronSchedule(expression).next_after(after) == expected
+
+    def test_next_after_is_strictly_later(self):
+        assert CronSchedule("0 0 * * *").next_after(utc(2026, 10, 20)) == utc(2026, 10, 21)
+
+    def test_day_of_month_or_weekday(self):
+        # 13-е число или пятница, как в cron
+        schedule = CronSchedule("0 0 13 * 5")
+
+        assert schedule.next_after(utc(2026, 10, 19)) == utc(2026, 10, 23)
+        assert schedule.next_after(utc(2026, 11, 7)) == utc(2026, 11, 13)
+
+    @pytest.mark.parametrize("expression", ["* * * *", "60 * * * *", "*/0 * * * *", "5-1 * * * *"])
+    def test_invalid_expression(self, expression):
+        with pytest.raises(ValueError):
+            CronSchedule(expression)
+
+    def test_never_firing_expression(self):
+        with pytest.raises(ValueError):
+            CronSchedule("0 0 31 2 *").next_after(utc(2026, 1, 1))
+
+
+class TestScheduler:
+    def test_interval_schedule(self):
+        assert IntervalSchedule(90).next_after(utc(2026, 10, 19, 12)) == utc(2026, 10, 19, 12, 1, 30)
+
+    def test_duplicate_job_name_is_rejected(self):
+        scheduler = Scheduler()
+        scheduler.every("job", 60, AsyncMock())
+
+        with pytest.raises(ValueError):
+            scheduler.cron("job", "* * * * *", AsyncMock())
+
+    @pytest.mark.asyncio
+    async def test_follower_skips_run(self):
+        leader = AsyncMock()
+        leader.is_leader.return_value = False
+        run = AsyncMock()
+        scheduler = Scheduler(leader)
+        job = scheduler.every("job", 60, run)
+
+        assert await scheduler.run_job(job) is None
+        run.assert_not_awaited()
+
+        leader.is_leader.return_value = True
+        assert await scheduler.run_job(job) == "ok"
+        run.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_run_now_checks_leadership(self):
+        leader = AsyncMock()
+        leader.is_leader.return_value = False
+        run = AsyncMock()
+        scheduler = Scheduler(leader)
+        scheduler.cron("partitions", "0 3 * * *", run)
+
+        assert await scheduler.run_now("partitions") is None
+        run.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_failed_run_is_reported_not_raised(self):
+        scheduler = Scheduler()
+        job = scheduler.every("job", 60, AsyncMock(side_effect=RuntimeError("boom")))
+
+        assert await scheduler.run_job(job) == "error"
+        assert job.runs == 1
+
+    @pytest.mark.asyncio
+    async def test_runs_do_not_overlap(self):
+        release = asyncio.Event()
+        scheduler = Scheduler()
+        job = scheduler.every("job", 60, release.wait)
+
+        first = asyncio.create_task(scheduler.run_job(job))
+        await asyncio.sleep(0)
+        assert await scheduler.run_job(job) is None
+
+        release.set()
+        assert await first == "ok"
+
+    @pytest.mark.asyncio
+    async def test_interval_loop_and_shutdown(self):
+        leader = AsyncMock()
+        leader.is_leader.return_value = True
+        run = AsyncMock()
+        scheduler = Scheduler(leader)
+        scheduler.every("job", 0.01, run)
+
+        scheduler.start()
+        await asyncio.sleep(0.05)
+        await scheduler.shutdown()
+
+        assert run.await_count >= 2
+        leader.release.assert_awaited_once()
@@ -159,6 +159,7 @@ class TestUserService:
         mock_user_repository.get_or_create_user.assert_called_once()
         mock_user_repository.increment_requests_today.assert_called_once_with(telegram_id=123456789)
         mock_user_repository.get_by_telegram_id.assert_called_once_with(telegram_id=123456789)
+        mock_user_repository.commit.assert_awaited_once()
 
     @pytest.mark.asyncio
     async def test_process_user_request_limit_exceeded(self, user_service, mock_user_repository, sample_user):
@@ -260,6 +261,7 @@ class TestUserService:
         # Assert
         assert result == 5
         mock_user_repository.reset_daily_limits.assert_called_once()
+        mock_user_repository.commit.assert_awaited_once()
 
     @pytest.mark.asyncio
     async def test_reset_all_daily_limits_sqlalchemy_error(self, user_service, mock_user_repository):
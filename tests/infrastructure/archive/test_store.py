@@ -0,0 +1,74 @@
+import gzip
+import pytest
+from datetime import datetime, timezone
+
+from app.core.models.message import MessageRole
+from app.core.schemas.message import MessageRow
+from app.infrastructure.archive.store import MessageArchive
+
+TELEGRAM_ID = 123456789
+
+
+def row(id, day, month=1, content=None):
+    created_at = datetime(2026, month, day, 12, tzinfo=timezone.utc)
+    return MessageRow(id, MessageRole.USER, content or f"msg {id}", created_at)
+
+
+class TestMessageArchive:
+    @pytest.fixture
+    def archive(self, tmp_path):
+        return MessageArchive(str(tmp_path))
+
+    @pytest.mark.asyncio
+    async def test_append_groups_by_month_and_updates_manifest(self, archive, tmp_path):
+        await archive.append(TELEGRAM_ID, [row(1, 5), row(2, 20), row(3, 2, month=2)])
+        await archive.append(TELEGRAM_ID, [row(4, 25), row(5, 3, month=2)])
+
+        manifest = archive.manifest(TELEGRAM_ID)
+        assert {name: month.messages for name, month in manifest.months.items()} == {
+            "2026-01": 3, "2026-02": 2,
+        }
+        assert manifest.total == 5
+        assert manifest.last_at == datetime(2026, 2, 3, 12, tzinfo=timezone.utc)
+
+        # Файл месяца — несколько gzip-member'ов, читаемых одним потоком
+        with gzip.open(tmp_path / str(TELEGRAM_ID) / "2026-01.jsonl.gz") as file:
+            assert len(file.read().splitlines()) == 3
+
+    @pytest.mark.asyncio
+    async def test_read_returns_history_in_order(self, archive):
+        await archive.append(TELEGRAM_ID, [row(3, 2, month=2), row(2, 20), row(1, 5, content="Привет")])
+        await archive.append(TELEGRAM_ID, [row(2, 20)])
+
+        messages = [message async for message in archive.read(TELEGRAM_ID)]
+
+        assert [m.id for m in messages] == [1, 2, 3]
+        assert messages[0] == row(1, 5, content="Привет")
+
+    @pytest.mark.asyncio
+    async def test_append_skips_ids_already_archived(self, archive):
+        await archive.append(TELEGRAM_ID, [row(1, 5), row(2, 20)])
+
+        written = await archive.append(TELEGRAM_ID, [row(1, 5), row(2, 20), row(3, 10)])
+
+        assert written == 1
+        assert archive.manifest(TELEGRAM_ID).total == 3
+        assert [m.id async for m in archive.read(TELEGRAM_ID)] == [1, 3, 2]
+
+    @pytest.mark.asyncio
+    async def test_drop_before_removes_whole_months(self, archive):
+        await archive.append(TELEGRAM_ID, [row(1, 5), row(2, 2, month=2), row(3, 20, month=2)])
+
+        dropped = await archive.drop_before(TELEGRAM_ID, datetime(2026, 2, 10, tzinfo=timezone.utc))
+
+        assert dropped == 1
+        assert list(archive.manifest(TELEGRAM_ID).months) == ["2026-02"]
+
+    @pytest.mark.asyncio
+    async def test_delete_user(self, archive):
+        await archive.append(TELEGRAM_ID, [row(1, 5)])
+
+        await archive.delete_user(TELEGRAM_ID)
+
+        assert archive.manifest(TELEGRAM_ID).total == 0
+        assert [m async for m in archive.read(TELEGRAM_ID)] == []
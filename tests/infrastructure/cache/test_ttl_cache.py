@@ -0,0 +1,80 @@
+import pytest
+from sqlalchemy import text
+
+from app.infrastructure.cache.ttl_cache import TTLCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestTTLCache:
+    def test_get_returns_value_until_expired(self):
+        clock = FakeClock()
+        cache = TTLCache("test", ttl=10, clock=clock)
+        cache.set("key", 42)
+
+        clock.now = 9.9
+        assert cache.get("key") == 42
+
+        clock.now = 10
+        assert cache.get("key") is None
+        assert len(cache) == 0
+
+    def test_invalidate_and_clear(self):
+        cache = TTLCache("test", ttl=10)
+        cache.set(1, "a")
+        cache.set(2, "b")
+
+        cache.invalidate(1)
+        cache.invalidate(3)
+        assert cache.get(1) is None
+        assert cache.get(2) == "b"
+
+        cache.clear()
+        assert cache.get(2) is None
+
+    def test_evicts_least_recently_used(self):
+        cache = TTLCache("test", ttl=10, maxsize=2)
+        cache.set(1, "a")
+        cache.set(2, "b")
+        cache.get(1)
+        cache.set(3, "c")
+
+        assert cache.get(1) == "a"
+        assert cache.get(2) is None
+        assert cache.get(3) == "c"
+
+    @pytest.mark.asyncio
+    async def test_invalidate_on_commit(self, async_session):
+        cache = TTLCache("test", ttl=10)
+        cache.set(1, "a")
+        cache.set(2, "b")
+
+        cache.invalidate_on_commit(async_session, 1)
+        # До COMMIT читатели ещё видят старые данные — и кэш тоже
+        assert cache.get(1) == "a"
+
+        await async_session.commit()
+        assert cache.get(1) is None
+        assert cache.get(2) == "b"
+
+        cache.invalidate_on_commit(async_session)
+        await async_session.commit()
+        assert cache.get(2) is None
+
+    @pytest.mark.asyncio
+    async def test_rollback_keeps_cached_value(self, async_session):
+        cache = TTLCache("test", ttl=10)
+        cache.set(1, "a")
+
+        await async_session.execute(text("SELECT 1"))
+        cache.invalidate_on_commit(async_session, 1)
+        await async_session.rollback()
+        await async_session.commit()
+
+        assert cache.get(1) == "a"
@@ -133,4 +133,41 @@ class TestBaseRepository:
         repo = BaseRepository(async_session, User)
         
         assert repo.model == User
-        assert repo.session == async_session
\ No newline at end of file
+        assert repo.session == async_session
+    @pytest.mark.asyncio
+    async def test_create_is_single_insert_returning(self, async_session, assert_max_queries):
+        repo = BaseRepository(async_session, User)
+
+        with assert_max_queries(1) as log:
+            user = await repo.create(telegram_id=123456789, first_name="Test")
+
+        assert log.statements[0].startswith("INSERT INTO users")
+        assert "RETURNING" in log.statements[0]
+        # Серверный default пришёл в том же INSERT, без refresh
+        assert user.created_at is not None
+        assert "created_at" in vars(user)
+
+    @pytest.mark.asyncio
+    async def test_update_is_single_update_returning(self, async_session, assert_max_queries):
+        repo = BaseRepository(async_session, User)
+        user = await repo.create(telegram_id=123456789, first_name="Test")
+
+        with assert_max_queries(1):
+            updated = await repo.update(user.id, first_name="Updated")
+
+        assert updated is user
+        assert user.first_name == "Updated"
+
+    @pytest.mark.asyncio
+    async def test_writes_are_committed_by_caller(self, async_session):
+        repo = BaseRepository(async_session, User)
+        user = await repo.create(telegram_id=123456789, first_name="Test")
+        user_id = user.id
+
+        await repo.rollback()
+        assert await repo.get_by_id(user_id) is None
+
+        user = await repo.create(telegram_id=123456789, first_name="Test")
+        await repo.commit()
+        await repo.rollback()
+        assert await repo.get_by_id(user.id) is not None
@@ -0,0 +1,91 @@
+import pytest
+import pytest_asyncio
+from datetime import date, datetime, timedelta, timezone
+from app.core.models.message import MessageRole
+from app.infrastructure.database.repositories.message_daily_stats_repository import MessageDailyStatsRepository
+from app.infrastructure.database.repositories.message_repository import MessageRepository
+from app.infrastructure.database.repositories.user_repository import UserRepository
+
+
+class TestMessageDailyStatsRepository:
+    @pytest_asyncio.fixture
+    async def test_user(self, async_session):
+        return await UserRepository(async_session).create(
+            telegram_id=123456789, first_name="Test User"
+        )
+
+    @pytest.mark.asyncio
+    async def test_increment_upserts_single_row(self, async_session, test_user):
+        repo = MessageDailyStatsRepository(async_session)
+        day = date(2025, 6, 1)
+
+        await repo.increment(test_user.id, day, MessageRole.USER)
+        await repo.increment(test_user.id, day, MessageRole.ASSISTANT, tokens_in=12, tokens_out=30)
+        await repo.increment(test_user.id, day, MessageRole.USER)
+
+        days = await repo.get_days(test_user.id, since=day)
+        assert len(days) == 1
+        await async_session.refresh(days[0])
+        assert days[0].user_msgs == 2
+        assert days[0].assistant_msgs == 1
+        assert days[0].tokens_in == 12
+        assert days[0].tokens_out == 30
+
+    @pytest.mark.asyncio
+    async def test_get_totals(self, async_session, test_user):
+        repo = MessageDailyStatsRepository(async_session)
+
+        await repo.increment(test_user.id, date(2025, 6, 1), MessageRole.USER)
+        await repo.increment(test_user.id, date(2025, 6, 5), MessageRole.USER)
+        await repo.increment(test_user.id, date(2025, 6, 5), MessageRole.ASSISTANT, tokens_out=7)
+
+        totals = await repo.get_totals(test_user.id)
+        assert totals.total == 3
+        assert totals.user_messages == 2
+        assert totals.tokens_out == 7
+        assert totals.active_days == 2
+
+        recent = await repo.get_totals(test_user.id, since=date(2025, 6, 2))
+        assert recent.total == 2
+        assert recent.active_days == 1
+
+    @pytest.mark.asyncio
+    async def test_get_totals_without_rollups(self, async_session, test_user):
+        totals = await MessageDailyStatsRepository(async_session).get_totals(test_user.id)
+
+        assert totals.total == 0
+        assert totals.active_days == 0
+
+    @pytest.mark.asyncio
+    async def test_create_message_updates_rollup(self, async_session, test_user):
+        message_repo = MessageRepository(async_session)
+
+        await message_repo.create_message(
+            user_id=test_user.id, role=MessageRole.USER, content="Hi"
+        )
+        await message_repo.create_message(
+            user_id=test_user.id,
+            role=MessageRole.ASSISTANT,
+            content="Hello",
+            ai_metadata={"token_usage": {"input_tokens": 5, "output_tokens": 9}},
+        )
+
+        totals = await message_repo.daily_stats.get_totals(
+            test_user.id, since=datetime.now(timezone.utc).date()
+        )
+        assert totals.user_messages == 1
+        assert totals.assistant_messages == 1
+        assert totals.tokens_in == 5
+        assert totals.tokens_out == 9
+
+    @pytest.mark.asyncio
+    async def test_delete_all_user_messages_clears_rollups(self, async_session, test_user):
+        message_repo = MessageRepository(async_session)
+        await message_repo.create_message(
+            user_id=test_user.id, role=MessageRole.USER, content="Hi"
+        )
+
+        await message_repo.delete_all_user_messages(test_user.id)
+
+        totals = await message_repo.daily_stats.get_totals(test_user.id)
+        assert totals.total == 0
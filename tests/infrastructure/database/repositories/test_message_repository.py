@@ -1,10 +1,17 @@
 import pytest
 import pytest_asyncio
+from unittest.mock import AsyncMock, Mock
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.exc import InvalidRequestError
+from sqlalchemy.orm import undefer
 from datetime import datetime, timedelta, timezone
 from app.infrastructure.database.repositories.message_repository import MessageRepository
 from app.infrastructure.database.repositories.user_repository import UserRepository
 from app.core.models.message import Message, MessageRole
 from app.core.models.user import User
+from app.core.schemas.message import MessageRow
+from app.utils.cursor import MessageCursor, SearchCursor
 
 
 class TestMessageRepository:
@@ -51,6 +58,42 @@ class TestMessageRepository:
         assert message.content == "AI response"
         assert message.ai_metadata is None
 
+    @pytest.mark.asyncio
+    async def test_ai_metadata_is_deferred(self, async_session, test_user):
+        repo = MessageRepository(async_session)
+        created = await repo.create_message(
+            user_id=test_user.id,
+            role=MessageRole.ASSISTANT,
+            content="AI response",
+            ai_metadata={"model": "gemini"},
+        )
+        async_session.expunge_all()
+
+        message = await repo.get_by_id(created.id)
+        with pytest.raises(InvalidRequestError):
+            message.ai_metadata
+
+        loaded = await async_session.scalar(
+            select(Message).where(Message.id == created.id).options(undefer(Message.ai_metadata))
+        )
+        assert loaded.ai_metadata == {"model": "gemini"}
+
+    @pytest.mark.asyncio
+    async def test_long_content_is_stored_and_searched_in_full(self, async_session, test_user):
+        repo = MessageRepository(async_session)
+        long_text = "Here is a detailed answer. " * 150 + "Finally, use quicksort."
+        assert long_text.index("quicksort") > 1000
+        await repo.create_message(user_id=test_user.id, role=MessageRole.ASSISTANT, content=long_text)
+
+        [row] = await repo.get_recent_context(test_user.id)
+        assert row.content == long_text
+        # Поиск видит текст дальше первой тысячи символов
+        [(hit, _)] = await repo.search_messages(test_user.id, "quicksort")
+        assert hit.content == long_text
+        [(hit, _)] = await repo.search_messages(test_user.id, "use quick")
+        assert hit.content == long_text
+        assert [r.content async for r in repo.stream_user_messages(test_user.id)] == [long_text]
+
     @pytest.mark.asyncio
     async def test_get_user_messages(self, async_session, test_user):
         repo = MessageRepository(async_session)
@@ -102,6 +145,91 @@ class TestMessageRepository:
         messages = await repo.get_user_messages(test_user.id, limit=2, offset=2)
         assert len(messages) == 2
 
+    async def _create_timeline(self, repo, user_id, count):
+        """Messages with explicit timestamps; pairs share created_at to exercise the id tie-breaker"""
+        base = datetime(2026, 1, 1, tzinfo=timezone.utc)
+        return [
+            await repo.create(
+                user_id=user_id,
+                role=MessageRole.USER,
+                content=f"Message {i}",
+                created_at=base + timedelta(minutes=i // 2),
+            )
+            for i in range(count)
+        ]
+
+    @pytest.mark.asyncio
+    async def test_get_user_messages_after_walks_all_pages(self, async_session, test_user):
+        repo = MessageRepository(async_session)
+        created = await self._create_timeline(repo, test_user.id, 7)
+
+        seen, cursor = [], None
+        while True:
+            page = await repo.get_user_messages_after(test_user.id, cursor, limit=3)
+            if not page:
+                break
+            seen.extend(page)
+            cursor = MessageCursor(page[-1].created_at, page[-1].id)
+
+        assert [msg.id for msg in seen] == [msg.id for msg in reversed(created)]
+
+    @pytest.mark.asyncio
+    async def test_get_user_messages_before(self, async_session, test_user):
+        repo = MessageRepository(async_session)
+        created = await self._create_timeline(repo, test_user.id, 7)
+        cursor = MessageCursor(created[2].created_at, created[2].id)
+
+        page = await repo.get_user_messages_before(test_user.id, cursor, limit=3)
+
+        # Ближайшие новее курсора, в порядке страницы (новые -> старые)
+        assert [msg.content for msg in page] == ["Message 5", "Message 4", "Message 3"]
+
+    @pytest.mark.asyncio
+    async def test_search_messages_ranks_word_matches_first(self, async_session, test_user):
+        repo = MessageRepository(async_session)
+        for content in ["hello world", "say helloworld", "world peace", "nothing here"]:
+            await repo.create_message(user_id=test_user.id, role=MessageRole.USER, content=content)
+
+        hits = await repo.search_messages(test_user.id, "world")
+
+        # "helloworld" находится только как подстрока и идёт последним с рангом 0
+        assert [msg.content for msg, _ in hits] == ["world peace", "hello world", "say helloworld"]
+        assert hits[0][1] > 0
+        assert hits[-1][1] == 0
+
+    @pytest.mark.asyncio
+    async def test_search_messages_is_scoped_to_user(self, async_session, test_user):
+        other = await UserRepository(async_session).create(telegram_id=987654321, first_name="Other")
+        repo = MessageRepository(async_session)
+        await repo.create_message(user_id=other.id, role=MessageRole.USER, content="secret plan")
+
+        assert await repo.search_messages(test_user.id, "secret") == []
+
+    @pytest.mark.asyncio
+    async def test_search_messages_keyset_pages(self, async_session, test_user):
+        repo = MessageRepository(async_session)
+        for i in range(5):
+            await repo.create_message(user_id=test_user.id, role=MessageRole.USER, content=f"report {i}")
+
+        first = await repo.search_messages(test_user.id, "report", limit=2)
+        cursor = SearchCursor(first[-1][1], first[-1][0].id)
+        second = await repo.search_messages(test_user.id, "report", cursor=cursor, limit=2)
+        back_cursor = SearchCursor(second[0][1], second[0][0].id)
+        back = await repo.search_messages(test_user.id, "report", cursor=back_cursor, direction="newer")
+
+        assert not {msg.id for msg, _ in first} & {msg.id for msg, _ in second}
+        assert [msg.id for msg, _ in back] == [msg.id for msg, _ in first]
+
+    @pytest.mark.asyncio
+    async def test_search_messages_escapes_special_characters(self, async_session, test_user):
+        repo = MessageRepository(async_session)
+        await repo.create_message(user_id=test_user.id, role=MessageRole.USER, content="100% sure")
+        await repo.create_message(user_id=test_user.id, role=MessageRole.USER, content="1000 times")
+
+        # % и кавычки — литералы, а не wildcard LIKE / синтаксис FTS5
+        assert [msg.content for msg, _ in await repo.search_messages(test_user.id, '0% s')] == ["100% sure"]
+        assert await repo.search_messages(test_user.id, '"*%') == []
+
     @pytest.mark.asyncio
     async def test_get_recent_context(self, async_session, test_user):
         repo = MessageRepository(async_session)
@@ -131,6 +259,26 @@ class TestMessageRepository:
         contents = [msg.content for msg in context]
         assert len(set(contents)) == 2  # Should be 2 different messages
 
+    @pytest.mark.asyncio
+    async def test_read_paths_return_rows_without_hydration(self, async_session, test_user, assert_max_queries):
+        repo = MessageRepository(async_session)
+        await repo.create_message(
+            user_id=test_user.id,
+            role=MessageRole.ASSISTANT,
+            content="Answer",
+            ai_metadata={"model": "gemini"},
+        )
+        async_session.expunge_all()
+
+        with assert_max_queries(1) as log:
+            [row] = await repo.get_recent_context(test_user.id)
+
+        assert isinstance(row, MessageRow)
+        assert (row.role, row.content) == (MessageRole.ASSISTANT, "Answer")
+        # ai_metadata не читается, ORM-объекты в сессию не попадают
+        assert "ai_metadata" not in log.statements[0]
+        assert len(async_session.identity_map) == 0
+
     @pytest.mark.asyncio
     async def test_get_conversation_context(self, async_session, test_user):
         repo = MessageRepository(async_session)
@@ -231,6 +379,18 @@ class TestMessageRepository:
         remaining_messages = await repo.get_user_messages(test_user.id)
         assert len(remaining_messages) == 0
 
+    @pytest.mark.asyncio
+    async def test_delete_old_messages_does_not_commit(self, async_session, test_user):
+        repo = MessageRepository(async_session)
+        user_id = test_user.id
+        await repo.create_message(user_id=user_id, role=MessageRole.USER, content="kept")
+        await async_session.commit()
+
+        await repo.delete_old_messages(days_old=0)
+        await async_session.rollback()
+
+        assert len(await repo.get_user_messages(user_id)) == 1
+
     @pytest.mark.asyncio
     async def test_delete_old_messages_specific_user(self, async_session, test_user):
         repo = MessageRepository(async_session)
@@ -305,6 +465,26 @@ class TestMessageRepository:
         count = await repo.get_user_message_count(test_user.id, hours_back=0)
         assert count == 0
 
+    @pytest.mark.asyncio
+    async def test_get_user_message_count_is_pushed_down(self, async_session, test_user, assert_max_queries):
+        repo = MessageRepository(async_session)
+
+        for i in range(3):
+            await repo.create_message(
+                user_id=test_user.id,
+                role=MessageRole.USER,
+                content=f"Message {i}"
+            )
+
+        # Single aggregate query, no message columns fetched
+        with assert_max_queries(1) as log:
+            count = await repo.get_user_message_count(test_user.id)
+
+        assert count == 3
+        statement = log.statements[0].lower()
+        assert "count(*)" in statement
+        assert "messages.content" not in statement
+
     @pytest.mark.asyncio
     async def test_get_messages_by_role(self, async_session, test_user):
         repo = MessageRepository(async_session)
@@ -345,4 +525,73 @@ class TestMessageRepository:
         assert hasattr(repo, 'get_by_id')
         assert hasattr(repo, 'update')
         assert hasattr(repo, 'delete')
-        assert repo.model == Message
\ No newline at end of file
+        assert repo.model == Message
+    @pytest.mark.asyncio
+    async def test_get_activity_summary(self, async_session, test_user, assert_max_queries):
+        repo = MessageRepository(async_session)
+        now = datetime.now(timezone.utc).replace(minute=30, second=0, microsecond=0)
+
+        rows = [
+            (MessageRole.USER, now - timedelta(hours=1)),
+            (MessageRole.ASSISTANT, now - timedelta(hours=1)),
+            (MessageRole.USER, now - timedelta(hours=25)),
+            (MessageRole.USER, now - timedelta(hours=26)),
+            (MessageRole.USER, now - timedelta(days=10)),
+        ]
+        for role, created_at in rows:
+            await repo.create(
+                user_id=test_user.id, role=role, content="msg", created_at=created_at
+            )
+
+        with assert_max_queries(1):
+            summary = await repo.get_activity_summary(test_user.id)
+
+        assert summary.total == 5
+        assert summary.user_messages == 4
+        assert summary.assistant_messages == 1
+        assert sum(summary.hourly_user) == 4
+        assert summary.hourly_user[(now - timedelta(hours=1)).hour] >= 1
+
+    @pytest.mark.asyncio
+    async def test_get_activity_summary_since(self, async_session, test_user):
+        repo = MessageRepository(async_session)
+        now = datetime.now(timezone.utc)
+
+        await repo.create(
+            user_id=test_user.id, role=MessageRole.USER, content="old",
+            created_at=now - timedelta(days=10)
+        )
+        await repo.create(
+            user_id=test_user.id, role=MessageRole.USER, content="new",
+            created_at=now - timedelta(days=1)
+        )
+
+        summary = await repo.get_activity_summary(test_user.id, since=now - timedelta(days=7))
+
+        assert summary.total == 1
+        assert summary.user_messages == 1
+
+    @pytest.mark.asyncio
+    async def test_activity_hours_are_utc_in_any_session_time_zone(self):
+        # PostgreSQL-сессия с TimeZone = 'Europe/Moscow': EXTRACT(hour FROM
+        # timestamptz) дал бы местный час, поэтому время сначала переводится в UTC
+        session = Mock()
+        session.get_bind.return_value.dialect.name = "postgresql"
+        session.execute = AsyncMock(return_value=[])
+
+        await MessageRepository(session).get_activity_summary(1)
+
+        [stmt] = session.execute.call_args.args
+        sql = str(stmt.compile(dialect=postgresql.dialect()))
+        assert "EXTRACT(hour FROM timezone(%(timezone_1)s, messages.created_at))" in sql
+        assert stmt.compile(dialect=postgresql.dialect()).params["timezone_1"] == "UTC"
+
+    @pytest.mark.asyncio
+    async def test_get_activity_summary_empty(self, async_session, test_user):
+        repo = MessageRepository(async_session)
+
+        summary = await repo.get_activity_summary(test_user.id)
+
+        assert summary.total == 0
+        assert summary.peak_hour is None
+        assert summary.hourly_user == [0] * 24
@@ -180,6 +180,22 @@ class TestUserRepository:
         assert updated_user2.requests_today == 0
         assert updated_user3.requests_today == 0
 
+    @pytest.mark.asyncio
+    async def test_reset_daily_limits_single_statement(self, async_session, assert_max_queries):
+        repo = UserRepository(async_session)
+
+        for i in range(5):
+            await repo.create(
+                telegram_id=111111111 + i,
+                first_name=f"User{i}",
+                requests_today=i + 1
+            )
+
+        with assert_max_queries(1):
+            reset_count = await repo.reset_daily_limits()
+
+        assert reset_count == 5
+
     @pytest.mark.asyncio
     async def test_reset_daily_limits_no_users_with_requests(self, async_session):
         repo = UserRepository(async_session)
@@ -0,0 +1,127 @@
+import pytest
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+
+from app.infrastructure.database.bulk import (
+    BULK_TABLES,
+    CopyFormat,
+    copy_count,
+    copy_in,
+    copy_out,
+    export_query,
+    raw_connection,
+)
+
+
+class FakeCopyConnection:
+    """Записывает команды вместо asyncpg.Connection (COPY есть только в PostgreSQL)"""
+
+    def __init__(self, partitioned=True, bounds=None):
+        self.partitioned = partitioned
+        self.bounds = bounds
+        self.executed = []
+        self.copies = []
+
+    @asynccontextmanager
+    async def transaction(self):
+        self.executed.append("BEGIN")
+        yield
+        self.executed.append("COMMIT")
+
+    async def execute(self, query, *args):
+        self.executed.append(query)
+        return "INSERT 0 3" if query.startswith("INSERT") else "OK"
+
+    async def fetchval(self, query, *args):
+        if query.startswith("WITH"):
+            self.executed.append(query)
+            return 4
+        return self.partitioned
+
+    async def fetchrow(self, query, *args):
+        return self.bounds
+
+    async def copy_to_table(self, table, **kwargs):
+        self.copies.append((table, kwargs))
+        return "COPY 5"
+
+    async def copy_from_query(self, query, *args, **kwargs):
+        self.copies.append((query, args, kwargs))
+        return "COPY 7"
+
+
+def test_dump_columns_skip_generated_tsv():
+    messages = BULK_TABLES["messages"]
+
+    assert "content_tsv" not in messages.columns
+    assert {"id", "created_at", "content", "ai_metadata"} <= set(messages.columns)
+    assert list(BULK_TABLES) == ["users", "messages"]
+
+
+def test_export_query_and_status():
+    since = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+    query, args = export_query(BULK_TABLES["users"], since)
+
+    assert query.endswith("FROM users WHERE created_at >= $1")
+    assert args == [since]
+    assert copy_count("COPY 12") == 12
+    assert copy_count("INSERT 0 3") == 3
+
+
+@pytest.mark.asyncio
+async def test_copy_out_passes_format_and_header():
+    conn = FakeCopyConnection()
+
+    rows = await copy_out(conn, BULK_TABLES["messages"], "out.csv", CopyFormat.CSV)
+
+    assert rows == 7
+    _, args, kwargs = conn.copies[0]
+    assert args == ()
+    assert kwargs == {"output": "out.csv", "format": "csv", "header": True}
+
+
+@pytest.mark.asyncio
+async def test_copy_in_stages_creates_partitions_and_inserts():
+    conn = FakeCopyConnection(
+        bounds=(
+            datetime(2025, 11, 20, tzinfo=timezone.utc),
+            datetime(2026, 1, 3, tzinfo=timezone.utc),
+        )
+    )
+
+    rows = await copy_in(conn, BULK_TABLES["messages"], "in.bin")
+
+    assert rows == 4
+    table, kwargs = conn.copies[0]
+    assert table == "_bulk_messages"
+    assert kwargs["format"] == "binary" and "header" not in kwargs
+    created = [q for q in conn.executed if q.startswith("CREATE TABLE IF NOT EXISTS")]
+    assert [q.split()[5] for q in created] == [
+        "messages_p202511", "messages_p202512", "messages_p202601"
+    ]
+    assert conn.executed[0] == "BEGIN" and conn.executed[-1] == "COMMIT"
+    assert any("ON CONFLICT DO NOTHING" in q for q in conn.executed)
+    assert "setval" in conn.executed[-2]
+    # Роллапы растут только на строки из RETURNING вставки
+    [insert] = [q for q in conn.executed if "ON CONFLICT DO NOTHING" in q]
+    assert insert.startswith("WITH inserted AS (INSERT INTO messages")
+    assert "INSERT INTO message_daily_stats" in insert
+    assert "FROM inserted GROUP BY" in insert
+
+
+@pytest.mark.asyncio
+async def test_users_import_does_not_touch_rollups():
+    conn = FakeCopyConnection(partitioned=False)
+
+    rows = await copy_in(conn, BULK_TABLES["users"], "users.bin")
+
+    assert rows == 3
+    assert not any("message_daily_stats" in q for q in conn.executed)
+
+
+@pytest.mark.asyncio
+async def test_raw_connection_requires_asyncpg(async_engine):
+    with pytest.raises(RuntimeError):
+        async with raw_connection(async_engine):
+            pass
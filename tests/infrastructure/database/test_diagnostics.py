@@ -0,0 +1,127 @@
+import asyncio
+import logging
+import time
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.config.settings import settings
+from app.infrastructure.database.diagnostics import (
+    MonitoredQueuePool,
+    install_slow_query_log,
+    redact_parameters,
+)
+
+LOGGER = "app.infrastructure.database.diagnostics"
+
+
+class TestRedactParameters:
+    def test_values_are_replaced_by_types(self):
+        assert redact_parameters({"content": "secret", "user_id": 1}) == (
+            "{content: <str>, user_id: <int>}"
+        )
+        assert redact_parameters(("secret", 1)) == "(<str>, <int>)"
+
+    def test_executemany_reports_only_row_count(self):
+        assert redact_parameters([("a",), ("b",)]) == "<2 parameter sets>"
+
+
+class TestSlowQueryLog:
+    @pytest.mark.asyncio
+    async def test_slow_query_is_logged_without_values(self, async_engine, caplog):
+        install_slow_query_log(async_engine.sync_engine, threshold_ms=0)
+
+        with caplog.at_level(logging.WARNING, logger=LOGGER):
+            async with async_engine.connect() as conn:
+                await conn.execute(text("SELECT :secret, 'inline secret'"), {"secret": "top secret"})
+
+        [record] = [r for r in caplog.records if r.name == LOGGER]
+        message = record.getMessage()
+        assert "Slow query" in message
+        assert "parameters: (<str>)" in message
+        assert "top secret" not in message
+        assert "inline secret" not in message
+
+    @pytest.mark.asyncio
+    async def test_fast_query_is_not_logged(self, async_engine, caplog):
+        install_slow_query_log(async_engine.sync_engine, threshold_ms=60_000)
+
+        with caplog.at_level(logging.WARNING, logger=LOGGER):
+            async with async_engine.connect() as conn:
+                await conn.execute(text("SELECT 1"))
+
+        assert not [r for r in caplog.records if r.name == LOGGER]
+
+    @pytest.mark.asyncio
+    async def test_failed_query_leaves_no_timing_state(self, async_engine, caplog):
+        install_slow_query_log(async_engine.sync_engine, threshold_ms=0)
+
+        with caplog.at_level(logging.WARNING, logger=LOGGER):
+            async with async_engine.connect() as conn:
+                with pytest.raises(Exception):
+                    await conn.execute(text("SELECT * FROM missing_table"))
+                await conn.rollback()
+                await conn.execute(text("SELECT 1"))
+                info = (await conn.get_raw_connection()).info
+
+        assert len([r for r in caplog.records if r.name == LOGGER]) == 1
+        assert not [key for key in info if "start" in str(key)]
+
+
+class TestMonitoredQueuePool:
+    @pytest.mark.asyncio
+    async def test_saturated_pool_checkout_warns(self, caplog, monkeypatch):
+        monkeypatch.setattr(settings, "DB_POOL_WAIT_WARNING_MS", 10)
+        engine = create_async_engine(
+            "sqlite+aiosqlite://", poolclass=MonitoredQueuePool, pool_size=1, max_overflow=0
+        )
+
+        async def hold_connection(release: asyncio.Event) -> None:
+            async with engine.connect() as conn:
+                await conn.execute(text("SELECT 1"))
+                await release.wait()
+
+        release = asyncio.Event()
+        holder = asyncio.create_task(hold_connection(release))
+        await asyncio.sleep(0.01)
+        asyncio.get_running_loop().call_later(0.05, release.set)
+
+        with caplog.at_level(logging.WARNING, logger=LOGGER):
+            async with engine.connect() as conn:
+                await conn.execute(text("SELECT 1"))
+
+        await holder
+        await engine.dispose()
+        assert any("pool saturated" in r.getMessage() for r in caplog.records)
+
+    @pytest.mark.asyncio
+    async def test_free_pool_checkout_is_silent(self, caplog, monkeypatch):
+        monkeypatch.setattr(settings, "DB_POOL_WAIT_WARNING_MS", 1000)
+        engine = create_async_engine("sqlite+aiosqlite://", poolclass=MonitoredQueuePool)
+
+        with caplog.at_level(logging.WARNING, logger=LOGGER):
+            async with engine.connect() as conn:
+                await conn.execute(text("SELECT 1"))
+
+        await engine.dispose()
+        assert not caplog.records
+
+    @pytest.mark.asyncio
+    async def test_slow_connect_is_not_reported_as_saturation(self, caplog, monkeypatch):
+        monkeypatch.setattr(settings, "DB_POOL_WAIT_WARNING_MS", 10)
+        engine = create_async_engine("sqlite+aiosqlite://", poolclass=MonitoredQueuePool)
+        pool = engine.sync_engine.pool
+        create_connection = pool._create_connection
+
+        def slow_connect():
+            time.sleep(0.05)
+            return create_connection()
+
+        monkeypatch.setattr(pool, "_create_connection", slow_connect)
+
+        with caplog.at_level(logging.WARNING, logger=LOGGER):
+            async with engine.connect() as conn:
+                await conn.execute(text("SELECT 1"))
+
+        await engine.dispose()
+        assert not caplog.records
@@ -0,0 +1,108 @@
+import asyncio
+import pytest
+from types import SimpleNamespace
+
+from app.infrastructure.database.leader import LeaderLock, advisory_lock, lock_key
+
+
+def test_lock_key_is_stable():
+    assert lock_key("textflow-scheduler") == lock_key("textflow-scheduler")
+    assert lock_key("textflow-scheduler") != lock_key("other")
+    assert 0 <= lock_key("textflow-scheduler") < 2**63
+
+
+@pytest.mark.asyncio
+async def test_single_process_is_always_leader_outside_postgresql(async_engine):
+    lock = LeaderLock(async_engine, "textflow-scheduler")
+
+    assert await lock.is_leader()
+    await lock.release()
+
+
+class FakeLockConnection:
+    def __init__(self, held):
+        self.held = held
+
+    async def execution_options(self, **options):
+        return self
+
+    async def scalar(self, statement, params):
+        await asyncio.sleep(0)
+        if self.held:
+            return False
+        self.held.append(params["key"])
+        return True
+
+    async def execute(self, statement, params=None):
+        return None
+
+    async def close(self):
+        pass
+
+
+class FakePostgresEngine:
+    dialect = SimpleNamespace(name="postgresql")
+
+    def __init__(self):
+        self.held = []
+        self.connections = 0
+
+    async def connect(self):
+        self.connections += 1
+        return FakeLockConnection(self.held)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_checks_share_one_election():
+    engine = FakePostgresEngine()
+    lock = LeaderLock(engine, "textflow-scheduler")
+
+    results = await asyncio.gather(*(lock.is_leader() for _ in range(5)))
+
+    assert results == [True] * 5
+    assert engine.connections == 1
+
+
+class FakeAdvisoryEngine:
+    dialect = SimpleNamespace(name="postgresql")
+
+    def __init__(self):
+        self.statements = []
+
+    def connect(self):
+        engine = self
+
+        class Connection:
+            async def __aenter__(self):
+                return self
+
+            async def __aexit__(self, *exc):
+                return False
+
+            async def execution_options(self, **options):
+                return self
+
+            async def execute(self, statement, params):
+                engine.statements.append((str(statement), params["key"]))
+
+        return Connection()
+
+
+@pytest.mark.asyncio
+async def test_advisory_lock_waits_and_unlocks():
+    engine = FakeAdvisoryEngine()
+
+    with pytest.raises(RuntimeError):
+        async with advisory_lock(engine, "archive-user-1"):
+            assert engine.statements == [("SELECT pg_advisory_lock(:key)", lock_key("archive-user-1"))]
+            raise RuntimeError("boom")
+
+    assert engine.statements[-1] == ("SELECT pg_advisory_unlock(:key)", lock_key("archive-user-1"))
+
+
+@pytest.mark.asyncio
+async def test_advisory_lock_is_noop_outside_postgresql(async_engine):
+    async with advisory_lock(async_engine, "archive-user-1"):
+        pass
+    async with advisory_lock(None, "archive-user-1"):
+        pass
@@ -0,0 +1,78 @@
+import pytest
+from datetime import datetime, timedelta, timezone
+
+from app.infrastructure.database.partitions import (
+    PartitionManager,
+    add_months,
+    month_partition,
+    month_start,
+    parse_partition_name,
+    partitions_between,
+)
+
+
+class TestMonthPartition:
+    def test_month_start_normalizes_to_utc(self):
+        value = datetime(2026, 3, 1, 1, 30, tzinfo=timezone(timedelta(hours=3)))
+
+        assert month_start(value) == datetime(2026, 2, 1, tzinfo=timezone.utc)
+
+    def test_month_start_treats_naive_as_utc(self):
+        assert month_start(datetime(2026, 10, 19, 12)) == datetime(
+            2026, 10, 1, tzinfo=timezone.utc
+        )
+
+    def test_add_months_crosses_year(self):
+        start = datetime(2026, 11, 1, tzinfo=timezone.utc)
+
+        assert add_months(start, 2) == datetime(2027, 1, 1, tzinfo=timezone.utc)
+        assert add_months(start, -11) == datetime(2025, 12, 1, tzinfo=timezone.utc)
+
+    def test_partition_bounds_and_name(self):
+        partition = month_partition("messages", datetime(2026, 12, 15, tzinfo=timezone.utc))
+
+        assert partition.name == "messages_p202612"
+        assert partition.start == datetime(2026, 12, 1, tzinfo=timezone.utc)
+        assert partition.end == datetime(2027, 1, 1, tzinfo=timezone.utc)
+        assert partition.create_sql() == (
+            "CREATE TABLE IF NOT EXISTS messages_p202612 PARTITION OF messages "
+            "FOR VALUES FROM ('2026-12-01T00:00:00+00:00') TO ('2027-01-01T00:00:00+00:00')"
+        )
+
+    def test_partitions_between_covers_both_ends(self):
+        partitions = partitions_between(
+            "messages",
+            datetime(2025, 11, 30, 23, tzinfo=timezone.utc),
+            datetime(2026, 1, 1, tzinfo=timezone.utc),
+        )
+
+        assert [p.name for p in partitions] == [
+            "messages_p202511", "messages_p202512", "messages_p202601"
+        ]
+
+    def test_parse_partition_name_roundtrip(self):
+        partition = parse_partition_name("messages", "messages_p202602")
+
+        assert partition == month_partition("messages", datetime(2026, 2, 1))
+
+    @pytest.mark.parametrize(
+        "name",
+        ["messages_default", "messages_p202613", "messages_p2026", "users_p202601", "messages_fts"],
+    )
+    def test_parse_partition_name_ignores_foreign_tables(self, name):
+        assert parse_partition_name("messages", name) is None
+
+
+class TestPartitionManagerFallback:
+    """Without a partitioned table every operation is a no-op"""
+
+    @pytest.mark.asyncio
+    async def test_sqlite_is_not_partitioned(self, async_engine):
+        manager = PartitionManager(async_engine)
+
+        assert await manager.is_partitioned() is False
+        assert await manager.ensure_future_partitions(months_ahead=3) == []
+        assert await manager.drop_partitions_before(datetime.now(timezone.utc)) == 0
+        assert await manager.ensure_partitions_between(
+            datetime(2024, 1, 1, tzinfo=timezone.utc), datetime.now(timezone.utc)
+        ) == []
@@ -0,0 +1,113 @@
+import pytest
+import pytest_asyncio
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import event
+from app.core.models.message import MessageRole
+from app.infrastructure.database.repositories.message_repository import MessageRepository
+from app.infrastructure.database.repositories.user_repository import UserRepository
+from app.utils.cursor import MessageCursor
+
+
+ORDERED_INDEX = "ix_messages_user_id_created_at_id"
+ROLE_INDEX = "ix_messages_user_id_role_created_at"
+
+
+class TestMessageQueryPlans:
+    """Hot message queries must be served by the composite indexes without a sort step"""
+
+    @pytest_asyncio.fixture
+    async def repo(self, async_session):
+        user = await UserRepository(async_session).create(
+            telegram_id=123456789, first_name="Test User"
+        )
+        repo = MessageRepository(async_session)
+        for i in range(20):
+            await repo.create_message(
+                user_id=user.id,
+                role=MessageRole.USER if i % 2 == 0 else MessageRole.ASSISTANT,
+                content=f"Message {i}",
+            )
+        repo.test_user_id = user.id
+        return repo
+
+    @pytest_asyncio.fixture
+    async def explain(self, async_engine, async_session):
+        """Run a repository call, then EXPLAIN QUERY PLAN each SELECT it issued"""
+
+        async def _explain(call):
+            captured = []
+
+            def capture(conn, cursor, statement, parameters, context, executemany):
+                if statement.lstrip().upper().startswith("SELECT"):
+                    captured.append((statement, parameters))
+
+            sync_engine = async_engine.sync_engine
+            event.listen(sync_engine, "before_cursor_execute", capture)
+            try:
+                await call()
+            finally:
+                event.remove(sync_engine, "before_cursor_execute", capture)
+
+            plans = []
+            connection = await async_session.connection()
+            for statement, parameters in captured:
+                result = await connection.exec_driver_sql(
+                    "EXPLAIN QUERY PLAN " + statement, parameters
+                )
+                plans.append(" | ".join(row[-1] for row in result))
+            return plans
+
+        return _explain
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize(
+        "call, index",
+        [
+            (lambda repo: repo.get_user_messages(repo.test_user_id, limit=5, offset=5), ORDERED_INDEX),
+            (
+                lambda repo: repo.get_user_messages_after(
+                    repo.test_user_id, MessageCursor(datetime.now(timezone.utc), 10), limit=5
+                ),
+                ORDERED_INDEX,
+            ),
+            (
+                lambda repo: repo.get_user_messages_before(
+                    repo.test_user_id, MessageCursor(datetime(2000, 1, 1), 10), limit=5
+                ),
+                ORDERED_INDEX,
+            ),
+            (lambda repo: repo.get_recent_context(repo.test_user_id, limit=10), ORDERED_INDEX),
+            (lambda repo: repo.get_conversation_context(repo.test_user_id, hours_back=24), ORDERED_INDEX),
+            (
+                lambda repo: repo.get_messages_by_date_range(
+                    repo.test_user_id,
+                    datetime.now(timezone.utc) - timedelta(days=1),
+                    datetime.now(timezone.utc),
+                ),
+                ORDERED_INDEX,
+            ),
+            (lambda repo: repo.get_messages_by_role(repo.test_user_id, MessageRole.USER), ROLE_INDEX),
+        ],
+    )
+    async def test_ordered_index_scan(self, repo, explain, call, index):
+        plans = await explain(lambda: call(repo))
+
+        assert plans, "repository call issued no SELECT"
+        for plan in plans:
+            assert index in plan, plan
+            assert "TEMP B-TREE" not in plan, plan
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize(
+        "call",
+        [
+            lambda repo: repo.get_messages_by_role_count(repo.test_user_id, MessageRole.USER, hours_back=24),
+            lambda repo: repo.get_user_message_count(repo.test_user_id, hours_back=24),
+            lambda repo: repo.get_user_message_count(repo.test_user_id),
+        ],
+    )
+    async def test_counts_use_covering_index(self, repo, explain, call):
+        plans = await explain(lambda: call(repo))
+
+        for plan in plans:
+            assert "COVERING INDEX" in plan, plan
@@ -0,0 +1,140 @@
+import pytest
+import pytest_asyncio
+from sqlalchemy import func, insert, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from app.core.models.base import Base
+from app.core.models.message import Message, MessageRole
+from app.core.models.user import User
+from app.core.services.cabinet_service import CabinetService
+from app.infrastructure.database.routing import ReplicaRouter, RoutingSession
+
+TELEGRAM_ID = 123456789
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+async def _memory_engine(with_schema: bool = True):
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:", poolclass=StaticPool)
+    if with_schema:
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+    return engine
+
+
+async def _add_messages(engine, user_id: int, count: int) -> None:
+    async with engine.begin() as conn:
+        await conn.execute(
+            insert(Message),
+            [{"user_id": user_id, "role": MessageRole.USER, "content": "hi"}] * count,
+        )
+
+
+class TestReplicaRouting:
+    @pytest_asyncio.fixture
+    async def replica_engine(self):
+        engine = await _memory_engine()
+        yield engine
+        await engine.dispose()
+
+    @pytest_asyncio.fixture
+    async def user_id(self, async_engine):
+        async with async_engine.begin() as conn:
+            result = await conn.execute(
+                insert(User).values(telegram_id=TELEGRAM_ID, first_name="Test").returning(User.id)
+            )
+            user_id = result.scalar_one()
+        # Реплика «отстаёт»: в primary два сообщения, в реплике одно
+        await _add_messages(async_engine, user_id, 2)
+        return user_id
+
+    @pytest.fixture
+    def clock(self):
+        return FakeClock()
+
+    def _router(self, engine, clock, **kwargs):
+        options = {"max_lag": 5, "read_your_writes": 10, "check_interval": 5}
+        options.update(kwargs)
+        return ReplicaRouter(engine, clock=clock, **options)
+
+    async def _history_count(self, async_engine, router) -> int:
+        sessionmaker = async_sessionmaker(
+            async_engine, sync_session_class=RoutingSession, expire_on_commit=False
+        )
+        async with sessionmaker() as session:
+            return await CabinetService(session, router).get_message_history_count(TELEGRAM_ID)
+
+    @pytest.mark.asyncio
+    async def test_reads_go_to_replica_user_row_to_primary(self, async_engine, replica_engine, user_id, clock):
+        await _add_messages(replica_engine, user_id, 1)
+
+        # Пользователя в реплике нет — его строка читается с primary
+        assert await self._history_count(async_engine, self._router(replica_engine, clock)) == 1
+
+    @pytest.mark.asyncio
+    async def test_read_your_writes_uses_primary(self, async_engine, replica_engine, user_id, clock):
+        await _add_messages(replica_engine, user_id, 1)
+        router = self._router(replica_engine, clock)
+        router.note_write(TELEGRAM_ID)
+
+        assert await self._history_count(async_engine, router) == 2
+
+        clock.now += 11
+        assert not router.wrote_recently(TELEGRAM_ID)
+
+    @pytest.mark.asyncio
+    async def test_lagging_replica_falls_back_to_primary(self, async_engine, replica_engine, user_id, clock, monkeypatch):
+        await _add_messages(replica_engine, user_id, 1)
+        router = self._router(replica_engine, clock)
+
+        async def lag():
+            return 30.0
+
+        monkeypatch.setattr(router, "replication_lag", lag)
+
+        assert await self._history_count(async_engine, router) == 2
+
+    @pytest.mark.asyncio
+    async def test_replica_error_retries_on_primary(self, async_engine, user_id, clock):
+        # Проверка здоровья проходит, а запрос падает (в реплике нет таблиц)
+        broken = await _memory_engine(with_schema=False)
+        router = self._router(broken, clock)
+
+        assert await self._history_count(async_engine, router) == 2
+        assert not await router.is_available()
+
+        await broken.dispose()
+
+    @pytest.mark.asyncio
+    async def test_health_check_is_cached(self, replica_engine, clock, monkeypatch):
+        router = self._router(replica_engine, clock)
+        calls = []
+
+        async def lag():
+            calls.append(clock.now)
+            return 0.0
+
+        monkeypatch.setattr(router, "replication_lag", lag)
+
+        assert await router.is_available()
+        assert await router.is_available()
+        clock.now += 5
+        assert await router.is_available()
+        assert len(calls) == 2
+
+    @pytest.mark.asyncio
+    async def test_writes_inside_replica_read_go_to_primary(self, async_engine, replica_engine, clock):
+        # Неизвестный пользователь создаётся — и только в primary
+        assert await self._history_count(async_engine, self._router(replica_engine, clock)) == 0
+
+        for engine, expected in ((async_engine, 1), (replica_engine, 0)):
+            async with engine.connect() as conn:
+                count = await conn.scalar(select(func.count()).select_from(User))
+            assert count == expected
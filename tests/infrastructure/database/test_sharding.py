@@ -0,0 +1,149 @@
+import pytest
+import pytest_asyncio
+from datetime import date
+from sqlalchemy import func, insert, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from app.core.models.base import Base
+from app.core.models.message import Message, MessageRole
+from app.core.models.message_daily_stats import MessageDailyStats
+from app.core.models.user import User
+from app.infrastructure.cache.ttl_cache import message_count_cache
+from app.infrastructure.database.rebalance import move_buckets
+from app.infrastructure.database.repositories.user_repository import UserRepository
+from app.infrastructure.database.routing import RoutingSession
+from app.infrastructure.database.sharding import ShardMap, ShardRegistry, bucket_of
+
+
+def telegram_ids_in_buckets(buckets, total):
+    """По одному telegram_id на каждый бакет из buckets"""
+    found = {}
+    telegram_id = 100_000
+    while len(found) < len(buckets):
+        bucket = bucket_of(telegram_id, total)
+        if bucket in buckets and bucket not in found:
+            found[bucket] = telegram_id
+        telegram_id += 1
+    return [found[b] for b in buckets]
+
+
+class TestShardMap:
+    def test_even_split_by_default(self):
+        shard_map = ShardMap(["main", "b"], buckets=4)
+
+        assert shard_map.to_ranges() == {"0-1": "main", "2-3": "b"}
+
+    def test_explicit_ranges(self):
+        shard_map = ShardMap(["main", "b"], buckets=4, ranges={"0,3": "main", "1-2": "b"})
+
+        assert shard_map.buckets_of("main") == [0, 3]
+        [telegram_id] = telegram_ids_in_buckets([2], 4)
+        assert shard_map.shard_for(telegram_id) == "b"
+
+    @pytest.mark.parametrize(
+        "ranges",
+        [{"0-2": "main"}, {"0-3": "main", "3": "b"}, {"0-3": "unknown"}, {"0-4": "main"}, {"x": "main"}],
+    )
+    def test_invalid_map_is_rejected(self, ranges):
+        with pytest.raises(ValueError):
+            ShardMap(["main", "b"], buckets=4, ranges=ranges)
+
+    def test_moved_returns_new_map(self):
+        shard_map = ShardMap(["main", "b"], buckets=4, ranges={"0-3": "main"})
+
+        moved = shard_map.moved([1, 2], "b")
+
+        assert moved.to_ranges() == {"0": "main", "3": "main", "1-2": "b"}
+        assert shard_map.buckets_of("b") == []
+
+
+class TestShardRegistry:
+    @pytest_asyncio.fixture
+    async def registry(self):
+        engines = {}
+        for name in ("main", "b"):
+            engine = create_async_engine("sqlite+aiosqlite:///:memory:", poolclass=StaticPool)
+            async with engine.begin() as conn:
+                await conn.run_sync(Base.metadata.create_all)
+            engines[name] = engine
+        registry = ShardRegistry(engines, ShardMap(["main", "b"], buckets=4, ranges={"0-3": "main"}))
+        yield registry
+        await registry.dispose()
+
+    async def _count(self, registry, name, model, **filters):
+        async with registry.shards[name].engine.connect() as conn:
+            stmt = select(func.count()).select_from(model).filter_by(**filters)
+            return await conn.scalar(stmt)
+
+    @pytest.mark.asyncio
+    async def test_repository_writes_go_to_users_shard(self, registry):
+        registry.shard_map = ShardMap(["main", "b"], buckets=4)
+        first, second = telegram_ids_in_buckets([0, 3], 4)
+        sessionmaker = async_sessionmaker(
+            registry.shards["main"].engine, sync_session_class=RoutingSession, expire_on_commit=False
+        )
+
+        for telegram_id in (first, second):
+            with registry.use_shard_of(telegram_id):
+                async with sessionmaker() as session:
+                    repo = UserRepository(session)
+                    await repo.create(telegram_id=telegram_id, first_name="Test")
+                    await repo.commit()
+                    assert await repo.get_by_telegram_id(telegram_id) is not None
+
+        assert await self._count(registry, "main", User, telegram_id=first) == 1
+        assert await self._count(registry, "b", User, telegram_id=second) == 1
+        assert await self._count(registry, "main", User) == 1
+
+    @pytest.mark.asyncio
+    async def test_fan_out_runs_on_every_shard(self, registry):
+        async def shard_name(shard):
+            async with shard.engine.connect() as conn:
+                await conn.execute(select(1))
+            return shard.name
+
+        assert await registry.fan_out(shard_name) == {"main": "main", "b": "b"}
+
+    @pytest.mark.asyncio
+    async def test_cache_keys_are_per_shard(self, registry):
+        with registry.use_shard("main"):
+            message_count_cache.set(1, 10)
+        with registry.use_shard("b"):
+            assert message_count_cache.get(1) is None
+            message_count_cache.set(1, 20)
+        with registry.use_shard("main"):
+            assert message_count_cache.get(1) == 10
+
+    @pytest.mark.asyncio
+    async def test_rebalance_moves_users_with_their_data(self, registry):
+        stay, move = telegram_ids_in_buckets([0, 2], 4)
+        async with registry.shards["main"].engine.begin() as conn:
+            for telegram_id in (stay, move):
+                user_id = await conn.scalar(
+                    insert(User).values(telegram_id=telegram_id, first_name="Test").returning(User.id)
+                )
+                await conn.execute(
+                    insert(Message),
+                    [{"user_id": user_id, "role": MessageRole.USER, "content": f"m{i}"} for i in range(3)],
+                )
+                await conn.execute(
+                    insert(MessageDailyStats).values(
+                        user_id=user_id, day=date(2026, 1, 1), user_msgs=3,
+                        assistant_msgs=0, tokens_in=0, tokens_out=0,
+                    )
+                )
+
+        result = await move_buckets(registry, [2, 3], "b", batch_size=2)
+
+        assert (result.users, result.messages) == (1, 3)
+        assert await self._count(registry, "main", User) == 1
+        assert await self._count(registry, "main", Message) == 3
+        assert await self._count(registry, "b", User, telegram_id=move) == 1
+        assert await self._count(registry, "b", Message) == 3
+        assert await self._count(registry, "b", MessageDailyStats) == 1
+
+        # Повторный запуск ничего не дублирует
+        result = await move_buckets(registry, [2, 3], "b")
+        assert result.users == 0
+        assert await self._count(registry, "b", Message) == 3
@@ -0,0 +1,158 @@
+import asyncio
+import pytest
+import pytest_asyncio
+from unittest.mock import AsyncMock
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from app.core.models.message import MessageRole
+from app.infrastructure.database.repositories.message_daily_stats_repository import (
+    MessageDailyStatsRepository,
+)
+from app.infrastructure.database.repositories.message_repository import MessageRepository
+from app.infrastructure.database.repositories.user_repository import UserRepository
+from app.infrastructure.database.write_buffer import MessageWriteBuffer
+
+
+class TestMessageWriteBuffer:
+    @pytest_asyncio.fixture
+    async def user(self, async_session):
+        return await UserRepository(async_session).create(
+            telegram_id=123456789, first_name="Test User"
+        )
+
+    @pytest_asyncio.fixture
+    async def buffer(self, async_engine):
+        buffer = MessageWriteBuffer(
+            async_sessionmaker(async_engine, class_=AsyncSession, expire_on_commit=False),
+            max_rows=3,
+            flush_interval=60,
+        )
+        yield buffer
+        await buffer.close()
+
+    @pytest.mark.asyncio
+    async def test_context_reads_pending_messages(self, async_session, buffer, user):
+        repo = MessageRepository(async_session, write_buffer=buffer)
+        await MessageRepository(async_session).create_message(
+            user_id=user.id, role=MessageRole.USER, content="stored"
+        )
+
+        message = await repo.create_message(
+            user_id=user.id, role=MessageRole.USER, content="pending"
+        )
+
+        assert message.id is None
+        assert await repo.get_user_message_count(user.id) == 1
+        context = await repo.get_recent_context(user.id, limit=10)
+        assert [m.content for m in context] == ["stored", "pending"]
+        assert [m.content for m in await repo.get_recent_context(user.id, limit=1)] == ["pending"]
+
+    @pytest.mark.asyncio
+    async def test_flush_writes_batch_in_one_insert(self, async_session, buffer, user, assert_max_queries):
+        repo = MessageRepository(async_session, write_buffer=buffer)
+        await repo.create_message(user_id=user.id, role=MessageRole.USER, content="question")
+        answer = await repo.create_message(
+            user_id=user.id,
+            role=MessageRole.ASSISTANT,
+            content="answer",
+            ai_metadata={"token_usage": {"input_tokens": 7, "output_tokens": 11}},
+        )
+
+        # Одна транзакция без SELECT: вставки (в PostgreSQL — один
+        # многострочный INSERT) и один upsert роллапа на пользователя и день
+        with assert_max_queries(3) as log:
+            assert await buffer.flush() == 2
+
+        assert not any(s.startswith("SELECT") for s in log.statements)
+        assert sum(s.startswith("INSERT INTO message_daily_stats") for s in log.statements) == 1
+        assert answer.id is not None
+        assert len(buffer) == 0
+        assert await repo.get_user_message_count(user.id) == 2
+        totals = await MessageDailyStatsRepository(async_session).get_totals(user.id)
+        assert (totals.user_messages, totals.assistant_messages) == (1, 1)
+        assert (totals.tokens_in, totals.tokens_out) == (7, 11)
+
+    @pytest.mark.asyncio
+    async def test_written_message_is_not_duplicated(self, async_session, buffer, user):
+        repo = MessageRepository(async_session, write_buffer=buffer)
+        message = await repo.create_message(user_id=user.id, role=MessageRole.USER, content="hi")
+        await buffer.flush()
+        # Запись в БД есть, а из очереди сообщение ещё не убрано
+        buffer._pending.append(message)
+
+        context = await repo.get_recent_context(user.id)
+
+        assert [m.content for m in context] == ["hi"]
+
+    @pytest.mark.asyncio
+    async def test_max_rows_triggers_background_flush(self, async_session, buffer, user):
+        buffer.start()
+        for i in range(3):
+            await buffer.add(user.id, MessageRole.USER, f"Message {i}")
+
+        for _ in range(50):
+            if not len(buffer):
+                break
+            await asyncio.sleep(0.01)
+
+        assert len(buffer) == 0
+        assert await MessageRepository(async_session).get_user_message_count(user.id) == 3
+
+    @pytest.mark.asyncio
+    async def test_failed_flush_keeps_messages_until_close(self, async_session, buffer, user, monkeypatch):
+        await buffer.add(user.id, MessageRole.USER, "hi")
+        monkeypatch.setattr(
+            MessageDailyStatsRepository, "add_counts", AsyncMock(side_effect=RuntimeError("db down"))
+        )
+
+        with pytest.raises(RuntimeError):
+            await buffer.flush()
+        assert len(buffer) == 1
+        assert buffer.pending_for(user.id)[0].id is None
+
+        monkeypatch.undo()
+        await buffer.close()
+
+        assert len(buffer) == 0
+        assert await MessageRepository(async_session).get_user_message_count(user.id) == 1
+
+    @pytest.mark.asyncio
+    async def test_rejected_row_is_dropped_and_rest_written(self, async_session, buffer, user):
+        await buffer.add(user.id, MessageRole.USER, "first")
+        await buffer.add(user.id, MessageRole.USER, None)  # NOT NULL: БД отвергнет
+        await buffer.add(user.id, MessageRole.USER, "third")
+
+        assert await buffer.flush() == 2
+
+        assert len(buffer) == 0
+        context = await MessageRepository(async_session).get_recent_context(user.id)
+        assert [m.content for m in context] == ["first", "third"]
+
+    @pytest.mark.asyncio
+    async def test_full_queue_flushes_before_accepting(self, async_session, async_engine, user):
+        buffer = MessageWriteBuffer(
+            async_sessionmaker(async_engine, class_=AsyncSession, expire_on_commit=False),
+            max_rows=100,
+            flush_interval=60,
+            max_pending=2,
+        )
+        await buffer.add(user.id, MessageRole.USER, "one")
+        await buffer.add(user.id, MessageRole.USER, "two")
+
+        await buffer.add(user.id, MessageRole.USER, "three")
+
+        assert len(buffer) == 1
+        assert await MessageRepository(async_session).get_user_message_count(user.id) == 2
+        await buffer.close()
+
+    @pytest.mark.asyncio
+    async def test_discard_user_drops_pending_rows(self, async_session, buffer, user):
+        other = await UserRepository(async_session).create(telegram_id=987654321, first_name="Other")
+        await buffer.add(user.id, MessageRole.USER, "secret")
+        await buffer.add(other.id, MessageRole.USER, "kept")
+
+        assert await buffer.discard_user(user.id) == 1
+        await buffer.flush()
+
+        repo = MessageRepository(async_session)
+        assert await repo.get_user_message_count(user.id) == 0
+        assert await repo.get_user_message_count(other.id) == 1
@@ -0,0 +1,138 @@
+import pytest
+from unittest.mock import patch
+from aiohttp.test_utils import TestClient, TestServer
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import QueuePool
+
+from app.infrastructure.monitoring import metrics
+from app.infrastructure.monitoring.metrics import (
+    REGISTRY,
+    install_engine_metrics,
+    instrument_repository,
+    record_cache_lookup,
+    record_provider_tokens,
+    track_repository_call,
+)
+from app.infrastructure.monitoring.server import create_metrics_app
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+class DummyRepository:
+    def __init__(self, session):
+        self.session = session
+
+    async def ping(self):
+        await self.session.execute(text("SELECT 1"))
+        await self.session.execute(text("SELECT 2"))
+        return "pong"
+
+    async def _private(self):
+        return None
+
+
+class TestMetrics:
+    @pytest.mark.asyncio
+    async def test_repository_queries_are_attributed_to_method(self, async_engine, async_session):
+        install_engine_metrics(async_engine.sync_engine)
+        method = "DummyRepository.ping"
+        before = sample("textflow_db_queries_total", method=method)
+
+        repo = DummyRepository(async_session)
+        result = await track_repository_call(DummyRepository.ping)(repo)
+
+        assert result == "pong"
+        assert sample("textflow_db_queries_total", method=method) == before + 2
+        assert sample("textflow_repository_call_duration_seconds_count", method=method) >= 1
+
+    @pytest.mark.asyncio
+    async def test_queries_outside_repository_are_unscoped(self, async_engine, async_session):
+        install_engine_metrics(async_engine.sync_engine)
+        before = sample("textflow_db_queries_total", method=metrics.UNSCOPED)
+
+        await async_session.execute(text("SELECT 1"))
+
+        assert sample("textflow_db_queries_total", method=metrics.UNSCOPED) == before + 1
+
+    @pytest.mark.asyncio
+    async def test_failed_query_does_not_break_timing(self, async_engine, async_session):
+        install_engine_metrics(async_engine.sync_engine)
+        before = sample("textflow_db_queries_total", method=metrics.UNSCOPED)
+
+        with pytest.raises(Exception):
+            await async_session.execute(text("SELECT * FROM missing_table"))
+        await async_session.rollback()
+        await async_session.execute(text("SELECT 1"))
+
+        assert sample("textflow_db_queries_total", method=metrics.UNSCOPED) == before + 1
+
+    def test_pool_gauges_are_labelled_by_engine(self):
+        engines = {
+            "shard-a": create_engine("sqlite://", poolclass=QueuePool),
+            "shard-b": create_engine("sqlite://", poolclass=QueuePool),
+        }
+        for name, engine in engines.items():
+            install_engine_metrics(engine, name)
+
+        with engines["shard-a"].connect():
+            assert sample("textflow_db_pool_checked_out", engine="shard-a") == 1
+            assert sample("textflow_db_pool_checked_out", engine="shard-b") == 0
+
+    def test_instrument_repository_noop_when_disabled(self):
+        class Repo:
+            async def get(self):
+                return 1
+
+        original = Repo.get
+        with patch.object(metrics.settings, "METRICS_ENABLED", False):
+            instrument_repository(Repo)
+
+        assert Repo.get is original
+
+    def test_instrument_repository_wraps_public_coroutines(self):
+        class Repo:
+            async def get(self):
+                return 1
+
+            async def _hidden(self):
+                return 2
+
+        original_get, original_hidden = Repo.get, Repo._hidden
+        with patch.object(metrics.settings, "METRICS_ENABLED", True):
+            instrument_repository(Repo)
+
+        assert Repo.get is not original_get
+        assert Repo.get.__wrapped__ is original_get
+        assert Repo._hidden is original_hidden
+
+    def test_counters_skipped_when_disabled(self):
+        before = sample("textflow_cache_lookups_total", cache="test", result="hit")
+        with patch.object(metrics.settings, "METRICS_ENABLED", False):
+            record_cache_lookup("test", hit=True)
+        assert sample("textflow_cache_lookups_total", cache="test", result="hit") == before
+
+    def test_cache_and_token_counters(self):
+        with patch.object(metrics.settings, "METRICS_ENABLED", True):
+            record_cache_lookup("test", hit=True)
+            record_cache_lookup("test", hit=False)
+            record_provider_tokens("google", "test-model", input_tokens=10, output_tokens=5)
+
+        assert sample("textflow_cache_lookups_total", cache="test", result="hit") >= 1
+        assert sample("textflow_cache_lookups_total", cache="test", result="miss") >= 1
+        assert sample(
+            "textflow_provider_tokens_total", provider="google", model="test-model", direction="output"
+        ) >= 5
+
+    @pytest.mark.asyncio
+    async def test_metrics_endpoint(self):
+        record_provider_tokens("google", "endpoint-model", input_tokens=1, output_tokens=1)
+
+        async with TestClient(TestServer(create_metrics_app())) as client:
+            response = await client.get("/metrics")
+            body = await response.text()
+
+        assert response.status == 200
+        assert response.content_type == "text/plain"
+        assert "textflow_handler_duration_seconds" in body
@@ -0,0 +1,57 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from app.core.exceptions.message import InvalidCursor
+from app.utils.cursor import (
+    MessageCursor,
+    SearchCursor,
+    decode_cursor,
+    decode_search_cursor,
+    encode_cursor,
+    encode_search_cursor,
+)
+
+
+def test_cursor_round_trip():
+    """Encoding keeps microsecond precision and the id tie-breaker."""
+    cursor = MessageCursor(datetime(2026, 10, 19, 11, 3, 27, 540913, tzinfo=timezone.utc), 987654)
+
+    assert decode_cursor(encode_cursor(cursor)) == cursor
+
+
+def test_naive_datetime_is_treated_as_utc():
+    """SQLite returns naive datetimes; they must encode like their UTC equivalent."""
+    naive = datetime(2026, 10, 19, 11, 3, 27)
+
+    assert encode_cursor(MessageCursor(naive, 1)) == encode_cursor(
+        MessageCursor(naive.replace(tzinfo=timezone.utc), 1)
+    )
+
+
+def test_cursor_is_compact():
+    """Cursor must leave room for the prefix within Telegram's 64-byte callback data."""
+    cursor = MessageCursor(datetime(2100, 1, 1, tzinfo=timezone.utc), 2**31 - 1)
+
+    assert len(encode_cursor(cursor)) <= 20
+
+
+@pytest.mark.parametrize("token", ["", "abc", "a.b.c", "zz.!", "-1.5", "1.-5", "z" * 40 + ".1"])
+def test_decode_invalid_cursor(token):
+    """Malformed callback data should raise InvalidCursor."""
+    with pytest.raises(InvalidCursor):
+        decode_cursor(token)
+
+
+@pytest.mark.parametrize("rank", [0.0, 0.1, -3.2e-6, 7.5, 1e300])
+def test_search_cursor_round_trip(rank):
+    """Rank must survive encoding bit-for-bit so keyset comparisons stay exact."""
+    cursor = SearchCursor(rank, 123456)
+
+    assert decode_search_cursor(encode_search_cursor(cursor)) == cursor
+
+
+@pytest.mark.parametrize("token", ["", "1", "zzzzzzzzzzzzzzz.1", "-1.1", "1.-1"])
+def test_decode_invalid_search_cursor(token):
+    with pytest.raises(InvalidCursor):
+        decode_search_cursor(token)